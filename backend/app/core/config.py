@@ -17,6 +17,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "votre_super_secret_key_a_remplacer_dans_env" # Default peu sûr, juste pour démarrer
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 jours
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10000 # Utilisateurs authentifiés gardés en mémoire (LRU)
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60 # Délai maximal de prise en compte d'une modification faite par un autre worker
+    AUTH_PASSWORD_HASH_WORKERS: int = 4 # Threads dédiés à bcrypt (hachages/vérifications simultanés)
+    AUTH_PASSWORD_HASH_MAX_PENDING: int = 256 # Opérations bcrypt en attente ou en cours (au-delà : 503)
 
     # Configuration MongoDB (Priorité: .env > Variables système)
     USE_MONGODB_ATLAS: bool = False # Par défaut sur False, surcharger via .env pour utiliser Atlas
@@ -31,6 +35,52 @@ class Settings(BaseSettings):
     # Si 'resultats' est DANS 'backend', ce serait:
     DATA_PATH: str = os.path.join(os.path.dirname(PROJECT_ROOT), "resultats", "donnees_application.json")
     METADATA_PATH: str = os.path.join(os.path.dirname(PROJECT_ROOT), "resultats", "metadonnees.json")
+    # Registre des facteurs d'émission (fournisseur cloud x région), rechargé à chaud
+    EMISSION_FACTORS_PATH: str = os.path.join(os.path.dirname(PROJECT_ROOT), "resultats", "facteurs_emission.json")
+    EMISSION_FACTORS_CHECK_INTERVAL_SECONDS: float = 5.0 # Fréquence de vérification du fichier
+    # Profils horaires d'intensité carbone (<région>.csv ou <région>.parquet, 8760 valeurs)
+    GRID_PROFILES_DIR: str = os.path.join(os.path.dirname(PROJECT_ROOT), "resultats", "grid_profiles")
+    GRID_PROFILES_CACHE_DIR: Optional[str] = None # Profils convertis en .npy (par défaut : dossier temporaire du système)
+
+    # Calcul des scores carbone (scripts/calculate_scores.py, moteur "streaming")
+    SCORING_CURSOR_BATCH_SIZE: int = 5000 # Documents lus par lot depuis le curseur MongoDB
+    SCORING_UPDATE_BATCH_SIZE: int = 1000 # Opérations UpdateOne maximum par bulk_write
+    SCORING_PROCESS_POOL_THRESHOLD: int = 200000 # Au-delà, les rangs sont calculés dans un pool de processus
+
+    # Snapshot en mémoire du catalogue (colonnes NumPy partagées par les services)
+    CATALOG_SNAPSHOT_TTL_SECONDS: int = 60 # Délai avant de revérifier la version du catalogue en base
+    SIMULATION_CACHE_MAX_ENTRIES: int = 10000 # Résultats de simulation gardés en mémoire (LRU)
+    SIMULATION_CACHE_TTL_SECONDS: int = 300 # Durée de vie d'un résultat de simulation en cache
+    SIMULATION_WRITE_BUFFER_MAX_PENDING: int = 10000 # Simulations en attente d'écriture (au-delà : contre-pression)
+    SIMULATION_WRITE_BATCH_SIZE: int = 500 # Taille des lots insert_many de l'historique des simulations
+    SIMULATION_WRITE_FLUSH_INTERVAL_SECONDS: float = 1.0 # Délai maximal avant écriture d'une simulation
+    SIMULATION_WRITE_MAX_ATTEMPTS: int = 3 # Tentatives d'un lot en échec avant d'isoler les documents invalides
+    SIMULATION_WRITE_DEAD_LETTER_MAX: int = 1000 # Documents impossibles à écrire gardés en mémoire (cf. stats)
+    SIMULATION_HISTORY_RETENTION_DAYS: int = 30 # Durée de conservation des simulations non sauvegardées (index TTL)
+    SIMULATION_SWEEP_MAX_CELLS: int = 2000000 # Taille maximale d'une grille de simulations (cellules)
+    SIMULATION_MONTE_CARLO_WORKERS: int = 2 # Threads dédiés aux simulations Monte Carlo
+    SIMULATION_MONTE_CARLO_TIMEOUT_SECONDS: float = 2.0 # Budget de latence d'une simulation Monte Carlo
+
+    # Exports (rapports PDF / Excel) générés en tâche de fond
+    EXPORT_JOB_WORKERS: int = 2 # Exports générés simultanément
+    EXPORT_JOB_MAX_QUEUED: int = 100 # Exports en attente (au-delà : 503)
+    EXPORT_JOB_RETENTION_SECONDS: int = 3600 # Durée de conservation du statut d'un export terminé
+    EXPORT_JOB_SSE_KEEPALIVE_SECONDS: float = 15.0 # Intervalle des commentaires keep-alive du flux SSE
+    EXPORT_JOB_POLL_INTERVAL_SECONDS: float = 1.0 # Relecture en base du statut d'un export d'un autre worker (flux SSE)
+    EXPORT_CURSOR_BATCH_SIZE: int = 2000 # Modèles lus (et écrits dans le classeur XLSX) par lot
+    EXPORT_PDF_WORKERS: int = 2 # Processus dédiés au rendu des rapports PDF (graphiques, mise en page)
+    EXPORT_CHART_CACHE_MAX_ENTRIES: int = 256 # Graphiques de rapports gardés en mémoire (par ensemble de modèles)
+    EXPORT_CHART_CACHE_TTL_SECONDS: int = 3600
+    EXPORT_REPORT_FREQUENCY_PER_DAY: int = 1000 # Charge simulée dans la section "Simulations" des rapports
+    EXPORT_REPORT_DURATION_DAYS: int = 365
+    EXPORT_ARTIFACT_MAX_BYTES: int = 1024 ** 3 # Taille maximale du dossier des exports (éviction LRU au-delà)
+    EXPORT_ARTIFACT_SWEEP_INTERVAL_SECONDS: int = 300 # Intervalle de la tâche d'éviction des exports
+    EXPORT_PARQUET_COMPRESSION: str = "zstd" # Codec des exports Parquet
+    EXPORT_ARROW_COMPRESSION: Optional[str] = None # Codec des exports Arrow IPC (None : lecture zero-copy par memory map)
+    EXPORT_GZIP_LEVEL: int = 6 # Niveau de compression des copies gzip des exports (téléchargements)
+    EXPORT_GZIP_MIN_SAVINGS: float = 0.1 # Gain minimal (fraction de la taille) pour conserver la copie gzip
+    EXPORT_RECORD_RETENTION_DAYS: int = 7 # Durée de conservation des exports d'un utilisateur (index TTL)
+    SCENARIO_RETENTION_DAYS: int = 0 # Durée de conservation des scénarios (0 : conservés sans limite)
 
     # Configuration CORS (Chargée depuis l'environnement, fallback pour dev local)
     # Utilisez une chaîne séparée par des virgules dans .env, ex: "http://localhost:3000,https://votre-frontend.vercel.app"
@@ -84,4 +84,11 @@ CARBON_CATEGORIES = {
     "D":  { "min_score": 30, "color": "#fdae61", "description": "Impact environnemental élevé" },
     "E":  { "min_score": 10, "color": "#f46d43", "description": "Impact environnemental très élevé" },
     "F":  { "min_score":  0, "color": "#d73027", "description": "Impact environnemental extrêmement élevé" }
-}
\ No newline at end of file
+}
+
+# Pondérations du score carbone (rangs percentiles : CO2 absolu, CO2/paramètre, CO2/score)
+SCORE_WEIGHTS = {
+    "co2": 0.4,
+    "co2_per_param": 0.4,
+    "co2_per_score": 0.2
+}
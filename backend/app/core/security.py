@@ -1,7 +1,11 @@
 # backend/app/core/security.py
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, Callable
+import asyncio
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -29,6 +33,113 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHashingPool:
+    """Pool borné de threads pour bcrypt (~100-300 ms de CPU par opération).
+
+    bcrypt libère le GIL : exécutées dans ``workers`` threads, les opérations ne bloquent plus
+    la boucle d'événements (les autres requêtes du worker restent servies pendant une vague
+    de connexions). Au-delà de ``max_pending`` opérations en attente ou en cours, run() lève
+    une 503. Le temps d'attente dans la file (avant exécution) est mesuré.
+    """
+
+    def __init__(self, workers: int, max_pending: int, window: int = 1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._recent_waits: deque = deque(maxlen=window) # Attentes des dernières opérations (percentiles)
+        self.pending = 0
+        # Métriques
+        self.completed = 0
+        self.rejected = 0
+        self.max_pending_seen = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Exécute func(*args) dans le pool et retourne son résultat."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Trop de demandes d'authentification simultanées, réessayez plus tard",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        submitted = time.perf_counter()
+
+        def task() -> tuple:
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        # pending est décrémenté à la fin de l'opération elle-même, pas de l'attente : une
+        # requête annulée (client déconnecté) pendant un hachage compte jusqu'à sa fin
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(task)
+        future.add_done_callback(lambda done: self._call_in_loop(loop, self._on_task_done, done))
+        result, _, _ = await asyncio.wrap_future(future)
+        return result
+
+    @staticmethod
+    def _call_in_loop(loop: asyncio.AbstractEventLoop, callback: Callable[..., Any], *args: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass # Boucle fermée (arrêt du processus)
+
+    def _on_task_done(self, future: Future) -> None:
+        """Fin d'une opération (exécutée, en échec ou annulée avant son début) : compteurs et métriques."""
+        self.pending -= 1
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, wait, duration = future.result()
+        self.completed += 1
+        self.queue_wait_seconds += wait
+        self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, wait)
+        self.run_seconds += duration
+        self._recent_waits.append(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques du pool (opérations, attente dans la file, durée moyenne d'une opération)."""
+        waits = sorted(self._recent_waits)
+
+        def percentile(p: float) -> float:
+            return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "max_pending_seen": self.max_pending_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": 1000 * self.queue_wait_seconds / self.completed if self.completed else 0.0,
+            "queue_wait_p50_ms": 1000 * percentile(0.50),
+            "queue_wait_p95_ms": 1000 * percentile(0.95),
+            "queue_wait_max_ms": 1000 * self.max_queue_wait_seconds,
+            "run_avg_ms": 1000 * self.run_seconds / self.completed if self.completed else 0.0,
+        }
+
+
+# Instance partagée par le processus
+password_hashing_pool = PasswordHashingPool(
+    workers=settings.AUTH_PASSWORD_HASH_WORKERS,
+    max_pending=settings.AUTH_PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password exécutée dans password_hashing_pool (à utiliser dans les handlers async)."""
+    return await password_hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash exécutée dans password_hashing_pool (à utiliser dans les handlers async)."""
+    return await password_hashing_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Crée un token JWT d'accès."""
     to_encode = data.copy()
@@ -61,9 +172,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Optional[User
     # === Modification Principale Ici ===
     # Importer UserService ici, à l'intérieur de la fonction
     from app.services.user_service import UserService
-    # Utiliser le vrai UserService pour chercher l'utilisateur dans la base de données
+    # Utiliser le vrai UserService (cache des utilisateurs authentifiés, puis base de données)
     user_service = UserService()
-    user = await user_service.get_user_by_email(email=token_data.email)
+    user = await user_service.get_authenticated_user(email=token_data.email)
     # ==================================
 
     if user is None:
@@ -6,6 +6,11 @@ from app.routers import auth, models, simulations, exports
 from app.routers.carbon_scores import router as carbon_scores_router
 from app.services.model_service import ModelService
 from app.services.carbon_score_service import CarbonScoreService
+from app.services.simulation_service import SimulationService
+from app.services.simulation_write_buffer import simulation_write_buffer
+from app.services.export_jobs import export_job_queue
+from app.services.export_artifacts import export_artifact_cache
+from app.services.export_service import ExportService, shutdown_pdf_pool
 
 # Création de l'application FastAPI
 app = FastAPI(
@@ -41,6 +46,18 @@ async def startup_db_client():
         
         # Calcul des scores carbone
         await carbon_score_service.calculate_all_scores()
+
+        # Historique des simulations : index (pagination, TTL) et écriture différée
+        await SimulationService().ensure_indexes()
+        await simulation_write_buffer.start()
+
+        # Exports, statuts d'export et scénarios : index (listes par utilisateur, TTL)
+        await ExportService().ensure_indexes()
+        await export_job_queue.ensure_indexes()
+
+        # Workers de génération des exports et éviction des fichiers d'export
+        await export_job_queue.start()
+        await export_artifact_cache.start()
         
     except Exception as e:
         print(f"Erreur de connexion à MongoDB: {str(e)}")
@@ -49,6 +66,10 @@ async def startup_db_client():
 # Événement à l'arrêt : Fermeture de la connexion MongoDB
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await simulation_write_buffer.stop() # Écrire les simulations encore en file
+    await export_job_queue.stop()
+    await export_artifact_cache.stop()
+    shutdown_pdf_pool()
     app.mongodb_client.close()
 
 # Inclusion des routeurs
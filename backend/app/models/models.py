@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, conlist
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -128,11 +128,12 @@ class SimulationParams(BaseModel):
     frequency_per_day: int = Field(gt=0)
     region: str
     cloud_provider: Optional[str] = None
-    duration_days: int = Field(gt=0, default=365)
+    duration_days: int = Field(gt=0, le=36500, default=365)  # 100 ans au plus
 
 
 class SimulationResult(BaseModel):
     """Résultat d'une simulation d'impact carbone."""
+    id: Optional[str] = None  # ID de la simulation dans l'historique (pour la sauvegarder)
     model_id: str
     model_name: str
     total_co2_kg: float
@@ -143,6 +144,236 @@ class SimulationResult(BaseModel):
     equivalent_smartphone_charges: Optional[int] = None
 
 
+class SimulationHistoryEntry(BaseModel):
+    """Simulation de l'historique d'un utilisateur."""
+    id: str
+    timestamp: datetime
+    saved: bool = False
+    expires_at: Optional[datetime] = None  # None : simulation sauvegardée, conservée
+    params: Dict[str, Any]
+    result: SimulationResult
+
+
+class SimulationHistoryPage(BaseModel):
+    """Page de l'historique des simulations (pagination par curseur)."""
+    items: List[SimulationHistoryEntry]
+    next_cursor: Optional[str] = None  # À passer en paramètre 'cursor' pour la page suivante
+
+
+class SimulationSummary(BaseModel):
+    """Agrégats cumulés des simulations d'un utilisateur."""
+    user_id: str
+    simulations_count: int = 0
+    total_co2_kg: float = 0.0
+    total_energy_kwh: float = 0.0
+    by_region: Dict[str, Dict[str, Any]] = {}  # région -> {"count", "total_co2_kg"}
+    by_model: Dict[str, Dict[str, Any]] = {}  # model_id -> {"model_name", "count", "total_co2_kg"}
+    updated_at: Optional[datetime] = None
+
+
+class SimulationBatchRequest(BaseModel):
+    """Lot de scénarios de simulation évalués en un seul appel."""
+    scenarios: List[SimulationParams] = Field(..., min_items=1, max_items=20000)
+
+
+class SimulationBatchError(BaseModel):
+    """Scénario d'un lot qui n'a pas pu être simulé."""
+    index: int  # Position du scénario dans la requête
+    model_id: str
+    detail: str
+
+
+class SimulationBatchResult(BaseModel):
+    """Résultats d'un lot de simulations (dans l'ordre des scénarios valides)."""
+    results: List[SimulationResult]
+    errors: List[SimulationBatchError] = []
+
+
+class PortfolioRequest(BaseModel):
+    """Ensemble de déploiements (modèle, région, fréquence, durée) simulés ensemble."""
+    deployments: List[SimulationParams] = Field(..., min_items=1, max_items=20000)
+
+
+class PortfolioModelBreakdown(BaseModel):
+    """Impact d'un modèle du portefeuille et gain si on le remplace par sa meilleure recommandation."""
+    model_id: str
+    model_name: str
+    deployments: int
+    total_co2_kg: float
+    total_energy_kwh: Optional[float] = None
+    recommended_model_id: Optional[str] = None
+    recommended_model_name: Optional[str] = None
+    co2_after_swap_kg: Optional[float] = None
+    co2_savings_kg: Optional[float] = None  # Gain (inférence) du remplacement, négatif si défavorable
+    training_co2_savings_kg: Optional[float] = None
+
+
+class PortfolioResult(BaseModel):
+    """Totaux et répartitions d'un portefeuille de déploiements."""
+    deployments_count: int
+    total_co2_kg: float
+    total_energy_kwh: float
+    total_water_liters: Optional[float] = None
+    by_region: Dict[str, Dict[str, Any]]  # région -> {"deployments", "total_co2_kg", "total_energy_kwh"}
+    by_model: List[PortfolioModelBreakdown]  # Trié par CO2 décroissant
+    potential_savings_kg: float  # Somme des gains positifs des remplacements
+    errors: List[SimulationBatchError] = []
+
+
+class SimulationRankingRequest(BaseModel):
+    """Charge de travail évaluée sur tout le catalogue, avec contraintes sur les modèles."""
+    frequency_per_day: int = Field(gt=0)
+    region: str
+    cloud_provider: Optional[str] = None
+    duration_days: int = Field(gt=0, le=36500, default=365)  # 100 ans au plus
+    min_overall_score: Optional[float] = None
+    architecture: Optional[str] = None
+    model_type: Optional[str] = None
+    max_parameters_billions: Optional[float] = Field(None, gt=0)
+    top_k: int = Field(10, ge=1, le=500)
+
+
+class SimulationRankingEntry(BaseModel):
+    """Modèle classé par CO2 projeté pour la charge de travail."""
+    rank: int
+    model_id: str
+    model_name: str
+    architecture: Optional[str] = None
+    parameters_billions: float
+    overall_score: Optional[float] = None
+    total_co2_kg: float
+    total_energy_kwh: float
+    total_water_liters: Optional[float] = None
+
+
+class SimulationRankingResult(BaseModel):
+    """Classement (CO2 croissant) des modèles éligibles pour une charge de travail."""
+    region: str
+    cloud_provider: Optional[str] = None
+    data_version: str  # Version du snapshot du catalogue utilisé
+    eligible_models: int
+    ranking: List[SimulationRankingEntry]
+
+
+class PlacementWorkload(SimulationParams):
+    """Charge de travail à placer ; ``region`` est sa région actuelle (placement naïf)."""
+    allowed_regions: Optional[List[str]] = None  # Régions candidates ; toutes si non précisé
+
+
+class PlacementRequest(BaseModel):
+    """Charges de travail à répartir entre régions, avec capacités par région."""
+    workloads: List[PlacementWorkload] = Field(..., min_items=1, max_items=20000)
+    capacities_kwh: Dict[str, float] = {}  # Énergie maximale par région sur la période ; sans limite si absente
+    regions: Optional[List[str]] = None  # Régions candidates pour toutes les charges ; toutes si non précisé
+
+
+class PlacementAssignment(BaseModel):
+    """Région choisie pour une charge de travail."""
+    index: int  # Position de la charge dans la requête
+    model_id: str
+    model_name: str
+    naive_region: str
+    region: Optional[str] = None  # None : aucune région n'a la capacité suffisante
+    energy_kwh: Optional[float] = None
+    co2_kg: Optional[float] = None
+    naive_co2_kg: float
+
+
+class PlacementRegionUsage(BaseModel):
+    """Utilisation d'une région par le placement optimisé."""
+    region: str
+    workloads: int
+    energy_kwh: float
+    capacity_kwh: Optional[float] = None  # None : sans limite
+    co2_kg: float
+
+
+class PlacementResult(BaseModel):
+    """Placement optimisé et comparaison avec le placement naïf (régions d'origine)."""
+    workloads_count: int
+    placed_count: int
+    total_co2_kg: float  # Charges placées
+    naive_co2_kg: float  # Mêmes charges dans leur région d'origine
+    co2_savings_kg: float
+    lower_bound_co2_kg: Optional[float] = None  # Borne inférieure de l'optimum ; None si des charges restent non placées
+    naive_over_capacity: List[str] = []  # Régions dont le placement naïf dépasse la capacité
+    regions: List[PlacementRegionUsage]
+    assignments: List[PlacementAssignment]
+    errors: List[SimulationBatchError] = []
+
+
+class SimulationMonteCarloParams(SimulationParams):
+    """Simulation avec incertitude : tirages aléatoires (reproductibles via seed)."""
+    samples: int = Field(100000, ge=1000, le=1000000)
+    seed: int = 0
+    energy_sigma: float = Field(0.5, ge=0, le=3)  # Écart-type log de l'énergie par inférence
+    intensity_sigma: float = Field(0.2, ge=0, le=3)  # Écart-type log de l'intensité carbone du réseau
+    # PUE : loi triangulaire (min, mode, max) ; par défaut centrée sur le PUE du registre
+    # (fournisseur, région), comme la simulation déterministe
+    pue_min: Optional[float] = Field(None, ge=1)
+    pue_mode: Optional[float] = Field(None, ge=1)
+    pue_max: Optional[float] = Field(None, ge=1)
+
+
+class SimulationMonteCarloResult(BaseModel):
+    """Percentiles (P5/P50/P95) des impacts simulés."""
+    model_id: str
+    model_name: str
+    samples: int
+    seed: int
+    mean_co2_kg: float
+    percentiles: Dict[str, Dict[str, float]]  # métrique -> {"p5", "p50", "p95"}
+
+
+class HourlySimulationParams(SimulationParams):
+    """Simulation heure par heure à partir du profil horaire d'intensité de la région."""
+    load_curve: Optional[List[float]] = None  # 24 poids relatifs (charge quotidienne) ; plate par défaut
+    start_day: int = Field(0, ge=0, le=364)  # Premier jour simulé (0 = 1er janvier)
+    window_hours: int = Field(4, ge=1, le=24)  # Durée des fenêtres recommandées
+    top_windows: int = Field(3, ge=1, le=24)
+
+
+class CarbonWindow(BaseModel):
+    """Fenêtre horaire quotidienne recommandée (heures de début et de fin, 0-23)."""
+    start_hour: int
+    end_hour: int
+    mean_intensity: float  # kg CO2 par kWh
+    co2_if_shifted_kg: float  # Émissions si toute la charge était exécutée dans la fenêtre
+    savings_kg: float
+
+
+class HourlySimulationResult(BaseModel):
+    """Résultat d'une simulation heure par heure."""
+    model_id: str
+    model_name: str
+    region: str
+    profile_source: str  # "hourly" (profil chargé) ou "flat" (facteur annuel)
+    total_energy_kwh: float
+    total_co2_kg: float
+    flat_co2_kg: float  # Même charge avec le facteur annuel moyen de la région
+    hour_of_day_co2_kg: List[float]  # Émissions par heure de la journée, sur toute la période
+    recommended_windows: List[CarbonWindow]
+
+
+class SweepAxis(BaseModel):
+    """Axe d'une grille de simulation : valeurs explicites ou plage régulière."""
+    values: Optional[List[float]] = None  # Valeurs explicites (prioritaires sur la plage)
+    start: Optional[float] = Field(None, gt=0)
+    stop: Optional[float] = Field(None, gt=0)
+    num: int = Field(10, ge=1, le=10000)  # Nombre de points de la plage (bornes incluses)
+    log: bool = False  # Plage géométrique plutôt que linéaire
+
+
+class SimulationSweepRequest(BaseModel):
+    """Grille de simulations fréquence × région × durée pour un modèle."""
+    model_id: str
+    frequency_per_day: SweepAxis
+    duration_days: SweepAxis
+    regions: Optional[List[str]] = None  # Toutes les régions si non précisé
+    cloud_provider: Optional[str] = None  # Facteurs (PUE, intensité) propres au fournisseur
+    format: str = Field("ndjson", regex="^(ndjson|npy)$")
+
+
 class CarbonScore(BaseModel):
     """Score carbone pour un modèle d'IA."""
     model_id: str
@@ -153,6 +384,69 @@ class CarbonScore(BaseModel):
     category: str  # A+, A, B, C, D, E, F
 
 
+class ScoreRun(BaseModel):
+    """Exécution du calcul des scores carbone (scripts/calculate_scores.py)."""
+    run_id: str
+    seq: int
+    timestamp: datetime
+    engine: str
+    models_count: int = 0
+
+
+class ScoreHistoryPoint(BaseModel):
+    """Score carbone d'un modèle lors d'un run de calcul."""
+    run_id: str
+    timestamp: datetime
+    carbon_score: float
+    rank_percentile: float
+    category: str
+
+
+class ScoreTrajectory(BaseModel):
+    """Série temporelle des scores carbone d'un modèle."""
+    model_id: str
+    points: List[ScoreHistoryPoint] = []
+
+
+class CategoryChurn(BaseModel):
+    """Changements de catégorie carbone entre deux runs de calcul."""
+    from_run_id: str
+    to_run_id: str
+    compared_models: int
+    changed_models_count: int
+    added_models_count: int
+    removed_models_count: int
+    transitions: Dict[str, Dict[str, int]]  # catégorie avant -> catégorie après -> nombre
+    changed_models: List[Dict[str, str]] = []
+
+
+class WeightSensitivityRequest(BaseModel):
+    """Grille de pondérations (co2, co2/paramètre, co2/score) à évaluer."""
+    weights: Optional[List[conlist(float, min_items=3, max_items=3)]] = None  # Triplets explicites ; sinon grille régulière
+    step: float = Field(0.05, gt=0, le=0.5)  # Pas de la grille régulière (somme des poids = 1)
+    pair_samples: int = Field(20000, ge=100, le=1000000)  # Paires tirées pour le tau de Kendall
+    seed: int = 0
+
+
+class WeightSensitivityPoint(BaseModel):
+    """Effet d'un triplet de pondérations par rapport aux pondérations actuelles."""
+    weights: List[float]
+    changed_models: int
+    changed_fraction: float
+    transition_matrix: List[List[int]]  # ligne = catégorie actuelle, colonne = nouvelle catégorie
+    kendall_tau: float
+    spearman_rho: float
+
+
+class WeightSensitivityReport(BaseModel):
+    """Analyse de sensibilité du score carbone aux pondérations."""
+    models_count: int
+    data_version: str
+    categories: List[str]
+    current_weights: List[float]
+    grid_points: List[WeightSensitivityPoint]
+
+
 class ModelRecommendation(BaseModel):
     """Recommandation de modèle alternatif plus écologique."""
     original_model_id: str
@@ -207,3 +501,20 @@ class Statistics(BaseModel):
     least_efficient_model: Dict[str, Any]
     best_performing_model: Dict[str, Any]
     most_recent_model: Dict[str, Any]
+
+
+class ExportJobStatus(BaseModel):
+    """Statut d'un export (rapport PDF ou Excel) généré en tâche de fond."""
+    job_id: str
+    kind: str  # "pdf", "excel", "parquet" ou "arrow"
+    status: str  # "queued", "running", "done" ou "failed"
+    model_ids: List[str]
+    options: Dict[str, Any] = {}
+    data_version: str  # Version du catalogue au moment de la demande
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    file_id: Optional[str] = None  # À passer à /exports/download/{file_id} une fois l'export terminé
+    filename: Optional[str] = None
+    error: Optional[str] = None
+    subscribers: int = 1  # Demandes identiques regroupées sur cet export
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Any, List
 
-from app.core.security import create_access_token, verify_password, get_current_active_user
+from app.core.security import create_access_token, verify_password_async, get_current_active_user
+from app.core.security import password_hashing_pool
 from app.models.models import User, UserCreate, Token, UserLogin
-from app.services.user_service import UserService
+from app.services.user_service import UserService, user_cache
 from app.core.config import settings
 
 router = APIRouter()
@@ -38,7 +39,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     user_service = UserService()
     user = await user_service.get_user_by_email(form_data.username)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect",
@@ -71,6 +72,18 @@ async def update_user(
     return updated_user
 
 
+@router.post("/me/deactivate", response_model=User)
+async def deactivate_user(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Désactive le compte de l'utilisateur connecté (ses tokens ne sont plus acceptés).
+    """
+    user_service = UserService()
+    deactivated_user = await user_service.deactivate_user(current_user.id)
+    return deactivated_user
+
+
 @router.post("/me/favorites/{model_id}", response_model=User)
 async def add_favorite(
     model_id: str,
@@ -131,3 +144,23 @@ async def clear_search_history(
     user_service = UserService()
     updated_user = await user_service.clear_search_history(current_user.id)
     return updated_user
+
+
+@router.get("/cache/stats", response_model=dict)
+async def get_user_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Statistiques du cache des utilisateurs authentifiés (taille, hits, misses) pour ce processus.
+    """
+    return user_cache.stats()
+
+
+@router.get("/password-hashing/stats", response_model=dict)
+async def get_password_hashing_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Métriques du pool de hachage des mots de passe (bcrypt) : opérations, attente dans la file.
+    """
+    return password_hashing_pool.stats()
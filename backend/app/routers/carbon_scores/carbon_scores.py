@@ -5,9 +5,12 @@ from typing import Any, List, Dict # Ajouter Dict pour response_model=dict
 
 # Importer les modèles Pydantic principaux depuis models.py
 from app.models.models import CarbonScore, ModelRecommendation, User
+from app.models.models import ScoreRun, ScoreTrajectory, CategoryChurn
+from app.models.models import WeightSensitivityRequest, WeightSensitivityReport
 
 # Importer le service correspondant
 from app.services.carbon_score_service import CarbonScoreService
+from app.services.score_history_service import ScoreHistoryService
 
 # Importer la dépendance d'authentification depuis security.py
 from app.core.security import get_current_active_user
@@ -16,6 +19,7 @@ from app.schemas.carbon_score import CarbonEfficiencyMetric
 
 router = APIRouter()
 carbon_score_service = CarbonScoreService()
+score_history_service = ScoreHistoryService()
 
 @router.get("/ranking", response_model=List[CarbonScore])
 async def get_ranking(
@@ -46,4 +50,52 @@ async def get_efficiency_metrics(
     try:
         return await carbon_score_service.get_efficiency_metrics()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/history/runs", response_model=List[ScoreRun])
+async def get_score_runs(
+    limit: int = Query(20, ge=1, le=200, description="Nombre de runs à retourner"),
+    current_user = Depends(get_current_active_user)
+):
+    """Liste les derniers runs de calcul des scores carbone"""
+    try:
+        return await score_history_service.list_runs(limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/history/churn", response_model=CategoryChurn)
+async def get_category_churn(
+    from_run: str = Query(..., description="ID du run de référence"),
+    to_run: str = Query(..., description="ID du run à comparer"),
+    current_user = Depends(get_current_active_user)
+):
+    """Récupère les changements de catégorie carbone entre deux runs de calcul"""
+    try:
+        churn = await score_history_service.get_category_churn(from_run, to_run)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not churn:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Runs non trouvés dans l'historique")
+    return churn
+
+@router.get("/history/{model_id}", response_model=ScoreTrajectory)
+async def get_score_trajectory(
+    model_id: str = Path(..., description="ID du modèle d'IA"),
+    current_user = Depends(get_current_active_user)
+):
+    """Récupère l'évolution du score carbone d'un modèle au fil des runs de calcul"""
+    try:
+        trajectory = await score_history_service.get_trajectory(model_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not trajectory:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Aucun historique pour ce modèle")
+    return trajectory
+
+@router.post("/sensitivity", response_model=WeightSensitivityReport)
+async def get_weight_sensitivity(
+    request: WeightSensitivityRequest,
+    current_user = Depends(get_current_active_user)
+):
+    """Analyse combien de modèles changeraient de catégorie avec d'autres pondérations du score"""
+    return await carbon_score_service.get_weight_sensitivity(request)
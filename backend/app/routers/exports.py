@@ -1,17 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, status, UploadFile, File
-from typing import Any, List
-from fastapi.responses import FileResponse
-import os
+"""Exports (rapports PDF, classeurs Excel, fichiers Parquet / Arrow) et scénarios.
+
+Les exports sont générés en tâche de fond (cf. app.services.export_jobs). POST /pdf, /excel,
+/parquet, /arrow et /catalog répondent immédiatement 202 Accepted avec le statut de l'export
+(ExportJobStatus : job_id, status, file_id une fois terminé, ...) ; ils ne renvoient plus
+``{"status", "file_path", "filename"}`` après génération. Les clients doivent :
+
+1. suivre GET /jobs/{job_id} (ou le flux server-sent events GET /jobs/{job_id}/events)
+   jusqu'au statut "done" (ou "failed", avec ``error``) ;
+2. télécharger GET /download/{file_id} (le nom du fichier est dans ``filename``).
+
+Une demande rejetée faute de place dans la file reçoit une 503 (à réessayer plus tard).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Path, Query, status, UploadFile, File
+from typing import Any, List, Optional
+from fastapi.responses import FileResponse, StreamingResponse
 import json
 
-from app.models.models import User
+from app.core.config import settings
+from app.models.models import User, ExportJobStatus
 from app.core.security import get_current_active_user
-from app.services.export_service import ExportService
+from app.services.export_service import ExportService, chart_cache, check_export_kind
+from app.services.export_jobs import export_job_queue
+from app.services.export_artifacts import export_artifact_cache
+from app.utils.http_files import RangeFileResponse, accepts_encoding
 
 router = APIRouter()
 
 
-@router.post("/pdf", response_model=dict)
+@router.post("/pdf", response_model=ExportJobStatus, status_code=status.HTTP_202_ACCEPTED)
 async def export_to_pdf(
     model_ids: List[str],
     include_simulations: bool = False,
@@ -19,72 +36,204 @@ async def export_to_pdf(
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
-    Génère un rapport PDF comparatif pour les modèles d'IA sélectionnés.
+    Demande un rapport PDF comparatif pour les modèles d'IA sélectionnés.
+
+    Le rapport est généré en tâche de fond : suivre /exports/jobs/{job_id} (ou le flux
+    /exports/jobs/{job_id}/events), puis télécharger /exports/download/{file_id}.
     """
-    export_service = ExportService()
-    pdf_path = await export_service.export_to_pdf(
-        model_ids, 
-        include_simulations, 
-        include_recommendations,
+    job = await export_job_queue.submit(
+        "pdf",
+        model_ids,
+        {"include_simulations": include_simulations, "include_recommendations": include_recommendations},
         current_user.id
     )
-    
-    if not pdf_path:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erreur lors de la génération du PDF"
-        )
-    
-    filename = os.path.basename(pdf_path)
-    return {"status": "success", "file_path": pdf_path, "filename": filename}
+    return job.to_status()
 
 
-@router.post("/excel", response_model=dict)
+@router.post("/excel", response_model=ExportJobStatus, status_code=status.HTTP_202_ACCEPTED)
 async def export_to_excel(
     model_ids: List[str],
     include_simulations: bool = False,
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
-    Génère un fichier Excel comparatif pour les modèles d'IA sélectionnés.
+    Demande un fichier Excel comparatif pour les modèles d'IA sélectionnés (généré en tâche de fond).
     """
-    export_service = ExportService()
-    excel_path = await export_service.export_to_excel(
-        model_ids, 
-        include_simulations,
-        current_user.id
+    job = await export_job_queue.submit(
+        "excel", model_ids, {"include_simulations": include_simulations}, current_user.id
     )
-    
-    if not excel_path:
+    return job.to_status()
+
+
+@router.post("/parquet", response_model=ExportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def export_to_parquet(
+    model_ids: List[str],
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Demande un fichier Parquet (colonnes typées, compressé) des modèles sélectionnés (généré en tâche de fond).
+    """
+    check_export_kind("parquet")
+    job = await export_job_queue.submit("parquet", model_ids, {}, current_user.id)
+    return job.to_status()
+
+
+@router.post("/arrow", response_model=ExportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def export_to_arrow(
+    model_ids: List[str],
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Demande un fichier Arrow IPC (colonnes typées, lisible par memory map) des modèles sélectionnés.
+    """
+    check_export_kind("arrow")
+    job = await export_job_queue.submit("arrow", model_ids, {}, current_user.id)
+    return job.to_status()
+
+
+@router.post("/catalog", response_model=ExportJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def export_catalog(
+    format: str = Query("parquet", regex="^(parquet|arrow|excel)$", description="Format du fichier"),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Demande un export du catalogue complet (lu en un seul curseur, par lots).
+    """
+    check_export_kind(format)
+    job = await export_job_queue.submit(format, [], {"catalog": True}, current_user.id)
+    return job.to_status()
+
+
+@router.get("/jobs/stats", response_model=dict)
+async def get_export_jobs_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Métriques de la file des exports (profondeur, exports regroupés, en échec).
+    """
+    return export_job_queue.stats()
+
+
+@router.get("/charts/cache/stats", response_model=dict)
+async def get_chart_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Statistiques du cache des graphiques des rapports PDF (taille, hits, misses) pour ce processus.
+    """
+    return chart_cache.stats()
+
+
+@router.get("/artifacts/stats", response_model=dict)
+async def get_export_artifacts_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Réutilisation des fichiers d'export (taux de hits) et occupation du dossier des exports.
+    """
+    return export_artifact_cache.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobStatus)
+async def get_export_job(
+    job_id: str = Path(..., description="ID de l'export"),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Récupère le statut d'un export (quel que soit le worker qui l'a créé).
+    """
+    job_status = await export_job_queue.get_status(job_id, current_user.id)
+    if not job_status:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erreur lors de la génération du fichier Excel"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export non trouvé"
+        )
+    return job_status
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_export_job(
+    job_id: str = Path(..., description="ID de l'export"),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Flux server-sent events du statut d'un export : un événement 'status' à chaque
+    changement, jusqu'à la fin de l'export (terminé ou en échec).
+    """
+    if not await export_job_queue.get_status(job_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export non trouvé"
         )
-    
-    filename = os.path.basename(excel_path)
-    return {"status": "success", "file_path": excel_path, "filename": filename}
+
+    async def events():
+        async for job_status in export_job_queue.watch(
+            job_id, current_user.id, settings.EXPORT_JOB_SSE_KEEPALIVE_SECONDS, settings.EXPORT_JOB_POLL_INTERVAL_SECONDS
+        ):
+            if job_status is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: status\ndata: {job_status.json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/list", response_model=List[dict])
+async def list_exports(
+    limit: int = Query(50, ge=1, le=200, description="Nombre maximal d'exports"),
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Liste les exports générés pour l'utilisateur (plus récents d'abord).
+    """
+    export_service = ExportService()
+    exports = await export_service.list_exports(current_user.id, limit)
+    return exports
 
 
 @router.get("/download/{file_id}", response_class=FileResponse)
 async def download_file(
     file_id: str = Path(..., description="ID du fichier à télécharger"),
+    accept_encoding: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
     Télécharge un fichier d'export généré précédemment.
+
+    La copie gzip du fichier est envoyée (Content-Encoding: gzip) si le client l'accepte.
+    Les requêtes Range (un intervalle d'octets) permettent de reprendre un téléchargement.
+    Un fichier évincé du dossier des exports est régénéré.
     """
     export_service = ExportService()
-    file_path = await export_service.get_file_path(file_id, current_user.id)
-    
-    if not file_path or not os.path.exists(file_path):
+    export = await export_service.get_export(file_id, current_user.id)
+    if not export:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Fichier non trouvé"
         )
+    # Fichier marqué comme utilisé, ou régénéré s'il a été évincé du dossier des exports
+    export = await export_service.ensure_export_file(export)
+    if not export:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Les modèles de cet export n'existent plus"
+        )
+
+    file_path = export["file_path"]
+    headers = {"Vary": "Accept-Encoding"}
+    gz_path = export_artifact_cache.compressed_path(file_path)
+    if gz_path and accepts_encoding(accept_encoding, "gzip"):
+        file_path = gz_path
+        headers["Content-Encoding"] = "gzip"
     
-    return FileResponse(
+    return RangeFileResponse(
         path=file_path,
-        filename=os.path.basename(file_path),
+        filename=export["filename"],
+        headers=headers,
         media_type="application/octet-stream"
     )
 
@@ -106,13 +255,14 @@ async def save_scenario(
 
 @router.get("/scenario/list", response_model=List[dict])
 async def list_scenarios(
+    limit: int = Query(100, ge=1, le=500, description="Nombre maximal de scénarios"),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
-    Liste les scénarios d'analyse sauvegardés par l'utilisateur.
+    Liste les scénarios d'analyse sauvegardés par l'utilisateur (plus récents d'abord).
     """
     export_service = ExportService()
-    scenarios = await export_service.list_scenarios(current_user.id)
+    scenarios = await export_service.list_scenarios(current_user.id, limit)
     return scenarios
 
 
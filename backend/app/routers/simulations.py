@@ -1,8 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, status
-from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, List, Optional
 
 from app.models.models import SimulationParams, SimulationResult
-from app.services.simulation_service import SimulationService
+from app.models.models import SimulationBatchRequest, SimulationBatchResult, SimulationSweepRequest
+from app.models.models import SimulationMonteCarloParams, SimulationMonteCarloResult
+from app.models.models import HourlySimulationParams, HourlySimulationResult
+from app.models.models import SimulationHistoryPage, SimulationSummary
+from app.models.models import PortfolioRequest, PortfolioResult
+from app.models.models import SimulationRankingRequest, SimulationRankingResult
+from app.models.models import PlacementRequest, PlacementResult
+from app.services.grid_profile_service import GridProfileService
+from app.services.emission_factors import emission_factor_registry
+from app.services.simulation_service import SimulationService, simulation_cache
+from app.services.simulation_service import iter_sweep_ndjson, iter_sweep_npy
+from app.services.simulation_write_buffer import simulation_write_buffer
 from app.core.security import get_current_active_user
 from app.models.models import User
 
@@ -22,6 +34,152 @@ async def simulate_impact(
     return result
 
 
+@router.post("/batch", response_model=SimulationBatchResult)
+async def simulate_batch(
+    batch: SimulationBatchRequest,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Simule l'impact carbone de nombreux scénarios en un seul appel (calcul vectorisé).
+    """
+    simulation_service = SimulationService()
+    result = await simulation_service.simulate_batch(batch.scenarios, current_user.id)
+    # Pas de revalidation de milliers d'objets : la conformité du dict à SimulationBatchResult
+    # (response_model, documentation OpenAPI) est vérifiée par tests/test_simulation_batch.py
+    return JSONResponse(content=result)
+
+
+@router.post("/portfolio", response_model=PortfolioResult)
+async def simulate_portfolio(
+    portfolio: PortfolioRequest,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Simule un portefeuille de déploiements : totaux, répartition par région et par modèle,
+    et gains possibles en remplaçant chaque modèle par sa meilleure recommandation.
+    """
+    simulation_service = SimulationService()
+    result = await simulation_service.simulate_portfolio(portfolio.deployments)
+    return result
+
+
+@router.post("/ranking", response_model=SimulationRankingResult)
+async def rank_models_for_workload(
+    request: SimulationRankingRequest,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Classe les modèles du catalogue par CO2 projeté pour une charge de travail
+    (fréquence, durée, région), avec contraintes optionnelles (score global minimal,
+    architecture, type, taille maximale).
+    """
+    simulation_service = SimulationService()
+    result = await simulation_service.rank_models(request)
+    return result
+
+
+@router.post("/placement", response_model=PlacementResult)
+async def optimize_placement(
+    request: PlacementRequest,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Répartit des charges de travail entre régions (capacités en kWh par région) pour
+    minimiser le CO2 total, et compare au placement naïf (régions d'origine).
+    """
+    simulation_service = SimulationService()
+    result = await simulation_service.optimize_placement(request)
+    return result
+
+
+@router.post("/monte-carlo", response_model=SimulationMonteCarloResult)
+async def simulate_monte_carlo(
+    simulation_params: SimulationMonteCarloParams,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Simule l'impact carbone avec incertitude (tirages Monte Carlo) : percentiles P5/P50/P95.
+    """
+    simulation_service = SimulationService()
+    result = await simulation_service.simulate_monte_carlo(simulation_params)
+    return result
+
+
+@router.post("/hourly", response_model=HourlySimulationResult)
+async def simulate_hourly(
+    simulation_params: HourlySimulationParams,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Simule les émissions heure par heure (profil horaire de la région et courbe de charge
+    quotidienne) et recommande les fenêtres horaires les moins carbonées.
+    """
+    simulation_service = SimulationService()
+    result = await simulation_service.simulate_hourly(simulation_params)
+    return result
+
+
+@router.get("/emission-factors", response_model=dict)
+async def get_emission_factors() -> Any:
+    """
+    Récupère le registre des facteurs d'émission (intensité, PUE, WUE) par fournisseur et région.
+    """
+    return emission_factor_registry.describe()
+
+
+@router.get("/grid-profiles", response_model=List[dict])
+async def get_grid_profiles() -> Any:
+    """
+    Liste les régions et indique celles qui disposent d'un profil horaire d'intensité carbone.
+    """
+    return GridProfileService().list_profiles()
+
+
+@router.post("/sweep")
+async def simulate_sweep(
+    sweep_request: SimulationSweepRequest,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Calcule une grille de simulations fréquence × région × durée pour un modèle.
+
+    Format "ndjson" : une ligne d'en-tête (axes, forme, métriques) puis une ligne par couple
+    (fréquence, région). Format "npy" : en-tête JSON préfixé par sa longueur (uint32
+    petit-boutiste) puis tableau .npy float64 (métrique, fréquence, région, durée).
+    """
+    simulation_service = SimulationService()
+    sweep = await simulation_service.simulate_sweep(sweep_request)
+    if sweep_request.format == "npy":
+        return StreamingResponse(
+            iter_sweep_npy(sweep["header"], sweep["tensors"]),
+            media_type="application/octet-stream"
+        )
+    return StreamingResponse(
+        iter_sweep_ndjson(sweep["header"], sweep["tensors"]),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/cache/stats", response_model=dict)
+async def get_simulation_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Statistiques du cache des résultats de simulation (taille, hits, misses) pour ce processus.
+    """
+    return simulation_cache.stats()
+
+
+@router.get("/write-buffer/stats", response_model=dict)
+async def get_simulation_write_buffer_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Métriques de la file d'écriture de l'historique des simulations (profondeur, contre-pression).
+    """
+    return simulation_write_buffer.stats()
+
+
 @router.get("/regions", response_model=List[dict])
 async def get_regions() -> Any:
     """
@@ -42,18 +200,32 @@ async def get_equivalents() -> Any:
     return equivalents
 
 
-@router.get("/history", response_model=List[SimulationResult])
+@router.get("/history", response_model=SimulationHistoryPage)
 async def get_simulation_history(
+    limit: int = Query(50, ge=1, le=200, description="Nombre de simulations par page"),
+    cursor: Optional[str] = Query(None, description="Curseur 'next_cursor' de la page précédente"),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """
-    Récupère l'historique des simulations de l'utilisateur.
+    Récupère l'historique des simulations de l'utilisateur, paginé par curseur.
     """
     simulation_service = SimulationService()
-    history = await simulation_service.get_simulation_history(current_user.id)
+    history = await simulation_service.get_simulation_history(current_user.id, limit, cursor)
     return history
 
 
+@router.get("/summary", response_model=SimulationSummary)
+async def get_simulation_summary(
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Récupère les agrégats cumulés des simulations de l'utilisateur (CO2 total, par région, par modèle).
+    """
+    simulation_service = SimulationService()
+    summary = await simulation_service.get_simulation_summary(current_user.id)
+    return summary
+
+
 @router.post("/save/{simulation_id}", response_model=dict)
 async def save_simulation(
     simulation_id: str = Path(..., description="ID de la simulation à sauvegarder"),
@@ -1,21 +1,141 @@
 # backend/app/services/carbon_score_service.py
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from bson import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
 from fastapi import HTTPException, status
+import asyncio
 import math
+import numpy as np
+import pandas as pd
 
 from app.core.database import get_database
 from app.models.models import CarbonScore, ModelRecommendation, AIModel # Ajuster imports modèles si besoin
+from app.models.models import WeightSensitivityRequest, WeightSensitivityReport, WeightSensitivityPoint
 from app.core.constants import CARBON_CATEGORIES
+from app.services.catalog_service import CatalogService, CatalogSnapshot
+from app.utils.scoring import CATEGORY_ORDER, default_weights, weight_grid, weight_sensitivity
 # Supposons que les schémas spécifiques ne sont pas strictement nécessaires pour le moment
 # Si les méthodes de routeur les utilisent en response_model, il faudra les réimporter
 # from app.schemas.carbon_score import CarbonScoreCategory, CarbonScoreEfficiency, CarbonScoreRanking, CarbonEfficiencyMetric
 
 # Nom de la collection MongoDB pour les modèles AI
 MODELS_COLLECTION = "ai_models"
+# Nombre maximal de points évalués par une analyse de sensibilité
+MAX_SENSITIVITY_GRID_POINTS = 5000
+# Taille des modèles recommandés, relative à celle du modèle d'origine (cf. get_recommendations)
+RECOMMENDATION_PARAMETERS_RANGE = (0.5, 1.5)
+
+
+# Clé de tri des candidats : (code d'architecture, taille)
+_RECOMMENDATION_KEY = np.dtype([("architecture", np.int64), ("parameters", np.float64)])
+
+
+class _RecommendationIndex:
+    """Index des candidats à la recommandation d'un snapshot, pour best_recommendation_indices.
+
+    Les candidats (CO2 > 0, score global connu, architecture et taille connues) sont triés par
+    (architecture, taille) : les candidats d'un modèle forment une plage contiguë, trouvée par
+    searchsorted. Une table de minimums par plage (sparse table) sur le rang (CO2, position)
+    donne le candidat de plus faible CO2 de chaque plage en O(1), pour toutes les requêtes à la fois.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        co2 = snapshot.training_co2_kg
+        parameters = snapshot.parameters_billions
+        self.architecture_codes, _ = pd.factorize(snapshot.architectures) # -1 si inconnue
+        with np.errstate(invalid="ignore"):
+            eligible = (co2 > 0) & ~np.isnan(snapshot.overall_score) \
+                & (self.architecture_codes >= 0) & ~np.isnan(parameters)
+        candidates = np.flatnonzero(eligible)
+        order = np.lexsort((parameters[candidates], self.architecture_codes[candidates]))
+        self.positions = candidates[order]
+        self.keys = np.empty(len(self.positions), dtype=_RECOMMENDATION_KEY)
+        self.keys["architecture"] = self.architecture_codes[self.positions]
+        self.keys["parameters"] = parameters[self.positions]
+
+        # Rang de chaque candidat par CO2 croissant (égalités : position dans le snapshot)
+        self.by_rank = np.lexsort((self.positions, co2[self.positions]))
+        ranks = np.empty(len(self.positions), dtype=np.int64)
+        ranks[self.by_rank] = np.arange(len(self.positions))
+        # levels[j][i] = rang minimal sur [i, i + 2**j)
+        self.levels = [ranks]
+        while len(self.levels[-1]) > 1 and (1 << len(self.levels)) <= len(ranks):
+            previous, half = self.levels[-1], 1 << (len(self.levels) - 1)
+            self.levels.append(np.minimum(previous[:-half], previous[half:]))
+
+    def range_min(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Position (dans le snapshot) du candidat de plus faible CO2 de chaque plage [lo, hi) non vide."""
+        level = np.floor(np.log2(hi - lo)).astype(np.int64)
+        best_rank = np.empty(len(lo), dtype=np.int64)
+        for j in np.unique(level): # Une opération par niveau, pas par requête
+            rows = np.flatnonzero(level == j)
+            table = self.levels[j]
+            best_rank[rows] = np.minimum(table[lo[rows]], table[hi[rows] - (1 << j)])
+        return self.positions[self.by_rank[best_rank]]
+
+
+# Index du dernier snapshot utilisé (un snapshot n'est jamais modifié)
+_recommendation_index: Optional[Tuple[CatalogSnapshot, _RecommendationIndex]] = None
+
+
+def _get_recommendation_index(snapshot: CatalogSnapshot) -> _RecommendationIndex:
+    global _recommendation_index
+    if _recommendation_index is None or _recommendation_index[0] is not snapshot:
+        _recommendation_index = (snapshot, _RecommendationIndex(snapshot))
+    return _recommendation_index[1]
+
+
+def best_recommendation_indices(snapshot: CatalogSnapshot, model_indices: np.ndarray) -> np.ndarray:
+    """Meilleure recommandation de chaque modèle, calculée sur les colonnes du snapshot.
+
+    Mêmes critères que get_recommendations : même architecture, taille dans
+    RECOMMENDATION_PARAMETERS_RANGE, CO2 d'entraînement plus faible (et > 0), score global
+    connu ; la meilleure est celle de plus faible CO2 d'entraînement. ``model_indices`` sont
+    des positions dans le snapshot ; retourne les positions recommandées (-1 si aucune).
+
+    Un seul passage vectorisé pour tous les modèles (cf. _RecommendationIndex) : le candidat
+    de plus faible CO2 de la plage (architecture, taille) est retenu s'il émet moins que le modèle.
+    """
+    index = _get_recommendation_index(snapshot)
+    model_indices = np.asarray(model_indices, dtype=np.int64)
+    best = np.full(len(model_indices), -1, dtype=np.int64)
+    if not len(index.positions):
+        return best
+
+    co2 = snapshot.training_co2_kg
+    parameters = snapshot.parameters_billions
+    positions = np.where(model_indices >= 0, model_indices, 0)
+    valid = (model_indices >= 0) & (index.architecture_codes[positions] >= 0) \
+        & ~np.isnan(parameters[positions]) & ~np.isnan(co2[positions]) & ~np.isnan(snapshot.overall_score[positions])
+    queries = np.flatnonzero(valid)
+    positions = positions[queries]
+
+    low, high = RECOMMENDATION_PARAMETERS_RANGE
+    bounds = np.empty((2, len(queries)), dtype=_RECOMMENDATION_KEY)
+    bounds["architecture"] = index.architecture_codes[positions]
+    bounds["parameters"][0] = parameters[positions] * low
+    bounds["parameters"][1] = parameters[positions] * high
+    lo = np.searchsorted(index.keys, bounds[0], side="left")
+    hi = np.searchsorted(index.keys, bounds[1], side="right")
+
+    found = hi > lo
+    candidates = index.range_min(lo[found], hi[found])
+    # Le modèle lui-même n'est jamais retenu : son CO2 n'est pas strictement inférieur
+    better = co2[candidates] < co2[positions[found]]
+    best[queries[found][better]] = candidates[better]
+    return best
+
+
+def recommendation_reason(performance_diff: float) -> str:
+    """Motif d'une recommandation selon l'écart de performance (en %)."""
+    reason = "Modèle plus écologique "
+    if performance_diff > 5: reason += "et plus performant"
+    elif performance_diff > -10: reason += "avec des performances similaires"
+    else: reason += "mais moins performant"
+    return reason
+
 
 class CarbonScoreService:
     """Service pour la gestion des scores carbone et des recommandations via MongoDB."""
@@ -115,10 +235,7 @@ class CarbonScoreService:
              if original_model.get("overall_score", 0) > 0 and rec_model_db.get("overall_score") is not None:
                   performance_diff = ((rec_model_db["overall_score"] - original_model["overall_score"]) / original_model["overall_score"]) * 100
 
-             reason = "Modèle plus écologique "
-             if performance_diff > 5: reason += "et plus performant"
-             elif performance_diff > -10: reason += "avec des performances similaires"
-             else: reason += "mais moins performant"
+             reason = recommendation_reason(performance_diff)
 
              recommendations.append(ModelRecommendation(
                  original_model_id=model_id,
@@ -132,6 +249,37 @@ class CarbonScoreService:
              ))
         return recommendations
 
+    async def get_best_recommendations(self, model_ids: List[str]) -> List[ModelRecommendation]:
+        """Meilleure recommandation de chaque modèle, en un seul calcul sur le snapshot du catalogue.
+
+        Version groupée de get_recommendations (mêmes critères, cf. best_recommendation_indices) :
+        aucune requête par modèle. Les modèles sans recommandation sont omis.
+        """
+        snapshot = await CatalogService().get_snapshot()
+        positions = snapshot.indices_of(list(dict.fromkeys(model_ids)))
+        positions = positions[positions >= 0]
+        recommended = best_recommendation_indices(snapshot, positions)
+
+        recommendations = []
+        for position, recommendation in zip(positions, recommended):
+            if recommendation < 0:
+                continue
+            original_score = snapshot.overall_score[position]
+            performance_diff = 0.0
+            if original_score > 0:
+                performance_diff = float((snapshot.overall_score[recommendation] - original_score) / original_score * 100)
+            recommendations.append(ModelRecommendation(
+                original_model_id=snapshot.model_ids[position],
+                original_model_name=snapshot.model_names[position],
+                recommended_model_id=snapshot.model_ids[recommendation],
+                recommended_model_name=snapshot.model_names[recommendation],
+                co2_savings_kg=float(snapshot.training_co2_kg[position] - snapshot.training_co2_kg[recommendation]),
+                performance_difference_percent=performance_diff,
+                similarity_score=0.8, # Simplifié
+                recommendation_reason=recommendation_reason(performance_diff)
+            ))
+        return recommendations
+
     async def get_carbon_ranking(self, limit: int = 10, sort_by: str = 'carbon_score', sort_order: str = 'desc') -> List[CarbonScore]:
         """Récupère le classement des modèles selon leur score carbone depuis MongoDB."""
         collection = self._get_collection()
@@ -229,4 +377,63 @@ class CarbonScoreService:
             "worst_score": result_doc.get("worst_score"),
             "total_models": result_doc.get("total_models"),
             "category_distribution": result_doc.get("category_distribution", {})
-        }
\ No newline at end of file
+        }
+
+    async def get_weight_sensitivity(self, request: WeightSensitivityRequest) -> WeightSensitivityReport:
+        """Évalue l'effet de pondérations alternatives sur les catégories et le classement.
+
+        Le calcul porte sur les rangs percentiles du snapshot du catalogue (aucune requête
+        par modèle) et s'exécute dans un thread pour ne pas bloquer la boucle d'événements.
+        """
+        if request.weights:
+            grid = np.array(request.weights, dtype=np.float64)
+            if grid.ndim != 2 or grid.shape[1] != 3 or not np.isfinite(grid).all() \
+                    or (grid < 0).any() or (grid.sum(axis=1) <= 0).any():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Chaque pondération doit être un triplet de valeurs positives de somme non nulle"
+                )
+            grid = grid / grid.sum(axis=1, keepdims=True) # Scores ramenés entre 0 et 100
+        else:
+            try:
+                grid = weight_grid(request.step)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if len(grid) > MAX_SENSITIVITY_GRID_POINTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Grille trop grande ({len(grid)} points, maximum {MAX_SENSITIVITY_GRID_POINTS})"
+            )
+
+        snapshot = await CatalogService().get_snapshot()
+        scored = ~np.isnan(snapshot.ranks).any(axis=1)
+        ranks = snapshot.ranks[scored]
+        if len(ranks) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Aucun rang percentile disponible : exécutez d'abord scripts/calculate_scores.py"
+            )
+
+        result = await asyncio.to_thread(
+            weight_sensitivity, ranks, grid, default_weights(), request.pair_samples, request.seed
+        )
+
+        models_count = len(ranks)
+        grid_points = [
+            WeightSensitivityPoint(
+                weights=grid[idx].tolist(),
+                changed_models=int(result["changed"][idx]),
+                changed_fraction=float(result["changed"][idx]) / models_count,
+                transition_matrix=result["transitions"][idx].tolist(),
+                kendall_tau=float(result["kendall_tau"][idx]),
+                spearman_rho=float(result["spearman_rho"][idx])
+            )
+            for idx in range(len(grid))
+        ]
+        return WeightSensitivityReport(
+            models_count=models_count,
+            data_version=snapshot.version,
+            categories=CATEGORY_ORDER,
+            current_weights=default_weights().tolist(),
+            grid_points=grid_points
+        )
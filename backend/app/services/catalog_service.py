@@ -0,0 +1,191 @@
+# backend/app/services/catalog_service.py
+
+from typing import List, Dict, Any, Optional, Sequence
+import asyncio
+import time
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import DESCENDING, ReturnDocument
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.utils.scoring import METRICS
+
+# Nom de la collection MongoDB pour les modèles AI
+MODELS_COLLECTION = "ai_models"
+# Collection des runs de calcul des scores (cf. score_history_service)
+SCORE_RUNS_COLLECTION = "score_runs"
+# Compteur d'écritures dans ai_models, partagé par tous les processus (cf. bump_catalog_version)
+CATALOG_META_COLLECTION = "catalog_meta"
+CATALOG_VERSION_ID = MODELS_COLLECTION
+
+# Champs chargés dans le snapshot (aucun champ volumineux)
+CATALOG_PROJECTION = {
+    "_id": 1,
+    "model_name": 1,
+    "architecture": 1,
+    "model_type": 1,
+    "parameters_billions": 1,
+    "training_co2_kg": 1,
+    "overall_score": 1,
+    "carbon_score": 1,
+    "category": 1,
+    **{f"rank_{metric}": 1 for metric in METRICS},
+}
+
+
+def _float_column(docs: Sequence[Dict[str, Any]], field: str) -> np.ndarray:
+    """Extrait un champ numérique en tableau float64 (NaN si absent ou invalide)."""
+    values = np.full(len(docs), np.nan, dtype=np.float64)
+    for idx, doc in enumerate(docs):
+        value = doc.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[idx] = value
+    return values
+
+
+class CatalogSnapshot:
+    """Vue colonnaire (tableaux NumPy) en lecture seule du catalogue ai_models.
+
+    Partagée par tous les services d'un même processus et identifiée par ``version`` :
+    un snapshot n'est jamais modifié, il est remplacé lorsque la version change.
+    """
+
+    def __init__(self, version: str, docs: List[Dict[str, Any]]):
+        self.version = version
+        self.model_ids: List[str] = [str(doc["_id"]) for doc in docs]
+        self.index: Dict[str, int] = {model_id: idx for idx, model_id in enumerate(self.model_ids)}
+        self.model_names = np.array([doc.get("model_name") or "" for doc in docs], dtype=object)
+        self.architectures = np.array([doc.get("architecture") for doc in docs], dtype=object)
+        self.model_types = np.array([doc.get("model_type") for doc in docs], dtype=object)
+        self.parameters_billions = _float_column(docs, "parameters_billions")
+        self.training_co2_kg = _float_column(docs, "training_co2_kg")
+        self.overall_score = _float_column(docs, "overall_score")
+        self.carbon_score = _float_column(docs, "carbon_score")
+        self.categories = np.array([doc.get("category") for doc in docs], dtype=object)
+        # Rangs percentiles (n_modèles, 3) dans l'ordre de METRICS, NaN si non calculés
+        self.ranks = np.column_stack([_float_column(docs, f"rank_{metric}") for metric in METRICS]) \
+            if docs else np.empty((0, len(METRICS)), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.model_ids)
+
+    def indices_of(self, model_ids: Sequence[str]) -> np.ndarray:
+        """Retourne les positions des modèles demandés (-1 pour les IDs inconnus)."""
+        return np.array([self.index.get(model_id, -1) for model_id in model_ids], dtype=np.int64)
+
+
+async def bump_catalog_version(db=None) -> int:
+    """Incrémente le compteur d'écritures du catalogue en base ; retourne sa nouvelle valeur.
+
+    À appeler par tout code qui modifie ai_models (API, scripts de chargement) : la version
+    des données change alors pour tous les processus, et non pour le seul processus écrivain.
+    """
+    db = db if db is not None else get_database()
+    doc = await db[CATALOG_META_COLLECTION].find_one_and_update(
+        {"_id": CATALOG_VERSION_ID}, {"$inc": {"writes": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["writes"]
+
+
+async def _fetch_write_count(db) -> int:
+    """Valeur du compteur d'écritures du catalogue (0 si aucune écriture n'a été signalée)."""
+    meta = await db[CATALOG_META_COLLECTION].find_one({"_id": CATALOG_VERSION_ID}, {"writes": 1})
+    return meta["writes"] if meta else 0
+
+
+# État partagé entre toutes les instances de CatalogService (un snapshot par processus)
+_snapshot: Optional[CatalogSnapshot] = None
+_checked_at: float = 0.0
+_lock: Optional[asyncio.Lock] = None
+# Compteur d'écritures lu seul (get_write_version), sans chargement du snapshot
+_write_version: Optional[int] = None
+_write_version_checked_at: float = 0.0
+
+
+class CatalogService:
+    """Service fournissant le snapshot colonnaire partagé et versionné du catalogue."""
+
+    def _get_models_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB pour les modèles AI."""
+        db = get_database()
+        return db[MODELS_COLLECTION]
+
+    async def _fetch_version(self) -> str:
+        """Calcule la version des données depuis la base : compteur d'écritures, dernier run de scores, taille.
+
+        Les trois valeurs sont lues en base : tous les processus obtiennent la même version
+        pour les mêmes données (clés de cache et d'export identiques d'un processus à l'autre).
+        """
+        db = get_database()
+        count = await self._get_models_collection().estimated_document_count()
+        last_run = await db[SCORE_RUNS_COLLECTION].find_one(
+            {}, {"seq": 1}, sort=[("seq", DESCENDING)]
+        )
+        run_seq = last_run["seq"] if last_run else -1
+        writes = await _fetch_write_count(db)
+        return f"{writes}.{run_seq}.{count}"
+
+    async def _load(self, version: str) -> CatalogSnapshot:
+        """Charge le catalogue complet (champs projetés) en un seul parcours de curseur."""
+        cursor = self._get_models_collection().find({}, CATALOG_PROJECTION, batch_size=5000)
+        docs = await cursor.to_list(length=None)
+        return CatalogSnapshot(version, docs)
+
+    async def get_snapshot(self) -> CatalogSnapshot:
+        """Retourne le snapshot courant, rechargé si la version des données a changé.
+
+        La version n'est revérifiée en base qu'après CATALOG_SNAPSHOT_TTL_SECONDS
+        (ou immédiatement après invalidate()).
+        """
+        global _snapshot, _checked_at, _lock
+        now = time.monotonic()
+        if _snapshot is not None and now - _checked_at < settings.CATALOG_SNAPSHOT_TTL_SECONDS:
+            return _snapshot
+
+        if _lock is None:
+            _lock = asyncio.Lock()
+        async with _lock:
+            # Un autre appel a pu recharger le snapshot pendant l'attente du verrou
+            if _snapshot is not None and time.monotonic() - _checked_at < settings.CATALOG_SNAPSHOT_TTL_SECONDS:
+                return _snapshot
+            version = await self._fetch_version()
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = await self._load(version)
+            _checked_at = time.monotonic()
+            return _snapshot
+
+    async def get_write_version(self) -> int:
+        """Compteur d'écritures du catalogue (cf. bump_catalog_version), sans charger le snapshot.
+
+        Une seule lecture (par _id) au plus toutes les CATALOG_SNAPSHOT_TTL_SECONDS, ou après
+        invalidate(). Suffit aux clés de cache qui ne dépendent que de quelques modèles
+        (simulate_impact) : toute écriture dans ai_models, y compris les scripts de calcul des
+        scores, incrémente ce compteur.
+        """
+        global _write_version, _write_version_checked_at
+        if _write_version is not None \
+                and time.monotonic() - _write_version_checked_at < settings.CATALOG_SNAPSHOT_TTL_SECONDS:
+            return _write_version
+        _write_version = await _fetch_write_count(get_database())
+        _write_version_checked_at = time.monotonic()
+        return _write_version
+
+    def invalidate(self) -> None:
+        """Force la revérification de la version en base au prochain get_snapshot() / get_write_version()."""
+        global _checked_at, _write_version_checked_at
+        _checked_at = 0.0
+        _write_version_checked_at = 0.0
+
+    async def record_write(self) -> None:
+        """Signale une écriture dans ai_models : version incrémentée en base, snapshot local revérifié.
+
+        Les autres processus voient la nouvelle version au plus tard après
+        CATALOG_SNAPSHOT_TTL_SECONDS.
+        """
+        await bump_catalog_version()
+        self.invalidate()
+
+    def current_version(self) -> Optional[str]:
+        """Version du snapshot actuellement en mémoire (None si aucun n'a été chargé)."""
+        return _snapshot.version if _snapshot is not None else None
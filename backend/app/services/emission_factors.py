@@ -0,0 +1,188 @@
+# backend/app/services/emission_factors.py
+
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+from app.core.config import settings
+from app.core.constants import REGIONS
+
+# Champs d'un facteur d'émission résolu
+FACTOR_FIELDS = ("co2_factor", "pue", "wue_l_per_kwh")
+# Valeurs utilisées sans fichier de facteurs (ou pour les champs qu'il ne précise pas)
+DEFAULT_FACTORS = {"pue": 1.0, "wue_l_per_kwh": None}
+# Champs descriptifs d'une région (REGIONS, ou "regions" du fichier de facteurs)
+REGION_INFO_FIELDS = ("name", "description", "countries")
+
+
+def _normalize_provider(provider: Optional[str]) -> Optional[str]:
+    return provider.strip().lower() if provider and provider.strip() else None
+
+
+def _pick(*sources: Dict[str, Any]) -> Dict[str, Any]:
+    """Fusionne les champs FACTOR_FIELDS présents, la dernière source étant prioritaire."""
+    merged: Dict[str, Any] = {}
+    for source in sources:
+        merged.update({field: source[field] for field in FACTOR_FIELDS if field in source})
+    return merged
+
+
+def _region_ids(data: Dict[str, Any]) -> List[str]:
+    """Régions connues : celles de REGIONS, puis celles ajoutées par le fichier de facteurs."""
+    file_regions = data.get("regions", {})
+    return list(REGIONS) + [region for region in file_regions if region not in REGIONS]
+
+
+def build_factor_table(data: Dict[str, Any]) -> Dict[Tuple[Optional[str], str], Dict[str, Any]]:
+    """Précalcule les facteurs de chaque couple (fournisseur, région).
+
+    Priorité : fournisseur/région > fournisseur > région > défauts du fichier > REGIONS.
+    La clé (None, région) correspond à un fournisseur non précisé ou inconnu.
+    """
+    defaults = data.get("defaults", {})
+    file_regions = data.get("regions", {})
+    providers = {_normalize_provider(name): entry for name, entry in data.get("providers", {}).items()}
+    table = {}
+    for region in _region_ids(data):
+        base = _pick(DEFAULT_FACTORS, REGIONS.get(region, {}), defaults, file_regions.get(region, {}))
+        table[(None, region)] = {**base, "provider": None}
+        for provider, entry in providers.items():
+            table[(provider, region)] = {
+                **_pick(base, entry, entry.get("regions", {}).get(region, {})),
+                "provider": provider,
+            }
+
+    for key, factors in table.items():
+        if not isinstance(factors.get("co2_factor"), (int, float)) or factors["co2_factor"] < 0:
+            raise ValueError(f"co2_factor manquant ou invalide pour {key}")
+        if not isinstance(factors.get("pue"), (int, float)) or factors["pue"] < 1:
+            raise ValueError(f"PUE invalide pour {key}")
+    return table
+
+
+def build_region_list(data: Dict[str, Any], table: Dict[Tuple[Optional[str], str], Dict[str, Any]]
+                      ) -> Dict[str, Dict[str, Any]]:
+    """Description de chaque région (id, nom, description, pays) et son facteur sans fournisseur.
+
+    Les champs du fichier sont prioritaires sur REGIONS ; une région ajoutée par le fichier
+    sans nom est nommée par son identifiant.
+    """
+    file_regions = data.get("regions", {})
+    regions = {}
+    for region in _region_ids(data):
+        info = {"id": region, "name": region}
+        for source in (REGIONS.get(region, {}), file_regions.get(region, {})):
+            info.update({field: source[field] for field in REGION_INFO_FIELDS if field in source})
+        info["co2_factor"] = table[(None, region)]["co2_factor"]
+        regions[region] = info
+    return regions
+
+
+class EmissionFactorRegistry:
+    """Registre des facteurs d'émission (intensité, PUE, WUE) par fournisseur cloud et région.
+
+    Chargé depuis un fichier JSON local, indexé par (fournisseur, région). Le fichier est
+    surveillé (mtime, au plus toutes les ``check_interval`` secondes, lors des lectures) et
+    rechargé à chaud dans chaque worker. ``version`` (empreinte du contenu) change avec le
+    fichier : elle fait partie des clés du cache des simulations. Sans fichier, les facteurs
+    de REGIONS sont utilisés. Les régions proposées par l'API (regions()) sont celles du
+    registre : une région ajoutée au fichier est disponible sans redéploiement.
+    """
+
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._mtime: Optional[float] = None
+        self._version = "constants"
+        self._providers: Dict[str, Dict[str, Any]] = {}
+        self._table = build_factor_table({})
+        self._regions = build_region_list({}, self._table)
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+            if mtime is None:
+                self._table, self._providers, self._version = build_factor_table({}), {}, "constants"
+                self._regions = build_region_list({}, self._table)
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    content = f.read()
+                data = json.loads(content)
+                table = build_factor_table(data)
+                regions = build_region_list(data, table)
+            except (OSError, ValueError) as e:
+                # Fichier invalide : on garde les facteurs précédents
+                self.last_error = str(e)
+                print(f"Avertissement: facteurs d'émission non rechargés ({e})")
+                return
+            # Remplacement en une affectation : les lectures concurrentes voient l'ancienne ou la nouvelle table
+            self._providers = {_normalize_provider(name): entry for name, entry in data.get("providers", {}).items()}
+            self._table = table
+            self._regions = regions
+            self._version = hashlib.sha1(content).hexdigest()[:12]
+            self.reloads += 1
+            self.last_error = None
+
+    @property
+    def version(self) -> str:
+        self._maybe_reload()
+        return self._version
+
+    def lookup(self, provider: Optional[str], region: str) -> Optional[Dict[str, Any]]:
+        """Facteurs résolus pour (fournisseur, région), ou None si la région est inconnue.
+
+        Un fournisseur absent du registre utilise les facteurs de la région seule.
+        """
+        self._maybe_reload()
+        table = self._table
+        return table.get((_normalize_provider(provider), region)) or table.get((None, region))
+
+    def regions(self) -> Dict[str, Dict[str, Any]]:
+        """Régions connues (REGIONS et régions du fichier), dans l'ordre, avec leur description.
+
+        Dictionnaire partagé : à ne pas modifier.
+        """
+        self._maybe_reload()
+        return self._regions
+
+    def describe(self) -> Dict[str, Any]:
+        """Contenu du registre : version, fournisseurs et facteurs par (fournisseur, région)."""
+        self._maybe_reload()
+        table = self._table
+        return {
+            "version": self._version,
+            "source": self.path if self._mtime is not None else None,
+            "providers": {provider: entry.get("name", provider) for provider, entry in self._providers.items()},
+            "factors": [
+                {"provider": provider, "region": region, **{field: factors.get(field) for field in FACTOR_FIELDS}}
+                for (provider, region), factors in table.items()
+            ],
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
+
+
+# Instance partagée par le processus
+emission_factor_registry = EmissionFactorRegistry(
+    settings.EMISSION_FACTORS_PATH, settings.EMISSION_FACTORS_CHECK_INTERVAL_SECONDS
+)
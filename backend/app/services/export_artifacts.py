@@ -0,0 +1,266 @@
+# backend/app/services/export_artifacts.py
+
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from app.core.config import settings
+
+# Extension des fichiers d'export par type
+ARTIFACT_EXTENSIONS = {"pdf": ".pdf", "excel": ".xlsx", "parquet": ".parquet", "arrow": ".arrow"}
+# Suffixe des copies compressées (gzip) servies aux clients qui l'acceptent
+GZIP_SUFFIX = ".gz"
+# Fichiers utilisés depuis moins longtemps jamais évincés (export en cours de téléchargement)
+EVICTION_GRACE_SECONDS = 60
+# Fichiers temporaires (écriture interrompue) supprimés au-delà de cet âge
+STALE_TMP_SECONDS = 3600
+
+
+def artifact_key(kind: str, model_ids: List[str], options: Dict[str, Any], data_version: str) -> str:
+    """Empreinte (SHA-256) d'un export : type, ensemble des modèles, options et version des données.
+
+    L'ordre des modèles n'intervient pas : une demande répétée dans un autre ordre est servie
+    par le fichier existant.
+    """
+    payload = json.dumps(
+        {"kind": kind, "model_ids": sorted(model_ids), "options": options, "data_version": data_version},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExportArtifactCache:
+    """Fichiers d'export adressés par leur contenu (cf. artifact_key), dans un dossier borné.
+
+    La date de dernier accès des fichiers (atime) sert d'horloge LRU : elle est mise à jour à
+    chaque réutilisation (lookup) et à chaque téléchargement (touch), et l'ordre est donc
+    partagé par tous les processus servant le même dossier. La date de modification n'est
+    pas touchée : elle ne change qu'à l'écriture du fichier, et les validateurs HTTP qui en
+    dérivent (ETag, Last-Modified, If-Range) restent stables d'un téléchargement à l'autre. Au-delà de ``max_bytes``, une tâche de fond (réveillée après chaque ajout
+    et toutes les ``sweep_interval`` secondes) supprime les fichiers les moins récemment
+    utilisés. Les anciens fichiers horodatés du dossier sont soumis à la même politique.
+
+    Chaque export peut avoir une copie gzip (``<fichier>.gz``, cf. precompress), comptée dans
+    la taille du dossier et supprimée avec lui.
+
+    Tant que start() n'a pas été appelé (scripts, tests), add() évince directement.
+    """
+
+    def __init__(self, max_bytes: int, sweep_interval: float, directory: Optional[str] = None,
+                 gzip_level: int = 6, gzip_min_savings: float = 0.1):
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.gzip_level = gzip_level
+        self.gzip_min_savings = gzip_min_savings
+        self._directory = directory
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # Occupation du dossier lors du dernier parcours, augmentée des ajouts depuis
+        self.disk_bytes = 0
+        self.files = 0
+        # Métriques
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.precompressed = 0
+        self.precompressed_saved_bytes = 0
+        self.sweeps = 0
+        self.last_sweep_at: Optional[datetime] = None
+
+    @property
+    def directory(self) -> str:
+        """Dossier des exports (par défaut "exports" dans le dossier courant), créé si besoin."""
+        directory = self._directory or os.path.join(os.getcwd(), "exports")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def path_for(self, key: str, kind: str) -> str:
+        """Chemin du fichier d'un export."""
+        return os.path.join(self.directory, key + ARTIFACT_EXTENSIONS[kind])
+
+    def exists(self, key: str, kind: str) -> bool:
+        """Indique si l'export est déjà disponible (sans compter d'accès)."""
+        return os.path.exists(self.path_for(key, kind))
+
+    def lookup(self, key: str, kind: str) -> Optional[str]:
+        """Retourne le chemin de l'export s'il existe (et le marque comme récemment utilisé)."""
+        path = self.path_for(key, kind)
+        if not self.touch(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def touch(self, path: str) -> bool:
+        """Marque un export comme récemment utilisé (téléchargement) ; False s'il n'existe plus."""
+        try:
+            # atime seulement : la date de modification (validateurs HTTP) est conservée
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def compressed_path(self, path: str) -> Optional[str]:
+        """Chemin de la copie gzip d'un export, si elle existe."""
+        gz_path = path + GZIP_SUFFIX
+        return gz_path if os.path.exists(gz_path) else None
+
+    def precompress(self, path: str) -> Optional[str]:
+        """Écrit la copie gzip d'un export (bloquant) si elle réduit la taille d'au moins gzip_min_savings.
+
+        Les fichiers déjà compressés (Parquet zstd, par exemple) n'ont en général pas de copie.
+        Retourne le chemin de la copie, None si elle n'est pas conservée.
+        """
+        gz_path = path + GZIP_SUFFIX
+        tmp_path = f"{gz_path}.{os.getpid()}.tmp"
+        with open(path, "rb") as source, open(tmp_path, "wb") as target:
+            # mtime=0 : copie identique pour un même fichier (ETag stable d'un processus à l'autre)
+            with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=self.gzip_level, mtime=0) as compressed:
+                shutil.copyfileobj(source, compressed, 1024 * 1024)
+        size, gz_size = os.path.getsize(path), os.path.getsize(tmp_path)
+        if gz_size > size * (1 - self.gzip_min_savings):
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, gz_path)
+        self.precompressed += 1
+        self.precompressed_saved_bytes += size - gz_size
+        return gz_path
+
+    def add(self, path: str) -> None:
+        """Enregistre un export qui vient d'être écrit ; évince si le dossier dépasse sa taille."""
+        self.disk_bytes += os.path.getsize(path)
+        gz_path = self.compressed_path(path)
+        if gz_path:
+            self.disk_bytes += os.path.getsize(gz_path)
+        self.files += 1
+        if self.disk_bytes <= self.max_bytes:
+            return
+        if self._task is not None:
+            self._wakeup.set()
+        else:
+            self.sweep()
+
+    async def start(self) -> None:
+        """Démarre la tâche d'éviction (au démarrage de l'application)."""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self.sweep) # Occupation initiale du dossier
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Arrête la tâche d'éviction."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.sweep)
+            except OSError as e:
+                print(f"ERREUR: éviction des exports impossible ({e})")
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """Fichiers d'export du dossier : (date de dernière utilisation, taille, chemin).
+
+        La taille inclut la copie gzip. Les fichiers temporaires abandonnés et les copies gzip
+        sans export sont supprimés au passage.
+        """
+        now = time.time()
+        files: Dict[str, Tuple[float, int]] = {}
+        compressed: Dict[str, int] = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith(".tmp"):
+                    if stat.st_mtime < now - STALE_TMP_SECONDS:
+                        self._remove(entry.path)
+                elif entry.name.endswith(GZIP_SUFFIX):
+                    compressed[entry.path[:-len(GZIP_SUFFIX)]] = stat.st_size
+                else:
+                    # Dernière utilisation : atime (touch), ou mtime si le fichier a été réécrit depuis
+                    files[entry.path] = (max(stat.st_atime, stat.st_mtime), stat.st_size)
+        for path in compressed.keys() - files.keys():
+            self._remove(path + GZIP_SUFFIX)
+        return [(used_at, size + compressed.get(path, 0), path) for path, (used_at, size) in files.items()]
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False # Déjà supprimé (par un autre processus)
+
+    def sweep(self) -> int:
+        """Supprime les exports les moins récemment utilisés jusqu'à repasser sous max_bytes.
+
+        Retourne le nombre de fichiers supprimés.
+        """
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        grace_limit = time.time() - EVICTION_GRACE_SECONDS
+        removed = 0
+        for used_at, size, path in entries:
+            if total <= self.max_bytes or used_at >= grace_limit:
+                break
+            if self._remove(path):
+                self._remove(path + GZIP_SUFFIX)
+                self.evictions += 1
+                self.evicted_bytes += size
+                removed += 1
+            total -= size
+        self.disk_bytes = total
+        self.files = len(entries) - removed
+        self.sweeps += 1
+        self.last_sweep_at = datetime.now()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Taux de réutilisation des exports et occupation du dossier."""
+        lookups = self.hits + self.misses
+        return {
+            "running": self.running,
+            "files": self.files,
+            "disk_bytes": self.disk_bytes,
+            "max_bytes": self.max_bytes,
+            "usage_ratio": self.disk_bytes / self.max_bytes if self.max_bytes else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "precompressed": self.precompressed,
+            "precompressed_saved_bytes": self.precompressed_saved_bytes,
+            "sweeps": self.sweeps,
+            "last_sweep_at": self.last_sweep_at.isoformat() if self.last_sweep_at else None,
+        }
+
+
+# Instance partagée par le processus (démarrée/arrêtée par app.main)
+export_artifact_cache = ExportArtifactCache(
+    max_bytes=settings.EXPORT_ARTIFACT_MAX_BYTES,
+    sweep_interval=settings.EXPORT_ARTIFACT_SWEEP_INTERVAL_SECONDS,
+    gzip_level=settings.EXPORT_GZIP_LEVEL,
+    gzip_min_savings=settings.EXPORT_GZIP_MIN_SAVINGS,
+)
@@ -0,0 +1,343 @@
+# backend/app/services/export_jobs.py
+
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import asyncio
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.models.models import ExportJobStatus
+from app.services.catalog_service import CatalogService
+from app.services.export_artifacts import export_artifact_cache, artifact_key
+from app.services.export_service import ExportService
+
+# Statuts d'un export : en file, en cours, terminé, en échec
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED)
+# Statuts des exports, partagés par tous les workers (un document par export, expiration TTL)
+EXPORT_JOBS_COLLECTION = "export_jobs"
+
+
+class ExportJob:
+    """Export demandé : paramètres, statut et utilisateurs abonnés."""
+
+    def __init__(self, kind: str, model_ids: List[str], options: Dict[str, Any],
+                 data_version: str, key: Tuple, user_id: str):
+        self.id = str(ObjectId())
+        self.kind = kind
+        self.model_ids = model_ids
+        self.options = options
+        self.data_version = data_version
+        self.key = key
+        self.user_ids: List[str] = [user_id]
+        self.subscribers = 1
+        self.status = JOB_QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+        self.file_id: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.error: Optional[str] = None
+        # Remplacé à chaque changement de statut : l'ancien est déclenché (cf. wait_for_change)
+        self._changed = asyncio.Event()
+
+    def _set_status(self, new_status: str) -> None:
+        self.status = new_status
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def to_status(self) -> ExportJobStatus:
+        return ExportJobStatus(job_id=self.id, **self._fields())
+
+    def to_document(self, retention_seconds: float) -> Dict[str, Any]:
+        """Document MongoDB du statut (expire retention_seconds après la dernière mise à jour)."""
+        return {
+            "_id": ObjectId(self.id),
+            "user_ids": list(self.user_ids),
+            **self._fields(),
+            "expires_at": datetime.utcnow() + timedelta(seconds=retention_seconds),
+        }
+
+    def _fields(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "status": self.status,
+            "model_ids": self.model_ids,
+            "options": self.options,
+            "data_version": self.data_version,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "file_id": self.file_id,
+            "filename": self.filename,
+            "error": self.error,
+            "subscribers": self.subscribers,
+        }
+
+
+class ExportJobQueue:
+    """File des exports générés en tâche de fond par un pool borné de workers.
+
+    submit() retourne immédiatement l'export (à suivre via son statut ou un flux SSE). Les
+    demandes identiques (même type, même ensemble de modèles, mêmes options, même version du
+    catalogue) reçues tant qu'un export est en file ou en cours sont regroupées sur celui-ci.
+    Au-delà de ``max_queued`` exports en attente, submit() lève une 503. Les statuts des
+    exports terminés sont conservés ``retention_seconds`` secondes.
+
+    Les exports dont le fichier existe déjà (cf. export_artifacts) sont servis directement,
+    sans passer par la file. Tant que start() n'a pas été appelé (scripts, tests), submit()
+    génère l'export directement.
+
+    Chaque changement de statut est aussi écrit dans la collection export_jobs : derrière
+    plusieurs workers, get_status() et watch() suivent un export créé par un autre worker
+    (lecture en base, par interrogation périodique pour le flux SSE). Le regroupement des
+    demandes identiques reste propre à chaque worker ; le fichier, lui, est partagé.
+    """
+
+    def __init__(self, workers: int, max_queued: int, retention_seconds: float):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, ExportJob] = {}
+        self._active: Dict[Tuple, ExportJob] = {} # clé de déduplication -> export en file ou en cours
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Métriques
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _get_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB des statuts d'export."""
+        db = get_database()
+        return db[EXPORT_JOBS_COLLECTION]
+
+    async def ensure_indexes(self) -> None:
+        """Crée l'index d'expiration (TTL) des statuts d'export."""
+        await self._get_collection().create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    async def _persist(self, job: ExportJob) -> None:
+        """Écrit le statut de l'export en base (une erreur n'interrompt pas l'export)."""
+        document = job.to_document(self.retention_seconds)
+        try:
+            await self._get_collection().replace_one({"_id": document["_id"]}, document, upsert=True)
+        except PyMongoError as e:
+            print(f"ERREUR: statut de l'export {job.id} non enregistré ({e})")
+
+    async def start(self) -> None:
+        """Démarre les workers (au démarrage de l'application)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Arrête les workers ; les exports non terminés passent en échec."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in list(self._active.values()):
+            await self._finish(job, JOB_FAILED, error="Export interrompu par l'arrêt du serveur")
+
+    async def submit(self, kind: str, model_ids: List[str], options: Dict[str, Any], user_id: str) -> ExportJob:
+        """Crée un export (ou rejoint un export identique en cours) et retourne son statut."""
+        self._prune()
+        snapshot = await CatalogService().get_snapshot()
+        if options.get("catalog"):
+            # Catalogue complet : les modèles sont lus à la génération
+            known_ids = []
+            found = len(snapshot.model_ids) > 0
+        else:
+            known_ids = [model_id for model_id in dict.fromkeys(model_ids) if model_id in snapshot.index]
+            found = bool(known_ids)
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Aucun des modèles demandés n'a été trouvé"
+            )
+
+        key = (kind, frozenset(known_ids), tuple(sorted(options.items())), snapshot.version)
+        job = self._active.get(key)
+        if job is not None:
+            if user_id not in job.user_ids:
+                job.user_ids.append(user_id)
+            job.subscribers += 1
+            self.deduplicated += 1
+            await self._persist(job)
+            return job
+
+        # Fichier déjà généré : servi directement, sans passer par la file
+        cached = export_artifact_cache.exists(artifact_key(kind, known_ids, options, snapshot.version), kind)
+        if not cached and self._queue is not None and self._queue.full():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Trop d'exports en attente, réessayez plus tard"
+            )
+
+        job = ExportJob(kind, known_ids, dict(options), snapshot.version, key, user_id)
+        self._jobs[job.id] = job
+        self._active[key] = job
+        self.submitted += 1
+        await self._persist(job)
+        if self._tasks and not cached:
+            self._queue.put_nowait(job)
+        else:
+            await self._run_job(job)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[ExportJob]:
+        """Retourne l'export s'il a été créé par ce worker et si l'utilisateur l'a demandé."""
+        job = self._jobs.get(job_id)
+        if job is None or user_id not in job.user_ids:
+            return None
+        return job
+
+    async def get_status(self, job_id: str, user_id: str) -> Optional[ExportJobStatus]:
+        """Statut d'un export créé par n'importe quel worker (None si inconnu ou d'un autre utilisateur)."""
+        job = self.get(job_id, user_id)
+        if job is not None:
+            return job.to_status()
+        try:
+            document_id = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+        doc = await self._get_collection().find_one({"_id": document_id, "user_ids": user_id})
+        if doc is None:
+            return None
+        return ExportJobStatus(
+            job_id=job_id,
+            **{key: value for key, value in doc.items() if key not in ("_id", "user_ids", "expires_at")}
+        )
+
+    async def watch(self, job_id: str, user_id: str, keepalive: float,
+                    poll_interval: float) -> AsyncIterator[Optional[ExportJobStatus]]:
+        """Statuts successifs d'un export jusqu'à sa fin (None : aucun changement depuis ``keepalive`` s).
+
+        Un export de ce worker est suivi par événement ; celui d'un autre worker, en relisant
+        son statut en base toutes les ``poll_interval`` secondes.
+        """
+        job = self.get(job_id, user_id)
+        sent_status = None
+        if job is not None:
+            while True:
+                if job.status != sent_status:
+                    sent_status = job.status
+                    yield job.to_status()
+                if sent_status in FINISHED_STATUSES:
+                    return
+                if not await self.wait_for_change(job, keepalive):
+                    yield None
+        last_sent = time.monotonic()
+        while True:
+            job_status = await self.get_status(job_id, user_id)
+            if job_status is None:
+                return
+            if job_status.status != sent_status:
+                sent_status = job_status.status
+                last_sent = time.monotonic()
+                yield job_status
+            if sent_status in FINISHED_STATUSES:
+                return
+            if time.monotonic() - last_sent >= keepalive:
+                last_sent = time.monotonic()
+                yield None
+            await asyncio.sleep(poll_interval)
+
+    async def wait_for_change(self, job: ExportJob, timeout: float) -> bool:
+        """Attend le prochain changement de statut ; retourne False à l'expiration du délai."""
+        if job.status in FINISHED_STATUSES:
+            return False
+        try:
+            await asyncio.wait_for(job._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: ExportJob) -> None:
+        """Génère le fichier d'un export (lecture des modèles, écriture dans un thread)."""
+        job.started_at = datetime.utcnow()
+        job._set_status(JOB_RUNNING)
+        await self._persist(job)
+        try:
+            export = await ExportService().render_export(job.kind, job.model_ids, job.options, job.user_ids)
+            if export is None:
+                raise ValueError("Les modèles demandés n'existent plus")
+        except Exception as e:
+            await self._finish(job, JOB_FAILED, error=str(e))
+            return
+        job.file_id = export["id"]
+        job.filename = export["filename"]
+        await self._finish(job, JOB_DONE)
+
+    async def _finish(self, job: ExportJob, final_status: str, error: Optional[str] = None) -> None:
+        # Les demandes suivantes créent un nouvel export
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        job.finished_monotonic = time.monotonic()
+        if final_status == JOB_DONE:
+            self.completed += 1
+        else:
+            self.failed += 1
+        job._set_status(final_status)
+        await self._persist(job)
+
+    def _prune(self) -> None:
+        """Oublie les exports terminés depuis plus de retention_seconds."""
+        limit = time.monotonic() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_monotonic is not None and job.finished_monotonic < limit]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques de la file (profondeur, exports en cours, regroupés, en échec)."""
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queued": sum(1 for job in self._active.values() if job.status == JOB_QUEUED),
+            "in_progress": sum(1 for job in self._active.values() if job.status == JOB_RUNNING),
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "tracked_jobs": len(self._jobs),
+        }
+
+
+# Instance partagée par le processus (démarrée/arrêtée par app.main)
+export_job_queue = ExportJobQueue(
+    workers=settings.EXPORT_JOB_WORKERS,
+    max_queued=settings.EXPORT_JOB_MAX_QUEUED,
+    retention_seconds=settings.EXPORT_JOB_RETENTION_SECONDS,
+)
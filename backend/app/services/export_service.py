@@ -1,102 +1,497 @@
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import math
+import multiprocessing
 import os
 from bson import ObjectId
-from datetime import datetime
-import tempfile
-import shutil
+from bson.errors import InvalidId
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from pymongo import ASCENDING, DESCENDING
+from motor.motor_asyncio import AsyncIOMotorCollection
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
 from app.core.config import settings
+from app.core.database import get_database
+from app.services.catalog_service import CatalogService
+from app.services.export_artifacts import export_artifact_cache, artifact_key, ARTIFACT_EXTENSIONS
+from app.services.carbon_score_service import CarbonScoreService
+from app.services.simulation_service import SimulationService
+from app.utils.cache import TTLCache
+from app.utils.columnar import ColumnarWriter, COLUMNAR_FORMATS, PYARROW_INSTALLED
+from app.utils.pdf_report import render_charts, render_pdf_report
+
+# Nom de la collection MongoDB pour les modèles AI
+MODELS_COLLECTION = "ai_models"
+# Exports générés (métadonnées ; les fichiers sont dans le dossier des exports) et scénarios
+EXPORTS_COLLECTION = "exports"
+SCENARIOS_COLLECTION = "scenarios"
+# Champs des listes d'exports et de scénarios (sans les données volumineuses)
+EXPORT_LIST_PROJECTION = {"filename": 1, "type": 1, "model_ids": 1, "data_version": 1, "options": 1, "created_at": 1}
+SCENARIO_LIST_PROJECTION = {"name": 1, "created_at": 1, "updated_at": 1}
+# Champs exportés et valeur utilisée lorsqu'ils sont absents (None : laissé vide)
+EXPORT_FIELDS = {
+    "model_name": "",
+    "parameters_billions": 0.0,
+    "architecture": "",
+    "model_type": "",
+    "training_co2_kg": 0.0,
+    "overall_score": 0.0,
+    "mmlu_score": None,
+    "bbh_score": None,
+    "math_score": None,
+    "date_submitted": None,
+    "training_energy_mwh": None,
+    "reported_co2_tons": None,
+    "cloud_provider": None,
+    "water_use_million_liters": None,
+}
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+# Nom des fichiers téléchargés, par type d'export
+EXPORT_FILENAME_PREFIXES = {
+    "pdf": "rapport_carbonscope", "excel": "export_carbonscope",
+    "parquet": "export_carbonscope", "arrow": "export_carbonscope",
+}
+# Préfixe des exports du catalogue complet (option "catalog")
+CATALOG_FILENAME_PREFIX = "catalogue_carbonscope"
+# Codec de compression par format en colonnes
+COLUMNAR_COMPRESSION = {
+    "parquet": settings.EXPORT_PARQUET_COMPRESSION,
+    "arrow": settings.EXPORT_ARROW_COMPRESSION,
+}
+# Colonnes du classeur XLSX : (en-tête, champ)
+XLSX_COLUMNS = [
+    ("Nom du modèle", "model_name"),
+    ("Architecture", "architecture"),
+    ("Type", "model_type"),
+    ("Paramètres (milliards)", "parameters_billions"),
+    ("Émissions CO2 (kg)", "training_co2_kg"),
+    ("Score global", "overall_score"),
+    ("Score MMLU", "mmlu_score"),
+    ("Score BBH", "bbh_score"),
+    ("Score Math", "math_score"),
+    ("Date de soumission", "date_submitted"),
+    ("Énergie d'entraînement (MWh)", "training_energy_mwh"),
+    ("CO2 rapporté (t)", "reported_co2_tons"),
+    ("Fournisseur cloud", "cloud_provider"),
+    ("Utilisation d'eau (millions de litres)", "water_use_million_liters"),
+]
+
+# Graphiques des rapports PDF : (ensemble de modèles, version des données) -> PNG par graphique
+chart_cache = TTLCache(
+    settings.EXPORT_CHART_CACHE_MAX_ENTRIES, settings.EXPORT_CHART_CACHE_TTL_SECONDS, name="export_charts"
+)
+# Pool de processus du rendu PDF (créé au premier rapport) : le rendu des graphiques et la
+# mise en page sont coûteux en CPU et ne doivent pas bloquer la boucle d'événements
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+# Générations de fichiers d'export en cours dans le processus : clé de l'export -> tâche
+_artifact_builds: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # "spawn" : processus neufs, sans copie de l'état (connexions, boucle) du serveur
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=settings.EXPORT_PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_pool
+
+
+async def _run_in_pdf_pool(func, *args):
+    """Exécute func(*args) dans le pool de rendu PDF (recréé au prochain appel s'il est cassé)."""
+    global _pdf_pool
+    pool = _get_pdf_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # Un processus du pool s'est arrêté brutalement : le pool n'est plus utilisable
+        if _pdf_pool is pool:
+            _pdf_pool = None
+        raise
+
+
+def shutdown_pdf_pool() -> None:
+    """Arrête le pool de rendu PDF (à l'arrêt de l'application)."""
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+def _map_export_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convertit un document ai_models en dictionnaire d'export (NaN et champs absents remplacés)."""
+    model = {"id": str(doc["_id"])}
+    for field, default in EXPORT_FIELDS.items():
+        value = doc.get(field)
+        if value is None or (isinstance(value, float) and (math.isnan(value) or math.isinf(value))):
+            value = default
+        model[field] = value
+    return model
+
+
+def new_xlsx_workbook() -> Tuple[Workbook, Any]:
+    """Crée un classeur en écriture seule (lignes écrites au fil de l'eau) et sa feuille de modèles."""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Modèles")
+    worksheet.append([header for header, _ in XLSX_COLUMNS])
+    return workbook, worksheet
+
+
+def _xlsx_value(value: Any) -> Any:
+    # Les caractères de contrôle sont interdits dans les fichiers XLSX
+    return ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value
+
+
+def append_xlsx_rows(worksheet: Any, models: List[Dict[str, Any]]) -> None:
+    """Ajoute une ligne par modèle (bloquant : exécuté dans un thread)."""
+    for model in models:
+        worksheet.append([_xlsx_value(model.get(field)) for _, field in XLSX_COLUMNS])
+
+
+def append_xlsx_simulations(workbook: Workbook, simulations: Dict[str, Any]) -> None:
+    """Ajoute la feuille "Simulations" : émissions de chaque modèle par région (bloquant)."""
+    worksheet = workbook.create_sheet("Simulations")
+    worksheet.append([
+        f"Émissions d'inférence (kg CO2) pour {simulations['frequency_per_day']} inférences par jour "
+        f"pendant {simulations['duration_days']} jours, selon la région d'hébergement."
+    ])
+    worksheet.append(["Modèle"] + [_xlsx_value(region["name"]) for region in simulations["regions"]])
+    for row in simulations["rows"]:
+        worksheet.append([_xlsx_value(row["model_name"])] + row["co2_kg"])
+
+
+def save_xlsx_workbook(workbook: Workbook, file_path: str) -> None:
+    """Enregistre le classeur sous un nom temporaire puis le renomme (pas de fichier partiel)."""
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    workbook.save(tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+def check_export_kind(kind: str) -> None:
+    """Vérifie que le format d'export est disponible (Parquet et Arrow nécessitent pyarrow)."""
+    if kind in COLUMNAR_FORMATS and not PYARROW_INSTALLED:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Export {kind} indisponible : pyarrow n'est pas installé"
+        )
+
+
+def _object_id(value: str) -> Optional[ObjectId]:
+    """Convertit un ID en ObjectId (None s'il est invalide)."""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
 
 
 class ExportService:
-    """Service pour l'export de rapports et la gestion des scénarios."""
+    """Service pour l'export de rapports et la gestion des scénarios.
+
+    Les modèles exportés sont lus dans la collection ai_models : les IDs demandés sont
+    filtrés sur le snapshot partagé du catalogue, puis récupérés en une seule requête.
+    Chaque export enregistre la version du snapshot utilisée.
+
+    Les métadonnées des exports et les scénarios sont stockés dans MongoDB (collections
+    exports et scenarios) : ils sont visibles de tous les workers. Les fichiers sont dans le
+    dossier des exports (cf. export_artifacts), partagé par les workers d'un même hôte.
+    """
     
     def __init__(self):
         """Initialise le service d'export."""
-        self.models_db = {}
-        self.exports_db = {}
-        self.scenarios_db = {}
-        self.export_dir = os.path.join(os.getcwd(), "exports")
-        os.makedirs(self.export_dir, exist_ok=True)
-        self._load_models()
+        self.export_dir = export_artifact_cache.directory
+
+    def _get_models_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB pour les modèles AI."""
+        db = get_database()
+        return db[MODELS_COLLECTION]
+
+    def _get_exports_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB des exports générés."""
+        db = get_database()
+        return db[EXPORTS_COLLECTION]
+
+    def _get_scenarios_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB des scénarios d'analyse."""
+        db = get_database()
+        return db[SCENARIOS_COLLECTION]
+
+    async def ensure_indexes(self) -> None:
+        """Crée les index des exports et scénarios : listes par utilisateur et expiration (TTL)."""
+        exports = self._get_exports_collection()
+        await exports.create_index([("user_ids", ASCENDING), ("created_at", DESCENDING)])
+        await exports.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        scenarios = self._get_scenarios_collection()
+        await scenarios.create_index([("user_id", ASCENDING), ("updated_at", DESCENDING)])
+        # Seuls les scénarios portant "expires_at" expirent (cf. SCENARIO_RETENTION_DAYS)
+        await scenarios.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    async def _get_models(self, model_ids: List[str]) -> Tuple[List[Dict[str, Any]], str]:
+        """Récupère les modèles demandés (dans l'ordre, sans doublon) et la version des données.
+
+        Les IDs inconnus du snapshot sont ignorés sans accès à la base ; les autres sont lus
+        en un seul ``find`` ($in).
+        """
+        known_ids, data_version = await self._known_ids(model_ids)
+        if not known_ids:
+            return [], data_version
+
+        cursor = self._get_models_collection().find(
+            {"_id": {"$in": [ObjectId(model_id) for model_id in known_ids]}}, EXPORT_PROJECTION
+        )
+        docs = {str(doc["_id"]): doc for doc in await cursor.to_list(length=len(known_ids))}
+        models = [_map_export_doc(docs[model_id]) for model_id in known_ids if model_id in docs]
+        return models, data_version
     
-    def _load_models(self):
-        """Charge les données des modèles depuis le fichier JSON."""
+    async def _known_ids(self, model_ids: List[str]) -> Tuple[List[str], str]:
+        """Filtre les IDs demandés (ordre conservé, sans doublon) sur le snapshot du catalogue."""
+        snapshot = await CatalogService().get_snapshot()
+        return [model_id for model_id in dict.fromkeys(model_ids) if model_id in snapshot.index], snapshot.version
+
+    async def _iter_model_batches(self, model_ids: List[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Lit les modèles par lots de EXPORT_CURSOR_BATCH_SIZE (un find $in par lot, ordre conservé).
+
+        Seul le lot courant est en mémoire, quel que soit le nombre de modèles exportés.
+        """
+        batch_size = settings.EXPORT_CURSOR_BATCH_SIZE
+        collection = self._get_models_collection()
+        for start in range(0, len(model_ids), batch_size):
+            batch_ids = model_ids[start:start + batch_size]
+            cursor = collection.find(
+                {"_id": {"$in": [ObjectId(model_id) for model_id in batch_ids]}}, EXPORT_PROJECTION,
+                batch_size=batch_size
+            )
+            docs = {str(doc["_id"]): doc async for doc in cursor}
+            yield [_map_export_doc(docs[model_id]) for model_id in batch_ids if model_id in docs]
+
+    async def _iter_catalog_batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Lit tout le catalogue en un seul curseur, par lots de EXPORT_CURSOR_BATCH_SIZE (ordre des _id)."""
+        batch_size = settings.EXPORT_CURSOR_BATCH_SIZE
+        cursor = self._get_models_collection().find({}, EXPORT_PROJECTION, batch_size=batch_size).sort("_id", ASCENDING)
+        batch = []
+        async for doc in cursor:
+            batch.append(_map_export_doc(doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _iter_export_batches(self, model_ids: List[str], options: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Lots de modèles d'un export : catalogue complet (option "catalog") ou modèles demandés."""
+        return self._iter_catalog_batches() if options.get("catalog") else self._iter_model_batches(model_ids)
+
+    async def _write_excel_export(self, file_path: str, batches: AsyncIterator[List[Dict[str, Any]]],
+                                  simulations: Optional[Dict[str, Any]] = None) -> int:
+        """Écrit le classeur XLSX lot par lot (mémoire constante). Retourne le nombre de lignes.
+
+        ``simulations`` (cf. _get_simulations) ajoute la feuille "Simulations".
+        """
+        workbook, worksheet = new_xlsx_workbook()
+        rows = 0
+        async for models in batches:
+            await asyncio.to_thread(append_xlsx_rows, worksheet, models)
+            rows += len(models)
+        if simulations is not None:
+            await asyncio.to_thread(append_xlsx_simulations, workbook, simulations)
+        await asyncio.to_thread(save_xlsx_workbook, workbook, file_path)
+        return rows
+
+    async def _write_columnar_export(self, file_path: str, kind: str,
+                                     batches: AsyncIterator[List[Dict[str, Any]]]) -> int:
+        """Écrit un export Parquet ou Arrow IPC lot par lot (colonnes typées, compressées).
+
+        Retourne le nombre de lignes.
+        """
+        writer = await asyncio.to_thread(ColumnarWriter, file_path, kind, COLUMNAR_COMPRESSION[kind])
         try:
-            with open(settings.DATA_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Convertir les données en modèles et les stocker avec un ID unique
-            for idx, model_data in enumerate(data):
-                model_id = str(ObjectId())
-                
-                # Renommer les clés pour correspondre au modèle Pydantic
-                renamed_data = {
-                    "id": model_id,
-                    "model_name": model_data.get("Model Name", ""),
-                    "parameters_billions": model_data.get("Parameters (B)", 0.0),
-                    "architecture": model_data.get("Architecture", ""),
-                    "model_type": model_data.get("Model Type", ""),
-                    "training_co2_kg": model_data.get("Training CO2 (kg)", 0.0),
-                    "overall_score": model_data.get("Overall Score", 0.0),
-                    "mmlu_score": model_data.get("MMLU Score"),
-                    "bbh_score": model_data.get("BBH Score"),
-                    "math_score": model_data.get("Math Score"),
-                    "date_submitted": model_data.get("Date Submitted"),
-                    "training_energy_mwh": model_data.get("Training Energy (MWh)"),
-                    "reported_co2_tons": model_data.get("Reported CO2 (t)"),
-                    "cloud_provider": model_data.get("Cloud Provider"),
-                    "water_use_million_liters": model_data.get("Water Use (Million Liters)")
-                }
-                
-                self.models_db[model_id] = renamed_data
-        except Exception as e:
-            print(f"Erreur lors du chargement des données: {e}")
-            # Créer quelques modèles fictifs en cas d'erreur
-            self._create_mock_data()
-    
-    def _create_mock_data(self):
-        """Crée des données fictives pour le développement."""
-        # Créer quelques modèles fictifs
-        model_id1 = str(ObjectId())
-        self.models_db[model_id1] = {
-            "id": model_id1,
-            "model_name": "GPT-4",
-            "parameters_billions": 1000.0,
-            "architecture": "Transformer",
-            "model_type": "💬 chat models (RLHF, DPO, IFT, ...)",
-            "training_co2_kg": 5000.0,
-            "overall_score": 90.0,
-            "mmlu_score": 85.0,
-            "bbh_score": 92.0,
-            "math_score": 88.0,
-            "date_submitted": "2024-06-01",
-            "training_energy_mwh": 10000.0,
-            "reported_co2_tons": 5.0,
-            "cloud_provider": "Microsoft (Azure)",
-            "water_use_million_liters": 2.5
-        }
-        
-        model_id2 = str(ObjectId())
-        self.models_db[model_id2] = {
-            "id": model_id2,
-            "model_name": "LLaMA-3",
-            "parameters_billions": 70.0,
-            "architecture": "LlamaForCausalLM",
-            "model_type": "🟢 pretrained",
-            "training_co2_kg": 1200.0,
-            "overall_score": 75.0,
-            "mmlu_score": 70.0,
-            "bbh_score": 78.0,
-            "math_score": 72.0,
-            "date_submitted": "2024-07-15",
-            "training_energy_mwh": 2500.0,
-            "reported_co2_tons": 1.2,
-            "cloud_provider": None,
-            "water_use_million_liters": None
+            async for models in batches:
+                await asyncio.to_thread(writer.write, models)
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            await asyncio.to_thread(writer.abort)
+            raise
+        return writer.rows
+
+    async def _get_charts(self, model_ids: List[str], data_version: str) -> Dict[str, bytes]:
+        """Graphiques du rapport, rendus dans le pool de processus et mis en cache."""
+        key = (frozenset(model_ids), data_version)
+        charts = chart_cache.get(key)
+        if charts is not None:
+            return charts
+
+        snapshot = await CatalogService().get_snapshot()
+        positions = snapshot.indices_of(model_ids)
+        positions = positions[positions >= 0]
+        charts = await _run_in_pdf_pool(
+            render_charts,
+            snapshot.model_names[positions].tolist(),
+            [0.0 if math.isnan(value) else value for value in snapshot.training_co2_kg[positions].tolist()],
+            [0.0 if math.isnan(value) else value for value in snapshot.overall_score[positions].tolist()],
+        )
+        chart_cache.set(key, charts)
+        return charts
+
+    async def _get_simulations(self, model_ids: List[str]) -> Dict[str, Any]:
+        """Section "Simulations" : impact de chaque modèle par région (un calcul groupé)."""
+        simulations = await SimulationService().simulate_models_by_region(
+            model_ids, settings.EXPORT_REPORT_FREQUENCY_PER_DAY, settings.EXPORT_REPORT_DURATION_DAYS
+        )
+        simulations["frequency_per_day"] = settings.EXPORT_REPORT_FREQUENCY_PER_DAY
+        simulations["duration_days"] = settings.EXPORT_REPORT_DURATION_DAYS
+        return simulations
+
+    async def _get_recommendations(self, model_ids: List[str]) -> List[Dict[str, Any]]:
+        """Section "Recommandations" : meilleure alternative de chaque modèle (un calcul groupé)."""
+        recommendations = await CarbonScoreService().get_best_recommendations(model_ids)
+        return [
+            {
+                "model_name": recommendation.original_model_name,
+                "recommended_model_name": recommendation.recommended_model_name,
+                "co2_savings_kg": recommendation.co2_savings_kg,
+                "performance_difference_percent": recommendation.performance_difference_percent,
+            }
+            for recommendation in recommendations
+        ]
+
+    async def _write_pdf_report(self, file_path: str, model_ids: List[str], data_version: str,
+                                options: Dict[str, Any]) -> List[str]:
+        """Prépare les sections du rapport en parallèle (asyncio.gather), puis le rend dans le pool.
+
+        Retourne les IDs des modèles inclus (liste vide si aucun n'a été trouvé).
+        """
+        async def no_section() -> None:
+            return None
+
+        (models, _), charts, simulations, recommendations = await asyncio.gather(
+            self._get_models(model_ids),
+            self._get_charts(model_ids, data_version),
+            self._get_simulations(model_ids) if options.get("include_simulations") else no_section(),
+            self._get_recommendations(model_ids) if options.get("include_recommendations") else no_section(),
+        )
+        if not models:
+            return []
+
+        for model in models:
+            model["efficiency"] = model["overall_score"] / model["training_co2_kg"] if model["training_co2_kg"] > 0 else 0
+        report = {
+            "generated_at": datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+            "data_version": data_version,
+            "models": models,
+            "simulations": simulations,
+            "recommendations": recommendations,
         }
-    
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        await _run_in_pdf_pool(render_pdf_report, tmp_path, report, charts)
+        os.replace(tmp_path, file_path)
+        return [model["id"] for model in models]
+
+    async def _build_artifact(self, kind: str, known_ids: List[str], options: Dict[str, Any],
+                              data_version: str) -> Optional[Tuple[str, str]]:
+        """Retourne (clé, chemin) du fichier d'un export, généré s'il n'existe pas encore.
+
+        Une seule génération par clé dans le processus : les appels concurrents (file des
+        exports, régénération au téléchargement) attendent la même tâche. Retourne None si
+        aucun modèle n'a pu être exporté.
+        """
+        key = artifact_key(kind, known_ids, options, data_version)
+        file_path = export_artifact_cache.lookup(key, kind)
+        if file_path is not None:
+            return key, file_path
+        task = _artifact_builds.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._write_artifact(kind, key, known_ids, options, data_version))
+            _artifact_builds[key] = task
+            task.add_done_callback(lambda _: _artifact_builds.pop(key, None))
+        # shield : l'annulation d'un appelant (client déconnecté) n'interrompt pas la génération
+        file_path = await asyncio.shield(task)
+        return (key, file_path) if file_path else None
+
+    async def _write_artifact(self, kind: str, key: str, known_ids: List[str], options: Dict[str, Any],
+                              data_version: str) -> Optional[str]:
+        """Écrit le fichier d'un export et sa copie gzip ; retourne son chemin (None si vide)."""
+        file_path = export_artifact_cache.path_for(key, kind)
+        if kind == "pdf":
+            if not await self._write_pdf_report(file_path, known_ids, data_version, options):
+                return None
+        elif kind == "excel":
+            simulations = await self._get_simulations(known_ids) \
+                if options.get("include_simulations") and known_ids else None
+            await self._write_excel_export(file_path, self._iter_export_batches(known_ids, options), simulations)
+        else:
+            await self._write_columnar_export(file_path, kind, self._iter_export_batches(known_ids, options))
+        # Copie gzip servie aux clients qui l'acceptent (Content-Encoding)
+        await asyncio.to_thread(export_artifact_cache.precompress, file_path)
+        export_artifact_cache.add(file_path)
+        return file_path
+
+    async def render_export(
+        self,
+        kind: str,
+        model_ids: List[str],
+        options: Dict[str, Any],
+        user_ids: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Génère le fichier d'un export et l'enregistre pour chaque utilisateur demandeur.
+
+        Le fichier n'est généré que s'il n'existe pas déjà pour les mêmes modèles, options et
+        version des données (cf. export_artifacts). Le rapport PDF est rendu dans un pool de
+        processus (cf. _write_pdf_report) ; les classeurs Excel et les fichiers Parquet / Arrow
+        sont écrits dans un thread, alimentés lot par lot depuis la base (cf. _iter_export_batches).
+
+        Args:
+            kind: "pdf", "excel", "parquet" ou "arrow"
+            model_ids: IDs des modèles à inclure (ignorés avec l'option "catalog")
+            options: Options de l'export (include_simulations, include_recommendations, catalog :
+                catalogue complet, hors PDF)
+            user_ids: Utilisateurs autorisés à télécharger le fichier
+
+        Returns:
+            Optional[Dict[str, Any]]: Enregistrement de l'export (id, file_path, filename, ...),
+            None si aucun modèle n'a été trouvé
+        """
+        if options.get("catalog") and kind != "pdf":
+            snapshot = await CatalogService().get_snapshot()
+            known_ids, data_version = [], snapshot.version
+            if not len(snapshot.model_ids):
+                return None
+        else:
+            known_ids, data_version = await self._known_ids(model_ids)
+            if not known_ids:
+                return None
+
+        # Fichier adressé par son contenu : une demande identique réutilise le fichier existant
+        artifact = await self._build_artifact(kind, known_ids, options, data_version)
+        if artifact is None:
+            return None
+        key, file_path = artifact
+
+        now = datetime.utcnow() # UTC : l'index TTL de MongoDB lit expires_at comme une date UTC
+        file_id = ObjectId()
+        prefix = CATALOG_FILENAME_PREFIX if options.get("catalog") else EXPORT_FILENAME_PREFIXES[kind]
+        filename = f"{prefix}_{now.strftime('%Y%m%d_%H%M%S')}{ARTIFACT_EXTENSIONS[kind]}"
+
+        # Enregistrer l'export dans la base de données (le chemin est recalculé à la lecture)
+        await self._get_exports_collection().insert_one({
+            "_id": file_id,
+            "user_id": user_ids[0] if user_ids else None,
+            "user_ids": list(user_ids),
+            "filename": filename,
+            "model_ids": known_ids,
+            "data_version": data_version,
+            "artifact_key": key,
+            "options": dict(options),
+            "type": kind,
+            "created_at": now,
+            "expires_at": now + timedelta(days=settings.EXPORT_RECORD_RETENTION_DAYS),
+        })
+        return self._map_export_record({"_id": file_id, "filename": filename, "artifact_key": key, "type": kind,
+                                        "user_ids": list(user_ids), "model_ids": known_ids,
+                                        "data_version": data_version, "options": dict(options), "created_at": now})
+
     async def export_to_pdf(
         self, 
         model_ids: List[str], 
@@ -115,105 +510,12 @@ class ExportService:
         Returns:
             Optional[str]: Chemin du fichier PDF généré, None en cas d'erreur
         """
-        # Dans une vraie application, nous utiliserions une bibliothèque comme ReportLab ou WeasyPrint
-        # pour générer un vrai PDF. Pour cet exemple, nous allons simplement créer un fichier texte.
-        
-        # Récupérer les modèles
-        models = []
-        for model_id in model_ids:
-            model = self.models_db.get(model_id)
-            if model:
-                models.append(model)
-        
-        if not models:
-            return None
-        
-        # Créer un fichier temporaire
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_id = str(ObjectId())
-        filename = f"rapport_carbonscope_{timestamp}.txt"
-        file_path = os.path.join(self.export_dir, filename)
-        
-        # Générer le contenu du rapport
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write("RAPPORT COMPARATIF CARBONSCOPE AI\n")
-            f.write("================================\n\n")
-            f.write(f"Date de génération: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n")
-            
-            f.write("MODÈLES COMPARÉS\n")
-            f.write("--------------\n\n")
-            
-            for model in models:
-                f.write(f"Modèle: {model['model_name']}\n")
-                f.write(f"Architecture: {model['architecture']}\n")
-                f.write(f"Type: {model['model_type']}\n")
-                f.write(f"Taille: {model['parameters_billions']} milliards de paramètres\n")
-                f.write(f"Émissions CO2: {model['training_co2_kg']} kg\n")
-                f.write(f"Score global: {model['overall_score']}\n")
-                f.write("\n")
-            
-            f.write("COMPARAISON ENVIRONNEMENTALE\n")
-            f.write("--------------------------\n\n")
-            
-            # Trier les modèles par émissions CO2
-            models_by_co2 = sorted(models, key=lambda m: m['training_co2_kg'])
-            
-            f.write("Classement par émissions CO2 (du plus faible au plus élevé):\n")
-            for idx, model in enumerate(models_by_co2):
-                f.write(f"{idx+1}. {model['model_name']}: {model['training_co2_kg']} kg CO2\n")
-            
-            f.write("\n")
-            
-            # Trier les modèles par efficacité (score/émissions)
-            models_by_efficiency = sorted(
-                models, 
-                key=lambda m: m['overall_score'] / m['training_co2_kg'] if m['training_co2_kg'] > 0 else 0,
-                reverse=True
-            )
-            
-            f.write("Classement par efficacité carbone (score/émissions):\n")
-            for idx, model in enumerate(models_by_efficiency):
-                efficiency = model['overall_score'] / model['training_co2_kg'] if model['training_co2_kg'] > 0 else 0
-                f.write(f"{idx+1}. {model['model_name']}: {efficiency:.4f} points/kg CO2\n")
-            
-            f.write("\n")
-            
-            if include_simulations:
-                f.write("SIMULATIONS D'IMPACT\n")
-                f.write("------------------\n\n")
-                
-                f.write("Cette section inclurait des simulations d'impact pour différents scénarios d'utilisation.\n")
-                f.write("Dans une vraie application, ces données seraient générées dynamiquement.\n")
-                f.write("\n")
-            
-            if include_recommendations:
-                f.write("RECOMMANDATIONS\n")
-                f.write("---------------\n\n")
-                
-                f.write("Cette section inclurait des recommandations de modèles alternatifs plus écologiques.\n")
-                f.write("Dans une vraie application, ces données seraient générées dynamiquement.\n")
-                f.write("\n")
-            
-            f.write("CONCLUSION\n")
-            f.write("----------\n\n")
-            
-            f.write("Ce rapport a été généré par CarbonScope AI, une application de visualisation\n")
-            f.write("de l'empreinte carbone des modèles d'IA générative.\n")
-            f.write("\n")
-            f.write("Pour plus d'informations, visitez notre site web.\n")
-        
-        # Enregistrer l'export dans la base de données
-        self.exports_db[file_id] = {
-            "id": file_id,
-            "user_id": user_id,
-            "file_path": file_path,
-            "filename": filename,
-            "model_ids": model_ids,
-            "type": "pdf",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        return file_path
+        export = await self.render_export(
+            "pdf", model_ids,
+            {"include_simulations": include_simulations, "include_recommendations": include_recommendations},
+            [user_id]
+        )
+        return export["file_path"] if export else None
     
     async def export_to_excel(
         self, 
@@ -221,57 +523,82 @@ class ExportService:
         include_simulations: bool = False,
         user_id: str = None
     ) -> Optional[str]:
-        """Génère un fichier Excel comparatif pour les modèles d'IA sélectionnés.
+        """Génère un classeur Excel (XLSX) comparatif pour les modèles d'IA sélectionnés.
         
         Args:
             model_ids: Liste des IDs des modèles à inclure
-            include_simulations: Si True, inclut les simulations
+            include_simulations: Si True, ajoute la feuille "Simulations" (impact par région)
             user_id: ID de l'utilisateur
             
         Returns:
             Optional[str]: Chemin du fichier Excel généré, None en cas d'erreur
         """
-        # Dans une vraie application, nous utiliserions une bibliothèque comme openpyxl ou pandas
-        # pour générer un vrai fichier Excel. Pour cet exemple, nous allons simplement créer un fichier CSV.
-        
-        # Récupérer les modèles
-        models = []
-        for model_id in model_ids:
-            model = self.models_db.get(model_id)
-            if model:
-                models.append(model)
-        
-        if not models:
-            return None
-        
-        # Créer un fichier temporaire
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_id = str(ObjectId())
-        filename = f"export_carbonscope_{timestamp}.csv"
-        file_path = os.path.join(self.export_dir, filename)
-        
-        # Générer le contenu du fichier CSV
-        with open(file_path, 'w', encoding='utf-8') as f:
-            # Écrire l'en-tête
-            f.write("Nom du modèle,Architecture,Type,Paramètres (milliards),Émissions CO2 (kg),Score global,Score MMLU,Score BBH,Score Math,Date de soumission,Énergie d'entraînement (MWh),CO2 rapporté (t),Fournisseur cloud,Utilisation d'eau (millions de litres)\n")
-            
-            # Écrire les données des modèles
-            for model in models:
-                f.write(f"{model['model_name']},{model['architecture']},{model['model_type']},{model['parameters_billions']},{model['training_co2_kg']},{model['overall_score']},{model.get('mmlu_score', '')},{model.get('bbh_score', '')},{model.get('math_score', '')},{model.get('date_submitted', '')},{model.get('training_energy_mwh', '')},{model.get('reported_co2_tons', '')},{model.get('cloud_provider', '')},{model.get('water_use_million_liters', '')}\n")
-        
-        # Enregistrer l'export dans la base de données
-        self.exports_db[file_id] = {
-            "id": file_id,
-            "user_id": user_id,
-            "file_path": file_path,
-            "filename": filename,
-            "model_ids": model_ids,
-            "type": "excel",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        return file_path
+        export = await self.render_export("excel", model_ids, {"include_simulations": include_simulations}, [user_id])
+        return export["file_path"] if export else None
     
+    def _map_export_record(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertit un document de la collection exports (chemin du fichier ajouté s'il est connu)."""
+        export = {key: value for key, value in doc.items() if key not in ("_id", "artifact_key", "expires_at")}
+        export["id"] = str(doc["_id"])
+        if "created_at" in doc:
+            export["timestamp"] = doc["created_at"].isoformat()
+            del export["created_at"]
+        if "artifact_key" in doc:
+            export["file_path"] = export_artifact_cache.path_for(doc["artifact_key"], doc["type"])
+        return export
+
+    async def get_export(self, file_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère l'enregistrement d'un export (None si inconnu ou demandé par un autre utilisateur)."""
+        export_id = _object_id(file_id)
+        if export_id is None:
+            return None
+        doc = await self._get_exports_collection().find_one(
+            {"_id": export_id, "user_ids": user_id},
+            {"filename": 1, "artifact_key": 1, "type": 1, "created_at": 1, "model_ids": 1, "options": 1,
+             "data_version": 1}
+        )
+        return self._map_export_record(doc) if doc else None
+
+    async def ensure_export_file(self, export: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Garantit que le fichier d'un export existe (avant un téléchargement).
+
+        Le fichier est marqué comme récemment utilisé : un téléchargement, y compris une reprise
+        (Range), le protège de l'éviction. S'il a été évincé, il est régénéré : à l'identique si
+        le catalogue n'a pas changé, sinon sur les données actuelles (l'enregistrement pointe
+        alors vers le nouveau fichier). Retourne l'export à servir, None si ses modèles
+        n'existent plus.
+        """
+        if export_artifact_cache.touch(export["file_path"]):
+            return export
+
+        kind, options = export["type"], export.get("options") or {}
+        if options.get("catalog") and kind != "pdf":
+            snapshot = await CatalogService().get_snapshot()
+            known_ids, data_version = [], snapshot.version
+            if not len(snapshot.model_ids):
+                return None
+        else:
+            known_ids, data_version = await self._known_ids(export.get("model_ids") or [])
+            if not known_ids:
+                return None
+        artifact = await self._build_artifact(kind, known_ids, options, data_version)
+        if artifact is None:
+            return None
+        key, file_path = artifact
+        if file_path != export["file_path"]:
+            await self._get_exports_collection().update_one(
+                {"_id": ObjectId(export["id"])},
+                {"$set": {"artifact_key": key, "data_version": data_version, "model_ids": known_ids}}
+            )
+        return {**export, "file_path": file_path, "data_version": data_version, "model_ids": known_ids}
+
+    async def list_exports(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Liste les exports de l'utilisateur (plus récents d'abord), servie par l'index (user_ids, created_at)."""
+        cursor = self._get_exports_collection().find(
+            {"user_ids": user_id}, EXPORT_LIST_PROJECTION
+        ).sort("created_at", DESCENDING).limit(limit)
+        return [self._map_export_record(doc) async for doc in cursor]
+
     async def get_file_path(self, file_id: str, user_id: str) -> Optional[str]:
         """Récupère le chemin d'un fichier d'export.
         
@@ -282,12 +609,8 @@ class ExportService:
         Returns:
             Optional[str]: Chemin du fichier, None si non trouvé
         """
-        export = self.exports_db.get(file_id)
-        
-        if not export or export["user_id"] != user_id:
-            return None
-        
-        return export["file_path"]
+        export = await self.get_export(file_id, user_id)
+        return export["file_path"] if export else None
     
     async def save_scenario(self, scenario_data: dict, name: str, user_id: str) -> str:
         """Sauvegarde un scénario d'analyse.
@@ -300,40 +623,44 @@ class ExportService:
         Returns:
             str: ID du scénario sauvegardé
         """
-        scenario_id = str(ObjectId())
-        
-        self.scenarios_db[scenario_id] = {
-            "id": scenario_id,
+        now = datetime.utcnow() # UTC, comme expires_at (index TTL)
+        scenario = {
             "user_id": user_id,
             "name": name,
             "data": scenario_data,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
+            "created_at": now,
+            "updated_at": now
         }
+        if settings.SCENARIO_RETENTION_DAYS > 0:
+            scenario["expires_at"] = now + timedelta(days=settings.SCENARIO_RETENTION_DAYS)
         
-        return scenario_id
+        result = await self._get_scenarios_collection().insert_one(scenario)
+        return str(result.inserted_id)
+
+    def _map_scenario_doc(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertit un document de la collection scenarios (dates au format ISO)."""
+        scenario = {"id": str(doc["_id"])}
+        for key, value in doc.items():
+            if key not in ("_id", "expires_at"):
+                scenario[key] = value.isoformat() if isinstance(value, datetime) else value
+        return scenario
     
-    async def list_scenarios(self, user_id: str) -> List[Dict[str, Any]]:
-        """Liste les scénarios d'analyse sauvegardés par l'utilisateur.
+    async def list_scenarios(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Liste les scénarios d'analyse sauvegardés par l'utilisateur (plus récents d'abord).
+        
+        Servie par l'index (user_id, updated_at), sans les données des scénarios.
         
         Args:
             user_id: ID de l'utilisateur
+            limit: Nombre maximal de scénarios retournés
             
         Returns:
             List[Dict[str, Any]]: Liste des scénarios
         """
-        user_scenarios = []
-        
-        for scenario_id, scenario in self.scenarios_db.items():
-            if scenario["user_id"] == user_id:
-                user_scenarios.append({
-                    "id": scenario_id,
-                    "name": scenario["name"],
-                    "created_at": scenario["created_at"],
-                    "updated_at": scenario["updated_at"]
-                })
-        
-        return user_scenarios
+        cursor = self._get_scenarios_collection().find(
+            {"user_id": user_id}, SCENARIO_LIST_PROJECTION
+        ).sort("updated_at", DESCENDING).limit(limit)
+        return [self._map_scenario_doc(doc) async for doc in cursor]
     
     async def get_scenario(self, scenario_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """Récupère un scénario d'analyse sauvegardé.
@@ -345,12 +672,12 @@ class ExportService:
         Returns:
             Optional[Dict[str, Any]]: Scénario si trouvé, None sinon
         """
-        scenario = self.scenarios_db.get(scenario_id)
+        scenario_obj_id = _object_id(scenario_id)
+        if scenario_obj_id is None:
+            return None # ID invalide
         
-        if not scenario or scenario["user_id"] != user_id:
-            return None
-        
-        return scenario
+        doc = await self._get_scenarios_collection().find_one({"_id": scenario_obj_id, "user_id": user_id})
+        return self._map_scenario_doc(doc) if doc else None
     
     async def delete_scenario(self, scenario_id: str, user_id: str) -> bool:
         """Supprime un scénario d'analyse sauvegardé.
@@ -362,10 +689,9 @@ class ExportService:
         Returns:
             bool: True si le scénario a été supprimé, False sinon
         """
-        scenario = self.scenarios_db.get(scenario_id)
-        
-        if not scenario or scenario["user_id"] != user_id:
-            return False
+        scenario_obj_id = _object_id(scenario_id)
+        if scenario_obj_id is None:
+            return False # ID invalide
         
-        del self.scenarios_db[scenario_id]
-        return True
+        result = await self._get_scenarios_collection().delete_one({"_id": scenario_obj_id, "user_id": user_id})
+        return result.deleted_count > 0
@@ -0,0 +1,177 @@
+# backend/app/services/grid_profile_service.py
+
+from typing import List, Dict, Any, Optional, Tuple
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.emission_factors import emission_factor_registry
+
+# Nombre d'heures d'un profil annuel (année non bissextile)
+HOURS_PER_YEAR = 8760
+DAYS_PER_YEAR = HOURS_PER_YEAR // 24
+# Extensions de fichiers sources acceptées, par ordre de priorité
+PROFILE_EXTENSIONS = (".parquet", ".csv")
+# Colonnes reconnues dans les fichiers sources : nom -> facteur vers kg CO2 par kWh
+PROFILE_COLUMNS = {
+    "co2_factor": 1.0,
+    "carbon_intensity_kg_per_kwh": 1.0,
+    "carbon_intensity_g_per_kwh": 0.001,
+}
+# Dossier par défaut des profils convertis en .npy (ouverts en mémoire mappée), hors du
+# dossier des sources qui peut être en lecture seule
+NPY_CACHE_DIR = os.path.join(tempfile.gettempdir(), "carbonscope_grid_profiles")
+
+# Profils chargés dans le processus : fichier source -> (mtime du fichier source, tableau (365, 24))
+_profiles: Dict[str, Tuple[float, np.ndarray]] = {}
+
+
+def _read_source(path: str) -> np.ndarray:
+    """Lit un fichier source CSV ou Parquet et retourne les 8760 intensités en kg CO2/kWh."""
+    frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    for column, factor in PROFILE_COLUMNS.items():
+        if column in frame.columns:
+            values = frame[column].to_numpy(dtype=np.float64) * factor
+            break
+    else:
+        # Sinon : dernière colonne numérique, supposée en kg CO2/kWh
+        numeric = frame.select_dtypes("number")
+        if numeric.empty:
+            raise ValueError(f"Aucune colonne numérique dans {path}")
+        values = numeric.iloc[:, -1].to_numpy(dtype=np.float64)
+
+    if values.size < HOURS_PER_YEAR:
+        raise ValueError(f"{path} : {values.size} valeurs, {HOURS_PER_YEAR} attendues")
+    values = values[:HOURS_PER_YEAR] # Année bissextile : le 31 décembre est ignoré
+    if not np.all(np.isfinite(values)) or np.any(values < 0):
+        raise ValueError(f"{path} : valeurs manquantes ou négatives")
+    return values
+
+
+def _hourly_window_means(profile: np.ndarray, window_hours: int) -> np.ndarray:
+    """Intensité moyenne de chaque fenêtre de window_hours heures, par jour et heure de début.
+
+    Retourne un tableau (jours, 24). Une fenêtre qui dépasse minuit se poursuit le lendemain
+    (le 31 décembre se poursuit le 1er janvier : le profil est une année qui boucle).
+    """
+    next_day = np.roll(profile, -1, axis=0)
+    wrapped = np.concatenate([profile, next_day[:, :window_hours - 1]], axis=1)
+    cumulative = np.concatenate([np.zeros((profile.shape[0], 1)), np.cumsum(wrapped, axis=1)], axis=1)
+    return (cumulative[:, window_hours:window_hours + 24] - cumulative[:, :24]) / window_hours
+
+
+class GridProfileService:
+    """Profils horaires (8760 h) d'intensité carbone du réseau, par région.
+
+    Les fichiers ``<région>.csv`` ou ``<région>.parquet`` de GRID_PROFILES_DIR sont convertis
+    une fois en ``.npy`` dans GRID_PROFILES_CACHE_DIR (reconvertis si la source change) puis
+    ouverts en mémoire mappée ; si ce dossier n'est pas accessible en écriture, le profil est
+    gardé en mémoire.
+    Une région sans profil utilise un profil plat égal à son facteur annuel (fourni par
+    l'appelant, celui du registre des facteurs d'émission par défaut).
+    """
+
+    def __init__(self, profiles_dir: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.profiles_dir = profiles_dir or settings.GRID_PROFILES_DIR
+        self.cache_dir = cache_dir or settings.GRID_PROFILES_CACHE_DIR or NPY_CACHE_DIR
+
+    @property
+    def regions(self) -> Dict[str, Dict[str, Any]]:
+        """Régions du registre des facteurs d'émission (y compris celles ajoutées au fichier)."""
+        return emission_factor_registry.regions()
+
+    def _source_path(self, region: str) -> Optional[str]:
+        for extension in PROFILE_EXTENSIONS:
+            path = os.path.join(self.profiles_dir, f"{region}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _load_npy(self, region: str, source: str, source_mtime: float) -> np.ndarray:
+        """Convertit la source en .npy si nécessaire, puis l'ouvre en mémoire mappée."""
+        npy_path = os.path.join(self.cache_dir, f"{region}.npy")
+        if not os.path.exists(npy_path) or os.path.getmtime(npy_path) < source_mtime:
+            values = _read_source(source)
+            tmp_path = f"{npy_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    np.save(f, values)
+                os.replace(tmp_path, npy_path) # Remplacement atomique
+            except OSError as e:
+                print(f"Avertissement: profil '{region}' non converti en .npy ({e}), gardé en mémoire.")
+                return values.reshape(DAYS_PER_YEAR, 24)
+        return np.load(npy_path, mmap_mode="r").reshape(DAYS_PER_YEAR, 24)
+
+    def get_profile(self, region: str, flat_factor: Optional[float] = None) -> Tuple[np.ndarray, str]:
+        """Retourne le profil (365, 24) d'une région et sa source ("hourly" ou "flat")."""
+        source = self._source_path(region)
+        if source is not None:
+            source_mtime = os.path.getmtime(source)
+            cached = _profiles.get(source)
+            if cached is not None and cached[0] == source_mtime:
+                return cached[1], "hourly"
+            try:
+                profile = self._load_npy(region, source, source_mtime)
+                _profiles[source] = (source_mtime, profile)
+                return profile, "hourly"
+            except (ValueError, OSError, ImportError) as e:
+                print(f"Avertissement: profil horaire invalide pour '{region}' ({e}), profil plat utilisé.")
+
+        if flat_factor is None:
+            flat_factor = self.regions[region]["co2_factor"]
+        return np.full((DAYS_PER_YEAR, 24), flat_factor, dtype=np.float64), "flat"
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Liste les régions et la disponibilité de leur profil horaire."""
+        return [
+            {"region": region, "has_hourly_profile": self._source_path(region) is not None}
+            for region in self.regions
+        ]
+
+    def simulate_hourly(self, daily_energy_kwh: float, region: str, flat_factor: float,
+                        load_curve: np.ndarray, start_day: int, duration_days: int,
+                        window_hours: int, top_windows: int) -> Dict[str, Any]:
+        """Émissions heure par heure d'une charge quotidienne et fenêtres les moins carbonées.
+
+        ``load_curve`` (24 valeurs, somme 1) répartit l'énergie quotidienne par heure. La
+        période couvre ``duration_days`` jours à partir de ``start_day`` (0 = 1er janvier),
+        en bouclant sur l'année du profil. Tout est vectorisé sur le tableau (365, 24), en mémoire
+        constante quelle que soit la durée. Bloquant (lecture du profil) : à appeler dans un thread.
+        """
+        profile, profile_source = self.get_profile(region, flat_factor)
+        # Nombre d'occurrences de chaque jour de l'année dans la période simulée : les années
+        # complètes comptent chaque jour, le reste (< 365 jours) part de start_day en bouclant
+        full_years, remaining_days = divmod(duration_days, DAYS_PER_YEAR)
+        day_counts = np.full(DAYS_PER_YEAR, full_years, dtype=np.float64)
+        day_counts[(start_day + np.arange(remaining_days)) % DAYS_PER_YEAR] += 1
+
+        hourly_energy_kwh = daily_energy_kwh * load_curve # (24,)
+        hour_of_day_co2_kg = (day_counts @ profile) * hourly_energy_kwh # (24,)
+        total_co2_kg = float(hour_of_day_co2_kg.sum())
+        total_energy_kwh = daily_energy_kwh * duration_days
+
+        # Intensité moyenne de chaque fenêtre, pondérée par les jours de la période
+        window_intensity = (day_counts @ _hourly_window_means(profile, window_hours)) / duration_days
+        best_starts = np.argsort(window_intensity, kind="stable")[:top_windows]
+        windows = [
+            {
+                "start_hour": int(start),
+                "end_hour": int((start + window_hours) % 24),
+                "mean_intensity": float(window_intensity[start]),
+                "co2_if_shifted_kg": float(total_energy_kwh * window_intensity[start]),
+                "savings_kg": float(total_co2_kg - total_energy_kwh * window_intensity[start]),
+            }
+            for start in best_starts
+        ]
+
+        return {
+            "profile_source": profile_source,
+            "total_energy_kwh": total_energy_kwh,
+            "total_co2_kg": total_co2_kg,
+            "flat_co2_kg": total_energy_kwh * flat_factor,
+            "hour_of_day_co2_kg": hour_of_day_co2_kg.tolist(),
+            "recommended_windows": windows,
+        }
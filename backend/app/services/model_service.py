@@ -10,6 +10,7 @@ from app.core.database import get_database
 from app.models.models import AIModel, AIModelCreate, SearchFilter, PaginatedResponse, Statistics
 # Import ModelType si nécessaire pour la conversion lors de la création/update
 from app.models.models import ModelType
+from app.services.catalog_service import CatalogService
 
 from datetime import datetime
 try:
@@ -183,6 +184,7 @@ class ModelService:
 
         # Insérer dans la base de données
         result = await collection.insert_one(model_data)
+        await CatalogService().record_write() # Version du catalogue incrémentée pour tous les processus
 
         # Récupérer le document nouvellement créé pour le retourner
         # (find_one nécessite l'_id ObjectId)
@@ -285,6 +287,7 @@ class ModelService:
             # Insérer les données en masse
             if models_to_insert:
                 result = await collection.insert_many(models_to_insert)
+                await CatalogService().record_write()
                 print(f"Chargement initial réussi : {len(result.inserted_ids)} modèles insérés.")
             else:
                 print("Aucun modèle à insérer.")
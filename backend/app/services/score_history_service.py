@@ -0,0 +1,261 @@
+# backend/app/services/score_history_service.py
+
+from typing import List, Dict, Any, Optional, Sequence
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+
+from app.core.database import get_database
+from app.models.models import ScoreRun, ScoreHistoryPoint, ScoreTrajectory, CategoryChurn
+
+# Collection des exécutions du calcul des scores (une entrée par run)
+SCORE_RUNS_COLLECTION = "score_runs"
+# Compteur des runs alloués (numérotation atomique, partagée par tous les processus)
+SCORE_META_COLLECTION = "score_meta"
+SCORE_RUN_COUNTER_ID = SCORE_RUNS_COLLECTION
+# Collection des séries temporelles de scores, regroupées en "buckets" par modèle
+SCORE_HISTORY_COLLECTION = "score_history"
+# Nombre de runs stockés dans un même bucket : un document par modèle et par tranche
+# de BUCKET_SIZE runs, ce qui garde le nombre de documents (et d'entrées d'index)
+# indépendant du nombre de runs à l'intérieur d'une tranche.
+BUCKET_SIZE = 128
+
+
+class ScoreHistoryService:
+    """Service pour l'historique des scores carbone (schéma en buckets dans MongoDB).
+
+    Chaque document de ``score_history`` correspond à un modèle et à une tranche de
+    ``BUCKET_SIZE`` runs consécutifs (``_id = "<model_id>:<bucket>"``) et contient des
+    tableaux parallèles : ``run_ids``, ``timestamps``, ``scores``, ``rank_percentiles``
+    et ``categories``.
+    """
+
+    def _get_runs_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB des runs de calcul."""
+        db = get_database()
+        return db[SCORE_RUNS_COLLECTION]
+
+    def _get_history_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB de l'historique des scores."""
+        db = get_database()
+        return db[SCORE_HISTORY_COLLECTION]
+
+    async def ensure_indexes(self) -> None:
+        """Crée les index utilisés par les lectures de l'historique."""
+        await self._get_runs_collection().create_index([("seq", DESCENDING)], unique=True)
+        history = self._get_history_collection()
+        # Trajectoire d'un modèle : une seule lecture indexée, triée par bucket
+        await history.create_index([("model_id", ASCENDING), ("bucket", ASCENDING)])
+        # Churn entre deux runs : index multiclé sur les identifiants de run
+        await history.create_index([("run_ids", ASCENDING)])
+
+    # --- Écriture (utilisée par scripts/calculate_scores.py) ---
+
+    def _get_meta_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB du compteur des runs."""
+        db = get_database()
+        return db[SCORE_META_COLLECTION]
+
+    async def _next_seq(self) -> int:
+        """Alloue le numéro du prochain run ($inc atomique : deux calculs simultanés ne partagent pas un numéro)."""
+        meta = self._get_meta_collection()
+        if await meta.find_one({"_id": SCORE_RUN_COUNTER_ID}, {"_id": 1}) is None:
+            # Base antérieure au compteur : il reprend après le dernier run enregistré ($max : sans effet
+            # si un autre processus l'a déjà initialisé ou incrémenté)
+            last_run = await self._get_runs_collection().find_one({}, {"seq": 1}, sort=[("seq", DESCENDING)])
+            await meta.update_one(
+                {"_id": SCORE_RUN_COUNTER_ID},
+                {"$max": {"allocated": (last_run["seq"] + 1) if last_run else 0}},
+                upsert=True,
+            )
+        counter = await meta.find_one_and_update(
+            {"_id": SCORE_RUN_COUNTER_ID}, {"$inc": {"allocated": 1}}, return_document=ReturnDocument.AFTER
+        )
+        return counter["allocated"] - 1
+
+    async def start_run(self, engine: str) -> Dict[str, Any]:
+        """Enregistre un nouveau run de calcul et retourne ses métadonnées (id, seq, timestamp)."""
+        run = {
+            "_id": ObjectId(),
+            "seq": await self._next_seq(),
+            "timestamp": datetime.now(),
+            "engine": engine,
+            "models_count": 0,
+        }
+        await self._get_runs_collection().insert_one(run)
+        return run
+
+    async def finish_run(self, run: Dict[str, Any], models_count: int) -> None:
+        """Met à jour le nombre de modèles scorés pour un run."""
+        await self._get_runs_collection().update_one(
+            {"_id": run["_id"]}, {"$set": {"models_count": models_count}}
+        )
+
+    def build_history_updates(
+        self,
+        run: Dict[str, Any],
+        model_ids: Sequence[Any],
+        scores: Sequence[float],
+        categories: Sequence[str],
+        rank_percentiles: Optional[Sequence[float]] = None,
+    ) -> List[UpdateOne]:
+        """Prépare les opérations d'ajout d'un run dans les buckets des modèles.
+
+        Les listes ``model_ids``, ``scores``, ``categories`` (et ``rank_percentiles``) sont
+        parallèles. Les opérations retournées sont destinées à ``bulk_write``.
+        """
+        if rank_percentiles is None:
+            rank_percentiles = scores
+        bucket = run["seq"] // BUCKET_SIZE
+        run_id = str(run["_id"])
+        timestamp = run["timestamp"]
+
+        operations = []
+        for model_id, score, category, percentile in zip(model_ids, scores, categories, rank_percentiles):
+            model_id_str = str(model_id)
+            operations.append(UpdateOne(
+                {"_id": f"{model_id_str}:{bucket}"},
+                {
+                    "$setOnInsert": {"model_id": model_id_str, "bucket": bucket},
+                    "$push": {
+                        "run_ids": run_id,
+                        "timestamps": timestamp,
+                        "scores": float(score),
+                        "rank_percentiles": float(percentile),
+                        "categories": category,
+                    },
+                },
+                upsert=True,
+            ))
+        return operations
+
+    async def record_run(
+        self,
+        run: Dict[str, Any],
+        model_ids: Sequence[Any],
+        scores: Sequence[float],
+        categories: Sequence[str],
+        rank_percentiles: Optional[Sequence[float]] = None,
+    ) -> int:
+        """Ajoute les scores d'un run à l'historique. Retourne le nombre de modèles enregistrés."""
+        operations = self.build_history_updates(run, model_ids, scores, categories, rank_percentiles)
+        if not operations:
+            return 0
+        await self._get_history_collection().bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def history_merge_pipeline(self, run: Dict[str, Any], match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pipeline d'agrégation (sur ai_models) ajoutant un run aux buckets via $merge.
+
+        Équivalent côté serveur de build_history_updates, pour le moteur "aggregation" :
+        les scores ne transitent pas par Python.
+        """
+        bucket = run["seq"] // BUCKET_SIZE
+        array_fields = ["run_ids", "timestamps", "scores", "rank_percentiles", "categories"]
+        return [
+            {"$match": match},
+            {"$project": {
+                "_id": {"$concat": [{"$toString": "$_id"}, f":{bucket}"]},
+                "model_id": {"$toString": "$_id"},
+                "bucket": {"$literal": bucket},
+                "run_ids": [{"$literal": str(run["_id"])}],
+                "timestamps": [{"$literal": run["timestamp"]}],
+                "scores": ["$carbon_score"],
+                "rank_percentiles": ["$rank_percentile"],
+                "categories": ["$category"],
+            }},
+            {"$merge": {
+                "into": SCORE_HISTORY_COLLECTION,
+                "on": "_id",
+                "whenMatched": [{"$set": {
+                    field: {"$concatArrays": [f"${field}", f"$$new.{field}"]} for field in array_fields
+                }}],
+                "whenNotMatched": "insert",
+            }},
+        ]
+
+    # --- Lecture (utilisée par le routeur carbon_scores) ---
+
+    async def list_runs(self, limit: int = 20) -> List[ScoreRun]:
+        """Liste les derniers runs de calcul, du plus récent au plus ancien."""
+        cursor = self._get_runs_collection().find({}).sort("seq", DESCENDING).limit(limit)
+        runs = await cursor.to_list(length=limit)
+        return [
+            ScoreRun(
+                run_id=str(run["_id"]),
+                seq=run["seq"],
+                timestamp=run["timestamp"],
+                engine=run.get("engine", "python"),
+                models_count=run.get("models_count", 0),
+            )
+            for run in runs
+        ]
+
+    async def get_trajectory(self, model_id: str) -> Optional[ScoreTrajectory]:
+        """Récupère la série temporelle des scores d'un modèle (une lecture indexée)."""
+        cursor = self._get_history_collection().find({"model_id": model_id}).sort("bucket", ASCENDING)
+        buckets = await cursor.to_list(length=None)
+        if not buckets:
+            return None
+
+        points = []
+        for bucket in buckets:
+            for run_id, timestamp, score, percentile, category in zip(
+                bucket["run_ids"], bucket["timestamps"], bucket["scores"],
+                bucket["rank_percentiles"], bucket["categories"]
+            ):
+                points.append(ScoreHistoryPoint(
+                    run_id=run_id,
+                    timestamp=timestamp,
+                    carbon_score=score,
+                    rank_percentile=percentile,
+                    category=category,
+                ))
+        return ScoreTrajectory(model_id=model_id, points=points)
+
+    async def get_category_churn(self, from_run_id: str, to_run_id: str) -> Optional[CategoryChurn]:
+        """Compare les catégories de tous les modèles entre deux runs (une lecture indexée)."""
+        try:
+            ObjectId(from_run_id)
+            ObjectId(to_run_id)
+        except InvalidId:
+            return None
+
+        cursor = self._get_history_collection().find(
+            {"run_ids": {"$in": [from_run_id, to_run_id]}},
+            {"_id": 0, "model_id": 1, "run_ids": 1, "categories": 1}
+        )
+
+        before: Dict[str, str] = {}
+        after: Dict[str, str] = {}
+        async for bucket in cursor:
+            for run_id, category in zip(bucket["run_ids"], bucket["categories"]):
+                if run_id == from_run_id:
+                    before[bucket["model_id"]] = category
+                elif run_id == to_run_id:
+                    after[bucket["model_id"]] = category
+
+        if not before and not after:
+            return None
+
+        transitions: Dict[str, Dict[str, int]] = {}
+        changed_models = []
+        for model_id in before.keys() & after.keys():
+            old_category, new_category = before[model_id], after[model_id]
+            transitions.setdefault(old_category, {})
+            transitions[old_category][new_category] = transitions[old_category].get(new_category, 0) + 1
+            if old_category != new_category:
+                changed_models.append({"model_id": model_id, "from": old_category, "to": new_category})
+
+        return CategoryChurn(
+            from_run_id=from_run_id,
+            to_run_id=to_run_id,
+            compared_models=len(before.keys() & after.keys()),
+            changed_models_count=len(changed_models),
+            added_models_count=len(after.keys() - before.keys()),
+            removed_models_count=len(before.keys() - after.keys()),
+            transitions=transitions,
+            changed_models=changed_models,
+        )
@@ -1,22 +1,216 @@
 # backend/app/services/simulation_service.py
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from bson import ObjectId
 from bson.errors import InvalidId
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+import asyncio
+import io
+import json
 import math
+import struct
+import threading
+import numpy as np
 
+from app.core.config import settings
 from app.core.database import get_database
 from app.models.models import SimulationParams, SimulationResult
+from app.models.models import SimulationBatchError, SimulationSweepRequest, SweepAxis
+from app.models.models import SimulationMonteCarloParams, SimulationMonteCarloResult
+from app.models.models import HourlySimulationParams, HourlySimulationResult
+from app.models.models import SimulationHistoryEntry, SimulationHistoryPage, SimulationSummary
+from app.models.models import PortfolioResult, PortfolioModelBreakdown
+from app.models.models import SimulationRankingRequest, SimulationRankingResult, SimulationRankingEntry
+from app.models.models import PlacementRequest, PlacementResult, PlacementAssignment, PlacementRegionUsage
 from app.services.model_service import ModelService # Pour récupérer les infos du modèle
-from app.core.constants import REGIONS, EQUIVALENTS # Importer depuis les constantes
+from app.services.catalog_service import CatalogService
+from app.services.carbon_score_service import best_recommendation_indices
+from app.services.grid_profile_service import GridProfileService
+from app.services.emission_factors import emission_factor_registry
+from app.services.simulation_write_buffer import simulation_write_buffer, SIMULATION_ROLLUPS_COLLECTION
+from app.core.constants import EQUIVALENTS # Importer depuis les constantes
+from app.utils.cache import TTLCache
+from app.utils.placement import place_workloads
 
 # Nom de la collection pour stocker les simulations
 SIMULATIONS_COLLECTION = "simulations"
 # Nom de la collection pour les modèles AI (au cas où on accède directement)
 MODELS_COLLECTION = "ai_models"
+# Préfixe de longueur de l'en-tête JSON des grilles au format "npy" (cf. iter_sweep_npy)
+SWEEP_NPY_PREAMBLE = struct.Struct("<I")
+# Heuristique d'énergie par inférence : kWh par milliard de paramètres
+ENERGY_PER_INFERENCE_KWH_PER_BILLION = 0.0001
+
+# Cache des résultats de simulate_impact, partagé entre utilisateurs (un par processus).
+# Clé : (model_id, compteur d'écritures du catalogue, fournisseur, région, version du registre
+# des facteurs d'émission, fréquence, durée). Une écriture dans ai_models incrémente le compteur
+# (CatalogService.record_write) et une modification des facteurs change la version du registre :
+# les anciennes entrées ne sont plus atteignables et sortent par LRU/TTL.
+simulation_cache = TTLCache(
+    maxsize=settings.SIMULATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SIMULATION_CACHE_TTL_SECONDS,
+    name="simulations",
+)
+
+
+def compute_impacts(parameters_billions: np.ndarray, frequency_per_day: np.ndarray,
+                    duration_days: np.ndarray, co2_factor: np.ndarray,
+                    equivalents: Dict[str, Dict[str, Any]] = EQUIVALENTS,
+                    pue: Any = 1.0, wue_l_per_kwh: Any = np.nan) -> Dict[str, np.ndarray]:
+    """Version vectorisée (NumPy) des calculs de simulate_impact, pour N scénarios à la fois.
+
+    Les tableaux d'entrée ont la même forme (ou sont diffusables). Les modèles sans taille
+    connue (NaN ou <= 0) ont une énergie NaN et un CO2 nul, comme dans simulate_impact.
+    L'énergie inclut le PUE ; l'eau est NaN lorsque le WUE est inconnu (NaN).
+    """
+    parameters_billions = np.asarray(parameters_billions, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        has_size = parameters_billions > 0
+    energy_per_inference_kwh = np.where(has_size, parameters_billions * ENERGY_PER_INFERENCE_KWH_PER_BILLION, np.nan)
+    total_energy_kwh = energy_per_inference_kwh * pue * frequency_per_day * duration_days
+    total_co2_kg = np.where(has_size, np.nan_to_num(total_energy_kwh) * co2_factor, 0.0)
+
+    positive = total_co2_kg > 0
+    return {
+        "total_energy_kwh": total_energy_kwh,
+        "total_co2_kg": total_co2_kg,
+        "total_water_liters": total_energy_kwh * wue_l_per_kwh,
+        "equivalent_car_km": np.where(positive, total_co2_kg / equivalents["car_km"]["factor"], 0.0),
+        "equivalent_trees_needed": np.where(
+            positive, np.ceil(total_co2_kg / equivalents["trees"]["factor"]), 0).astype(np.int64),
+        "equivalent_smartphone_charges": np.where(
+            positive, np.ceil(total_co2_kg / equivalents["smartphone_charges"]["factor"]), 0).astype(np.int64),
+    }
+
+
+# Percentiles renvoyés par le mode Monte Carlo
+MONTE_CARLO_PERCENTILES = (5, 50, 95)
+# Écarts par défaut de la loi triangulaire du PUE autour du PUE du registre (mode)
+MONTE_CARLO_PUE_BELOW = 0.15
+MONTE_CARLO_PUE_ABOVE = 0.4
+# Tirages par tranche : l'annulation (délai dépassé) est vérifiée entre deux tranches
+MONTE_CARLO_CHUNK_SAMPLES = 100000
+# Threads dédiés aux tirages Monte Carlo (NumPy libère le GIL pendant les calculs) : la
+# boucle d'événements n'est jamais bloquée et la concurrence reste bornée.
+_monte_carlo_executor = ThreadPoolExecutor(
+    max_workers=settings.SIMULATION_MONTE_CARLO_WORKERS, thread_name_prefix="monte-carlo"
+)
+
+
+def monte_carlo_pue(params: SimulationMonteCarloParams, registry_pue: float) -> Tuple[float, float, float]:
+    """Loi triangulaire (min, mode, max) du PUE : valeurs de la requête, sinon autour du PUE du registre."""
+    pue_mode = params.pue_mode if params.pue_mode is not None else registry_pue
+    pue_min = params.pue_min if params.pue_min is not None else max(1.0, pue_mode - MONTE_CARLO_PUE_BELOW)
+    pue_max = params.pue_max if params.pue_max is not None else pue_mode + MONTE_CARLO_PUE_ABOVE
+    return pue_min, pue_mode, pue_max
+
+
+def monte_carlo_impacts(parameters_billions: float, frequency_per_day: float, duration_days: float,
+                        co2_factor: float, samples: int, seed: int, energy_sigma: float,
+                        intensity_sigma: float, pue: Tuple[float, float, float],
+                        equivalents: Dict[str, Dict[str, Any]] = EQUIVALENTS,
+                        cancel: Optional[threading.Event] = None) -> Optional[Dict[str, Any]]:
+    """Tire ``samples`` scénarios et retourne la moyenne et les percentiles des impacts.
+
+    - énergie par inférence : loi log-normale de médiane l'heuristique de simulate_impact ;
+    - intensité carbone du réseau : loi log-normale de médiane le co2_factor de la région ;
+    - PUE : loi triangulaire (min, mode, max), appliquée à l'énergie par inférence.
+
+    Les tirages sont faits par tranches de MONTE_CARLO_CHUNK_SAMPLES : si ``cancel`` est
+    positionné entre deux tranches, le calcul s'arrête et retourne None (le thread est libéré).
+    Les équivalents sont des fonctions croissantes du CO2 : leurs percentiles se déduisent
+    directement de ceux du CO2.
+    """
+    rng = np.random.default_rng(seed)
+    log_median_energy = np.log(parameters_billions * ENERGY_PER_INFERENCE_KWH_PER_BILLION)
+    log_co2_factor = np.log(co2_factor)
+    pue_min, pue_mode, pue_max = pue
+    total_energy_kwh = np.empty(samples)
+    total_co2_kg = np.empty(samples)
+    for start in range(0, samples, MONTE_CARLO_CHUNK_SAMPLES):
+        if cancel is not None and cancel.is_set():
+            return None
+        size = min(MONTE_CARLO_CHUNK_SAMPLES, samples - start)
+        energy_per_inference_kwh = rng.lognormal(log_median_energy, energy_sigma, size)
+        intensity = rng.lognormal(log_co2_factor, intensity_sigma, size)
+        pue_draws = rng.triangular(pue_min, pue_mode, pue_max, size) if pue_min < pue_max \
+            else np.full(size, pue_min)
+        energy = total_energy_kwh[start:start + size]
+        np.multiply(energy_per_inference_kwh * pue_draws, frequency_per_day * duration_days, out=energy)
+        np.multiply(energy, intensity, out=total_co2_kg[start:start + size])
+    co2_quantiles = np.percentile(total_co2_kg, MONTE_CARLO_PERCENTILES)
+    energy_quantiles = np.percentile(total_energy_kwh, MONTE_CARLO_PERCENTILES)
+
+    def summary(values: np.ndarray) -> Dict[str, float]:
+        return {f"p{p}": float(value) for p, value in zip(MONTE_CARLO_PERCENTILES, values)}
+
+    return {
+        "mean_co2_kg": float(total_co2_kg.mean()),
+        "percentiles": {
+            "total_co2_kg": summary(co2_quantiles),
+            "total_energy_kwh": summary(energy_quantiles),
+            "equivalent_car_km": summary(co2_quantiles / equivalents["car_km"]["factor"]),
+            "equivalent_trees_needed": summary(np.ceil(co2_quantiles / equivalents["trees"]["factor"])),
+            "equivalent_smartphone_charges": summary(
+                np.ceil(co2_quantiles / equivalents["smartphone_charges"]["factor"])),
+        },
+    }
+
+
+def iter_sweep_ndjson(header: Dict[str, Any], tensors: Dict[str, np.ndarray],
+                      rows_per_chunk: int = 256) -> Iterator[str]:
+    """Sérialise une grille en NDJSON : une ligne d'en-tête puis une ligne par (fréquence, région).
+
+    Chaque ligne de données contient les valeurs de chaque métrique le long de l'axe des
+    durées. Les lignes sont produites par blocs, sans objet Pydantic par cellule.
+    """
+    yield json.dumps(header) + "\n"
+    n_frequencies, n_regions, n_durations = header["shape"]
+    rows = {metric: tensor.reshape(n_frequencies * n_regions, n_durations) for metric, tensor in tensors.items()}
+    for start in range(0, n_frequencies * n_regions, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n_frequencies * n_regions)
+        block = {metric: values[start:stop].tolist() for metric, values in rows.items()}
+        lines = []
+        for offset in range(stop - start):
+            row = start + offset
+            line = {"frequency_index": row // n_regions, "region_index": row % n_regions}
+            line.update({metric: values[offset] for metric, values in block.items()})
+            lines.append(json.dumps(line))
+        yield "\n".join(lines) + "\n"
+
+
+def iter_sweep_npy(header: Dict[str, Any], tensors: Dict[str, np.ndarray],
+                   chunk_bytes: int = 1 << 20) -> Iterator[bytes]:
+    """Sérialise une grille : préambule JSON préfixé par sa longueur, puis fichier .npy.
+
+    Format : longueur de l'en-tête JSON (entier non signé 32 bits, petit-boutiste), en-tête
+    JSON (UTF-8 : axes, forme, métriques), puis tableau .npy float64 de forme (métrique,
+    fréquence, région, durée). L'en-tête, qui contient les axes complets, est dans le corps et
+    non dans un en-tête HTTP (limité à 8-16 Ko par la plupart des proxys). Cf. read_sweep_npy.
+    """
+    preamble = json.dumps(header).encode("utf-8")
+    yield SWEEP_NPY_PREAMBLE.pack(len(preamble)) + preamble
+    array = np.ascontiguousarray(np.stack(list(tensors.values())), dtype=np.float64)
+    npy_header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(npy_header, np.lib.format.header_data_from_array_1_0(array))
+    yield npy_header.getvalue()
+    data = memoryview(array).cast("B")
+    for start in range(0, len(data), chunk_bytes):
+        yield bytes(data[start:start + chunk_bytes])
+
+
+def read_sweep_npy(payload: bytes) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Relit une réponse produite par iter_sweep_npy : (en-tête, tableau)."""
+    (length,) = SWEEP_NPY_PREAMBLE.unpack_from(payload)
+    offset = SWEEP_NPY_PREAMBLE.size
+    header = json.loads(payload[offset:offset + length].decode("utf-8"))
+    array = np.load(io.BytesIO(payload[offset + length:]), allow_pickle=False)
+    return header, array
+
 
 class SimulationService:
     """Service pour la simulation d'impact carbone (utilise MongoDB)."""
@@ -24,16 +218,34 @@ class SimulationService:
     def __init__(self):
         """Initialise le service."""
         # Pas besoin d'initialiser de DB en mémoire ici
-        # Utilisation des constantes importées pour regions/equivalents
-        self.regions = REGIONS
+        # Utilisation des constantes importées pour les équivalents
         self.equivalents = EQUIVALENTS
         self.model_service = ModelService() # Instancier pour récupérer les données modèles
 
+    @property
+    def regions(self) -> Dict[str, Dict[str, Any]]:
+        """Régions disponibles : celles du registre des facteurs d'émission (rechargé à chaud)."""
+        return emission_factor_registry.regions()
+
     def _get_sim_collection(self) -> AsyncIOMotorDatabase:
         """Obtient la collection MongoDB pour les simulations."""
         db = get_database()
         return db[SIMULATIONS_COLLECTION]
 
+    async def ensure_indexes(self) -> None:
+        """Crée les index de l'historique : pagination par utilisateur et expiration (TTL)."""
+        collection = self._get_sim_collection()
+        await collection.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)])
+        # Les simulations non sauvegardées portent "expires_at" ; save_simulation le retire
+        await collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    def _expires_at(self) -> datetime:
+        """Date d'expiration d'une simulation non sauvegardée.
+
+        En UTC (naïve) : l'index TTL de MongoDB interprète les dates comme UTC.
+        """
+        return datetime.utcnow() + timedelta(days=settings.SIMULATION_HISTORY_RETENTION_DAYS)
+
     # La méthode pour récupérer la collection des modèles pourrait être ajoutée si
     # on n'utilise pas toujours ModelService pour récupérer les détails.
     # def _get_model_collection(self) -> AsyncIOMotorDatabase:
@@ -41,23 +253,65 @@ class SimulationService:
     #     return db[MODELS_COLLECTION]
 
     async def simulate_impact(self, params: SimulationParams, user_id: Optional[str] = None) -> SimulationResult:
-        """Simule l'impact carbone et sauvegarde le résultat dans MongoDB."""
+        """Simule l'impact carbone et sauvegarde le résultat dans MongoDB.
 
-        # 1. Récupérer les informations du modèle via ModelService
-        model = await self.model_service.get_model_by_id(params.model_id)
-        if not model:
+        Le calcul est déterministe : un résultat identique déjà calculé (même modèle, même
+        compteur d'écritures du catalogue, mêmes facteurs d'émission, fréquence et durée) est
+        servi depuis simulation_cache, sans relire le modèle. L'entrée d'historique est
+        toujours enregistrée.
+        """
+
+        # 1. Récupérer les facteurs d'émission (fournisseur, région) : intensité, PUE, WUE
+        factors = emission_factor_registry.lookup(params.cloud_provider, params.region)
+        if factors is None:
+            # Modèle inconnu (404) signalé avant la région inconnue (400), comme sans cache
+            await self._get_model(params.model_id)
+            factors = self._get_factors(params.cloud_provider, params.region)
+
+        cache_key = (
+            params.model_id,
+            await CatalogService().get_write_version(),
+            factors["provider"],
+            params.region,
+            emission_factor_registry.version,
+            params.frequency_per_day,
+            params.duration_days,
+        )
+        simulation_result = simulation_cache.get(cache_key)
+        if simulation_result is None:
+            simulation_result = await self._compute_impact(params, factors)
+            simulation_cache.set(cache_key, simulation_result)
+
+        # Copie : l'objet en cache est partagé entre les requêtes
+        simulation_result = simulation_result.copy()
+        simulation_result.id = await self._record_simulation(params, simulation_result, user_id)
+        return simulation_result
+
+    def _get_factors(self, cloud_provider: Optional[str], region: str) -> Dict[str, Any]:
+        """Facteurs d'émission du registre pour (fournisseur, région) ; 400 si la région est inconnue."""
+        factors = emission_factor_registry.lookup(cloud_provider, region)
+        if not factors:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Modèle avec ID {params.model_id} non trouvé"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Région '{region}' non valide ou non supportée"
             )
+        return factors
 
-        # 2. Récupérer le facteur d'émission de la région
-        region_data = self.regions.get(params.region)
-        if not region_data:
+    async def _get_model(self, model_id: str):
+        """Modèle du catalogue (via ModelService) ; 404 s'il n'existe pas."""
+        model = await self.model_service.get_model_by_id(model_id)
+        if not model:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Région '{params.region}' non valide ou non supportée"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Modèle avec ID {model_id} non trouvé"
             )
+        return model
+
+    async def _compute_impact(self, params: SimulationParams, factors: Dict[str, Any]) -> SimulationResult:
+        """Calcule le résultat d'une simulation (sans l'enregistrer)."""
+
+        # 2. Récupérer les informations du modèle via ModelService
+        model = await self._get_model(params.model_id)
 
         # 3. Effectuer les calculs (logique similaire à avant, mais utilise l'objet 'model')
         total_co2_kg = 0.0
@@ -67,22 +321,19 @@ class SimulationService:
         # Note: Cette logique d'estimation devrait être affinée / basée sur des recherches
         if model.parameters_billions is not None and model.parameters_billions > 0:
             # Heuristique très simple (à remplacer par une meilleure estimation si possible)
-            energy_per_inference_kwh = model.parameters_billions * 0.0001
-            total_energy_kwh = energy_per_inference_kwh * params.frequency_per_day * params.duration_days
-            total_co2_kg = total_energy_kwh * region_data["co2_factor"]
+            energy_per_inference_kwh = model.parameters_billions * ENERGY_PER_INFERENCE_KWH_PER_BILLION
+            # Énergie du centre de données : énergie des serveurs x PUE du fournisseur
+            total_energy_kwh = energy_per_inference_kwh * factors["pue"] * params.frequency_per_day * params.duration_days
+            total_co2_kg = total_energy_kwh * factors["co2_factor"]
         else:
             # Si on ne peut pas estimer l'énergie, on ne peut pas calculer le CO2 basé sur la région
             # On pourrait retourner une erreur ou 0 ? Pour l'instant, 0.
             total_co2_kg = 0.0
 
-        # Estimer l'utilisation d'eau (si possible et pertinent)
+        # Estimer l'utilisation d'eau : WUE du fournisseur (litres par kWh), si connu
         total_water_liters = None
-        # La logique précédente basée sur le ratio CO2/eau de l'ENTRAÎNEMENT
-        # n'est probablement PAS pertinente pour l'INFÉRENCE.
-        # Il faudrait une autre source de données/heuristique ici. Laisser à None pour l'instant.
-        # if model.water_use_million_liters and model.training_co2_kg and total_co2_kg > 0:
-        #     water_factor = model.water_use_million_liters / model.training_co2_kg
-        #     total_water_liters = total_co2_kg * water_factor * 1000000
+        if total_energy_kwh is not None and factors["wue_l_per_kwh"] is not None:
+            total_water_liters = total_energy_kwh * factors["wue_l_per_kwh"]
 
         # 4. Calculer les équivalents
         equivalent_car_km = total_co2_kg / self.equivalents["car_km"]["factor"] if total_co2_kg > 0 else 0
@@ -101,23 +352,653 @@ class SimulationService:
             equivalent_smartphone_charges=equivalent_smartphone_charges
         )
 
-        # 6. Sauvegarder la simulation dans la collection MongoDB
-        collection = self._get_sim_collection()
+        return simulation_result
+
+    async def _record_simulation(self, params: SimulationParams, result: SimulationResult,
+                                 user_id: Optional[str] = None) -> str:
+        """Enregistre une simulation dans l'historique via la file d'écriture différée.
+
+        Retourne l'ID (attribué ici) de la simulation enregistrée.
+        """
+        # 6. Mettre la simulation en file : elle sera écrite par lot (insert_many)
+        timestamp = datetime.utcnow() # UTC, comme expires_at : le curseur de l'historique trie sur ce champ
         simulation_doc = {
-            # Pas besoin de stocker l'ID ici, MongoDB le génère (_id)
+            "_id": ObjectId(), # Attribué ici : un lot rejoué ne crée pas de doublon
             "user_id": user_id, # Associer à l'utilisateur (si fourni)
             "params": params.dict(), # Stocker les paramètres utilisés
-            "result": simulation_result.dict(), # Stocker les résultats
-            "timestamp": datetime.now() # Utiliser datetime pour tri/requêtes
+            "result": result.dict(exclude={"id"}), # Stocker les résultats
+            "timestamp": timestamp, # Utiliser datetime pour tri/requêtes
+            "expires_at": self._expires_at() # Retiré si la simulation est sauvegardée
         }
-        await collection.insert_one(simulation_doc)
+        await simulation_write_buffer.enqueue(simulation_doc)
+        return str(simulation_doc["_id"])
 
-        # 7. Retourner le résultat Pydantic
-        return simulation_result
+    async def simulate_batch(self, scenarios: List[SimulationParams], user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Simule un lot de scénarios : une requête pour les modèles, calcul vectorisé, un insert_many.
+
+        Les scénarios invalides (modèle ou région inconnus) sont signalés dans ``errors``
+        sans interrompre le lot. Retourne un dict de même forme que SimulationBatchResult,
+        construit directement depuis les colonnes NumPy (sans objet Pydantic par scénario).
+        """
+        # 1. Résoudre tous les modèles en une seule requête
+        object_ids = {}
+        for scenario in scenarios:
+            if scenario.model_id not in object_ids:
+                try:
+                    object_ids[scenario.model_id] = ObjectId(scenario.model_id)
+                except InvalidId:
+                    object_ids[scenario.model_id] = None
+        valid_object_ids = [obj_id for obj_id in object_ids.values() if obj_id is not None]
+        cursor = self.model_service._get_collection().find(
+            {"_id": {"$in": valid_object_ids}},
+            {"model_name": 1, "parameters_billions": 1}
+        )
+        models = {str(doc["_id"]): doc async for doc in cursor}
+
+        # 2. Construire les colonnes des scénarios valides
+        errors = []
+        valid = []
+        for index, scenario in enumerate(scenarios):
+            if scenario.model_id not in models:
+                errors.append(SimulationBatchError(
+                    index=index, model_id=scenario.model_id,
+                    detail=f"Modèle avec ID {scenario.model_id} non trouvé"
+                ).dict())
+            elif emission_factor_registry.lookup(scenario.cloud_provider, scenario.region) is None:
+                errors.append(SimulationBatchError(
+                    index=index, model_id=scenario.model_id,
+                    detail=f"Région '{scenario.region}' non valide ou non supportée"
+                ).dict())
+            else:
+                valid.append(scenario)
+
+        if not valid:
+            return {"results": [], "errors": errors}
+
+        parameters = [models[scenario.model_id].get("parameters_billions") for scenario in valid]
+        factors = [emission_factor_registry.lookup(scenario.cloud_provider, scenario.region) for scenario in valid]
+        impacts = compute_impacts(
+            np.array([p if isinstance(p, (int, float)) else np.nan for p in parameters], dtype=np.float64),
+            np.array([scenario.frequency_per_day for scenario in valid], dtype=np.float64),
+            np.array([scenario.duration_days for scenario in valid], dtype=np.float64),
+            np.array([f["co2_factor"] for f in factors], dtype=np.float64),
+            self.equivalents,
+            pue=np.array([f["pue"] for f in factors], dtype=np.float64),
+            wue_l_per_kwh=np.array([f["wue_l_per_kwh"] for f in factors], dtype=np.float64)
+        )
+
+        # 3. Résultats (colonnes converties une seule fois en listes Python)
+        energies = impacts["total_energy_kwh"]
+        energy_column = np.where(np.isnan(energies), None, energies).tolist() # NaN -> None (null en JSON)
+        water = impacts["total_water_liters"]
+        water_column = np.where(np.isnan(water), None, water).tolist()
+        results = [
+            {
+                "model_id": scenario.model_id,
+                "model_name": models[scenario.model_id].get("model_name") or "",
+                "total_co2_kg": co2,
+                "total_energy_kwh": energy,
+                "total_water_liters": water_liters,
+                "equivalent_car_km": car_km,
+                "equivalent_trees_needed": trees,
+                "equivalent_smartphone_charges": charges
+            }
+            for scenario, co2, energy, water_liters, car_km, trees, charges in zip(
+                valid,
+                impacts["total_co2_kg"].tolist(),
+                energy_column,
+                water_column,
+                impacts["equivalent_car_km"].tolist(),
+                impacts["equivalent_trees_needed"].tolist(),
+                impacts["equivalent_smartphone_charges"].tolist()
+            )
+        ]
+
+        # 4. Sauvegarder toutes les simulations en un seul insert_many
+        timestamp = datetime.utcnow()
+        expires_at = self._expires_at()
+        simulation_docs = [
+            {
+                "_id": ObjectId(),
+                "user_id": user_id,
+                "params": dict(scenario), # Modèle plat : conversion superficielle, bien plus rapide que .dict()
+                "result": dict(result),
+                "timestamp": timestamp,
+                "expires_at": expires_at
+            }
+            for scenario, result in zip(valid, results)
+        ]
+        await simulation_write_buffer.write_now(simulation_docs)
+        for result, doc in zip(results, simulation_docs):
+            result["id"] = str(doc["_id"])
+
+        return {"results": results, "errors": errors}
+
+    async def simulate_portfolio(self, deployments: List[SimulationParams]) -> PortfolioResult:
+        """Simule un portefeuille de déploiements en une passe vectorisée.
+
+        Les modèles sont lus dans le snapshot colonnaire partagé du catalogue (un seul
+        chargement, réutilisé entre requêtes). Pour chaque modèle, le gain du remplacement par
+        sa meilleure recommandation (cf. best_recommendation_indices) est calculé sur les mêmes
+        déploiements. Les déploiements invalides sont signalés dans ``errors``. Les portefeuilles
+        ne sont pas enregistrés dans l'historique.
+        """
+        snapshot = await CatalogService().get_snapshot()
+        positions = snapshot.indices_of([deployment.model_id for deployment in deployments])
+
+        errors = []
+        valid = []
+        valid_positions = []
+        factors = []
+        for index, (deployment, position) in enumerate(zip(deployments, positions)):
+            deployment_factors = emission_factor_registry.lookup(deployment.cloud_provider, deployment.region)
+            if position < 0:
+                errors.append(SimulationBatchError(
+                    index=index, model_id=deployment.model_id,
+                    detail=f"Modèle avec ID {deployment.model_id} non trouvé"
+                ))
+            elif deployment_factors is None:
+                errors.append(SimulationBatchError(
+                    index=index, model_id=deployment.model_id,
+                    detail=f"Région '{deployment.region}' non valide ou non supportée"
+                ))
+            else:
+                valid.append(deployment)
+                valid_positions.append(position)
+                factors.append(deployment_factors)
+
+        if not valid:
+            return PortfolioResult(
+                deployments_count=0, total_co2_kg=0.0, total_energy_kwh=0.0,
+                by_region={}, by_model=[], potential_savings_kg=0.0, errors=errors
+            )
+
+        positions = np.array(valid_positions, dtype=np.int64)
+        frequency = np.array([deployment.frequency_per_day for deployment in valid], dtype=np.float64)
+        duration = np.array([deployment.duration_days for deployment in valid], dtype=np.float64)
+        co2_factor = np.array([f["co2_factor"] for f in factors], dtype=np.float64)
+        pue = np.array([f["pue"] for f in factors], dtype=np.float64)
+        wue = np.array([f["wue_l_per_kwh"] for f in factors], dtype=np.float64)
+
+        impacts = compute_impacts(snapshot.parameters_billions[positions], frequency, duration,
+                                  co2_factor, self.equivalents, pue, wue)
+        co2 = impacts["total_co2_kg"]
+        energy = np.nan_to_num(impacts["total_energy_kwh"])
+
+        # Par modèle : regroupement des déploiements, puis remplacement par la meilleure recommandation
+        model_positions, model_of_deployment = np.unique(positions, return_inverse=True)
+        recommended = best_recommendation_indices(snapshot, model_positions)
+        has_recommendation = recommended >= 0
+        recommended_parameters = np.where(
+            has_recommendation, snapshot.parameters_billions[np.maximum(recommended, 0)], np.nan)
+        swapped_co2 = compute_impacts(recommended_parameters[model_of_deployment], frequency, duration,
+                                      co2_factor, self.equivalents, pue, wue)["total_co2_kg"]
+
+        n_models = model_positions.size
+        model_counts = np.bincount(model_of_deployment, minlength=n_models)
+        model_co2 = np.bincount(model_of_deployment, weights=co2, minlength=n_models)
+        model_energy = np.bincount(model_of_deployment, weights=energy, minlength=n_models)
+        model_swapped_co2 = np.bincount(model_of_deployment, weights=swapped_co2, minlength=n_models)
+        model_savings = model_co2 - model_swapped_co2
+        training_savings = snapshot.training_co2_kg[model_positions] \
+            - snapshot.training_co2_kg[np.maximum(recommended, 0)]
+
+        by_model = []
+        for k in np.argsort(-model_co2, kind="stable"):
+            position, recommendation = model_positions[k], recommended[k]
+            breakdown = PortfolioModelBreakdown(
+                model_id=snapshot.model_ids[position],
+                model_name=snapshot.model_names[position],
+                deployments=int(model_counts[k]),
+                total_co2_kg=float(model_co2[k]),
+                total_energy_kwh=float(model_energy[k]),
+            )
+            if has_recommendation[k]:
+                breakdown.recommended_model_id = snapshot.model_ids[recommendation]
+                breakdown.recommended_model_name = snapshot.model_names[recommendation]
+                breakdown.co2_after_swap_kg = float(model_swapped_co2[k])
+                breakdown.co2_savings_kg = float(model_savings[k])
+                breakdown.training_co2_savings_kg = float(training_savings[k])
+            by_model.append(breakdown)
+
+        # Par région
+        region_ids, region_of_deployment = np.unique([deployment.region for deployment in valid], return_inverse=True)
+        region_counts = np.bincount(region_of_deployment, minlength=region_ids.size)
+        region_co2 = np.bincount(region_of_deployment, weights=co2, minlength=region_ids.size)
+        region_energy = np.bincount(region_of_deployment, weights=energy, minlength=region_ids.size)
+        by_region = {
+            str(region): {
+                "deployments": int(region_counts[k]),
+                "total_co2_kg": float(region_co2[k]),
+                "total_energy_kwh": float(region_energy[k]),
+            }
+            for k, region in enumerate(region_ids)
+        }
+
+        water = impacts["total_water_liters"]
+        return PortfolioResult(
+            deployments_count=len(valid),
+            total_co2_kg=float(co2.sum()),
+            total_energy_kwh=float(energy.sum()),
+            total_water_liters=float(np.nansum(water)) if not np.all(np.isnan(water)) else None,
+            by_region=by_region,
+            by_model=by_model,
+            potential_savings_kg=float(model_savings[has_recommendation & (model_savings > 0)].sum()),
+            errors=errors,
+        )
+
+    async def rank_models(self, request: SimulationRankingRequest) -> SimulationRankingResult:
+        """Classe les modèles du catalogue par CO2 projeté pour une charge de travail.
+
+        Tous les modèles éligibles (taille connue et contraintes de la requête) sont évalués
+        en une passe sur les colonnes du snapshot ; seuls les ``top_k`` meilleurs sont triés
+        (sélection partielle). À CO2 égal, le meilleur score global passe en premier.
+        """
+        factors = self._get_factors(request.cloud_provider, request.region)
+        snapshot = await CatalogService().get_snapshot()
+
+        parameters = snapshot.parameters_billions
+        overall_score = snapshot.overall_score
+        with np.errstate(invalid="ignore"):
+            mask = parameters > 0
+            if request.min_overall_score is not None:
+                mask &= overall_score >= request.min_overall_score
+            if request.max_parameters_billions is not None:
+                mask &= parameters <= request.max_parameters_billions
+        if request.architecture is not None:
+            mask &= snapshot.architectures == request.architecture
+        if request.model_type is not None:
+            mask &= snapshot.model_types == request.model_type
+        candidates = np.flatnonzero(mask)
+
+        impacts = compute_impacts(
+            parameters[candidates], request.frequency_per_day, request.duration_days,
+            factors["co2_factor"], self.equivalents, factors["pue"],
+            np.nan if factors["wue_l_per_kwh"] is None else factors["wue_l_per_kwh"]
+        )
+        co2 = impacts["total_co2_kg"]
+        top_k = min(request.top_k, candidates.size)
+        best = np.arange(candidates.size)
+        if 0 < top_k < candidates.size:
+            # Sélection partielle : k-ième plus faible CO2, ex aequo compris
+            kth_co2 = np.partition(co2, top_k - 1)[top_k - 1]
+            best = np.flatnonzero(co2 <= kth_co2)
+        best = best[np.lexsort((np.nan_to_num(-overall_score[candidates[best]], nan=np.inf), co2[best]))][:top_k]
+
+        ranking = []
+        for rank, k in enumerate(best, start=1):
+            position = candidates[k]
+            water = impacts["total_water_liters"][k]
+            ranking.append(SimulationRankingEntry(
+                rank=rank,
+                model_id=snapshot.model_ids[position],
+                model_name=snapshot.model_names[position],
+                architecture=snapshot.architectures[position],
+                parameters_billions=float(parameters[position]),
+                overall_score=None if np.isnan(overall_score[position]) else float(overall_score[position]),
+                total_co2_kg=float(co2[k]),
+                total_energy_kwh=float(impacts["total_energy_kwh"][k]),
+                total_water_liters=None if np.isnan(water) else float(water),
+            ))
+
+        return SimulationRankingResult(
+            region=request.region,
+            cloud_provider=factors["provider"],
+            data_version=snapshot.version,
+            eligible_models=int(candidates.size),
+            ranking=ranking,
+        )
+
+    async def optimize_placement(self, request: PlacementRequest) -> PlacementResult:
+        """Répartit des charges de travail entre régions pour minimiser le CO2 total.
+
+        Les capacités (énergie sur la période, PUE inclus) sont respectées ; le coût de chaque
+        couple (charge, région) utilise les facteurs du registre pour le fournisseur de la
+        charge. La résolution (cf. app.utils.placement) s'exécute dans un thread. Le résultat
+        est comparé au placement naïf (chaque charge dans sa région d'origine).
+        """
+        region_ids = list(dict.fromkeys(request.regions or list(self.regions)))
+        unknown_regions = [
+            region for region in region_ids + list(request.capacities_kwh)
+            if emission_factor_registry.lookup(None, region) is None
+        ]
+        if unknown_regions:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Régions non valides ou non supportées : {', '.join(dict.fromkeys(unknown_regions))}"
+            )
+        if any(capacity < 0 for capacity in request.capacities_kwh.values()):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Les capacités doivent être positives"
+            )
+
+        snapshot = await CatalogService().get_snapshot()
+        positions = snapshot.indices_of([workload.model_id for workload in request.workloads])
+        region_index = {region: r for r, region in enumerate(region_ids)}
+
+        errors = []
+        valid = []
+        valid_positions = []
+        for index, (workload, position) in enumerate(zip(request.workloads, positions)):
+            invalid_allowed = [region for region in workload.allowed_regions or [] if region not in region_index]
+            if position < 0:
+                detail = f"Modèle avec ID {workload.model_id} non trouvé"
+            elif emission_factor_registry.lookup(workload.cloud_provider, workload.region) is None:
+                detail = f"Région '{workload.region}' non valide ou non supportée"
+            elif invalid_allowed:
+                detail = f"Régions autorisées hors des régions candidates : {', '.join(invalid_allowed)}"
+            else:
+                valid.append((index, workload))
+                valid_positions.append(position)
+                continue
+            errors.append(SimulationBatchError(index=index, model_id=workload.model_id, detail=detail))
+
+        # Facteurs (charges, régions), résolus une fois par fournisseur
+        providers = list(dict.fromkeys(workload.cloud_provider for _, workload in valid))
+        provider_factors = {
+            provider: [emission_factor_registry.lookup(provider, region) for region in region_ids]
+            for provider in providers
+        }
+        co2_factor = np.array([[f["co2_factor"] for f in provider_factors[workload.cloud_provider]]
+                               for _, workload in valid], dtype=np.float64).reshape(len(valid), len(region_ids))
+        pue = np.array([[f["pue"] for f in provider_factors[workload.cloud_provider]]
+                        for _, workload in valid], dtype=np.float64).reshape(len(valid), len(region_ids))
+        naive_factors = [emission_factor_registry.lookup(workload.cloud_provider, workload.region)
+                         for _, workload in valid]
+
+        parameters = snapshot.parameters_billions[np.array(valid_positions, dtype=np.int64)]
+        frequency = np.array([workload.frequency_per_day for _, workload in valid], dtype=np.float64)
+        duration = np.array([workload.duration_days for _, workload in valid], dtype=np.float64)
+
+        impacts = compute_impacts(parameters[:, None], frequency[:, None], duration[:, None],
+                                  co2_factor, self.equivalents, pue)
+        energy = np.nan_to_num(impacts["total_energy_kwh"]) # Taille inconnue : ni énergie ni CO2
+        cost = impacts["total_co2_kg"].copy()
+        for w, (_, workload) in enumerate(valid):
+            if workload.allowed_regions:
+                allowed = np.zeros(len(region_ids), dtype=bool)
+                allowed[[region_index[region] for region in workload.allowed_regions]] = True
+                cost[w, ~allowed] = np.inf
+        naive = compute_impacts(
+            parameters, frequency, duration,
+            np.array([f["co2_factor"] for f in naive_factors], dtype=np.float64), self.equivalents,
+            np.array([f["pue"] for f in naive_factors], dtype=np.float64)
+        )
+        naive_co2 = naive["total_co2_kg"]
+        naive_energy = np.nan_to_num(naive["total_energy_kwh"])
+
+        capacity = np.array([request.capacities_kwh.get(region, np.inf) for region in region_ids], dtype=np.float64)
+        assignment, lower_bound = await asyncio.to_thread(place_workloads, cost, energy, capacity)
+
+        placed = assignment >= 0
+        rows = np.flatnonzero(placed)
+        placed_regions = assignment[placed]
+        placed_co2 = cost[rows, placed_regions]
+        placed_energy = energy[rows, placed_regions]
+        region_counts = np.bincount(placed_regions, minlength=len(region_ids))
+        region_energy = np.bincount(placed_regions, weights=placed_energy, minlength=len(region_ids))
+        region_co2 = np.bincount(placed_regions, weights=placed_co2, minlength=len(region_ids))
+
+        naive_by_region: Dict[str, float] = {}
+        for (_, workload), workload_energy in zip(valid, naive_energy):
+            naive_by_region[workload.region] = naive_by_region.get(workload.region, 0.0) + workload_energy
+        naive_over_capacity = [
+            region for region, used in naive_by_region.items()
+            if used > request.capacities_kwh.get(region, np.inf)
+        ]
+
+        assignments = []
+        for w, (index, workload) in enumerate(valid):
+            r = assignment[w]
+            assignments.append(PlacementAssignment(
+                index=index,
+                model_id=workload.model_id,
+                model_name=snapshot.model_names[valid_positions[w]],
+                naive_region=workload.region,
+                region=region_ids[r] if r >= 0 else None,
+                energy_kwh=float(energy[w, r]) if r >= 0 else None,
+                co2_kg=float(cost[w, r]) if r >= 0 else None,
+                naive_co2_kg=float(naive_co2[w]),
+            ))
+
+        total_co2 = float(placed_co2.sum())
+        placed_naive_co2 = float(naive_co2[placed].sum())
+        return PlacementResult(
+            workloads_count=len(valid),
+            placed_count=int(placed.sum()),
+            total_co2_kg=total_co2,
+            naive_co2_kg=placed_naive_co2,
+            co2_savings_kg=placed_naive_co2 - total_co2,
+            lower_bound_co2_kg=lower_bound,
+            naive_over_capacity=naive_over_capacity,
+            regions=[
+                PlacementRegionUsage(
+                    region=region,
+                    workloads=int(region_counts[r]),
+                    energy_kwh=float(region_energy[r]),
+                    capacity_kwh=request.capacities_kwh.get(region),
+                    co2_kg=float(region_co2[r]),
+                )
+                for r, region in enumerate(region_ids)
+            ],
+            assignments=assignments,
+            errors=errors,
+        )
+
+    async def simulate_models_by_region(self, model_ids: List[str], frequency_per_day: int, duration_days: int,
+                                        regions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Impact de chaque modèle dans chaque région pour une même charge (rapports d'export).
+
+        Un seul calcul vectorisé (modèles × régions) sur le snapshot du catalogue, avec les
+        facteurs du registre (fournisseur non précisé). Non enregistré dans l'historique.
+        Retourne ``{"regions": [{"id", "name"}], "rows": [{"model_id", "model_name", "co2_kg"}]}``.
+        """
+        region_ids = [region for region in (regions or list(self.regions))
+                      if emission_factor_registry.lookup(None, region) is not None]
+        region_factors = [emission_factor_registry.lookup(None, region) for region in region_ids]
+        snapshot = await CatalogService().get_snapshot()
+        positions = snapshot.indices_of(list(dict.fromkeys(model_ids)))
+        positions = positions[positions >= 0]
+
+        impacts = compute_impacts(
+            snapshot.parameters_billions[positions][:, None], frequency_per_day, duration_days,
+            np.array([factors["co2_factor"] for factors in region_factors], dtype=np.float64)[None, :],
+            self.equivalents,
+            np.array([factors["pue"] for factors in region_factors], dtype=np.float64)[None, :]
+        )
+        co2 = impacts["total_co2_kg"]
+        return {
+            "regions": [
+                {"id": region, "name": self.regions.get(region, {}).get("name", region)} for region in region_ids
+            ],
+            "rows": [
+                {"model_id": snapshot.model_ids[position], "model_name": snapshot.model_names[position],
+                 "co2_kg": co2[k].tolist()}
+                for k, position in enumerate(positions)
+            ],
+        }
+
+    async def simulate_monte_carlo(self, params: SimulationMonteCarloParams) -> SimulationMonteCarloResult:
+        """Simule l'impact avec incertitude (Monte Carlo), dans le pool de threads dédié.
+
+        L'intensité médiane et le PUE (mode de la loi triangulaire, sauf valeurs de la
+        requête) viennent du registre des facteurs d'émission, comme pour simulate_impact. Le
+        calcul est abandonné (504) au-delà de SIMULATION_MONTE_CARLO_TIMEOUT_SECONDS, et le
+        thread de calcul s'arrête à la tranche de tirages suivante. Ces simulations ne sont
+        pas enregistrées dans l'historique.
+        """
+        model = await self._get_model(params.model_id)
+        factors = self._get_factors(params.cloud_provider, params.region)
+        pue = monte_carlo_pue(params, factors["pue"])
+        if not pue[0] <= pue[1] <= pue[2]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="PUE : il faut pue_min <= pue_mode <= pue_max"
+            )
+        if not model.parameters_billions or model.parameters_billions <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Taille du modèle {params.model_id} inconnue : simulation impossible"
+            )
+
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        future = loop.run_in_executor(
+            _monte_carlo_executor, monte_carlo_impacts,
+            model.parameters_billions, params.frequency_per_day, params.duration_days,
+            factors["co2_factor"], params.samples, params.seed, params.energy_sigma,
+            params.intensity_sigma, pue, self.equivalents, cancel
+        )
+        try:
+            impacts = await asyncio.wait_for(future, timeout=settings.SIMULATION_MONTE_CARLO_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            cancel.set() # Libère le thread du pool (au plus une tranche de tirages plus tard)
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Simulation Monte Carlo trop longue : réduire le nombre de tirages"
+            )
+
+        return SimulationMonteCarloResult(
+            model_id=params.model_id,
+            model_name=model.model_name,
+            samples=params.samples,
+            seed=params.seed,
+            **impacts
+        )
+
+    async def simulate_hourly(self, params: HourlySimulationParams) -> HourlySimulationResult:
+        """Simule les émissions heure par heure et recommande les fenêtres les moins carbonées.
+
+        Utilise le profil horaire de la région (GridProfileService), ou à défaut son facteur
+        annuel issu du registre des facteurs d'émission (le PUE du fournisseur s'applique
+        dans les deux cas). Ces simulations ne sont pas enregistrées dans l'historique.
+        """
+        factors = self._get_factors(params.cloud_provider, params.region)
+        if params.load_curve is None:
+            load_curve = np.full(24, 1 / 24)
+        else:
+            load_curve = np.asarray(params.load_curve, dtype=np.float64)
+            if load_curve.size != 24 or not np.all(np.isfinite(load_curve)) \
+                    or np.any(load_curve < 0) or load_curve.sum() <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="load_curve : 24 valeurs positives ou nulles, de somme non nulle"
+                )
+            load_curve = load_curve / load_curve.sum()
+
+        model = await self.model_service.get_model_by_id(params.model_id)
+        if not model:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Modèle avec ID {params.model_id} non trouvé"
+            )
+        if not model.parameters_billions or model.parameters_billions <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Taille du modèle {params.model_id} inconnue : simulation impossible"
+            )
+
+        daily_energy_kwh = model.parameters_billions * ENERGY_PER_INFERENCE_KWH_PER_BILLION \
+            * factors["pue"] * params.frequency_per_day
+        # Dans un thread : la première lecture d'un profil (CSV/Parquet, conversion .npy) est bloquante
+        hourly = await asyncio.to_thread(
+            GridProfileService().simulate_hourly,
+            daily_energy_kwh, params.region, factors["co2_factor"], load_curve, params.start_day,
+            params.duration_days, params.window_hours, params.top_windows
+        )
+        return HourlySimulationResult(
+            model_id=params.model_id,
+            model_name=model.model_name,
+            region=params.region,
+            **hourly
+        )
+
+    def _sweep_axis_values(self, axis: SweepAxis, name: str) -> np.ndarray:
+        """Valeurs d'un axe de grille (explicites, ou plage linéaire/géométrique)."""
+        if axis.values is not None:
+            values = np.asarray(axis.values, dtype=np.float64)
+        elif axis.start is not None and axis.stop is not None:
+            values = (np.geomspace if axis.log else np.linspace)(axis.start, axis.stop, axis.num)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Axe '{name}' : fournir 'values' ou 'start' et 'stop'"
+            )
+        if values.size == 0 or not np.all(np.isfinite(values)) or np.any(values <= 0):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Axe '{name}' : les valeurs doivent être strictement positives"
+            )
+        return values
+
+    async def simulate_sweep(self, request: SimulationSweepRequest) -> Dict[str, Any]:
+        """Calcule une grille fréquence × région × durée pour un modèle, par diffusion NumPy.
+
+        Retourne ``{"header": ..., "tensors": {métrique: tableau (F, R, D)}}``, à sérialiser
+        avec iter_sweep_ndjson ou iter_sweep_npy. Les grilles ne sont pas enregistrées dans
+        l'historique des simulations.
+        """
+        frequencies = self._sweep_axis_values(request.frequency_per_day, "frequency_per_day")
+        durations = self._sweep_axis_values(request.duration_days, "duration_days")
+        region_ids = request.regions or list(self.regions)
+        region_factors = [emission_factor_registry.lookup(request.cloud_provider, region) for region in region_ids]
+        unknown_regions = [region for region, factors in zip(region_ids, region_factors) if factors is None]
+        if unknown_regions:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Régions non valides ou non supportées : {', '.join(unknown_regions)}"
+            )
+        cells = frequencies.size * len(region_ids) * durations.size
+        if cells > settings.SIMULATION_SWEEP_MAX_CELLS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Grille trop grande ({cells} cellules, maximum {settings.SIMULATION_SWEEP_MAX_CELLS})"
+            )
+
+        try:
+            obj_id = ObjectId(request.model_id)
+        except InvalidId:
+            obj_id = None
+        model = await self.model_service._get_collection().find_one(
+            {"_id": obj_id}, {"model_name": 1, "parameters_billions": 1}
+        ) if obj_id is not None else None
+        if not model:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Modèle avec ID {request.model_id} non trouvé"
+            )
+
+        parameters = model.get("parameters_billions")
+        parameters = float(parameters) if isinstance(parameters, (int, float)) else np.nan
+        co2_factors = np.array([factors["co2_factor"] for factors in region_factors], dtype=np.float64)
+        pue = np.array([factors["pue"] for factors in region_factors], dtype=np.float64)
+        shape = (frequencies.size, len(region_ids), durations.size)
+
+        # Diffusion : fréquences (F, 1, 1) × facteurs (1, R, 1) × durées (1, 1, D)
+        impacts = await asyncio.to_thread(
+            compute_impacts, np.float64(parameters), frequencies[:, None, None],
+            durations[None, None, :], co2_factors[None, :, None], self.equivalents, pue[None, :, None]
+        )
+        tensors = {"total_co2_kg": np.broadcast_to(impacts["total_co2_kg"], shape)}
+        if parameters > 0: # Sinon l'énergie est inconnue (NaN) : métrique omise
+            tensors["total_energy_kwh"] = np.broadcast_to(impacts["total_energy_kwh"], shape)
+
+        header = {
+            "model_id": request.model_id,
+            "model_name": model.get("model_name"),
+            "axes": {
+                "frequency_per_day": frequencies.tolist(),
+                "region": region_ids,
+                "duration_days": durations.tolist(),
+            },
+            "shape": list(shape),
+            "metrics": list(tensors),
+        }
+        return {"header": header, "tensors": tensors}
 
     async def get_regions(self) -> List[Dict[str, Any]]:
-        """Récupère la liste des régions disponibles."""
-        # Retourne les données depuis les constantes chargées
+        """Récupère la liste des régions disponibles (registre des facteurs d'émission)."""
         return [region_data for region_data in self.regions.values()]
 
     async def get_equivalents(self) -> Dict[str, Dict[str, Any]]:
@@ -125,29 +1006,71 @@ class SimulationService:
         # Retourne les données depuis les constantes chargées
         return self.equivalents
 
-    async def get_simulation_history(self, user_id: str) -> List[SimulationResult]:
-        """Récupère l'historique des simulations de l'utilisateur depuis MongoDB."""
+    async def get_simulation_history(self, user_id: str, limit: int = 50,
+                                     cursor: Optional[str] = None) -> SimulationHistoryPage:
+        """Récupère une page de l'historique des simulations de l'utilisateur (plus récentes d'abord).
+
+        Pagination par curseur ("<timestamp ISO>|<id>" de la dernière simulation de la page
+        précédente), servie par l'index (user_id, timestamp, _id) : le coût d'une page ne
+        dépend pas de sa position dans l'historique.
+        """
         if not user_id:
-            return []
+            return SimulationHistoryPage(items=[])
+        query: Dict[str, Any] = {"user_id": user_id}
+        if cursor:
+            try:
+                cursor_timestamp, cursor_id = cursor.split("|", 1)
+                cursor_timestamp = datetime.fromisoformat(cursor_timestamp)
+                cursor_id = ObjectId(cursor_id)
+            except (ValueError, InvalidId):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Curseur de pagination invalide"
+                )
+            query["$or"] = [
+                {"timestamp": {"$lt": cursor_timestamp}},
+                {"timestamp": cursor_timestamp, "_id": {"$lt": cursor_id}},
+            ]
+
+        await simulation_write_buffer.flush_user(user_id) # Lire ses propres écritures encore en file
         collection = self._get_sim_collection()
-        history_cursor = collection.find({"user_id": user_id}).sort("timestamp", -1) # Trier par date décroissante
-        history_docs = await history_cursor.to_list(length=100) # Limiter la taille de l'historique ?
+        history_cursor = collection.find(query).sort([("timestamp", DESCENDING), ("_id", DESCENDING)]).limit(limit + 1)
+        history_docs = await history_cursor.to_list(length=limit + 1)
 
         # Extraire et valider les résultats avec Pydantic
-        results = []
-        for doc in history_docs:
-            if "result" in doc:
-                try:
-                    # Ajouter l'ID de la simulation du document parent si nécessaire
-                    # doc["result"]["simulation_db_id"] = str(doc["_id"])
-                    results.append(SimulationResult(**doc["result"]))
-                except Exception as e:
-                    print(f"Erreur de validation pour l'historique de simulation: {e}, data: {doc['result']}")
-                    # Ignorer l'entrée invalide ou gérer l'erreur autrement
-        return results
+        items = []
+        for doc in history_docs[:limit]:
+            try:
+                items.append(SimulationHistoryEntry(
+                    id=str(doc["_id"]),
+                    timestamp=doc["timestamp"],
+                    saved=doc.get("saved", False),
+                    expires_at=doc.get("expires_at"),
+                    params=doc.get("params") or {},
+                    result={**doc["result"], "id": str(doc["_id"])},
+                ))
+            except Exception as e:
+                print(f"Erreur de validation pour l'historique de simulation: {e}, data: {doc.get('result')}")
+                # Ignorer l'entrée invalide ou gérer l'erreur autrement
+
+        next_cursor = None
+        if len(history_docs) > limit:
+            last = history_docs[limit - 1]
+            next_cursor = f"{last['timestamp'].isoformat()}|{last['_id']}"
+        return SimulationHistoryPage(items=items, next_cursor=next_cursor)
+
+    async def get_simulation_summary(self, user_id: str) -> SimulationSummary:
+        """Agrégats cumulés des simulations de l'utilisateur (lecture d'un seul document)."""
+        await simulation_write_buffer.flush_user(user_id) # Inclure ses simulations encore en file
+        rollup = await get_database()[SIMULATION_ROLLUPS_COLLECTION].find_one({"_id": user_id})
+        if not rollup:
+            return SimulationSummary(user_id=user_id)
+        rollup.pop("_id")
+        return SimulationSummary(user_id=user_id, **rollup)
 
     async def save_simulation(self, simulation_id: str, user_id: str) -> bool:
         """Sauvegarde une simulation dans MongoDB (ajoute un flag 'saved')."""
+        await simulation_write_buffer.flush_user(user_id) # Lire ses propres écritures encore en file
         collection = self._get_sim_collection()
         try:
             sim_obj_id = ObjectId(simulation_id)
@@ -156,12 +1079,13 @@ class SimulationService:
 
         result = await collection.update_one(
             {"_id": sim_obj_id, "user_id": user_id}, # Vérifie aussi l'utilisateur
-            {"$set": {"saved": True}}
+            {"$set": {"saved": True}, "$unset": {"expires_at": ""}} # Conservée : plus d'expiration
         )
         return result.modified_count > 0 # Retourne True si un document a été modifié
 
     async def delete_simulation(self, simulation_id: str, user_id: str) -> bool:
         """Supprime une simulation de MongoDB."""
+        await simulation_write_buffer.flush_user(user_id) # Lire ses propres écritures encore en file
         collection = self._get_sim_collection()
         try:
             sim_obj_id = ObjectId(simulation_id)
@@ -0,0 +1,383 @@
+# backend/app/services/simulation_write_buffer.py
+
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict, deque
+import asyncio
+import time
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core.config import settings
+from app.core.database import get_database
+
+# Collection de l'historique des simulations (cf. simulation_service)
+SIMULATIONS_COLLECTION = "simulations"
+# Agrégats par utilisateur (un document par utilisateur, mis à jour à chaque écriture)
+SIMULATION_ROLLUPS_COLLECTION = "simulation_rollups"
+# Code MongoDB d'une clé dupliquée : document déjà écrit lors d'une tentative précédente
+DUPLICATE_KEY_ERROR = 11000
+
+
+def build_rollup_updates(docs: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Agrège des documents de simulation en incréments, un UpdateOne par utilisateur.
+
+    Les agrégats sont cumulatifs : ils ne diminuent pas à l'expiration (TTL) ou à la
+    suppression d'une simulation de l'historique.
+    """
+    increments: Dict[str, Dict[str, float]] = {}
+    model_names: Dict[str, Dict[str, str]] = {}
+    for doc in docs:
+        user_id = doc.get("user_id")
+        if not user_id:
+            continue
+        result = doc.get("result") or {}
+        region = (doc.get("params") or {}).get("region")
+        model_id = result.get("model_id")
+        co2 = result.get("total_co2_kg") or 0.0
+        inc = increments.setdefault(user_id, defaultdict(int))
+        inc["simulations_count"] += 1
+        inc["total_co2_kg"] += co2
+        inc["total_energy_kwh"] += result.get("total_energy_kwh") or 0.0
+        inc[f"by_region.{region}.count"] += 1
+        inc[f"by_region.{region}.total_co2_kg"] += co2
+        inc[f"by_model.{model_id}.count"] += 1
+        inc[f"by_model.{model_id}.total_co2_kg"] += co2
+        model_names.setdefault(user_id, {})[f"by_model.{model_id}.model_name"] = result.get("model_name")
+
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {"_id": user_id},
+            {"$inc": dict(inc), "$set": {**model_names[user_id], "updated_at": now}},
+            upsert=True,
+        )
+        for user_id, inc in increments.items()
+    ]
+
+
+def _is_document_error(error: Optional[Exception]) -> bool:
+    """Erreur propre aux documents du lot (à isoler), par opposition à une erreur de la base."""
+    return isinstance(error, BulkWriteError) or (error is not None and not isinstance(error, PyMongoError))
+
+
+class SimulationWriteBuffer:
+    """File d'écriture différée (write-behind) des documents de simulation.
+
+    Les documents sont mis en file en mémoire et écrits par une tâche de fond, par lots
+    (``insert_many``) toutes les ``flush_interval`` secondes ou dès que ``batch_size``
+    documents sont en attente. La file est bornée à ``max_pending`` documents : au-delà,
+    enqueue() attend qu'un lot soit écrit (contre-pression, comptabilisée dans stats()).
+
+    Un lot en échec est retenté ``max_attempts`` fois, puis découpé (par moitiés) pour isoler
+    les documents que MongoDB refuse (erreur d'écriture propre au document, document BSON
+    invalide) : ils sont écartés dans une liste de rejets (``dead_letters``, bornée, comptée
+    dans stats()) et le reste de la file s'écrit. Une erreur de la base elle-même (réseau,
+    serveur indisponible) n'écarte aucun document : le lot est retenté indéfiniment.
+
+    Les documents doivent porter leur ``_id`` : un lot rejoué après une erreur ne crée pas
+    de doublon. Chaque lot écrit met aussi à jour les agrégats par utilisateur
+    (``simulation_rollups``). Tant que start() n'a pas été appelé (scripts, tests), enqueue()
+    écrit directement (write_now).
+    """
+
+    def __init__(self, max_pending: int, batch_size: int, flush_interval: float,
+                 max_attempts: int = 3, dead_letter_max: int = 1000):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending: List[Dict[str, Any]] = []
+        self._head_attempts = 0 # Tentatives en échec du lot en tête de file
+        self.dead_letters: deque = deque(maxlen=dead_letter_max) # Documents écartés (les plus récents)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._not_full: Optional[asyncio.Condition] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Métriques
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self.backpressure_waits = 0
+        self.backpressure_wait_seconds = 0.0
+        self.max_pending_seen = 0
+        self.last_flush_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def _get_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB des simulations."""
+        db = get_database()
+        return db[SIMULATIONS_COLLECTION]
+
+    def _get_rollups_collection(self) -> AsyncIOMotorCollection:
+        """Obtient la collection MongoDB des agrégats de simulations par utilisateur."""
+        db = get_database()
+        return db[SIMULATION_ROLLUPS_COLLECTION]
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Démarre la tâche d'écriture de fond (au démarrage de l'application)."""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._not_full = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """Tâche de fond terminée : erreur enregistrée, producteurs en attente réveillés."""
+        if not task.cancelled() and task.exception() is not None:
+            self.last_error = f"Tâche d'écriture arrêtée : {task.exception()!r}"
+        if not self._stopping:
+            asyncio.ensure_future(self._notify_not_full())
+
+    async def _notify_not_full(self) -> None:
+        async with self._not_full:
+            self._not_full.notify_all()
+
+    async def stop(self) -> None:
+        """Arrête la tâche de fond et écrit les documents encore en file (à l'arrêt)."""
+        if self._task is None:
+            return
+        # Pas de cancel() : la boucle termine son lot en cours puis sort
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        self._task = None
+        if self._pending:
+            print(f"ERREUR: {len(self._pending)} simulations non écrites à l'arrêt ({self.last_error})")
+
+    async def enqueue(self, doc: Dict[str, Any]) -> None:
+        """Ajoute un document à la file (attend si la file est pleine).
+
+        Si la tâche de fond n'est pas démarrée ou s'est arrêtée, le document est écrit
+        directement (ainsi que la file restante) au lieu d'attendre indéfiniment.
+        """
+        if self._task is None:
+            await self.write_now([doc])
+            return
+        if self._task.done():
+            await self._write_directly(doc)
+            return
+
+        async with self._not_full:
+            if len(self._pending) >= self.max_pending:
+                self.backpressure_waits += 1
+                self._wakeup.set()
+                started = time.monotonic()
+                await self._not_full.wait_for(
+                    lambda: len(self._pending) < self.max_pending or self._task.done()
+                )
+                self.backpressure_wait_seconds += time.monotonic() - started
+            stopped = self._task.done()
+            if not stopped:
+                self._pending.append(doc)
+                self.enqueued += 1
+                self.max_pending_seen = max(self.max_pending_seen, len(self._pending))
+
+        if stopped:
+            await self._write_directly(doc)
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _write_directly(self, doc: Dict[str, Any]) -> None:
+        """Repli quand la tâche de fond s'est arrêtée : file restante puis document écrits directement."""
+        self.enqueued += 1
+        try:
+            await self.flush()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+        await self.write_now([doc])
+
+    async def flush(self) -> None:
+        """Écrit tous les documents en file, par lots. S'arrête au premier lot qui reste en échec.
+
+        Le verrou est repris à chaque lot : flush_user() n'attend pas l'écriture de toute la file.
+        """
+        if self._flush_lock is None:
+            return
+        while self._pending:
+            async with self._flush_lock:
+                if not await self._flush_head():
+                    break
+
+    async def _flush_head(self) -> bool:
+        """Écrit le lot en tête de file (sous self._flush_lock) ; False s'il reste en échec."""
+        # Les documents restent dans la file (et comptent dans la borne) pendant l'écriture
+        batch = self._pending[:self.batch_size]
+        if not batch:
+            return True
+        if self._head_attempts >= self.max_attempts:
+            remaining, _ = await self._write_isolating(batch)
+        else:
+            remaining, _ = await self._write(batch)
+        self._pending[:len(batch)] = remaining
+        self._head_attempts = self._head_attempts + 1 if remaining else 0
+        if len(remaining) < len(batch):
+            await self._notify_not_full()
+        return not remaining
+
+    async def flush_user(self, user_id: Optional[str]) -> None:
+        """Écrit les documents en file d'un utilisateur (pour lire ses propres écritures).
+
+        Les documents des autres utilisateurs restent en file. Un document en échec y reste
+        aussi (la tâche de fond le retente) : il n'apparaît pas encore dans les lectures.
+        """
+        if self._flush_lock is None or not user_id:
+            return
+        if not any(doc.get("user_id") == user_id for doc in self._pending):
+            return
+        async with self._flush_lock:
+            docs = [doc for doc in self._pending if doc.get("user_id") == user_id]
+            for start in range(0, len(docs), self.batch_size):
+                batch = docs[start:start + self.batch_size]
+                remaining, _ = await self._write(batch)
+                done = {id(doc) for doc in batch} - {id(doc) for doc in remaining}
+                self._pending[:] = [doc for doc in self._pending if id(doc) not in done]
+                if done:
+                    await self._notify_not_full()
+                if remaining:
+                    break
+
+    async def write_now(self, docs: List[Dict[str, Any]]) -> None:
+        """Écrit immédiatement des documents (un insert_many) et met à jour les agrégats.
+
+        Ne lève pas d'erreur : l'appelant a déjà calculé ses résultats. Les documents refusés
+        par MongoDB sont écartés en rejets ; ceux qu'une erreur de la base empêche d'écrire
+        sont remis en file si la tâche de fond tourne (retentés), sinon journalisés.
+        """
+        if not docs:
+            return
+        remaining, error = await self._write_isolating(docs)
+        if not remaining:
+            return
+        if self.running:
+            self._pending.extend(remaining)
+            self.max_pending_seen = max(self.max_pending_seen, len(self._pending))
+            self._wakeup.set()
+        else:
+            print(f"ERREUR: {len(remaining)} simulations non écrites ({type(error).__name__}: {error})")
+
+    async def _update_rollups(self, docs: List[Dict[str, Any]]) -> None:
+        """Met à jour les agrégats par utilisateur (un bulk_write par lot)."""
+        try:
+            operations = build_rollup_updates(docs)
+            if operations:
+                await self._get_rollups_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            # L'historique est écrit : on n'interrompt pas, l'erreur est visible dans stats()
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[Exception]]:
+        """Écrit un lot ; retourne les documents à retenter et l'erreur rencontrée."""
+        try:
+            await self._get_collection().insert_many(batch, ordered=False)
+            failed, error = [], None
+            inserted = batch
+        except BulkWriteError as e:
+            # ordered=False : seuls les documents en erreur ne sont pas écrits
+            errors = e.details.get("writeErrors", [])
+            failed_indexes = {error["index"] for error in errors if error.get("code") != DUPLICATE_KEY_ERROR}
+            # Lot rejoué : les documents déjà écrits ne sont pas recomptés dans les agrégats
+            not_inserted = {error["index"] for error in errors}
+            failed = [batch[index] for index in sorted(failed_indexes)]
+            error = e if failed else None
+            inserted = [doc for index, doc in enumerate(batch) if index not in not_inserted]
+        except Exception as e:
+            # Base indisponible (PyMongoError) ou document non encodable (bson InvalidDocument...)
+            self.failed_batches += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            return batch, e
+        if error is not None:
+            self.failed_batches += 1
+            self.last_error = str(error)
+        await self._update_rollups(inserted)
+        if len(failed) < len(batch):
+            self.written += len(batch) - len(failed)
+            self.batches += 1
+            self.last_flush_at = datetime.now()
+        return failed, error
+
+    async def _write_isolating(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[Exception]]:
+        """Écrit un lot en isolant les documents refusés (découpage par moitiés), écartés en rejets.
+
+        Retourne, comme _write, les documents à retenter : ceux qu'une erreur de la base
+        (et non du document) a empêché d'écrire.
+        """
+        remaining, error = await self._write(batch)
+        if not remaining or not _is_document_error(error):
+            return remaining, error
+        if len(remaining) == 1:
+            self._dead_letter(remaining[0], error)
+            return [], None
+        middle = len(remaining) // 2
+        left, error = await self._write_isolating(remaining[:middle])
+        if left:
+            return left + remaining[middle:], error
+        return await self._write_isolating(remaining[middle:])
+
+    def _dead_letter(self, doc: Dict[str, Any], error: Exception) -> None:
+        """Écarte un document que MongoDB refuse : il ne bloque plus la file."""
+        self.dead_lettered += 1
+        self.dead_letters.append({"doc": doc, "error": f"{type(error).__name__}: {error}", "failed_at": datetime.now()})
+        print(f"ERREUR: simulation {doc.get('_id')} écartée de la file d'écriture ({type(error).__name__}: {error})")
+
+    async def _run(self) -> None:
+        """Boucle de fond : écrit la file périodiquement ou dès qu'un lot est complet."""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Erreur inattendue (document invalide, bug d'agrégation...) : la boucle ne
+                # doit pas s'arrêter, sinon la file ne se viderait plus. Lot retenté plus tard.
+                self.failed_batches += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques de la file (profondeur, contre-pression, lots écrits ou en échec)."""
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "max_pending_seen": self.max_pending_seen,
+            "fill_ratio": len(self._pending) / self.max_pending if self.max_pending else 0.0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "dead_lettered": self.dead_lettered,
+            "dead_letters": [
+                {"id": str(entry["doc"].get("_id")), "user_id": entry["doc"].get("user_id"),
+                 "error": entry["error"], "failed_at": entry["failed_at"].isoformat()}
+                for entry in list(self.dead_letters)[-10:] # Les 10 plus récents
+            ],
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_wait_seconds": self.backpressure_wait_seconds,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+            "last_error": self.last_error,
+        }
+
+
+# Instance partagée par le processus (démarrée/arrêtée par app.main)
+simulation_write_buffer = SimulationWriteBuffer(
+    max_pending=settings.SIMULATION_WRITE_BUFFER_MAX_PENDING,
+    batch_size=settings.SIMULATION_WRITE_BATCH_SIZE,
+    flush_interval=settings.SIMULATION_WRITE_FLUSH_INTERVAL_SECONDS,
+    max_attempts=settings.SIMULATION_WRITE_MAX_ATTEMPTS,
+    dead_letter_max=settings.SIMULATION_WRITE_DEAD_LETTER_MAX,
+)
@@ -7,15 +7,28 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from fastapi import HTTPException, status
 
+from app.core.config import settings
 from app.core.database import get_database
 from app.models.models import User, UserCreate, UserInDB # Importer les modèles Pydantic
-from app.core.security import get_password_hash # Importer la fonction de hachage
+from app.core.security import get_password_hash_async # Hachage bcrypt hors de la boucle d'événements
+from app.utils.cache import TTLCache
 
 # Nom de la collection MongoDB pour les utilisateurs
 USERS_COLLECTION = "users"
 # Nom de la collection pour les modèles (si get_favorites est implémenté plus tard)
 MODELS_COLLECTION = "ai_models"
 
+# Utilisateurs authentifiés (email, sujet du JWT) -> UserInDB, propre au processus.
+# Invalidé par les méthodes qui modifient un utilisateur ; les modifications faites par un
+# autre worker sont prises en compte à l'expiration (AUTH_USER_CACHE_TTL_SECONDS).
+user_cache = TTLCache(settings.AUTH_USER_CACHE_MAX_ENTRIES, settings.AUTH_USER_CACHE_TTL_SECONDS, name="auth_users")
+
+
+def invalidate_cached_user(user_id: str) -> int:
+    """Retire un utilisateur du cache (quel que soit l'email sous lequel il est enregistré)."""
+    return user_cache.invalidate_where(lambda email, user: user.id == user_id)
+
+
 class UserService:
     """Service pour la gestion des utilisateurs via MongoDB."""
 
@@ -65,6 +78,21 @@ class UserService:
         db_user = await collection.find_one({"email": email})
         return self._map_db_user_to_pydantic(db_user)
 
+    async def get_authenticated_user(self, email: str) -> Optional[UserInDB]:
+        """Récupère l'utilisateur d'un token (email), depuis user_cache si possible.
+
+        L'objet retourné est partagé par les requêtes : il ne doit pas être modifié. Une
+        lecture concurrente d'une modification (invalidate_cached_user pendant l'attente de
+        MongoDB) n'est pas mise en cache : la valeur lue est peut-être celle d'avant.
+        """
+        user = user_cache.get(email)
+        if user is None:
+            generation = user_cache.generation
+            user = await self.get_user_by_email(email)
+            if user is not None:
+                user_cache.set_if_generation(email, user, generation)
+        return user
+
     async def create_user(self, user_create: UserCreate) -> User:
         """Crée un nouvel utilisateur dans MongoDB."""
         collection = self._get_collection()
@@ -77,7 +105,7 @@ class UserService:
                  detail="Un utilisateur avec cet email existe déjà."
              )
 
-        hashed_password = get_password_hash(user_create.password)
+        hashed_password = await get_password_hash_async(user_create.password)
         now = datetime.now()
 
         user_doc = {
@@ -116,7 +144,7 @@ class UserService:
          if user_update.username:
              update_data["username"] = user_update.username
          if user_update.password: # Si un nouveau mot de passe est fourni
-             update_data["hashed_password"] = get_password_hash(user_update.password)
+             update_data["hashed_password"] = await get_password_hash_async(user_update.password)
          update_data["updated_at"] = datetime.now()
 
          if not update_data:
@@ -128,6 +156,7 @@ class UserService:
              {"_id": obj_id},
              {"$set": update_data}
          )
+         invalidate_cached_user(user_id)
 
          if result.matched_count == 0:
              return None
@@ -136,6 +165,26 @@ class UserService:
          return self._map_user_in_db_to_user(updated_user_in_db)
 
 
+    async def deactivate_user(self, user_id: str) -> Optional[User]:
+        """Désactive un utilisateur dans MongoDB (ses tokens sont refusés dès la requête suivante)."""
+        collection = self._get_collection()
+        try:
+            obj_id = ObjectId(user_id)
+        except InvalidId:
+            return None
+
+        result = await collection.update_one(
+            {"_id": obj_id},
+            {"$set": {"is_active": False, "updated_at": datetime.now()}}
+        )
+        invalidate_cached_user(user_id)
+
+        if result.matched_count == 0:
+            return None
+
+        updated_user_in_db = await self.get_user_by_id(user_id)
+        return self._map_user_in_db_to_user(updated_user_in_db)
+
     async def add_favorite(self, user_id: str, model_id: str) -> Optional[User]:
         """Ajoute un modèle aux favoris dans MongoDB."""
         collection = self._get_collection()
@@ -149,6 +198,7 @@ class UserService:
             {"_id": obj_id},
             {"$addToSet": {"favorites": model_id}, "$set": {"updated_at": datetime.now()}}
         )
+        invalidate_cached_user(user_id)
 
         if result.matched_count == 0:
             return None
@@ -168,6 +218,7 @@ class UserService:
             {"_id": obj_id},
             {"$pull": {"favorites": model_id}, "$set": {"updated_at": datetime.now()}}
         )
+        invalidate_cached_user(user_id)
 
         if result.matched_count == 0:
             return None
@@ -222,6 +273,7 @@ class UserService:
              {"$push": {"search_history": {"$each": [search_entry], "$slice": -20}}, # Garde les 20 derniers
               "$set": {"updated_at": datetime.now()}}
          )
+         invalidate_cached_user(user_id)
          # Pas besoin de retourner l'utilisateur ici généralement
 
     async def clear_search_history(self, user_id: str) -> Optional[User]:
@@ -236,6 +288,7 @@ class UserService:
             {"_id": obj_id},
             {"$set": {"search_history": [], "updated_at": datetime.now()}}
         )
+        invalidate_cached_user(user_id)
 
         if result.matched_count == 0:
             return None
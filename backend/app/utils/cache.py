@@ -0,0 +1,110 @@
+# backend/app/utils/cache.py
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading
+import time
+
+
+class TTLCache:
+    """Cache en mémoire borné (LRU) avec expiration des entrées (TTL).
+
+    Propre à chaque processus. Les compteurs (hits, misses, évictions) sont exposés par
+    stats(). Les accès sont protégés par un verrou : le cache peut être partagé avec des
+    threads (asyncio.to_thread, pools d'exécution).
+
+    ``generation`` augmente à chaque invalidation (pop, invalidate_where, clear) : une valeur
+    lue à la source avant une invalidation n'est pas remise en cache (cf. set_if_generation).
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # clé -> (expiration, valeur)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur associée à key, ou default si absente ou expirée."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key) # Entrée la plus récemment utilisée
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Ajoute ou remplace une entrée, en évinçant la moins récemment utilisée si besoin."""
+        with self._lock:
+            self._store(key, value)
+
+    def set_if_generation(self, key: Hashable, value: Any, generation: int) -> bool:
+        """Ajoute l'entrée si aucune invalidation n'a eu lieu depuis la lecture de ``generation``.
+
+        À utiliser pour une valeur lue à la source (base de données) après avoir relevé
+        self.generation : si une invalidation est survenue pendant la lecture, la valeur est
+        peut-être déjà périmée et n'est pas mise en cache. Retourne True si l'entrée est ajoutée.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._store(key, value)
+            return True
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        # Appelé sous self._lock
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Supprime une entrée (invalidation explicite) et retourne sa valeur si elle existait."""
+        with self._lock:
+            self.generation += 1
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Supprime les entrées pour lesquelles predicate(clé, valeur) est vrai. Retourne leur nombre."""
+        with self._lock:
+            self.generation += 1
+            keys = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Vide le cache (les compteurs sont conservés)."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques d'utilisation du cache."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
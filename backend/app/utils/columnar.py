@@ -0,0 +1,140 @@
+# backend/app/utils/columnar.py
+
+"""Écriture des exports en colonnes typées : Parquet et Arrow IPC (format fichier).
+
+pyarrow est une dépendance optionnelle : sans elle, PYARROW_INSTALLED vaut False et ces
+formats ne sont pas proposés. Les modèles sont écrits lot par lot (lots du curseur MongoDB) :
+seul le lot courant (ou, en Parquet, le groupe de lignes en cours) est en mémoire.
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_INSTALLED = True
+except ImportError:
+    PYARROW_INSTALLED = False
+
+# Formats proposés
+COLUMNAR_FORMATS = ("parquet", "arrow")
+# Colonnes exportées : (champ, type) ; toutes les colonnes acceptent des valeurs nulles
+COLUMNAR_FIELDS = [
+    ("id", "string"),
+    ("model_name", "string"),
+    ("architecture", "string"),
+    ("model_type", "string"),
+    ("parameters_billions", "float64"),
+    ("training_co2_kg", "float64"),
+    ("overall_score", "float64"),
+    ("mmlu_score", "float64"),
+    ("bbh_score", "float64"),
+    ("math_score", "float64"),
+    ("date_submitted", "timestamp[ms]"),
+    ("training_energy_mwh", "float64"),
+    ("reported_co2_tons", "float64"),
+    ("cloud_provider", "string"),
+    ("water_use_million_liters", "float64"),
+]
+# Lignes par groupe de lignes Parquet (les lots du curseur sont regroupés jusqu'à cette taille)
+PARQUET_ROW_GROUP_SIZE = 65536
+
+
+def export_schema() -> "pa.Schema":
+    """Schéma Arrow des exports (cf. COLUMNAR_FIELDS)."""
+    types = {"string": pa.string(), "float64": pa.float64(), "timestamp[ms]": pa.timestamp("ms")}
+    return pa.schema([pa.field(name, types[kind]) for name, kind in COLUMNAR_FIELDS])
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    """Date de soumission (datetime, date ou chaîne ISO) ; None si absente ou illisible."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+def models_to_record_batch(models: List[Dict[str, Any]], schema: "pa.Schema") -> "pa.RecordBatch":
+    """Convertit un lot de modèles (cf. export_service._map_export_doc) en RecordBatch typé."""
+    columns = []
+    for field in schema:
+        values = [model.get(field.name) for model in models]
+        if field.name == "date_submitted":
+            values = [_to_datetime(value) for value in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class ColumnarWriter:
+    """Écrit des lots de modèles dans un fichier Parquet ou Arrow IPC.
+
+    Le fichier est écrit sous un nom temporaire puis renommé par close() (pas de fichier
+    partiel) ; abort() supprime le fichier temporaire. ``compression`` : codec pyarrow
+    ("zstd", "lz4", ...) ou None.
+    """
+
+    def __init__(self, file_path: str, fmt: str, compression: Optional[str] = None):
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Format en colonnes inconnu : {fmt}")
+        self.file_path = file_path
+        self.fmt = fmt
+        self.schema = export_schema()
+        self.rows = 0
+        self._tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        self._pending: List["pa.RecordBatch"] = []
+        self._pending_rows = 0
+        self._sink = None
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(self._tmp_path, self.schema, compression=compression or "none")
+        else:
+            self._sink = pa.OSFile(self._tmp_path, "wb")
+            self._writer = pa.ipc.new_file(
+                self._sink, self.schema, options=pa.ipc.IpcWriteOptions(compression=compression)
+            )
+
+    def write(self, models: List[Dict[str, Any]]) -> None:
+        """Ajoute un lot de modèles."""
+        if not models:
+            return
+        batch = models_to_record_batch(models, self.schema)
+        self.rows += batch.num_rows
+        if self.fmt == "arrow":
+            self._writer.write_batch(batch)
+            return
+        # Parquet : un groupe de lignes par PARQUET_ROW_GROUP_SIZE lignes, pas par lot du curseur
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._writer.write_table(pa.Table.from_batches(self._pending, schema=self.schema))
+            self._pending = []
+            self._pending_rows = 0
+
+    def close(self) -> None:
+        """Termine le fichier et le renomme à son emplacement final."""
+        self._flush()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        os.replace(self._tmp_path, self.file_path)
+
+    def abort(self) -> None:
+        """Abandonne l'écriture (fichier temporaire supprimé)."""
+        try:
+            self._writer.close()
+            if self._sink is not None:
+                self._sink.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
@@ -0,0 +1,120 @@
+# backend/app/utils/http_files.py
+
+"""Envoi de fichiers HTTP : requêtes Range (reprise des téléchargements) et envoi zero-copy."""
+
+from typing import Optional, Tuple
+from email.utils import formatdate
+import os
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+# Extension ASGI d'envoi de fichier par le serveur (sendfile), si celui-ci la propose
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Indique si l'en-tête Accept-Encoding autorise ``encoding`` (q > 0, "*" accepté)."""
+    if not accept_encoding:
+        return False
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    quality = accepted.get(encoding, accepted.get("*", 0.0))
+    return quality > 0
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Intervalle d'octets demandé (début, fin inclus) pour un fichier de ``size`` octets.
+
+    Retourne None si l'en-tête est absent, mal formé ou demande plusieurs intervalles (le
+    fichier complet est alors envoyé) ; lève ValueError si l'intervalle est hors du fichier.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+    start, sep, end = spec.partition("-")
+    if not sep or not (start or end) or not all(part.isdigit() for part in (start, end) if part):
+        return None
+    if not start:
+        # "bytes=-N" : les N derniers octets
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError("Intervalle vide")
+        return max(size - length, 0), size - 1
+    start, end = int(start), int(end) if end else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise ValueError("Intervalle hors du fichier")
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse acceptant les requêtes Range (un intervalle) et l'envoi zero-copy.
+
+    Les en-têtes Range / If-Range sont lus dans la requête : réponse 206 pour un intervalle
+    valide (If-Range respecté), 416 s'il est hors du fichier, 200 sinon. Si le serveur ASGI
+    propose l'extension "http.response.zerocopysend", le contenu est envoyé par sendfile ;
+    sinon il est lu par blocs.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stat_result = self.stat_result or await anyio.to_thread.run_sync(os.stat, self.path)
+        if self.stat_result is None:
+            self.set_stat_headers(stat_result)
+        size = stat_result.st_size
+        self.headers["accept-ranges"] = "bytes"
+
+        request_headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        byte_range = None
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range in (self.headers["etag"], formatdate(stat_result.st_mtime, usegmt=True)):
+            try:
+                byte_range = parse_range(request_headers.get("range"), size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+
+        start, end = byte_range if byte_range else (0, size - 1)
+        length = end - start + 1 if size else 0
+        if byte_range:
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(length)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or not length:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({"type": ZEROCOPY_EXTENSION, "file": file, "offset": start, "count": length, "more_body": False})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                remaining = length
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,183 @@
+# backend/app/utils/pdf_report.py
+
+"""Rendu des rapports PDF (fpdf2) et de leurs graphiques (matplotlib).
+
+Ces fonctions sont exécutées dans un pool de processus (cf. ExportService) : elles ne
+dépendent que de leurs arguments (données simples, sérialisables) et n'importent rien de
+l'application.
+"""
+
+from typing import Any, Dict, List
+import io
+
+# Remplacements typographiques avant conversion en latin-1 (polices de base de fpdf2)
+_LATIN1_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-",
+    "…": "...", " ": " ", " ": " ", "œ": "oe", "Œ": "OE", "€": "EUR",
+    "₂": "2", "≤": "<=", "≥": ">=",
+})
+# Nombre maximal de modèles affichés dans le graphique des émissions
+CHART_MAX_MODELS = 25
+
+
+def latin1(text: Any) -> str:
+    """Texte affichable avec les polices de base (latin-1) : caractères hors latin-1 retirés (emoji...)."""
+    text = "" if text is None else str(text)
+    text = text.translate(_LATIN1_REPLACEMENTS)
+    return " ".join("".join(c for c in text if ord(c) < 256).split())
+
+
+def render_charts(names: List[str], co2: List[float], scores: List[float]) -> Dict[str, bytes]:
+    """Graphiques du rapport (PNG) : émissions par modèle et score global en fonction du CO2."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    charts = {}
+    order = sorted(range(len(names)), key=lambda i: co2[i], reverse=True)[:CHART_MAX_MODELS][::-1]
+    fig, ax = plt.subplots(figsize=(8, max(2.5, 0.28 * len(order) + 1)), dpi=110)
+    ax.barh([latin1(names[i])[:40] for i in order], [co2[i] for i in order], color="#2e7d32")
+    ax.set_xlabel("Émissions CO2 d'entraînement (kg)")
+    ax.set_title("Émissions par modèle" + (f" ({CHART_MAX_MODELS} plus émetteurs)" if len(names) > CHART_MAX_MODELS else ""))
+    ax.tick_params(axis="y", labelsize=7)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    charts["co2"] = buffer.getvalue()
+
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=110)
+    ax.scatter(co2, scores, s=18, color="#1565c0", alpha=0.8)
+    if any(value > 0 for value in co2):
+        ax.set_xscale("log")
+    ax.set_xlabel("Émissions CO2 d'entraînement (kg)")
+    ax.set_ylabel("Score global")
+    ax.set_title("Performance et émissions")
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    charts["efficiency"] = buffer.getvalue()
+    return charts
+
+
+def _table(pdf: Any, headers: List[str], rows: List[List[Any]], widths: List[float]) -> None:
+    """Tableau simple (en-tête répété à chaque page)."""
+    from fpdf.enums import XPos, YPos
+
+    def header() -> None:
+        pdf.set_font("helvetica", "B", 8)
+        pdf.set_fill_color(230, 240, 230)
+        for text, width in zip(headers, widths):
+            pdf.cell(width, 6, latin1(text), border=1, fill=True)
+        pdf.ln(6)
+        pdf.set_font("helvetica", "", 8)
+
+    header()
+    for row in rows:
+        if pdf.will_page_break(6):
+            pdf.add_page()
+            header()
+        for value, width in zip(row, widths):
+            text = latin1(value)
+            # Texte tronqué à la largeur de la colonne
+            while text and pdf.get_string_width(text) > width - 2:
+                text = text[:-1]
+            pdf.cell(width, 6, text, border=1)
+        pdf.cell(0, 6, "", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+def _format_number(value: Any, digits: int = 2) -> str:
+    return "" if value is None else f"{value:,.{digits}f}".replace(",", " ")
+
+
+def render_pdf_report(file_path: str, report: Dict[str, Any], charts: Dict[str, bytes]) -> None:
+    """Écrit le rapport PDF comparatif.
+
+    ``report`` contient les sections préparées par ExportService : "models", et
+    optionnellement "simulations" et "recommendations" ; ``charts`` les PNG de render_charts.
+    """
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+
+    pdf = FPDF(orientation="P", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_title("Rapport comparatif CarbonScope AI")
+    pdf.add_page()
+
+    def title(text: str) -> None:
+        pdf.set_font("helvetica", "B", 13)
+        pdf.cell(0, 9, latin1(text), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.set_font("helvetica", "", 9)
+
+    def paragraph(text: str) -> None:
+        pdf.set_font("helvetica", "", 9)
+        pdf.multi_cell(0, 5, latin1(text), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.set_font("helvetica", "B", 18)
+    pdf.cell(0, 12, "Rapport comparatif CarbonScope AI", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    paragraph(f"Date de génération : {report['generated_at']} - version des données : {report['data_version']}")
+    pdf.ln(3)
+
+    models = report["models"]
+    title(f"Modèles comparés ({len(models)})")
+    _table(
+        pdf,
+        ["Modèle", "Architecture", "Type", "Param. (Md)", "CO2 (kg)", "Score", "Score/kg CO2"],
+        [[m["model_name"], m["architecture"], m["model_type"], _format_number(m["parameters_billions"], 1),
+          _format_number(m["training_co2_kg"]), _format_number(m["overall_score"]), _format_number(m["efficiency"], 4)]
+         for m in models],
+        [48, 30, 30, 18, 22, 14, 24],
+    )
+    pdf.ln(4)
+
+    title("Comparaison environnementale")
+    for chart in ("co2", "efficiency"):
+        if chart in charts:
+            if pdf.will_page_break(90):
+                pdf.add_page()
+            pdf.image(io.BytesIO(charts[chart]), w=175)
+            pdf.ln(2)
+
+    simulations = report.get("simulations")
+    if simulations:
+        pdf.add_page()
+        title("Simulations d'impact")
+        paragraph(
+            f"Émissions d'inférence (kg CO2) pour {simulations['frequency_per_day']} inférences par jour "
+            f"pendant {simulations['duration_days']} jours, selon la région d'hébergement."
+        )
+        regions = simulations["regions"]
+        region_width = min(25.0, 130.0 / max(len(regions), 1))
+        _table(
+            pdf,
+            ["Modèle"] + [region["name"] for region in regions],
+            [[row["model_name"]] + [_format_number(value) for value in row["co2_kg"]] for row in simulations["rows"]],
+            [56] + [region_width] * len(regions),
+        )
+        pdf.ln(4)
+
+    recommendations = report.get("recommendations")
+    if recommendations is not None:
+        if pdf.will_page_break(40):
+            pdf.add_page()
+        title("Recommandations")
+        if recommendations:
+            _table(
+                pdf,
+                ["Modèle", "Alternative recommandée", "Gain CO2 (kg)", "Écart perf. (%)"],
+                [[r["model_name"], r["recommended_model_name"], _format_number(r["co2_savings_kg"]),
+                  _format_number(r["performance_difference_percent"], 1)] for r in recommendations],
+                [58, 58, 34, 36],
+            )
+        else:
+            paragraph("Aucune alternative plus sobre (même architecture, taille comparable) n'a été trouvée.")
+        pdf.ln(4)
+
+    title("Conclusion")
+    paragraph(
+        "Ce rapport a été généré par CarbonScope AI, une application de visualisation de "
+        "l'empreinte carbone des modèles d'IA générative."
+    )
+    pdf.output(file_path)
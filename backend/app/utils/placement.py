@@ -0,0 +1,151 @@
+# backend/app/utils/placement.py
+
+"""Placement de charges de travail sur des régions à capacité limitée (minimisation du CO2).
+
+Problème d'affectation généralisée : chaque charge w placée dans la région r émet
+cost[w, r] et consomme energy[w, r] de la capacité de r. La résolution exacte est NP-difficile ;
+on utilise une heuristique gloutonne par regret suivie d'améliorations locales, guidée par
+les prix d'une relaxation lagrangienne des capacités, qui fournit aussi une borne inférieure
+pour mesurer l'écart à l'optimum.
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+
+# Tolérance sur les capacités (arrondis des sommes d'énergie)
+CAPACITY_TOLERANCE = 1e-9
+# Nombre maximal de passes d'amélioration locale
+MAX_IMPROVEMENT_PASSES = 5
+# Itérations du sous-gradient de la relaxation lagrangienne
+LAGRANGIAN_ITERATIONS = 200
+
+
+def lagrangian_bound(cost: np.ndarray, energy: np.ndarray, capacity: np.ndarray,
+                     upper_bound: float, iterations: int = LAGRANGIAN_ITERATIONS) -> Tuple[float, np.ndarray]:
+    """Borne inférieure du CO2 total par relaxation lagrangienne des capacités.
+
+    Pour des prix λ >= 0 (CO2 par kWh de capacité), L(λ) = Σ_w min_r (cost + λ·energy)
+    - Σ_r λ_r·capacité_r est une borne inférieure de l'optimum. λ est ajusté par sous-gradient
+    (pas de Polyak, à partir de ``upper_bound``). Retourne (meilleure borne, prix associés).
+    Les charges sans région autorisée sont ignorées.
+    """
+    rows = np.isfinite(cost).any(axis=1)
+    cost, energy = cost[rows], energy[rows]
+    limited = np.isfinite(capacity)
+    finite_capacity = np.where(limited, capacity, 0.0)
+    prices = np.zeros(cost.shape[1], dtype=np.float64)
+    best_bound, best_prices = -np.inf, prices.copy()
+    if cost.shape[0] == 0:
+        return 0.0, best_prices
+
+    theta, stalled = 2.0, 0
+    row_index = np.arange(cost.shape[0])
+    for _ in range(iterations):
+        reduced = cost + prices * energy
+        choice = reduced.argmin(axis=1)
+        bound = float(reduced[row_index, choice].sum() - prices @ finite_capacity)
+        if bound > best_bound + CAPACITY_TOLERANCE:
+            best_bound, best_prices, stalled = bound, prices.copy(), 0
+        else:
+            stalled += 1
+            if stalled >= 10:
+                theta, stalled = theta / 2, 0
+        used = np.bincount(choice, weights=energy[row_index, choice], minlength=cost.shape[1])
+        gradient = np.where(limited, used - finite_capacity, 0.0)
+        # Prix nuls et capacité non saturée : pas de mouvement possible sur cette région
+        gradient[(prices <= 0) & (gradient < 0)] = 0.0
+        norm = float(gradient @ gradient)
+        if norm == 0.0 or theta < 1e-4:
+            break # Relaxation réalisable (optimale) ou pas négligeable
+        prices = np.maximum(0.0, prices + theta * max(upper_bound - bound, 0.0) / norm * gradient)
+    return max(best_bound, 0.0), best_prices
+
+
+def _greedy(cost: np.ndarray, energy: np.ndarray, capacity: np.ndarray,
+            ranking: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Glouton par regret sur ``ranking`` (coût utilisé pour ordonner les choix), puis amélioration."""
+    n_workloads, n_regions = cost.shape
+    assignment = np.full(n_workloads, -1, dtype=np.int64)
+    remaining = capacity.copy()
+
+    # Régions de chaque charge, de la moins à la plus coûteuse selon ranking
+    preferences = np.argsort(ranking, axis=1, kind="stable")
+    rows = np.arange(n_workloads)
+    first = ranking[rows, preferences[:, 0]]
+    second = ranking[rows, preferences[:, 1]] if n_regions > 1 else np.full(n_workloads, np.inf)
+    with np.errstate(invalid="ignore"):
+        regret = np.where(np.isinf(second), np.inf, second - first)
+    # Regret décroissant, puis énergie décroissante (les grosses charges d'abord)
+    order = np.lexsort((-energy[rows, preferences[:, 0]], -regret))
+
+    for w in order:
+        for r in preferences[w]:
+            if np.isinf(cost[w, r]):
+                break
+            if remaining[r] + CAPACITY_TOLERANCE >= energy[w, r]:
+                assignment[w] = r
+                remaining[r] -= energy[w, r]
+                break
+
+    # Amélioration locale sur le coût réel : déplacements vers une région moins émettrice
+    # disposant de la capacité (les charges non placées sont retentées)
+    preferences = np.argsort(cost, axis=1, kind="stable")
+    best_cost = cost[rows, preferences[:, 0]]
+    for _ in range(MAX_IMPROVEMENT_PASSES):
+        moved = False
+        current_cost = np.where(assignment >= 0, cost[rows, np.maximum(assignment, 0)], np.inf)
+        # Charges les plus éloignées de leur meilleure région en premier
+        for w in np.argsort(best_cost - current_cost, kind="stable"):
+            current = assignment[w]
+            for r in preferences[w]:
+                if cost[w, r] >= current_cost[w]:
+                    break
+                if remaining[r] + CAPACITY_TOLERANCE >= energy[w, r]:
+                    if current >= 0:
+                        remaining[current] += energy[w, current]
+                    remaining[r] -= energy[w, r]
+                    assignment[w] = r
+                    moved = True
+                    break
+        if not moved:
+            break
+    return assignment, remaining
+
+
+def _total_cost(cost: np.ndarray, assignment: np.ndarray) -> Tuple[int, float]:
+    placed = np.flatnonzero(assignment >= 0)
+    return placed.size, float(cost[placed, assignment[placed]].sum())
+
+
+def place_workloads(cost: np.ndarray, energy: np.ndarray,
+                    capacity: np.ndarray) -> Tuple[np.ndarray, Optional[float]]:
+    """Affecte chaque charge à une région en respectant les capacités.
+
+    ``cost`` et ``energy`` sont des tableaux (charges, régions), ``cost`` valant inf pour une
+    région non autorisée ; ``capacity`` (régions,) vaut inf pour une région sans limite.
+    Retourne (région de chaque charge, -1 si non placée ; borne inférieure du CO2 total,
+    None si certaines charges n'ont pas pu être placées).
+
+    Deux gloutons sont évalués : sur le coût réel, puis sur le coût réduit par les prix
+    lagrangiens des capacités (cost + λ·energy), qui anticipe les régions saturées. Le
+    meilleur placement (plus de charges placées, puis moins de CO2) est retenu.
+    """
+    n_workloads, n_regions = cost.shape
+    capacity = np.asarray(capacity, dtype=np.float64)
+    if n_workloads == 0 or n_regions == 0:
+        return np.full(n_workloads, -1, dtype=np.int64), 0.0
+
+    assignment, _ = _greedy(cost, energy, capacity, cost)
+    placed_count, total = _total_cost(cost, assignment)
+    # Borne supérieure pour le pas du sous-gradient : placement glouton, ou pire cas
+    upper_bound = total if placed_count == n_workloads \
+        else float(np.where(np.isfinite(cost), cost, 0.0).max(axis=1).sum())
+    bound, prices = lagrangian_bound(cost, energy, capacity, upper_bound)
+
+    if prices.any():
+        priced_assignment, _ = _greedy(cost, energy, capacity, cost + prices * energy)
+        priced_count, priced_total = _total_cost(cost, priced_assignment)
+        if (priced_count, -priced_total) > (placed_count, -total):
+            assignment, placed_count, total = priced_assignment, priced_count, priced_total
+
+    return assignment, (min(bound, total) if placed_count == n_workloads else None)
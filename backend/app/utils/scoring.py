@@ -0,0 +1,187 @@
+# backend/app/utils/scoring.py
+
+"""Calculs vectorisés (NumPy) du score carbone.
+
+Reprend exactement les formules de scripts/calculate_scores.py (rang percentile avec
+demi-rang pour les égalités, somme pondérée, seuils de CARBON_CATEGORIES) sur des
+tableaux entiers au lieu de boucles Python par modèle.
+"""
+
+from typing import List, Tuple
+import numpy as np
+
+from app.core.constants import CARBON_CATEGORIES, SCORE_WEIGHTS
+
+# Seuils des catégories triés par score minimal croissant, et libellés correspondants
+_SORTED_CATEGORIES = sorted(CARBON_CATEGORIES.items(), key=lambda x: x[1]["min_score"])
+CATEGORY_THRESHOLDS = np.array([cat_data["min_score"] for _, cat_data in _SORTED_CATEGORIES], dtype=np.float64)
+CATEGORY_LABELS: List[str] = [cat for cat, _ in _SORTED_CATEGORIES]
+# Ordre d'affichage (meilleure catégorie en premier) : A+, A, B, ..., F
+CATEGORY_ORDER: List[str] = CATEGORY_LABELS[::-1]
+
+# Ordre des métriques dans les matrices de rangs (n_modèles, 3)
+METRICS: Tuple[str, str, str] = ("co2", "co2_per_param", "co2_per_score")
+
+
+def default_weights() -> np.ndarray:
+    """Retourne les pondérations actuelles sous forme de vecteur (co2, co2/param, co2/score)."""
+    return np.array([SCORE_WEIGHTS[metric] for metric in METRICS], dtype=np.float64)
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Calcule le rang percentile (0-100, 100 = meilleur = plus petite valeur) de chaque valeur.
+
+    Équivalent vectorisé de calculate_percentile_rank : O(n log n) au lieu de O(n²).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+    sorted_values = np.sort(values)
+    better_count = np.searchsorted(sorted_values, values, side="left")
+    equal_count = np.searchsorted(sorted_values, values, side="right") - better_count
+    rank = better_count + (equal_count / 2.0)
+    return 100.0 - (rank / n) * 100
+
+
+def weighted_scores(rank_co2: np.ndarray, rank_co2_param: np.ndarray, rank_co2_score: np.ndarray,
+                    weights: np.ndarray = None) -> np.ndarray:
+    """Combine les trois rangs percentiles en score final borné entre 0 et 100."""
+    if weights is None:
+        weights = default_weights()
+    scores = (weights[0] * rank_co2) + (weights[1] * rank_co2_param) + (weights[2] * rank_co2_score)
+    return np.clip(scores, 0, 100)
+
+
+def category_indices(scores: np.ndarray) -> np.ndarray:
+    """Retourne l'indice (dans CATEGORY_LABELS) de la catégorie de chaque score."""
+    indices = np.searchsorted(CATEGORY_THRESHOLDS, scores, side="right") - 1
+    return np.clip(indices, 0, len(CATEGORY_LABELS) - 1)
+
+
+def categorize(scores: np.ndarray) -> np.ndarray:
+    """Retourne les libellés de catégorie (A+ ... F) de chaque score."""
+    return np.array(CATEGORY_LABELS, dtype=object)[category_indices(scores)]
+
+
+
+def category_switch_branches(score_field: str = "$carbon_score") -> List[dict]:
+    """Branches d'un $switch MongoDB équivalentes à category_indices (meilleure catégorie d'abord)."""
+    return [
+        {"case": {"$gte": [score_field, float(CATEGORY_THRESHOLDS[idx])]}, "then": CATEGORY_LABELS[idx]}
+        for idx in reversed(range(len(CATEGORY_LABELS)))
+    ]
+
+
+def weight_grid(step: float) -> np.ndarray:
+    """Génère toutes les pondérations (w_co2, w_co2_param, w_co2_score) multiples de step et de somme 1.
+
+    ``step`` doit diviser 1 (0.05, 0.1, 0.25, ...) : ValueError sinon, plutôt qu'une grille
+    silencieusement construite sur un autre pas.
+    """
+    if not 0 < step <= 1:
+        raise ValueError("Le pas de la grille doit être compris entre 0 (exclu) et 1")
+    divisions = int(round(1.0 / step))
+    if abs(divisions * step - 1.0) > 1e-9:
+        raise ValueError(f"Le pas de la grille doit diviser 1 (pas le plus proche : {1.0 / divisions:g})")
+    grid = [
+        (i, j, divisions - i - j)
+        for i in range(divisions + 1)
+        for j in range(divisions + 1 - i)
+    ]
+    return np.array(grid, dtype=np.float64) / divisions
+
+
+def _average_ranks(values: np.ndarray) -> np.ndarray:
+    """Rangs moyens (0..n-1) le long du dernier axe : les valeurs égales reçoivent la moyenne de leurs rangs.
+
+    Équivalent de scipy.stats.rankdata(method="average") - 1, pour un tableau 1D ou 2D.
+    """
+    one_dimensional = np.ndim(values) == 1
+    values = np.atleast_2d(values)
+    n_rows, n = values.shape
+    order = np.argsort(values, axis=-1, kind="stable")
+    sorted_values = np.take_along_axis(values, order, axis=-1)
+    # Début de chaque groupe de valeurs égales (un groupe ne traverse jamais deux lignes)
+    starts = np.ones((n_rows, n), dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    groups = np.cumsum(starts.ravel()) - 1
+    positions = np.tile(np.arange(n, dtype=np.float64), n_rows)
+    averages = np.bincount(groups, weights=positions) / np.bincount(groups)
+    ranks = np.empty((n_rows, n), dtype=np.float64)
+    np.put_along_axis(ranks, order, averages[groups].reshape(n_rows, n), axis=-1)
+    return ranks[0] if one_dimensional else ranks
+
+
+def weight_sensitivity(ranks: np.ndarray, grid: np.ndarray, baseline: np.ndarray = None,
+                       pair_samples: int = 20000, seed: int = 0, max_cells: int = 5_000_000) -> dict:
+    """Évalue une grille de pondérations sur les rangs percentiles (n_modèles, 3) en un calcul vectorisé.
+
+    Pour chaque point de la grille (g, 3) retourne :
+    - ``transitions`` (g, k, k) : nombre de modèles passant de la catégorie actuelle (ligne)
+      à la nouvelle (colonne), dans l'ordre de CATEGORY_ORDER ;
+    - ``changed`` (g,) : nombre de modèles changeant de catégorie ;
+    - ``kendall_tau`` (g,) : tau-b estimé sur ``pair_samples`` paires tirées (graine ``seed``) ;
+    - ``spearman_rho`` (g,) : corrélation de Spearman (rangs moyens pour les égalités) avec le score actuel.
+    La grille est traitée par blocs pour borner la mémoire à ``max_cells`` scores.
+    """
+    if baseline is None:
+        baseline = default_weights()
+    n_models, n_points = ranks.shape[0], grid.shape[0]
+    n_categories = len(CATEGORY_LABELS)
+
+    base_scores = weighted_scores(ranks[:, 0], ranks[:, 1], ranks[:, 2], baseline)
+    base_categories = category_indices(base_scores)
+    base_average = _average_ranks(base_scores)
+    base_centered = base_average - base_average.mean()
+
+    # Paires tirées une fois pour toute la grille (estimation du tau de Kendall)
+    rng = np.random.default_rng(seed)
+    if n_models > 1:
+        first = rng.integers(0, n_models, pair_samples)
+        second = rng.integers(0, n_models - 1, pair_samples)
+        second = second + (second >= first) # paires de modèles distincts
+        base_signs = np.sign(base_scores[first] - base_scores[second])
+    else:
+        first = second = np.zeros(0, dtype=np.int64)
+        base_signs = np.zeros(0)
+
+    transitions = np.zeros((n_points, n_categories, n_categories), dtype=np.int64)
+    changed = np.zeros(n_points, dtype=np.int64)
+    kendall_tau = np.ones(n_points, dtype=np.float64)
+    spearman_rho = np.ones(n_points, dtype=np.float64)
+
+    chunk_size = max(1, max_cells // max(n_models, 1))
+    for start in range(0, n_points, chunk_size):
+        stop = min(start + chunk_size, n_points)
+        chunk = grid[start:stop]
+        scores = np.clip(chunk @ ranks.T, 0, 100) # (bloc, n_modèles)
+        categories = category_indices(scores)
+
+        # Matrices de transition : un seul bincount pour tout le bloc
+        rows = np.arange(stop - start)[:, None]
+        flat = (rows * n_categories + base_categories[None, :]) * n_categories + categories
+        counts = np.bincount(flat.ravel(), minlength=(stop - start) * n_categories * n_categories)
+        transitions[start:stop] = counts.reshape(stop - start, n_categories, n_categories)
+        changed[start:stop] = (categories != base_categories[None, :]).sum(axis=1)
+
+        if len(base_signs):
+            signs = np.sign(scores[:, first] - scores[:, second])
+            denominator = np.sqrt((base_signs ** 2).sum() * (signs ** 2).sum(axis=1))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                kendall_tau[start:stop] = np.where(denominator > 0, (signs * base_signs).sum(axis=1) / denominator, 1.0)
+
+        average = _average_ranks(scores)
+        centered = average - average.mean(axis=1, keepdims=True)
+        denominator = np.sqrt((base_centered ** 2).sum() * (centered ** 2).sum(axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            spearman_rho[start:stop] = np.where(denominator > 0, (centered @ base_centered) / denominator, 1.0)
+
+    # Présentation dans l'ordre A+ ... F
+    transitions = transitions[:, ::-1, ::-1]
+    return {
+        "transitions": transitions,
+        "changed": changed,
+        "kendall_tau": kendall_tau,
+        "spearman_rho": spearman_rho,
+    }
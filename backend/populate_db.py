@@ -8,6 +8,7 @@ import json
 # Si vous lancez depuis le dossier 'backend', ces imports devraient fonctionner.
 from app.core.database import connect_to_mongo, close_mongo_connection, get_database
 from app.core.config import settings
+from app.services.catalog_service import bump_catalog_version
 
 # Nom de la collection cible
 COLLECTION_NAME = "ai_models"
@@ -89,6 +90,7 @@ async def populate():
         print(f"Insertion de {len(models_to_insert)} modèles dans MongoDB...")
         try:
             result = await collection.insert_many(models_to_insert)
+            await bump_catalog_version(db) # Snapshots et exports en cache des serveurs périmés
             print(f"Insertion réussie. {len(result.inserted_ids)} documents ajoutés.")
         except Exception as e:
             print(f"ERREUR lors de l'insertion dans MongoDB : {e}")
@@ -0,0 +1,157 @@
+# backend/scripts/benchmark_auth.py
+
+"""Benchmark de la latence des lectures du catalogue pendant une vague de connexions (bcrypt).
+
+Usage (depuis le dossier 'backend'):
+    python -m scripts.benchmark_auth --logins 64
+
+Sans serveur : dans une même boucle d'événements, une vague de connexions (vérifications
+bcrypt, --concurrency simultanées) est lancée pendant que des lectures du catalogue (tri
+d'un snapshot synthétique en mémoire, comme les lectures servies par CatalogService) sont
+mesurées en continu. Modes comparés :
+  - "baseline" : lectures seules ;
+  - "inline" : bcrypt exécuté dans la boucle d'événements (comportement d'avant) ;
+  - "pool" : bcrypt exécuté dans password_hashing_pool (AUTH_PASSWORD_HASH_WORKERS threads).
+
+Objectif documenté : en mode "pool", latence p95 des lectures de quelques dizaines de ms au
+plus (même ordre que "baseline"), alors qu'en mode "inline" chaque lecture attend la fin d'un
+ou plusieurs hachages (plusieurs centaines de ms à quelques secondes selon la machine). La
+ligne "pool" finale donne l'attente dans la file du pool (cf. /auth/password-hashing/stats).
+
+Avec --url, la vague vise un serveur lancé (POST /auth/login, utilisateur de benchmark créé
+au besoin) et les lectures sont des GET /models/ :
+    python -m scripts.benchmark_auth --url http://localhost:8000 --logins 64
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_password, verify_password_async, password_hashing_pool
+
+# Intervalle entre deux lectures d'une même sonde (secondes)
+PROBE_INTERVAL_SECONDS = 0.01
+# Sondes de lecture simultanées
+PROBES = 4
+BENCHMARK_EMAIL = "benchmark-auth@carbonscope.local"
+BENCHMARK_PASSWORD = "benchmark-auth-password"
+
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies) * 1000
+    if not len(values):
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {"count": len(values), "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+
+
+async def _measure(read: Callable[[], Awaitable[None]], storm: Callable[[], Awaitable[None]]) -> Dict[str, float]:
+    """Mesure la latence des lectures lancées toutes les PROBE_INTERVAL_SECONDS pendant storm()."""
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        # Latence = retard de la lecture sur l'instant prévu (boucle bloquée comprise)
+        while not done.is_set():
+            scheduled = time.perf_counter() + PROBE_INTERVAL_SECONDS
+            await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+            await read()
+            latencies.append(time.perf_counter() - scheduled)
+
+    probes = [asyncio.create_task(probe()) for _ in range(PROBES)]
+    started = time.perf_counter()
+    await storm()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*probes)
+    return {**_summary(latencies), "storm_seconds": elapsed}
+
+
+async def _bounded(tasks: int, concurrency: int, func: Callable[[], Awaitable[None]]) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await func()
+
+    await asyncio.gather(*(one() for _ in range(tasks)))
+
+
+async def _benchmark_local(logins: int, concurrency: int) -> None:
+    rng = np.random.default_rng(42)
+    catalog_scores = rng.uniform(0, 100, 50_000) # Snapshot synthétique (scores du catalogue)
+    hashed = get_password_hash(BENCHMARK_PASSWORD)
+
+    async def read() -> None:
+        await asyncio.sleep(0) # Passage par la boucle, comme une requête
+        np.argpartition(catalog_scores, 20)[:20]
+
+    async def login_inline() -> None:
+        await asyncio.sleep(0)
+        verify_password(BENCHMARK_PASSWORD, hashed)
+
+    async def login_pool() -> None:
+        await verify_password_async(BENCHMARK_PASSWORD, hashed)
+
+    modes = {
+        "baseline": lambda: asyncio.sleep(1.0),
+        "inline": lambda: _bounded(logins, concurrency, login_inline),
+        "pool": lambda: _bounded(logins, concurrency, login_pool),
+    }
+    for mode, storm in modes.items():
+        _print(mode, await _measure(read, storm), logins if mode != "baseline" else 0)
+    stats = password_hashing_pool.stats()
+    print(f"  pool : {stats['workers']} threads, attente dans la file p50 {stats['queue_wait_p50_ms']:.0f} ms, "
+          f"p95 {stats['queue_wait_p95_ms']:.0f} ms, durée moyenne d'un hachage {stats['run_avg_ms']:.0f} ms")
+
+
+async def _benchmark_server(url: str, logins: int, concurrency: int) -> None:
+    import httpx
+
+    api = f"{url.rstrip('/')}{settings.API_V1_STR}"
+    async with httpx.AsyncClient(timeout=60) as client:
+        # Utilisateur de benchmark (400 s'il existe déjà)
+        await client.post(f"{api}/auth/register", json={
+            "email": BENCHMARK_EMAIL, "username": "benchmark-auth", "password": BENCHMARK_PASSWORD
+        })
+
+        async def read() -> None:
+            response = await client.get(f"{api}/models/", params={"limit": 20})
+            response.raise_for_status()
+
+        async def login() -> None:
+            response = await client.post(f"{api}/auth/login", data={
+                "username": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD
+            })
+            response.raise_for_status()
+
+        _print("baseline", await _measure(read, lambda: asyncio.sleep(1.0)), 0)
+        _print("logins", await _measure(read, lambda: _bounded(logins, concurrency, login)), logins)
+
+
+def _print(mode: str, result: Dict[str, float], logins: int) -> None:
+    rate = f"{logins / result['storm_seconds']:7.1f} connexions/s" if logins else " " * 20
+    print(f"  {mode:<9} {rate}   lectures : {result['count']:5d}   p50 {result['p50']:8.1f} ms   "
+          f"p95 {result['p95']:8.1f} ms   max {result['max']:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latence des lectures du catalogue pendant une vague de connexions.")
+    parser.add_argument("--logins", type=int, default=64, help="Nombre de connexions de la vague")
+    parser.add_argument("--concurrency", type=int, default=16, help="Connexions simultanées")
+    parser.add_argument("--url", help="URL d'un serveur lancé (sinon : mesure dans le processus)")
+    args = parser.parse_args()
+
+    print(f"Vague de {args.logins} connexions ({args.concurrency} simultanées)")
+    if args.url:
+        asyncio.run(_benchmark_server(args.url, args.logins, args.concurrency))
+    else:
+        asyncio.run(_benchmark_local(args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# backend/scripts/benchmark_scoring.py
+
+"""Benchmark mémoire/temps des moteurs de calcul des scores carbone.
+
+Usage (depuis le dossier 'backend'):
+    python -m scripts.benchmark_scoring --models 1000000
+
+Chaque moteur est exécuté dans un processus séparé sur un catalogue synthétique
+(sans MongoDB : les lots du curseur sont simulés et les opérations UpdateOne sont
+construites puis jetées), et le pic de mémoire résidente (ru_maxrss) est relevé.
+
+Objectif documenté pour le moteur "streaming" : pic RSS < 250 Mo pour 1 million de
+modèles (mesuré ~170 Mo, contre ~1,5 Go pour la représentation du moteur "python").
+
+Avec --mongo, les moteurs de scripts/calculate_scores.py sont exécutés contre une
+base MongoDB de travail ("<DATABASE_NAME>_benchmark", supprimée à la fin) :
+    python -m scripts.benchmark_scoring --mongo --models 20000
+Les durées sont comparées et la parité des résultats (score et catégorie de chaque
+modèle) est vérifiée par rapport au premier moteur ; le script échoue en cas d'écart.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Dict, Iterator, List
+
+import numpy as np
+from bson import ObjectId
+
+from app.utils.scoring import percentile_ranks, weighted_scores, category_indices, CATEGORY_LABELS
+
+# Cible de pic RSS (Mo) pour le moteur streaming à 1 million de modèles
+STREAMING_PEAK_RSS_TARGET_MB = 250
+
+
+def _peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus courant, en Mo."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS et en kilo-octets sous Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _synthetic_batches(n_models: int, batch_size: int, seed: int = 42) -> Iterator[List[Dict]]:
+    """Simule les lots d'un curseur MongoDB (documents projetés)."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_models, batch_size):
+        size = min(batch_size, n_models - start)
+        co2 = rng.lognormal(0.0, 1.5, size)
+        params = rng.choice([0.5, 1.5, 3.0, 7.0, 8.0, 13.0, 70.0], size)
+        score = rng.uniform(1.0, 60.0, size)
+        yield [
+            {"_id": ObjectId(), "training_co2_kg": c, "parameters_billions": p, "overall_score": s}
+            for c, p, s in zip(co2.tolist(), params.tolist(), score.tolist())
+        ]
+
+
+def run_streaming(n_models: int, batch_size: int, update_batch_size: int) -> Dict[str, float]:
+    """Même représentation que calculate_and_update_scores_streaming."""
+    from pymongo import UpdateOne
+    started = time.perf_counter()
+
+    ids = np.empty(n_models, dtype="V12")
+    values = np.empty((3, n_models), dtype=np.float64)
+    count = 0
+    for batch in _synthetic_batches(n_models, batch_size):
+        for doc in batch:
+            ids[count] = doc["_id"].binary
+            values[0, count] = doc["training_co2_kg"]
+            values[1, count] = doc["parameters_billions"]
+            values[2, count] = doc["overall_score"]
+            count += 1
+
+    co2, params, score = values
+    co2_per_param = co2 / params
+    co2_per_score = co2 / score
+    ranks = [percentile_ranks(v) for v in (co2, co2_per_param, co2_per_score)]
+    final_scores = weighted_scores(*ranks)
+    del ranks
+    categories = np.array(CATEGORY_LABELS, dtype=object)[category_indices(final_scores)]
+
+    for start in range(0, n_models, update_batch_size):
+        stop = min(start + update_batch_size, n_models)
+        scores_chunk = final_scores[start:stop].tolist()
+        categories_chunk = categories[start:stop].tolist()
+        operations = [
+            UpdateOne({"_id": ObjectId(ids[start + i].tobytes())},
+                      {"$set": {"carbon_score": scores_chunk[i], "category": categories_chunk[i]}})
+            for i in range(stop - start)
+        ]
+        del operations
+
+    return {"seconds": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_python(n_models: int, batch_size: int, update_batch_size: int) -> Dict[str, float]:
+    """Même représentation que calculate_and_update_scores (to_list + dicts + listes).
+
+    Les rangs sont calculés avec la version vectorisée : la version O(n²) du moteur
+    "python" serait trop lente à cette échelle, et seule l'empreinte mémoire est comparée.
+    """
+    from pymongo import UpdateOne
+    started = time.perf_counter()
+
+    all_models = [doc for batch in _synthetic_batches(n_models, batch_size) for doc in batch]
+    metrics = {}
+    valid_co2, valid_co2_per_param, valid_co2_per_score = [], [], []
+    for model in all_models:
+        model_metrics = {
+            "co2": model["training_co2_kg"],
+            "co2_per_param": model["training_co2_kg"] / model["parameters_billions"],
+            "co2_per_score": model["training_co2_kg"] / model["overall_score"],
+        }
+        metrics[str(model["_id"])] = model_metrics
+        valid_co2.append(model_metrics["co2"])
+        valid_co2_per_param.append(model_metrics["co2_per_param"])
+        valid_co2_per_score.append(model_metrics["co2_per_score"])
+
+    ranks = [percentile_ranks(np.array(v)) for v in (valid_co2, valid_co2_per_param, valid_co2_per_score)]
+    final_scores = weighted_scores(*ranks).tolist()
+    updates = [
+        UpdateOne({"_id": model["_id"]}, {"$set": {"carbon_score": final_score}})
+        for model, final_score in zip(all_models, final_scores)
+    ]
+    del updates
+
+    return {"seconds": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+
+
+ENGINES = {"streaming": run_streaming, "python": run_python}
+
+
+def _run_in_child(engine: str, n_models: int, batch_size: int, update_batch_size: int, queue) -> None:
+    queue.put(ENGINES[engine](n_models, batch_size, update_batch_size))
+
+
+# Le moteur "python" est en O(n²) : au-delà, il est exclu de la comparaison MongoDB
+PYTHON_ENGINE_MAX_MODELS = 20000
+# Tolérance sur le score final entre moteurs (ordre des sommes flottantes côté serveur)
+PARITY_TOLERANCE = 1e-9
+
+
+async def _benchmark_mongo(n_models: int, engines: List[str]) -> bool:
+    """Exécute les moteurs sur une base de travail et vérifie la parité. Retourne True si OK."""
+    from app.core.config import settings
+    from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+    from scripts import calculate_scores
+
+    engine_functions = {
+        "python": calculate_scores.calculate_and_update_scores,
+        "streaming": calculate_scores.calculate_and_update_scores_streaming,
+        "aggregation": calculate_scores.calculate_and_update_scores_aggregation,
+    }
+    if n_models > PYTHON_ENGINE_MAX_MODELS and "python" in engines:
+        print(f"Moteur 'python' ignoré au-delà de {PYTHON_ENGINE_MAX_MODELS} modèles (O(n²)).")
+        engines = [engine for engine in engines if engine != "python"]
+
+    settings.DATABASE_NAME = f"{settings.DATABASE_NAME}_benchmark"
+    await connect_to_mongo()
+    db = get_database()
+    await db.client.drop_database(settings.DATABASE_NAME)
+    for batch in _synthetic_batches(n_models, 5000):
+        await db[calculate_scores.MODELS_COLLECTION].insert_many(batch)
+    await close_mongo_connection()
+
+    results = {}
+    for engine in engines:
+        started = time.perf_counter()
+        await engine_functions[engine]()
+        elapsed = time.perf_counter() - started
+
+        await connect_to_mongo()
+        cursor = get_database()[calculate_scores.MODELS_COLLECTION].find(
+            {}, {"carbon_score": 1, "category": 1}
+        )
+        results[engine] = {doc["_id"]: (doc["carbon_score"], doc["category"]) async for doc in cursor}
+        # Repartir d'un catalogue non scoré pour le moteur suivant
+        await get_database()[calculate_scores.MODELS_COLLECTION].update_many(
+            {}, {"$unset": {"carbon_score": "", "category": "", "rank_percentile": "",
+                            "efficiency_ratio": "", "co2_per_param": "", "rank_co2": "",
+                            "rank_co2_per_param": "", "rank_co2_per_score": ""}}
+        )
+        await close_mongo_connection()
+        print(f"  {engine:<12} {elapsed:8.2f} s")
+
+    parity_ok = True
+    reference_engine = engines[0]
+    reference = results[reference_engine]
+    for engine in engines[1:]:
+        other = results[engine]
+        max_diff = max((abs(score - other[model_id][0]) for model_id, (score, _) in reference.items()), default=0.0)
+        category_mismatches = sum(1 for model_id, (_, category) in reference.items() if other[model_id][1] != category)
+        ok = len(other) == len(reference) and max_diff <= PARITY_TOLERANCE and category_mismatches == 0
+        parity_ok = parity_ok and ok
+        print(f"  parité {reference_engine} / {engine} : écart max {max_diff:.2e}, "
+              f"catégories différentes {category_mismatches} -> {'OK' if ok else 'ÉCHEC'}")
+
+    await connect_to_mongo()
+    await get_database().client.drop_database(settings.DATABASE_NAME)
+    await close_mongo_connection()
+    return parity_ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs de calcul des scores carbone.")
+    parser.add_argument("--models", type=int, default=1_000_000, help="Taille du catalogue synthétique")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Taille des lots du curseur")
+    parser.add_argument("--update-batch-size", type=int, default=1000, help="Taille des lots UpdateOne")
+    parser.add_argument("--engines", nargs="+", choices=["streaming", "python", "aggregation"],
+                        help="Moteurs à comparer (défaut : streaming et python, plus aggregation avec --mongo)")
+    parser.add_argument("--mongo", action="store_true",
+                        help="Exécuter les vrais moteurs contre MongoDB et vérifier leur parité")
+    args = parser.parse_args()
+
+    if args.mongo:
+        engines = args.engines or ["python", "streaming", "aggregation"]
+        print(f"Catalogue synthétique de {args.models} modèles (MongoDB)")
+        if not asyncio.run(_benchmark_mongo(args.models, engines)):
+            sys.exit(1)
+        return
+
+    context = multiprocessing.get_context("spawn") # Processus neuf : ru_maxrss non pollué
+    print(f"Catalogue synthétique de {args.models} modèles")
+    for engine in [engine for engine in (args.engines or list(ENGINES)) if engine in ENGINES]:
+        queue = context.Queue()
+        process = context.Process(
+            target=_run_in_child,
+            args=(engine, args.models, args.batch_size, args.update_batch_size, queue)
+        )
+        process.start()
+        result = queue.get()
+        process.join()
+        line = f"  {engine:<10} {result['seconds']:8.2f} s   pic RSS {result['peak_rss_mb']:8.1f} Mo"
+        if engine == "streaming" and args.models >= 1_000_000:
+            status = "OK" if result["peak_rss_mb"] <= STREAMING_PEAK_RSS_TARGET_MB else "DÉPASSÉ"
+            line += f"   (cible {STREAMING_PEAK_RSS_TARGET_MB} Mo : {status})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
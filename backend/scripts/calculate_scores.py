@@ -1,19 +1,46 @@
 # backend/scripts/calculate_scores.py
 
+import argparse
 import asyncio
 import math
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any, Tuple
 
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
 # Assurez-vous que le script peut trouver les modules de l'application
 # Si vous lancez depuis le dossier 'backend' avec python -m scripts.calculate_scores
 # ces imports devraient fonctionner.
 from app.core.database import connect_to_mongo, close_mongo_connection, get_database
 from app.core.config import settings
-from app.core.constants import CARBON_CATEGORIES # Importer les catégories
+from app.core.constants import CARBON_CATEGORIES, SCORE_WEIGHTS # Importer les catégories et pondérations
+from app.services.score_history_service import ScoreHistoryService
+from app.services.catalog_service import bump_catalog_version
+from app.utils.scoring import percentile_ranks, weighted_scores, category_indices, CATEGORY_LABELS
+from app.utils.scoring import category_switch_branches, default_weights
 
 # Nom de la collection MongoDB pour les modèles AI
 MODELS_COLLECTION = "ai_models"
 
+# Filtre pour ne prendre que les modèles avec les données de base
+ELIGIBLE_FILTER = {
+    "training_co2_kg": {"$exists": True, "$ne": None, "$gt": 0},
+    "parameters_billions": {"$exists": True, "$ne": None, "$gt": 0},
+    "overall_score": {"$exists": True, "$ne": None, "$gt": 0}
+}
+# Projection pour ne récupérer que les champs utiles
+SCORING_PROJECTION = {
+    "_id": 1,
+    "training_co2_kg": 1,
+    "parameters_billions": 1,
+    "overall_score": 1
+}
+
+# Moteurs de calcul disponibles (option --engine)
+ENGINES = ("python", "streaming", "aggregation")
+
 # --- Fonctions utilitaires pour le calcul ---
 
 def calculate_percentile_rank(value: float, sorted_values: List[float]) -> float:
@@ -40,20 +67,7 @@ async def calculate_and_update_scores():
 
     # 1. Récupérer tous les modèles avec les données nécessaires
     print("Récupération des modèles depuis MongoDB...")
-    models_cursor = collection.find(
-        { # Filtre pour ne prendre que ceux avec les données de base
-            "training_co2_kg": {"$exists": True, "$ne": None, "$gt": 0},
-            "parameters_billions": {"$exists": True, "$ne": None, "$gt": 0},
-            "overall_score": {"$exists": True, "$ne": None, "$gt": 0}
-        },
-        { # Projection pour ne récupérer que les champs utiles
-            "_id": 1,
-            "model_name": 1,
-            "training_co2_kg": 1,
-            "parameters_billions": 1,
-            "overall_score": 1
-        }
-    )
+    models_cursor = collection.find(ELIGIBLE_FILTER, {**SCORING_PROJECTION, "model_name": 1})
     all_models = await models_cursor.to_list(length=None) # Charger tous les modèles éligibles
     print(f"{len(all_models)} modèles éligibles récupérés pour le calcul des scores.")
 
@@ -98,6 +112,7 @@ async def calculate_and_update_scores():
     # 3. Calculer les rangs percentiles et le score final pour chaque modèle
     print("Calcul des rangs percentiles et du score final...")
     updates = []
+    history_scores = [] # (model_id, score, catégorie) pour l'historique des scores
     for model in all_models:
         model_id_str = str(model["_id"])
         model_metrics = metrics[model_id_str]
@@ -107,9 +122,12 @@ async def calculate_and_update_scores():
         rank_co2_param = calculate_percentile_rank(model_metrics["co2_per_param"], valid_co2_per_param)
         rank_co2_score = calculate_percentile_rank(model_metrics["co2_per_score"], valid_co2_per_score)
 
-        # Calculer le score final pondéré (AJUSTER LES POIDS ICI SI BESOIN)
-        # Exemple: 40% CO2 Absolu, 40% CO2/Param, 20% CO2/Score
-        final_score = (0.4 * rank_co2) + (0.4 * rank_co2_param) + (0.2 * rank_co2_score)
+        # Calculer le score final pondéré (mêmes pondérations que les autres moteurs : SCORE_WEIGHTS)
+        final_score = (
+            SCORE_WEIGHTS["co2"] * rank_co2
+            + SCORE_WEIGHTS["co2_per_param"] * rank_co2_param
+            + SCORE_WEIGHTS["co2_per_score"] * rank_co2_score
+        )
         final_score = max(0, min(100, final_score)) # Assurer entre 0 et 100
 
         # Déterminer la catégorie
@@ -120,6 +138,8 @@ async def calculate_and_update_scores():
                 category = cat
                 break
 
+        history_scores.append((model["_id"], final_score, category))
+
         # Préparer l'opération de mise à jour pour ce modèle
         updates.append({
             "filter": {"_id": model["_id"]},
@@ -129,7 +149,11 @@ async def calculate_and_update_scores():
                     "category": category,
                     "rank_percentile": final_score, # On peut utiliser le score final comme percentile global
                     "efficiency_ratio": model_metrics["co2_per_score"], # Ou 1/co2_per_score si on veut perf/co2
-                    "co2_per_param": model_metrics["co2_per_param"] # Stocker pour info
+                    "co2_per_param": model_metrics["co2_per_param"], # Stocker pour info
+                    # Rangs percentiles conservés pour l'analyse de sensibilité des pondérations
+                    "rank_co2": rank_co2,
+                    "rank_co2_per_param": rank_co2_param,
+                    "rank_co2_per_score": rank_co2_score
                 }
             }
         })
@@ -137,8 +161,6 @@ async def calculate_and_update_scores():
     # 4. Mettre à jour les documents dans MongoDB
     print(f"Mise à jour de {len(updates)} modèles dans MongoDB...")
     if updates:
-        from pymongo import UpdateOne # Importer pour bulk_write
-
         bulk_operations = [UpdateOne(upd["filter"], upd["update"]) for upd in updates]
         try:
             result = await collection.bulk_write(bulk_operations)
@@ -156,10 +178,280 @@ async def calculate_and_update_scores():
             #         print(f"Erreur MAJ individuelle pour {upd['filter']}: {e_ind}")
             # print(f"Mise à jour individuelle terminée: {updated_count} modifiés.")
 
+    await bump_catalog_version(db) # Scores modifiés : nouvelle version du catalogue pour les serveurs
+
+    # 5. Enregistrer ce run dans l'historique des scores (séries temporelles en buckets)
+    if history_scores:
+        history_service = ScoreHistoryService()
+        await history_service.ensure_indexes()
+        run = await history_service.start_run(engine="python")
+        model_ids, scores, categories = zip(*history_scores)
+        recorded = await history_service.record_run(run, model_ids, scores, categories)
+        await history_service.finish_run(run, recorded)
+        print(f"Run {run['_id']} (n°{run['seq']}) enregistré dans l'historique pour {recorded} modèles.")
+
+    await close_mongo_connection()
+
+async def _load_scoring_arrays(collection, batch_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Lit les champs projetés par lots de curseur dans des tableaux NumPy préalloués.
+
+    Retourne (ids, co2, params, score) où ids contient les 12 octets de chaque ObjectId
+    (dtype V12) : aucun dict ni objet Python n'est conservé par modèle.
+    """
+    capacity = max(await collection.count_documents(ELIGIBLE_FILTER), 1)
+    ids = np.empty(capacity, dtype="V12")
+    values = np.empty((3, capacity), dtype=np.float64) # co2, params, score
+
+    count = 0
+    cursor = collection.find(ELIGIBLE_FILTER, SCORING_PROJECTION, batch_size=batch_size)
+    async for doc in cursor:
+        if count == capacity:
+            # Des modèles ont été ajoutés depuis le comptage : agrandir les tableaux
+            capacity *= 2
+            ids = np.resize(ids, capacity)
+            grown = np.empty((3, capacity), dtype=np.float64)
+            grown[:, :count] = values
+            values = grown
+        ids[count] = doc["_id"].binary
+        values[0, count] = doc["training_co2_kg"]
+        values[1, count] = doc["parameters_billions"]
+        values[2, count] = doc["overall_score"]
+        count += 1
+
+    return ids[:count], values[0, :count], values[1, :count], values[2, :count]
+
+
+async def _compute_ranks(metrics: List[np.ndarray], process_pool_threshold: int) -> List[np.ndarray]:
+    """Calcule les rangs percentiles des métriques, dans un pool de processus pour les grands catalogues."""
+    if len(metrics[0]) <= process_pool_threshold:
+        return [percentile_ranks(values) for values in metrics]
+
+    print(f"Catalogue > {process_pool_threshold} modèles : calcul des rangs dans un pool de processus...")
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=len(metrics)) as pool:
+        return list(await asyncio.gather(
+            *(loop.run_in_executor(pool, percentile_ranks, values) for values in metrics)
+        ))
+
+
+def _iter_update_batches(ids: np.ndarray, fields: Dict[str, np.ndarray], batch_size: int):
+    """Génère des listes d'UpdateOne de taille bornée (batch_size) à partir des tableaux de résultats."""
+    for start in range(0, len(ids), batch_size):
+        stop = min(start + batch_size, len(ids))
+        columns = {name: values[start:stop].tolist() for name, values in fields.items()}
+        yield [
+            UpdateOne(
+                {"_id": ObjectId(ids[start + offset].tobytes())},
+                {"$set": {name: column[offset] for name, column in columns.items()}}
+            )
+            for offset in range(stop - start)
+        ]
+
+
+async def calculate_and_update_scores_streaming(
+    cursor_batch_size: int = settings.SCORING_CURSOR_BATCH_SIZE,
+    update_batch_size: int = settings.SCORING_UPDATE_BATCH_SIZE,
+    process_pool_threshold: int = settings.SCORING_PROCESS_POOL_THRESHOLD
+):
+    """Variante à mémoire bornée : lecture par lots, calculs vectorisés et écritures par lots.
+
+    Les résultats sont identiques au moteur "python" (mêmes formules, cf. app/utils/scoring.py).
+    La mémoire est dominée par les tableaux NumPy (~100 octets par modèle) ; l'empreinte
+    mesurée est documentée dans scripts/benchmark_scoring.py.
+    """
+    await connect_to_mongo()
+    db = get_database()
+    collection = db[MODELS_COLLECTION]
+    print(f"Connecté à la collection '{MODELS_COLLECTION}' (moteur streaming).")
+
+    # 1. Lecture des champs projetés par lots de curseur
+    print(f"Lecture des modèles par lots de {cursor_batch_size}...")
+    ids, co2, params, score = await _load_scoring_arrays(collection, cursor_batch_size)
+    print(f"{len(ids)} modèles éligibles récupérés pour le calcul des scores.")
+
+    if len(ids) == 0:
+        print("Aucun modèle éligible trouvé pour calculer les scores.")
+        await close_mongo_connection()
+        return
+
+    # 2. Métriques, rangs percentiles, score final et catégorie (vectorisés)
+    print("Calcul vectorisé des métriques, rangs percentiles et scores...")
+    co2_per_param = co2 / params
+    co2_per_score = co2 / score
+    del params, score
+    rank_co2, rank_co2_param, rank_co2_score = await _compute_ranks(
+        [co2, co2_per_param, co2_per_score], process_pool_threshold
+    )
+    final_scores = weighted_scores(rank_co2, rank_co2_param, rank_co2_score)
+    del co2
+    categories = np.array(CATEGORY_LABELS, dtype=object)[category_indices(final_scores)]
+
+    # 3. Écriture par lots bornés (bulk_write non ordonné)
+    print(f"Mise à jour de {len(ids)} modèles par lots de {update_batch_size}...")
+    fields = {
+        "carbon_score": final_scores,
+        "category": categories,
+        "rank_percentile": final_scores,
+        "efficiency_ratio": co2_per_score,
+        "co2_per_param": co2_per_param,
+        "rank_co2": rank_co2,
+        "rank_co2_per_param": rank_co2_param,
+        "rank_co2_per_score": rank_co2_score
+    }
+    modified_count = 0
+    for operations in _iter_update_batches(ids, fields, update_batch_size):
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            modified_count += result.modified_count
+        except Exception as e:
+            print(f"ERREUR lors de la mise à jour en masse (bulk_write) : {e}")
+    print(f"Mise à jour terminée. {modified_count} documents modifiés.")
+    await bump_catalog_version(db) # Scores modifiés : nouvelle version du catalogue pour les serveurs
+
+    # 4. Historique des scores, écrit lui aussi par lots bornés
+    history_service = ScoreHistoryService()
+    await history_service.ensure_indexes()
+    run = await history_service.start_run(engine="streaming")
+    recorded = 0
+    for start in range(0, len(ids), update_batch_size):
+        stop = min(start + update_batch_size, len(ids))
+        recorded += await history_service.record_run(
+            run,
+            [ObjectId(raw_id.tobytes()) for raw_id in ids[start:stop]],
+            final_scores[start:stop].tolist(),
+            categories[start:stop].tolist()
+        )
+    await history_service.finish_run(run, recorded)
+    print(f"Run {run['_id']} (n°{run['seq']}) enregistré dans l'historique pour {recorded} modèles.")
+
     await close_mongo_connection()
 
+
+def _percentile_rank_expr(rank_asc: str, rank_desc: str) -> Dict[str, Any]:
+    """Expression MongoDB du rang percentile de calculate_percentile_rank.
+
+    Avec $rank croissant (ra) et décroissant (rd) sur n documents :
+    nombre de valeurs plus petites = ra - 1, égales = n - (ra - 1) - (rd - 1).
+    """
+    better_count = {"$subtract": [f"${rank_asc}", 1]}
+    equal_count = {"$subtract": [{"$subtract": ["$_n", better_count]}, {"$subtract": [f"${rank_desc}", 1]}]}
+    rank = {"$add": [better_count, {"$divide": [equal_count, 2.0]}]}
+    return {"$subtract": [100.0, {"$multiply": [{"$divide": [rank, "$_n"]}, 100]}]}
+
+
+def build_scoring_pipeline() -> List[Dict[str, Any]]:
+    """Pipeline d'agrégation calculant rangs, score final et catégorie, terminé par $merge.
+
+    Nécessite MongoDB >= 5.0 ($setWindowFields). Les formules sont celles du moteur
+    "python" : les résultats sont identiques aux arrondis flottants près.
+    """
+    weights = default_weights()
+    metrics = ["co2", "co2_per_param", "co2_per_score"]
+
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": ELIGIBLE_FILTER},
+        {"$project": {
+            "co2": "$training_co2_kg",
+            "co2_per_param": {"$divide": ["$training_co2_kg", "$parameters_billions"]},
+            "co2_per_score": {"$divide": ["$training_co2_kg", "$overall_score"]}
+        }},
+        # Nombre total de modèles éligibles (fenêtre sur toute la partition)
+        {"$setWindowFields": {
+            "output": {"_n": {"$sum": 1, "window": {"documents": ["unbounded", "unbounded"]}}}
+        }}
+    ]
+    # Un $setWindowFields n'accepte qu'un seul sortBy : deux étapes ($rank croissant et
+    # décroissant) par métrique pour obtenir le nombre de valeurs égales.
+    for metric in metrics:
+        pipeline.append({"$setWindowFields": {"sortBy": {metric: 1}, "output": {f"_ra_{metric}": {"$rank": {}}}}})
+        pipeline.append({"$setWindowFields": {"sortBy": {metric: -1}, "output": {f"_rd_{metric}": {"$rank": {}}}}})
+
+    pipeline += [
+        {"$set": {
+            f"_rank_{metric}": _percentile_rank_expr(f"_ra_{metric}", f"_rd_{metric}") for metric in metrics
+        }},
+        {"$set": {
+            "carbon_score": {"$max": [0, {"$min": [100, {"$add": [
+                {"$multiply": [float(weights[idx]), f"$_rank_{metric}"]} for idx, metric in enumerate(metrics)
+            ]}]}]}
+        }},
+        {"$set": {
+            "category": {"$switch": {"branches": category_switch_branches("$carbon_score"), "default": "F"}}
+        }},
+        {"$project": {
+            "carbon_score": 1,
+            "category": 1,
+            "rank_percentile": "$carbon_score",
+            "efficiency_ratio": "$co2_per_score",
+            "co2_per_param": 1,
+            **{f"rank_{metric}": f"$_rank_{metric}" for metric in metrics}
+        }},
+        {"$merge": {
+            "into": MODELS_COLLECTION,
+            "on": "_id",
+            "whenMatched": "merge",
+            "whenNotMatched": "discard"
+        }}
+    ]
+    return pipeline
+
+
+async def calculate_and_update_scores_aggregation():
+    """Calcule et met à jour les scores entièrement côté serveur (aucun transfert de données).
+
+    Le pipeline de build_scoring_pipeline écrit les scores dans ai_models ; un second
+    pipeline ajoute le run à l'historique des scores.
+    """
+    await connect_to_mongo()
+    db = get_database()
+    collection = db[MODELS_COLLECTION]
+    print(f"Connecté à la collection '{MODELS_COLLECTION}' (moteur aggregation).")
+
+    print("Calcul des scores par pipeline d'agrégation ($setWindowFields + $merge)...")
+    # Un pipeline terminé par $merge ne retourne aucun document : to_list pour l'exécuter
+    await collection.aggregate(build_scoring_pipeline(), allowDiskUse=True).to_list(length=None)
+    scored_count = await collection.count_documents({**ELIGIBLE_FILTER, "carbon_score": {"$exists": True}})
+    print(f"Calcul terminé. {scored_count} modèles éligibles scorés.")
+    await bump_catalog_version(db) # Scores modifiés : nouvelle version du catalogue pour les serveurs
+
+    if scored_count:
+        history_service = ScoreHistoryService()
+        await history_service.ensure_indexes()
+        run = await history_service.start_run(engine="aggregation")
+        history_pipeline = history_service.history_merge_pipeline(
+            run, {**ELIGIBLE_FILTER, "carbon_score": {"$exists": True}}
+        )
+        await collection.aggregate(history_pipeline, allowDiskUse=True).to_list(length=None)
+        await history_service.finish_run(run, scored_count)
+        print(f"Run {run['_id']} (n°{run['seq']}) enregistré dans l'historique pour {scored_count} modèles.")
+
+    await close_mongo_connection()
+
+
+def parse_args() -> argparse.Namespace:
+    """Options de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Calcul des scores carbone des modèles d'IA.")
+    parser.add_argument("--engine", choices=ENGINES, default="python",
+                        help="Moteur de calcul (python: en mémoire, streaming: mémoire bornée par lots, "
+                             "aggregation: entièrement dans MongoDB)")
+    parser.add_argument("--cursor-batch-size", type=int, default=settings.SCORING_CURSOR_BATCH_SIZE)
+    parser.add_argument("--update-batch-size", type=int, default=settings.SCORING_UPDATE_BATCH_SIZE)
+    parser.add_argument("--process-pool-threshold", type=int, default=settings.SCORING_PROCESS_POOL_THRESHOLD)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    print("Lancement du script de calcul des scores carbone...")
+    args = parse_args()
+    print(f"Lancement du script de calcul des scores carbone (moteur {args.engine})...")
     # Utiliser asyncio.run pour exécuter la fonction async principale
-    asyncio.run(calculate_and_update_scores())
-    print("Script de calcul des scores terminé.")
\ No newline at end of file
+    if args.engine == "aggregation":
+        asyncio.run(calculate_and_update_scores_aggregation())
+    elif args.engine == "streaming":
+        asyncio.run(calculate_and_update_scores_streaming(
+            cursor_batch_size=args.cursor_batch_size,
+            update_batch_size=args.update_batch_size,
+            process_pool_threshold=args.process_pool_threshold
+        ))
+    else:
+        asyncio.run(calculate_and_update_scores())
+    print("Script de calcul des scores terminé.")
@@ -0,0 +1,81 @@
+# backend/tests/test_columnar.py
+
+"""Exports en colonnes (ColumnarWriter) : types des colonnes, nulls, dates, groupes de lignes, abandon."""
+
+import os
+from datetime import date, datetime
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from app.utils import columnar
+from app.utils.columnar import COLUMNAR_FIELDS, ColumnarWriter
+
+MODELS = [
+    {"id": "m1", "model_name": "M1", "architecture": "LlamaForCausalLM", "parameters_billions": 7.0,
+     "training_co2_kg": 10.5, "overall_score": 50.0, "date_submitted": "2024-03-01T12:30:00Z"},
+    {"id": "m2", "model_name": "M2", "parameters_billions": 13, # Entier : converti en float64
+     "date_submitted": date(2024, 1, 2)},
+    {"id": "m3", "model_name": "M3", "date_submitted": "pas une date"},
+    {"id": "m4", "model_name": "M4", "date_submitted": datetime(2023, 12, 31, 8, 0)},
+]
+
+
+def read_table(path, fmt):
+    if fmt == "parquet":
+        return pq.read_table(path)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize("fmt, compression", [("parquet", "zstd"), ("arrow", "lz4"), ("arrow", None)])
+def test_columns_have_the_export_types(tmp_path, fmt, compression):
+    path = str(tmp_path / f"export.{fmt}")
+    writer = ColumnarWriter(path, fmt, compression)
+    writer.write(MODELS[:2])
+    writer.write([])
+    writer.write(MODELS[2:])
+    writer.close()
+
+    table = read_table(path, fmt)
+    assert writer.rows == table.num_rows == 4
+    assert table.schema.names == [name for name, _ in COLUMNAR_FIELDS]
+    types = {"string": pa.string(), "float64": pa.float64(), "timestamp[ms]": pa.timestamp("ms")}
+    assert [table.schema.field(name).type for name, _ in COLUMNAR_FIELDS] == [
+        types[kind] for _, kind in COLUMNAR_FIELDS
+    ]
+    columns = table.to_pydict()
+    assert columns["parameters_billions"] == [7.0, 13.0, None, None]
+    assert columns["architecture"] == ["LlamaForCausalLM", None, None, None]
+    assert columns["date_submitted"] == [
+        datetime(2024, 3, 1, 12, 30), datetime(2024, 1, 2), None, datetime(2023, 12, 31, 8, 0)
+    ]
+    assert os.listdir(tmp_path) == [f"export.{fmt}"] # Fichier temporaire renommé
+
+
+def test_parquet_row_groups_gather_cursor_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "PARQUET_ROW_GROUP_SIZE", 5)
+    path = str(tmp_path / "export.parquet")
+    writer = ColumnarWriter(path, "parquet")
+    for start in range(0, 12, 2):
+        writer.write([{"id": f"m{index}", "model_name": f"M{index}"} for index in range(start, start + 2)])
+    writer.close()
+
+    metadata = pq.ParquetFile(path).metadata
+    # Lots de 2 lignes regroupés en groupes d'au moins 5 lignes ; le reste à la fermeture
+    assert [metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)] == [6, 6]
+
+
+def test_abort_leaves_no_file(tmp_path):
+    path = str(tmp_path / "export.arrow")
+    writer = ColumnarWriter(path, "arrow")
+    writer.write(MODELS)
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarWriter(str(tmp_path / "export.csv"), "csv")
@@ -0,0 +1,137 @@
+# backend/tests/test_emission_factors.py
+
+"""Registre des facteurs d'émission : priorités de build_factor_table, rechargement à chaud.
+
+Les régions proposées par les services (simulations, profils horaires) sont celles du
+registre : une région ajoutée au fichier est disponible après rechargement.
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from app.core.constants import REGIONS
+from app.services import grid_profile_service, simulation_service
+from app.services.emission_factors import EmissionFactorRegistry, build_factor_table, build_region_list
+from app.services.grid_profile_service import GridProfileService
+from app.services.simulation_service import SimulationService
+
+FACTORS = {
+    "defaults": {"pue": 1.2, "wue_l_per_kwh": 0.5},
+    "regions": {
+        "france": {"co2_factor": 0.06},
+        "iceland": {"co2_factor": 0.01, "name": "Islande", "countries": ["Islande"]},
+    },
+    "providers": {
+        " AWS ": {"name": "Amazon Web Services", "pue": 1.15, "regions": {"france": {"co2_factor": 0.05, "pue": 1.1}}},
+        "gcp": {"wue_l_per_kwh": 1.0},
+    },
+}
+
+
+def write_factors(path, data, mtime):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime)) # mtime explicite : indépendant de la résolution du système de fichiers
+
+
+def test_factor_priority():
+    table = build_factor_table(FACTORS)
+    # fournisseur/région > fournisseur > région > défauts du fichier
+    assert table[("aws", "france")] == {"co2_factor": 0.05, "pue": 1.1, "wue_l_per_kwh": 0.5, "provider": "aws"}
+    assert table[("aws", "sweden")] == {"co2_factor": REGIONS["sweden"]["co2_factor"], "pue": 1.15,
+                                        "wue_l_per_kwh": 0.5, "provider": "aws"}
+    assert table[("gcp", "france")] == {"co2_factor": 0.06, "pue": 1.2, "wue_l_per_kwh": 1.0, "provider": "gcp"}
+    # Sans fournisseur : région du fichier, puis REGIONS pour les champs qu'il ne précise pas
+    assert table[(None, "france")] == {"co2_factor": 0.06, "pue": 1.2, "wue_l_per_kwh": 0.5, "provider": None}
+    assert table[(None, "europe")]["co2_factor"] == REGIONS["europe"]["co2_factor"]
+    assert table[(None, "iceland")]["co2_factor"] == 0.01
+
+
+def test_factor_table_without_file_uses_constants():
+    table = build_factor_table({})
+    assert set(table) == {(None, region) for region in REGIONS}
+    for region, data in REGIONS.items():
+        assert table[(None, region)] == {"co2_factor": data["co2_factor"], "pue": 1.0, "wue_l_per_kwh": None,
+                                         "provider": None}
+
+
+@pytest.mark.parametrize("data", [
+    {"regions": {"atlantis": {}}}, # Région sans co2_factor
+    {"regions": {"france": {"co2_factor": -1}}},
+    {"providers": {"aws": {"pue": 0.9}}}, # PUE < 1
+    {"defaults": {"pue": "1.2"}},
+])
+def test_invalid_factors_are_rejected(data):
+    with pytest.raises(ValueError):
+        build_factor_table(data)
+
+
+def test_region_list_merges_file_descriptions():
+    regions = build_region_list(FACTORS, build_factor_table(FACTORS))
+    assert list(regions) == list(REGIONS) + ["iceland"]
+    assert regions["iceland"] == {"id": "iceland", "name": "Islande", "countries": ["Islande"], "co2_factor": 0.01}
+    assert regions["france"]["name"] == REGIONS["france"]["name"]
+    assert regions["france"]["co2_factor"] == 0.06
+
+
+def test_registry_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "facteurs.json"
+    registry = EmissionFactorRegistry(str(path), check_interval=0)
+    assert registry.version == "constants"
+    assert registry.lookup("aws", "france")["co2_factor"] == REGIONS["france"]["co2_factor"]
+
+    write_factors(path, FACTORS, 1000)
+    assert registry.lookup("aws", "france")["co2_factor"] == 0.05
+    assert registry.lookup("unknown", "france")["provider"] is None # Fournisseur inconnu : région seule
+    assert registry.lookup(None, "atlantis") is None
+    assert "iceland" in registry.regions()
+    first_version = registry.version
+
+    # Même mtime : le fichier n'est pas relu
+    write_factors(path, {"regions": {"france": {"co2_factor": 0.07}}}, 1000)
+    assert registry.lookup(None, "france")["co2_factor"] == 0.06
+
+    os.utime(path, (1001, 1001))
+    assert registry.lookup(None, "france")["co2_factor"] == 0.07
+    assert registry.lookup("aws", "france")["provider"] is None
+    assert "iceland" not in registry.regions()
+    assert registry.version != first_version
+    assert registry.reloads == 2
+
+    # Fichier invalide : facteurs précédents conservés, erreur exposée
+    write_factors(path, {"regions": {"france": {"co2_factor": -1}}}, 1002)
+    assert registry.lookup(None, "france")["co2_factor"] == 0.07
+    assert registry.describe()["last_error"]
+
+    # Fichier supprimé : retour aux constantes
+    path.unlink()
+    assert registry.version == "constants"
+    assert registry.lookup(None, "france")["co2_factor"] == REGIONS["france"]["co2_factor"]
+
+
+def test_registry_checks_the_file_at_most_once_per_interval(tmp_path):
+    path = tmp_path / "facteurs.json"
+    write_factors(path, FACTORS, 1000)
+    registry = EmissionFactorRegistry(str(path), check_interval=3600)
+    assert registry.lookup(None, "france")["co2_factor"] == 0.06
+    write_factors(path, {}, 2000)
+    assert registry.lookup(None, "france")["co2_factor"] == 0.06
+
+
+def test_services_list_the_registry_regions(tmp_path, monkeypatch):
+    path = tmp_path / "facteurs.json"
+    write_factors(path, FACTORS, 1000)
+    registry = EmissionFactorRegistry(str(path), check_interval=0)
+    monkeypatch.setattr(simulation_service, "emission_factor_registry", registry)
+    monkeypatch.setattr(grid_profile_service, "emission_factor_registry", registry)
+
+    regions = asyncio.run(SimulationService().get_regions())
+    assert [region["id"] for region in regions] == list(REGIONS) + ["iceland"]
+    profiles = GridProfileService(str(tmp_path / "profils")).list_profiles()
+    assert [profile["region"] for profile in profiles] == list(REGIONS) + ["iceland"]
+    # Région sans profil horaire : profil plat au facteur du registre
+    profile, source = GridProfileService(str(tmp_path / "profils")).get_profile("iceland")
+    assert source == "flat"
+    assert float(profile[0, 0]) == 0.01
@@ -0,0 +1,107 @@
+# backend/tests/test_export_artifacts.py
+
+"""Dossier des exports (ExportArtifactCache) : éviction LRU, délai de grâce, copies gzip."""
+
+import os
+import time
+
+import pytest
+
+from app.services.export_artifacts import EVICTION_GRACE_SECONDS, GZIP_SUFFIX, STALE_TMP_SECONDS, ExportArtifactCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExportArtifactCache(max_bytes=2500, sweep_interval=60, directory=str(tmp_path))
+
+
+def write_artifact(cache, name, size, used_seconds_ago, gzip_size=0):
+    """Export de ``size`` octets, utilisé pour la dernière fois il y a ``used_seconds_ago`` secondes."""
+    path = os.path.join(cache.directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    used_at = time.time() - used_seconds_ago
+    os.utime(path, (used_at, used_at))
+    if gzip_size:
+        with open(path + GZIP_SUFFIX, "wb") as f:
+            f.write(b"z" * gzip_size)
+    return path
+
+
+def remaining(cache):
+    return sorted(os.listdir(cache.directory))
+
+
+def test_sweep_evicts_least_recently_used_first(cache):
+    old = EVICTION_GRACE_SECONDS + 1000
+    write_artifact(cache, "a.pdf", 1000, old + 300)
+    write_artifact(cache, "b.xlsx", 1000, old + 100, gzip_size=200)
+    write_artifact(cache, "c.parquet", 1000, old + 200)
+    write_artifact(cache, "d.arrow", 1000, old)
+
+    # 4 200 octets pour 2 500 autorisés : a puis c (les plus anciens) sont supprimés
+    assert cache.sweep() == 2
+    assert remaining(cache) == ["b.xlsx", "b.xlsx.gz", "d.arrow"]
+    assert cache.disk_bytes == 2200
+    assert cache.files == 2
+    assert cache.evictions == 2
+
+    # La copie gzip compte dans la taille et part avec son export
+    cache.max_bytes = 1000
+    assert cache.sweep() == 1
+    assert remaining(cache) == ["d.arrow"]
+    assert cache.evicted_bytes == 2000 + 1200
+
+
+def test_lookup_makes_an_export_recent(cache):
+    old = EVICTION_GRACE_SECONDS + 1000
+    first = write_artifact(cache, "a" * 64 + ".pdf", 1000, old + 200)
+    write_artifact(cache, "b.pdf", 1000, old + 100)
+    write_artifact(cache, "c.pdf", 1000, old)
+
+    # Réutilisé : l'export le plus ancien devient le plus récent, b est évincé à sa place
+    assert cache.lookup("a" * 64, "pdf") == first
+    assert cache.sweep() == 1
+    assert remaining(cache) == ["a" * 64 + ".pdf", "c.pdf"]
+    assert cache.lookup("b" * 64, "pdf") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_recently_used_exports_are_kept_over_the_limit(cache):
+    write_artifact(cache, "a.pdf", 2000, EVICTION_GRACE_SECONDS + 100)
+    write_artifact(cache, "b.pdf", 2000, EVICTION_GRACE_SECONDS // 2) # Téléchargement en cours
+    write_artifact(cache, "c.pdf", 2000, 0)
+
+    assert cache.sweep() == 1
+    assert remaining(cache) == ["b.pdf", "c.pdf"]
+    assert cache.disk_bytes == 4000 # Au-dessus de max_bytes tant que le délai de grâce court
+
+
+def test_sweep_removes_stale_temporary_files_and_orphan_copies(cache):
+    write_artifact(cache, "a.pdf", 10, 0)
+    write_artifact(cache, "abandonne.pdf.123.tmp", 10, STALE_TMP_SECONDS + 10)
+    write_artifact(cache, "en-cours.pdf.456.tmp", 10, 0)
+    write_artifact(cache, "orphelin.pdf" + GZIP_SUFFIX, 10, 0)
+
+    assert cache.sweep() == 0
+    assert remaining(cache) == ["a.pdf", "en-cours.pdf.456.tmp"]
+
+
+def test_add_sweeps_directly_without_background_task(cache):
+    write_artifact(cache, "a.pdf", 2000, EVICTION_GRACE_SECONDS + 100)
+    cache.sweep()
+    path = write_artifact(cache, "b.pdf", 2000, 0)
+    cache.add(path)
+    assert remaining(cache) == ["b.pdf"]
+
+
+def test_touch_updates_only_the_access_time(cache):
+    path = write_artifact(cache, "a.pdf", 10, 3600)
+    before = os.stat(path)
+
+    assert cache.touch(path)
+    after = os.stat(path)
+    # Date de modification conservée : ETag et Last-Modified inchangés, If-Range reste valide
+    assert after.st_mtime_ns == before.st_mtime_ns
+    assert after.st_atime > before.st_atime + 3000
+    assert not cache.touch(os.path.join(cache.directory, "absent.pdf"))
@@ -0,0 +1,68 @@
+# backend/tests/test_export_excel.py
+
+"""Export Excel : feuille des modèles, et feuille "Simulations" avec l'option include_simulations."""
+
+import asyncio
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services import export_service
+from app.services.export_artifacts import ExportArtifactCache
+from app.services.export_service import XLSX_COLUMNS, ExportService
+
+MODELS = [
+    {"id": "m1", "model_name": "Modèle\x01 A", "parameters_billions": 7.0, "training_co2_kg": 10.0, "overall_score": 50.0},
+    {"id": "m2", "model_name": "Modèle B", "parameters_billions": 13.0, "training_co2_kg": 20.0, "overall_score": 60.0},
+]
+SIMULATIONS = {
+    "regions": [{"id": "france", "name": "France"}, {"id": "china", "name": "Chine"}],
+    "rows": [{"model_id": "m1", "model_name": "Modèle A", "co2_kg": [1.5, 20.0]},
+             {"model_id": "m2", "model_name": "Modèle B", "co2_kg": [2.5, 35.0]}],
+    "frequency_per_day": 1000,
+    "duration_days": 365,
+}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    cache = ExportArtifactCache(max_bytes=10 ** 9, sweep_interval=60, directory=str(tmp_path))
+    monkeypatch.setattr(export_service, "export_artifact_cache", cache)
+    service = ExportService()
+    requested = []
+
+    async def batches(model_ids):
+        yield MODELS
+
+    async def get_simulations(model_ids):
+        requested.append(model_ids)
+        return SIMULATIONS
+
+    monkeypatch.setattr(service, "_iter_model_batches", batches)
+    monkeypatch.setattr(service, "_get_simulations", get_simulations)
+    service.simulations_requested = requested
+    return service
+
+
+def sheet_rows(path, name):
+    return [list(row) for row in load_workbook(path, read_only=True)[name].iter_rows(values_only=True)]
+
+
+def test_excel_export_without_simulations(service):
+    path = asyncio.run(service._write_artifact("excel", "k1", ["m1", "m2"], {"include_simulations": False}, "v1"))
+    assert load_workbook(path, read_only=True).sheetnames == ["Modèles"]
+    rows = sheet_rows(path, "Modèles")
+    assert rows[0] == [header for header, _ in XLSX_COLUMNS]
+    assert len(rows) == 1 + len(MODELS)
+    assert "Modèle A" in rows[1] # Caractères de contrôle retirés
+    assert service.simulations_requested == []
+
+
+def test_excel_export_with_simulations(service):
+    path = asyncio.run(service._write_artifact("excel", "k2", ["m1", "m2"], {"include_simulations": True}, "v1"))
+    assert load_workbook(path, read_only=True).sheetnames == ["Modèles", "Simulations"]
+    rows = sheet_rows(path, "Simulations")
+    assert "1000 inférences par jour pendant 365 jours" in rows[0][0]
+    assert rows[1] == ["Modèle", "France", "Chine"]
+    assert rows[2:] == [["Modèle A", 1.5, 20], ["Modèle B", 2.5, 35]]
+    assert service.simulations_requested == [["m1", "m2"]]
@@ -0,0 +1,217 @@
+# backend/tests/test_export_jobs.py
+
+"""File des exports (export_jobs) : regroupement, rejet en 503, statut partagé en base, suivi (SSE)."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.services import export_jobs
+from app.services.catalog_service import CatalogService
+from app.services.export_artifacts import ExportArtifactCache
+from app.services.export_jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, ExportJobQueue
+from app.services.export_service import ExportService
+
+MODEL_IDS = ["m1", "m2", "m3"]
+
+
+class FakeSnapshot:
+    model_ids = MODEL_IDS
+    index = {model_id: position for position, model_id in enumerate(MODEL_IDS)}
+    version = "v1"
+
+
+class Renders:
+    """ExportService.render_export simulé : chaque export attend release() (ou échoue)."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.error = None
+
+    async def render_export(self, service, kind, model_ids, options, user_ids):
+        self.calls.append((kind, sorted(model_ids), dict(options), list(user_ids)))
+        await self.gate.wait()
+        if self.error:
+            raise self.error
+        return {"id": f"file-{len(self.calls)}", "filename": f"export_{len(self.calls)}.pdf"}
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    db = AsyncMongoMockClient()["test_export_jobs"]
+    monkeypatch.setattr(export_jobs, "get_database", lambda: db)
+    monkeypatch.setattr(export_jobs, "export_artifact_cache",
+                        ExportArtifactCache(max_bytes=10 ** 9, sweep_interval=60, directory=str(tmp_path)))
+
+    async def get_snapshot(self):
+        return FakeSnapshot()
+
+    monkeypatch.setattr(CatalogService, "get_snapshot", get_snapshot)
+    renders = Renders()
+    monkeypatch.setattr(ExportService, "render_export",
+                        lambda service, *args: renders.render_export(service, *args))
+    return renders
+
+
+async def settle():
+    # Laisse les workers prendre les exports en file
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def wait_until_finished(queue, job_id, user_id="u1"):
+    for _ in range(200):
+        job_status = await queue.get_status(job_id, user_id)
+        if job_status.status in (JOB_DONE, JOB_FAILED):
+            return job_status
+        await asyncio.sleep(0.005)
+    raise AssertionError("export non terminé")
+
+
+def test_identical_requests_share_one_job(renders):
+    queue = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+
+    async def scenario():
+        renders.gate = asyncio.Event()
+        await queue.start()
+        first = await queue.submit("pdf", ["m1", "m2"], {"include_simulations": True}, "u1")
+        second = await queue.submit("pdf", ["m2", "m1", "m2", "inconnu"], {"include_simulations": True}, "u2")
+        other_options = await queue.submit("pdf", ["m1", "m2"], {"include_simulations": False}, "u1")
+        assert second is first
+        assert other_options is not first
+        assert first.user_ids == ["u1", "u2"]
+        assert first.subscribers == 2
+
+        renders.gate.set()
+        done = await wait_until_finished(queue, first.id, "u2")
+        # Export terminé : une nouvelle demande identique crée un nouvel export
+        again = await queue.submit("pdf", ["m1", "m2"], {"include_simulations": True}, "u1")
+        await wait_until_finished(queue, again.id)
+        await queue.stop()
+        return first, done, again
+
+    first, done, again = asyncio.run(scenario())
+    assert again.id != first.id
+    assert done.status == JOB_DONE and done.file_id and done.subscribers == 2
+    # Un seul rendu pour les deux demandes, pour les deux utilisateurs
+    assert renders.calls[0] == ("pdf", ["m1", "m2"], {"include_simulations": True}, ["u1", "u2"])
+    assert len(renders.calls) == 3
+    assert queue.stats()["deduplicated"] == 1
+
+
+def test_unknown_models_are_rejected(renders):
+    queue = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(queue.submit("pdf", ["inconnu"], {}, "u1"))
+    assert error.value.status_code == 404
+
+
+def test_full_queue_rejects_new_exports_with_503(renders):
+    queue = ExportJobQueue(workers=1, max_queued=1, retention_seconds=60)
+
+    async def scenario():
+        renders.gate = asyncio.Event()
+        await queue.start()
+        running = await queue.submit("excel", ["m1"], {}, "u1")
+        await settle()
+        queued = await queue.submit("excel", ["m2"], {}, "u1")
+        with pytest.raises(HTTPException) as error:
+            await queue.submit("excel", ["m3"], {}, "u1")
+        # Une demande identique à un export en file le rejoint, même file pleine
+        joined = await queue.submit("excel", ["m2"], {}, "u2")
+        statuses = (running.status, queued.status, joined is queued)
+        renders.gate.set()
+        await wait_until_finished(queue, queued.id)
+        await queue.stop()
+        return error.value.status_code, statuses
+
+    status_code, statuses = asyncio.run(scenario())
+    assert status_code == 503
+    assert statuses == (JOB_RUNNING, JOB_QUEUED, True)
+    assert queue.stats()["rejected"] == 1
+
+
+def test_status_is_read_from_the_database_by_other_workers(renders):
+    creator = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+    other_worker = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+
+    async def scenario():
+        renders.gate = asyncio.Event()
+        await creator.start()
+        job = await creator.submit("pdf", ["m1"], {}, "u1")
+        await settle()
+        running = await other_worker.get_status(job.id, "u1")
+        renders.gate.set()
+        await wait_until_finished(creator, job.id)
+        done = await other_worker.get_status(job.id, "u1")
+        hidden = await other_worker.get_status(job.id, "u2")
+        invalid = await other_worker.get_status("pas-un-id", "u1")
+        await creator.stop()
+        return job, running, done, hidden, invalid
+
+    job, running, done, hidden, invalid = asyncio.run(scenario())
+    assert other_worker.get(job.id, "u1") is None # Export inconnu de ce worker : lu en base
+    assert running.status == JOB_RUNNING
+    assert (done.job_id, done.status, done.file_id, done.filename) == (job.id, JOB_DONE, job.file_id, job.filename)
+    assert hidden is None # Export d'un autre utilisateur
+    assert invalid is None
+
+
+def test_watch_follows_a_local_job_until_it_finishes(renders):
+    queue = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+
+    async def scenario():
+        renders.gate = asyncio.Event()
+        renders.error = RuntimeError("rendu impossible")
+        await queue.start()
+        job = await queue.submit("pdf", ["m1"], {}, "u1")
+        events = []
+
+        async def follow():
+            async for job_status in queue.watch(job.id, "u1", keepalive=0.02, poll_interval=0.005):
+                events.append(job_status and job_status.status)
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.05) # Aucun changement pendant plus de keepalive : commentaire keep-alive
+        renders.gate.set()
+        await asyncio.wait_for(follower, timeout=5)
+        await queue.stop()
+        return job, events
+
+    job, events = asyncio.run(scenario())
+    statuses = [event for event in events if event is not None]
+    assert statuses in ([JOB_QUEUED, JOB_RUNNING, JOB_FAILED], [JOB_RUNNING, JOB_FAILED])
+    assert None in events
+    assert job.error == "rendu impossible"
+
+
+def test_watch_polls_the_database_for_a_job_of_another_worker(renders):
+    creator = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+    other_worker = ExportJobQueue(workers=1, max_queued=10, retention_seconds=60)
+
+    async def scenario():
+        renders.gate = asyncio.Event()
+        await creator.start()
+        job = await creator.submit("pdf", ["m1"], {}, "u1")
+        await settle()
+        events = []
+
+        async def follow():
+            async for job_status in other_worker.watch(job.id, "u1", keepalive=0.02, poll_interval=0.005):
+                events.append(job_status and job_status.status)
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.05)
+        renders.gate.set()
+        await asyncio.wait_for(follower, timeout=5)
+        unknown = [job_status async for job_status in other_worker.watch(job.id, "u2", 0.02, 0.005)]
+        await creator.stop()
+        return events, unknown
+
+    events, unknown = asyncio.run(scenario())
+    assert [event for event in events if event is not None] == [JOB_RUNNING, JOB_DONE]
+    assert None in events # Keep-alive pendant l'interrogation
+    assert unknown == []
@@ -0,0 +1,65 @@
+# backend/tests/test_export_models.py
+
+"""Modèles exportés : lus dans ai_models (IDs de la base), par lots, valeurs manquantes remplacées."""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import settings
+from app.services import catalog_service, export_service
+from app.services.catalog_service import MODELS_COLLECTION
+from app.services.export_service import EXPORT_FIELDS, ExportService
+
+
+@pytest.fixture
+def model_ids(monkeypatch):
+    db = AsyncMongoMockClient()["test_export_models"]
+    for module in (catalog_service, export_service):
+        monkeypatch.setattr(module, "get_database", lambda: db)
+    monkeypatch.setattr(catalog_service, "_snapshot", None)
+    monkeypatch.setattr(catalog_service, "_lock", None)
+    monkeypatch.setattr(settings, "EXPORT_CURSOR_BATCH_SIZE", 2)
+    docs = [
+        {"_id": ObjectId(), "model_name": f"M{index}", "architecture": "LlamaForCausalLM",
+         "model_type": "🟢 pretrained", "parameters_billions": float(index + 1),
+         "training_co2_kg": float("nan") if index == 1 else 10.0 * index, "overall_score": 50.0}
+        for index in range(5)
+    ]
+    asyncio.run(db[MODELS_COLLECTION].insert_many(docs))
+    return [str(doc["_id"]) for doc in docs]
+
+
+async def collect(batches):
+    return [batch async for batch in batches]
+
+
+def test_known_ids_are_filtered_on_the_catalog(model_ids):
+    requested = [model_ids[3], str(ObjectId()), model_ids[0], model_ids[3], "pas-un-id"]
+    known_ids, data_version = asyncio.run(ExportService()._known_ids(requested))
+
+    # Ordre de la demande conservé, doublons et IDs inconnus retirés
+    assert known_ids == [model_ids[3], model_ids[0]]
+    assert data_version == asyncio.run(catalog_service.CatalogService().get_snapshot()).version
+
+
+def test_model_batches_keep_the_requested_order(model_ids):
+    requested = [model_ids[4], model_ids[1], model_ids[0], model_ids[2], model_ids[3]]
+    batches = asyncio.run(collect(ExportService()._iter_model_batches(requested)))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    models = [model for batch in batches for model in batch]
+    assert [model["id"] for model in models] == requested
+    assert set(models[0]) == {"id", *EXPORT_FIELDS}
+    # NaN remplacé par la valeur par défaut du champ, champs absents compris
+    assert models[1]["training_co2_kg"] == EXPORT_FIELDS["training_co2_kg"]
+    assert models[1]["mmlu_score"] is None
+
+
+def test_catalog_batches_cover_every_model(model_ids):
+    batches = asyncio.run(collect(ExportService()._iter_export_batches([], {"catalog": True})))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [model["id"] for batch in batches for model in batch] == sorted(model_ids)
@@ -0,0 +1,119 @@
+# backend/tests/test_grid_profiles.py
+
+"""Profils horaires d'intensité carbone (GridProfileService) : fenêtres, conversion .npy, simulation."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.grid_profile_service import (
+    DAYS_PER_YEAR, HOURS_PER_YEAR, GridProfileService, _hourly_window_means,
+)
+
+
+def day_profile():
+    # Intensité égale au numéro du jour : une fenêtre de nuit mélange deux jours
+    return np.repeat(np.arange(DAYS_PER_YEAR, dtype=np.float64)[:, None], 24, axis=1)
+
+
+def brute_force_window_means(profile, window_hours):
+    hours = profile.reshape(-1)
+    means = [hours[np.arange(start, start + window_hours) % hours.size].mean() for start in range(hours.size)]
+    return np.array(means).reshape(profile.shape)
+
+
+def write_profile(directory, region, values, column="co2_factor"):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{region}.csv")
+    pd.DataFrame({"hour": np.arange(len(values)), column: values}).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    return GridProfileService(str(tmp_path / "profils"), str(tmp_path / "cache"))
+
+
+def test_window_crossing_midnight_continues_the_next_day():
+    means = _hourly_window_means(day_profile(), 4)
+    assert means[0, 20] == 0.0
+    assert means[0, 22] == pytest.approx(0.5) # 22h, 23h du jour 0 ; 0h, 1h du jour 1
+    assert means[10, 23] == pytest.approx(10.75)
+    assert means[DAYS_PER_YEAR - 1, 22] == pytest.approx((DAYS_PER_YEAR - 1) / 2) # L'année boucle
+
+
+@pytest.mark.parametrize("window_hours", [1, 3, 24])
+def test_window_means_match_brute_force(window_hours):
+    profile = np.random.default_rng(window_hours).uniform(0.01, 0.9, (DAYS_PER_YEAR, 24))
+    np.testing.assert_allclose(_hourly_window_means(profile, window_hours),
+                               brute_force_window_means(profile, window_hours))
+
+
+def test_profile_is_converted_outside_the_source_directory(service, tmp_path):
+    values = np.linspace(0.1, 0.5, HOURS_PER_YEAR)
+    write_profile(service.profiles_dir, "france", values)
+    sources = sorted(os.listdir(service.profiles_dir))
+
+    profile, source = service.get_profile("france")
+    assert source == "hourly"
+    np.testing.assert_allclose(profile.reshape(-1), values)
+    assert sorted(os.listdir(service.profiles_dir)) == sources # Dossier des sources non modifié
+    assert os.listdir(service.cache_dir) == ["france.npy"]
+
+
+def test_changed_source_is_reconverted(service):
+    path = write_profile(service.profiles_dir, "france", np.full(HOURS_PER_YEAR, 0.1))
+    os.utime(path, (1000, 1000))
+    assert service.get_profile("france")[0][0, 0] == pytest.approx(0.1)
+
+    write_profile(service.profiles_dir, "france", np.full(HOURS_PER_YEAR, 200.0), column="carbon_intensity_g_per_kwh")
+    os.utime(path, (os.path.getmtime(os.path.join(service.cache_dir, "france.npy")) + 10,) * 2)
+    assert service.get_profile("france")[0][0, 0] == pytest.approx(0.2) # g/kWh convertis en kg/kWh
+
+
+def test_unwritable_cache_keeps_the_profile_in_memory(tmp_path):
+    blocker = tmp_path / "cache"
+    blocker.write_text("") # Un fichier : le dossier de cache ne peut pas être créé
+    service = GridProfileService(str(tmp_path / "profils"), str(blocker / "npy"))
+    write_profile(service.profiles_dir, "france", np.full(HOURS_PER_YEAR, 0.3))
+    profile, source = service.get_profile("france")
+    assert source == "hourly"
+    assert profile[100, 5] == pytest.approx(0.3)
+
+
+def test_invalid_source_falls_back_to_a_flat_profile(service):
+    write_profile(service.profiles_dir, "france", np.full(100, 0.3)) # Moins de 8760 valeurs
+    profile, source = service.get_profile("france", flat_factor=0.05)
+    assert source == "flat"
+    assert profile.shape == (DAYS_PER_YEAR, 24)
+    assert np.all(profile == 0.05)
+
+
+def test_flat_profile_simulation(service):
+    load_curve = np.full(24, 1 / 24)
+    result = service.simulate_hourly(24.0, "france", 0.05, load_curve, start_day=300, duration_days=400,
+                                     window_hours=4, top_windows=3)
+    assert result["profile_source"] == "flat"
+    assert result["total_energy_kwh"] == 24.0 * 400
+    assert result["total_co2_kg"] == pytest.approx(result["flat_co2_kg"])
+    assert all(window["savings_kg"] == pytest.approx(0) for window in result["recommended_windows"])
+
+
+def test_hourly_simulation_recommends_the_night_window(service):
+    # Intensité plus faible de 22h à 2h : la meilleure fenêtre de 4 h commence à 22h
+    day = np.full(24, 0.4)
+    day[[22, 23, 0, 1]] = 0.1
+    write_profile(service.profiles_dir, "france", np.tile(day, DAYS_PER_YEAR))
+    load_curve = np.zeros(24)
+    load_curve[12] = 1.0 # Toute la charge à midi
+
+    result = service.simulate_hourly(10.0, "france", 0.4, load_curve, start_day=0, duration_days=2 * DAYS_PER_YEAR,
+                                     window_hours=4, top_windows=1)
+    assert result["profile_source"] == "hourly"
+    assert result["total_co2_kg"] == pytest.approx(10.0 * 2 * DAYS_PER_YEAR * 0.4)
+    best = result["recommended_windows"][0]
+    assert (best["start_hour"], best["end_hour"]) == (22, 2)
+    assert best["mean_intensity"] == pytest.approx(0.1)
+    assert best["savings_kg"] == pytest.approx(10.0 * 2 * DAYS_PER_YEAR * 0.3)
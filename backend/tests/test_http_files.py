@@ -0,0 +1,128 @@
+# backend/tests/test_http_files.py
+
+"""Envoi de fichiers HTTP : intervalles Range / If-Range, réponses 206 / 416, négociation gzip."""
+
+from email.utils import formatdate
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.http_files import RangeFileResponse, accepts_encoding, parse_range
+
+CONTENT = bytes(range(256)) * 40 # 10 240 octets
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-", (0, 9999)),
+    ("bytes=0-0", (0, 0)),
+    ("bytes=100-199", (100, 199)),
+    ("bytes=9000-20000", (9000, 9999)), # Fin au-delà du fichier : tronquée
+    ("bytes=-500", (9500, 9999)),
+    ("bytes=-20000", (0, 9999)), # Plus d'octets que le fichier : fichier complet
+    ("bytes=0-10,20-30", None), # Plusieurs intervalles : fichier complet
+    ("bytes=200-100", None),
+    ("bytes=abc-", None),
+    ("bytes=-", None),
+    ("items=0-10", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 10000) == expected
+
+
+@pytest.mark.parametrize("header, size", [("bytes=10000-", 10000), ("bytes=-0", 10000), ("bytes=0-", 0)])
+def test_parse_range_outside_the_file(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("GZIP", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0.0, br", False),
+    ("*", True),
+    ("*;q=0.1", True),
+    ("br, *;q=0", False),
+    ("gzip;q=0, *", False), # gzip explicitement refusé malgré "*"
+    ("gzip;q=invalide", False),
+])
+def test_accepts_encoding(header, expected):
+    assert accepts_encoding(header, "gzip") is expected
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "export.bin"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def download():
+        return RangeFileResponse(str(path), filename="export.bin")
+
+    return TestClient(app)
+
+
+def test_full_download_advertises_ranges(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+
+def test_open_ended_range_returns_the_whole_file_as_206(client):
+    response = client.get("/file", headers={"Range": "bytes=0-"})
+    assert response.status_code == 206
+    assert response.content == CONTENT
+    assert response.headers["content-range"] == f"bytes 0-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_suffix_range_returns_the_last_bytes(client):
+    response = client.get("/file", headers={"Range": "bytes=-100"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-100:]
+    assert response.headers["content-length"] == "100"
+    assert response.headers["content-range"] == f"bytes {len(CONTENT) - 100}-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_resumed_download_reassembles_the_file(client):
+    first = client.get("/file", headers={"Range": "bytes=0-4095"})
+    validator = first.headers["etag"]
+    second = client.get("/file", headers={"Range": "bytes=4096-", "If-Range": validator})
+    assert (first.status_code, second.status_code) == (206, 206)
+    assert first.content + second.content == CONTENT
+
+
+def test_range_outside_the_file_returns_416(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+    assert response.content == b""
+
+
+def test_if_range_with_last_modified_date_is_honoured(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    response = client.get("/file", headers={"Range": "bytes=10-19", "If-Range": last_modified})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+
+
+@pytest.mark.parametrize("if_range", ['"etag-perime"', formatdate(0, usegmt=True)])
+def test_mismatched_if_range_returns_the_full_file(client, if_range):
+    # Fichier modifié depuis le début du téléchargement : le client doit tout recharger
+    response = client.get("/file", headers={"Range": "bytes=10-19", "If-Range": if_range})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "content-range" not in response.headers
+
+
+def test_mismatched_if_range_ignores_an_unsatisfiable_range(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-", "If-Range": '"etag-perime"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
@@ -0,0 +1,78 @@
+# backend/tests/test_model_ranking.py
+
+"""Classement des modèles par CO2 projeté (rank_models) : sélection partielle comparée à un tri complet."""
+
+import asyncio
+import random
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models.models import SimulationRankingRequest
+from app.services import catalog_service
+from app.services.catalog_service import MODELS_COLLECTION
+from app.services.simulation_service import SimulationService
+
+ARCHITECTURES = ["LlamaForCausalLM", "MistralForCausalLM", None]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    db = AsyncMongoMockClient()["test_model_ranking"]
+    monkeypatch.setattr(catalog_service, "get_database", lambda: db)
+    monkeypatch.setattr(catalog_service, "_snapshot", None)
+    monkeypatch.setattr(catalog_service, "_lock", None)
+    generator = random.Random(39)
+    docs = []
+    for index in range(300):
+        # Peu de tailles et de scores distincts : nombreux ex aequo sur le CO2 et sur le score
+        doc = {"_id": ObjectId(), "model_name": f"M{index}", "model_type": "🟢 pretrained",
+               "architecture": generator.choice(ARCHITECTURES),
+               "parameters_billions": generator.choice([None, 0, 1.0, 2.0, 3.0, 7.0, 13.0]),
+               "overall_score": generator.choice([None, 40.0, 50.0, 60.0])}
+        docs.append(doc)
+    asyncio.run(db[MODELS_COLLECTION].insert_many(docs))
+    return docs
+
+
+def full_sort(docs, max_parameters_billions=None, min_overall_score=None, architecture=None):
+    """Classement de référence : tri complet par (taille, donc CO2), score décroissant, ordre du catalogue."""
+    eligible = [
+        (position, doc) for position, doc in enumerate(docs)
+        if doc["parameters_billions"]
+        and (max_parameters_billions is None or doc["parameters_billions"] <= max_parameters_billions)
+        and (min_overall_score is None or (doc["overall_score"] or 0) >= min_overall_score)
+        and (architecture is None or doc["architecture"] == architecture)
+    ]
+    eligible.sort(key=lambda item: (
+        item[1]["parameters_billions"],
+        -item[1]["overall_score"] if item[1]["overall_score"] is not None else float("inf"),
+        item[0],
+    ))
+    return [doc["model_name"] for _, doc in eligible]
+
+
+@pytest.mark.parametrize("top_k", [1, 2, 5, 37, 100, 500])
+def test_partial_selection_matches_a_full_sort(catalog, top_k):
+    request = SimulationRankingRequest(frequency_per_day=1000, region="france", top_k=top_k)
+    result = asyncio.run(SimulationService().rank_models(request))
+
+    expected = full_sort(catalog)
+    assert result.eligible_models == len(expected)
+    assert [entry.model_name for entry in result.ranking] == expected[:top_k]
+    assert [entry.rank for entry in result.ranking] == list(range(1, min(top_k, len(expected)) + 1))
+
+
+@pytest.mark.parametrize("constraints", [
+    {"max_parameters_billions": 3.0},
+    {"min_overall_score": 50.0},
+    {"architecture": "MistralForCausalLM"},
+])
+def test_constraints_filter_the_ranking(catalog, constraints):
+    request = SimulationRankingRequest(frequency_per_day=1000, region="france", top_k=20, **constraints)
+    result = asyncio.run(SimulationService().rank_models(request))
+
+    expected = full_sort(catalog, **constraints)
+    assert result.eligible_models == len(expected)
+    assert [entry.model_name for entry in result.ranking] == expected[:20]
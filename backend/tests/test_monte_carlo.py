@@ -0,0 +1,131 @@
+# backend/tests/test_monte_carlo.py
+
+"""Simulation Monte Carlo : PUE centré sur le registre, arrêt du calcul après un délai dépassé."""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import settings
+from app.models.models import SimulationMonteCarloParams, SimulationParams
+from app.services import catalog_service, model_service, simulation_service, simulation_write_buffer
+from app.services.catalog_service import MODELS_COLLECTION
+from app.services.emission_factors import emission_factor_registry
+from app.services.simulation_service import (
+    MONTE_CARLO_PUE_ABOVE, MONTE_CARLO_PUE_BELOW, SimulationService, monte_carlo_impacts, monte_carlo_pue,
+    simulation_cache,
+)
+
+
+class CancelAfter:
+    """Événement positionné après ``checks`` vérifications (annulation pendant le calcul)."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def is_set(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+@pytest.fixture
+def model_id(monkeypatch):
+    db = AsyncMongoMockClient()["test_monte_carlo"]
+    for module in (catalog_service, model_service, simulation_service, simulation_write_buffer):
+        monkeypatch.setattr(module, "get_database", lambda: db)
+    monkeypatch.setattr(catalog_service, "_write_version", None)
+    simulation_cache.clear()
+    result = asyncio.run(db[MODELS_COLLECTION].insert_one({
+        "model_name": "M1", "parameters_billions": 7.0, "architecture": "LlamaForCausalLM",
+        "model_type": "🟢 pretrained", "training_co2_kg": 10.0, "overall_score": 50.0,
+    }))
+    yield str(result.inserted_id)
+    simulation_cache.clear()
+
+
+def monte_carlo_params(model_id, **extra):
+    return SimulationMonteCarloParams(model_id=model_id, region="france", cloud_provider="aws",
+                                      frequency_per_day=1000, duration_days=30, **extra)
+
+
+def test_pue_defaults_are_centred_on_the_registry():
+    params = monte_carlo_params("m1")
+    assert monte_carlo_pue(params, 1.3) == (1.3 - MONTE_CARLO_PUE_BELOW, 1.3, 1.3 + MONTE_CARLO_PUE_ABOVE)
+    assert monte_carlo_pue(params, 1.0)[0] == 1.0 # PUE >= 1
+    explicit = monte_carlo_params("m1", pue_min=1.1, pue_max=2.0)
+    assert monte_carlo_pue(explicit, 1.3) == (1.1, 1.3, 2.0)
+
+
+def test_monte_carlo_median_matches_the_deterministic_simulation(model_id):
+    service = SimulationService()
+    registry_pue = emission_factor_registry.lookup("aws", "france")["pue"]
+
+    async def scenario():
+        deterministic = await service.simulate_impact(
+            SimulationParams(model_id=model_id, region="france", cloud_provider="aws",
+                             frequency_per_day=1000, duration_days=30))
+        # Sans incertitude et sans dispersion du PUE : tous les tirages valent la simulation déterministe
+        exact = await service.simulate_monte_carlo(monte_carlo_params(
+            model_id, energy_sigma=0, intensity_sigma=0, pue_min=registry_pue, pue_max=registry_pue))
+        # PUE par défaut : loi triangulaire de mode le PUE du registre
+        spread = await service.simulate_monte_carlo(monte_carlo_params(model_id, energy_sigma=0, intensity_sigma=0))
+        return deterministic.total_co2_kg, exact, spread
+
+    deterministic_co2, exact, spread = asyncio.run(scenario())
+    for value in exact.percentiles["total_co2_kg"].values():
+        assert value == pytest.approx(deterministic_co2)
+
+    low, mode, high = registry_pue - MONTE_CARLO_PUE_BELOW, registry_pue, registry_pue + MONTE_CARLO_PUE_ABOVE
+    median_pue = high - np.sqrt((high - low) * (high - mode) / 2) # Mode dans la moitié basse
+    assert spread.percentiles["total_co2_kg"]["p50"] == pytest.approx(deterministic_co2 * median_pue / mode, rel=1e-2)
+
+
+def test_monte_carlo_rejects_inconsistent_pue(model_id):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(SimulationService().simulate_monte_carlo(monte_carlo_params(model_id, pue_mode=1.0, pue_min=1.2)))
+    assert error.value.status_code == 400
+
+
+def test_impacts_are_drawn_in_chunks(monkeypatch):
+    arguments = (7.0, 1000, 30, 0.05, 2500, 3, 0.5, 0.2, (1.05, 1.2, 1.6))
+    expected = monte_carlo_impacts(*arguments)
+    monkeypatch.setattr(simulation_service, "MONTE_CARLO_CHUNK_SAMPLES", 1000)
+    chunked = monte_carlo_impacts(*arguments)
+    # Mêmes lois, autre découpage du flux aléatoire : mêmes statistiques à l'erreur d'échantillonnage près
+    assert chunked["mean_co2_kg"] == pytest.approx(expected["mean_co2_kg"], rel=0.1)
+    assert monte_carlo_impacts(*arguments) == chunked # Reproductible pour une même graine
+
+
+def test_cancelled_draws_stop_between_chunks(monkeypatch):
+    monkeypatch.setattr(simulation_service, "MONTE_CARLO_CHUNK_SAMPLES", 1000)
+    arguments = (7.0, 1000, 30, 0.05, 10000, 0, 0.5, 0.2, (1.05, 1.2, 1.6))
+    cancel = CancelAfter(checks=3)
+    assert monte_carlo_impacts(*arguments, cancel=cancel) is None
+    assert cancel.checks == -1 # Arrêt à la quatrième tranche, sur dix
+
+
+def test_timeout_releases_the_worker(model_id, monkeypatch):
+    monkeypatch.setattr(simulation_service, "MONTE_CARLO_CHUNK_SAMPLES", 1000)
+    monkeypatch.setattr(settings, "SIMULATION_MONTE_CARLO_TIMEOUT_SECONDS", 0.01)
+    started, finished = threading.Event(), threading.Event()
+    outcome = {}
+
+    def slow_impacts(*args):
+        cancel = args[-1]
+        started.set()
+        cancel.wait(5) # Le délai est dépassé pendant le calcul
+        outcome["result"] = monte_carlo_impacts(*args)
+        finished.set()
+        return outcome["result"]
+
+    monkeypatch.setattr(simulation_service, "monte_carlo_impacts", slow_impacts)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(SimulationService().simulate_monte_carlo(monte_carlo_params(model_id, samples=1000000)))
+    assert error.value.status_code == 504
+    assert started.is_set()
+    assert finished.wait(5)
+    assert outcome["result"] is None
@@ -0,0 +1,91 @@
+# backend/tests/test_password_hashing.py
+
+"""Pool de hachage des mots de passe (PasswordHashingPool) : borne, 503, libération des places."""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHashingPool
+
+
+class BlockingWork:
+    """Opération bloquante (bcrypt simulé) : démarre, puis attend release()."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self, value):
+        self.started.set()
+        assert self.released.wait(timeout=5)
+        return value * 2
+
+
+async def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition non atteinte")
+
+
+def test_cancelled_request_keeps_its_slot_until_the_work_ends():
+    pool = PasswordHashingPool(workers=1, max_pending=1)
+    work = BlockingWork()
+
+    async def scenario():
+        request = asyncio.create_task(pool.run(work, 21))
+        await asyncio.to_thread(work.started.wait, 5)
+        request.cancel() # Client déconnecté pendant le hachage
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        # Le thread calcule toujours : la place n'est pas rendue, une nouvelle demande est refusée
+        assert pool.pending == 1
+        with pytest.raises(HTTPException) as error:
+            await pool.run(str, 1)
+        work.released.set()
+        await wait_for(lambda: pool.pending == 0)
+        return error.value, await pool.run(lambda value: value + 1, 41)
+
+    error, result = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert result == 42
+    stats = pool.stats()
+    assert (stats["pending"], stats["completed"], stats["rejected"]) == (0, 2, 1)
+
+
+def test_failed_work_releases_its_slot():
+    pool = PasswordHashingPool(workers=1, max_pending=1)
+
+    def fail():
+        raise ValueError("hash invalide")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await pool.run(fail)
+        await wait_for(lambda: pool.pending == 0)
+        return await pool.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert pool.completed == 1
+
+
+def test_concurrent_operations_beyond_the_bound_are_rejected():
+    pool = PasswordHashingPool(workers=2, max_pending=3)
+    work = BlockingWork()
+
+    async def scenario():
+        requests = [asyncio.create_task(pool.run(work, value)) for value in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException):
+            await pool.run(work, 3)
+        work.released.set()
+        return await asyncio.gather(*requests)
+
+    assert asyncio.run(scenario()) == [0, 2, 4]
+    assert pool.max_pending_seen == 3
+    assert pool.pending == 0
@@ -0,0 +1,112 @@
+# backend/tests/test_pdf_report.py
+
+"""Rapports PDF : rendu (fpdf2, matplotlib), cache des graphiques, pool de processus cassé."""
+
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fpdf")
+pytest.importorskip("matplotlib")
+
+from app.services import export_service
+from app.services.catalog_service import CatalogService
+from app.services.export_service import ExportService, chart_cache
+from app.utils.pdf_report import CHART_MAX_MODELS, latin1, render_charts, render_pdf_report
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def test_latin1_keeps_accents_and_drops_emoji():
+    assert latin1("Émissions – CO₂ “réelles” 🟢 pretrained") == 'Émissions - CO2 "réelles" pretrained'
+    assert latin1(None) == ""
+
+
+def test_charts_are_rendered_as_png():
+    names = [f"Modèle {index}" for index in range(CHART_MAX_MODELS + 5)]
+    co2 = [0.0] + [float(index) for index in range(1, len(names))]
+    charts = render_charts(names, co2, [50.0] * len(names))
+    assert set(charts) == {"co2", "efficiency"}
+    assert all(chart.startswith(PNG_SIGNATURE) for chart in charts.values())
+
+
+def test_report_with_every_section_is_a_pdf(tmp_path):
+    models = [
+        {"model_name": f"Modèle {index} 🟢", "architecture": "LlamaForCausalLM", "model_type": "🟢 pretrained",
+         "parameters_billions": 7.0, "training_co2_kg": 10.0 * index, "overall_score": 50.0, "efficiency": 0.5}
+        for index in range(40) # Plusieurs pages
+    ]
+    report = {
+        "generated_at": "01/03/2024 12:00:00",
+        "data_version": "1.0.40",
+        "models": models,
+        "simulations": {"regions": [{"id": "france", "name": "France"}], "frequency_per_day": 1000,
+                        "duration_days": 365, "rows": [{"model_name": "Modèle 1", "co2_kg": [1.5]}]},
+        "recommendations": [],
+    }
+    charts = render_charts([m["model_name"] for m in models], [m["training_co2_kg"] for m in models],
+                           [m["overall_score"] for m in models])
+    path = tmp_path / "rapport.pdf"
+    render_pdf_report(str(path), report, charts)
+
+    content = path.read_bytes()
+    assert content.startswith(b"%PDF-")
+    assert content.count(b"/Type /Page\n") >= 2
+
+
+class FakeSnapshot:
+    version = "v1"
+    model_names = np.array(["A", "B", "C"], dtype=object)
+    training_co2_kg = np.array([10.0, np.nan, 30.0])
+    overall_score = np.array([50.0, 60.0, np.nan])
+
+    def indices_of(self, model_ids):
+        return np.array([{"a": 0, "b": 1, "c": 2}.get(model_id, -1) for model_id in model_ids])
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+
+    async def run_inline(func, *args):
+        calls.append(args)
+        return {"co2": b"png"}
+
+    async def get_snapshot(self):
+        return FakeSnapshot()
+
+    monkeypatch.setattr(export_service, "_run_in_pdf_pool", run_inline)
+    monkeypatch.setattr(CatalogService, "get_snapshot", get_snapshot)
+    chart_cache.clear()
+    yield calls
+    chart_cache.clear()
+
+
+def test_charts_are_cached_per_model_set_and_data_version(renders):
+    service = ExportService()
+
+    async def scenario():
+        await service._get_charts(["a", "b", "inconnu"], "v1")
+        await service._get_charts(["b", "inconnu", "a"], "v1") # Même ensemble : graphiques en cache
+        await service._get_charts(["a", "b", "inconnu"], "v2") # Données modifiées : nouveau rendu
+        await service._get_charts(["c"], "v2")
+
+    asyncio.run(scenario())
+    assert len(renders) == 3
+    # Modèles inconnus ignorés, NaN remplacés par 0
+    assert renders[0] == (["A", "B"], [10.0, 0.0], [50.0, 60.0])
+    assert renders[2] == (["C"], [30.0], [0.0])
+
+
+class BrokenPool:
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("processus de rendu arrêté")
+
+
+def test_broken_pool_is_recreated_on_next_use(monkeypatch):
+    monkeypatch.setattr(export_service, "_pdf_pool", BrokenPool())
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(export_service._run_in_pdf_pool(len, "abc"))
+    assert export_service._pdf_pool is None
@@ -0,0 +1,82 @@
+# backend/tests/test_placement.py
+
+"""Placement sous capacités (app.utils.placement) : faisabilité, borne lagrangienne, optimum exhaustif."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.utils.placement import CAPACITY_TOLERANCE, lagrangian_bound, place_workloads
+
+
+def random_instance(seed, n_workloads, n_regions, forbidden_ratio=0.2):
+    generator = np.random.default_rng(seed)
+    energy = generator.uniform(1.0, 10.0, size=(n_workloads, n_regions))
+    cost = energy * generator.uniform(0.02, 0.8, size=(1, n_regions)) # Intensité carbone par région
+    cost[generator.random(size=cost.shape) < forbidden_ratio] = np.inf
+    # Capacités serrées : la région la moins émettrice ne peut pas tout accueillir
+    capacity = np.full(n_regions, energy.sum() / n_regions * 0.9)
+    capacity[-1] = np.inf
+    cost[:, -1] = energy[:, -1] # Région sans limite, toujours autorisée (instance réalisable)
+    return cost, energy, capacity
+
+
+def brute_force_optimum(cost, energy, capacity):
+    best = np.inf
+    n_workloads, n_regions = cost.shape
+    for assignment in itertools.product(range(n_regions), repeat=n_workloads):
+        used = np.bincount(assignment, weights=energy[np.arange(n_workloads), assignment], minlength=n_regions)
+        if np.all(used <= capacity + CAPACITY_TOLERANCE):
+            best = min(best, cost[np.arange(n_workloads), assignment].sum())
+    return best
+
+
+def check_feasible(cost, energy, capacity, assignment):
+    rows = np.arange(cost.shape[0])
+    assert np.all(assignment >= 0)
+    assert np.all(np.isfinite(cost[rows, assignment])) # Aucune région interdite
+    used = np.bincount(assignment, weights=energy[rows, assignment], minlength=cost.shape[1])
+    assert np.all(used <= capacity + CAPACITY_TOLERANCE)
+    return float(cost[rows, assignment].sum())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_greedy_stays_above_the_bound_and_the_optimum(seed):
+    cost, energy, capacity = random_instance(seed, n_workloads=7, n_regions=3)
+    assignment, bound = place_workloads(cost, energy, capacity)
+
+    total = check_feasible(cost, energy, capacity, assignment)
+    optimum = brute_force_optimum(cost, energy, capacity)
+    assert bound is not None
+    assert bound <= optimum + 1e-9 <= total + 2e-9
+    # La borne lagrangienne seule (sans le min avec le glouton) reste une borne valide
+    raw_bound, prices = lagrangian_bound(cost, energy, capacity, upper_bound=total)
+    assert raw_bound <= optimum + 1e-9
+    assert np.all(prices >= 0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_larger_instances_stay_above_the_bound(seed):
+    cost, energy, capacity = random_instance(100 + seed, n_workloads=400, n_regions=8)
+    assignment, bound = place_workloads(cost, energy, capacity)
+
+    total = check_feasible(cost, energy, capacity, assignment)
+    assert 0 < bound <= total
+
+
+def test_without_capacity_limits_each_workload_takes_its_cheapest_region():
+    cost, energy, _ = random_instance(7, n_workloads=50, n_regions=4)
+    assignment, bound = place_workloads(cost, energy, np.full(4, np.inf))
+
+    assert np.array_equal(assignment, cost.argmin(axis=1))
+    assert bound == pytest.approx(cost.min(axis=1).sum())
+
+
+def test_workloads_that_cannot_be_placed_have_no_bound():
+    cost = np.array([[1.0, np.inf], [2.0, 1.0], [np.inf, np.inf]])
+    energy = np.array([[5.0, 5.0], [5.0, 5.0], [1.0, 1.0]])
+    assignment, bound = place_workloads(cost, energy, np.array([10.0, 1.0]))
+
+    assert assignment.tolist() == [0, 0, -1]
+    assert bound is None
@@ -0,0 +1,101 @@
+# backend/tests/test_portfolio.py
+
+"""Portefeuille de déploiements (simulate_portfolio) : totaux, répartitions, gains des remplacements."""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models.models import SimulationParams
+from app.services import catalog_service
+from app.services.catalog_service import MODELS_COLLECTION
+from app.services.emission_factors import emission_factor_registry
+from app.services.simulation_service import EQUIVALENTS, SimulationService, compute_impacts
+
+# (nom, architecture, milliards de paramètres, CO2 d'entraînement, score global)
+CATALOG = [
+    ("A", "LlamaForCausalLM", 7.0, 100.0, 50.0),
+    ("B", "LlamaForCausalLM", 6.0, 20.0, 40.0), # Meilleure recommandation de A et de C
+    ("C", "LlamaForCausalLM", 8.0, 50.0, 60.0),
+    ("E", "LlamaForCausalLM", 7.5, 1.0, None), # Sans score global : jamais recommandé
+    ("F", "QwenForCausalLM", 7.0, 100.0, 50.0),
+    ("G", "QwenForCausalLM", 9.0, 5.0, 55.0), # Recommandation de F, plus coûteuse à l'inférence
+    ("D", "MistralForCausalLM", 7.0, 10.0, 50.0), # Aucune recommandation
+]
+
+
+@pytest.fixture
+def model_ids(monkeypatch):
+    db = AsyncMongoMockClient()["test_portfolio"]
+    monkeypatch.setattr(catalog_service, "get_database", lambda: db)
+    monkeypatch.setattr(catalog_service, "_snapshot", None)
+    monkeypatch.setattr(catalog_service, "_lock", None)
+    docs = [
+        {"_id": ObjectId(), "model_name": name, "architecture": architecture, "model_type": "🟢 pretrained",
+         "parameters_billions": parameters, "training_co2_kg": co2, "overall_score": score}
+        for name, architecture, parameters, co2, score in CATALOG
+    ]
+    asyncio.run(db[MODELS_COLLECTION].insert_many(docs))
+    return {doc["model_name"]: str(doc["_id"]) for doc in docs}
+
+
+def deployment_co2(parameters, deployment):
+    factors = emission_factor_registry.lookup(None, deployment.region)
+    impacts = compute_impacts(parameters, deployment.frequency_per_day, deployment.duration_days,
+                              factors["co2_factor"], EQUIVALENTS, factors["pue"])
+    return float(impacts["total_co2_kg"])
+
+
+def test_portfolio_totals_and_swap_savings(model_ids):
+    deployments = [
+        SimulationParams(model_id=model_ids["A"], region="france", frequency_per_day=100, duration_days=30),
+        SimulationParams(model_id=model_ids["A"], region="china", frequency_per_day=100, duration_days=30),
+        SimulationParams(model_id=model_ids["C"], region="sweden", frequency_per_day=10, duration_days=365),
+        SimulationParams(model_id=model_ids["F"], region="france", frequency_per_day=1000, duration_days=30),
+        SimulationParams(model_id=model_ids["D"], region="france", frequency_per_day=10, duration_days=30),
+        SimulationParams(model_id=str(ObjectId()), region="france", frequency_per_day=10),
+        SimulationParams(model_id=model_ids["A"], region="atlantide", frequency_per_day=10),
+    ]
+    result = asyncio.run(SimulationService().simulate_portfolio(deployments))
+
+    valid = deployments[:5]
+    parameters = {name: size for name, _, size, _, _ in CATALOG}
+    names = ["A", "A", "C", "F", "D"]
+    co2 = [deployment_co2(parameters[name], deployment) for name, deployment in zip(names, valid)]
+    assert result.deployments_count == 5
+    assert [error.index for error in result.errors] == [5, 6]
+    assert result.total_co2_kg == pytest.approx(sum(co2))
+    assert result.by_region["france"]["deployments"] == 3
+    assert result.by_region["france"]["total_co2_kg"] == pytest.approx(co2[0] + co2[3] + co2[4])
+
+    by_model = {breakdown.model_name: breakdown for breakdown in result.by_model}
+    assert [breakdown.total_co2_kg for breakdown in result.by_model] == sorted(
+        (breakdown.total_co2_kg for breakdown in result.by_model), reverse=True)
+    assert by_model["A"].deployments == 2
+
+    # A et C remplacés par B : mêmes déploiements, modèle plus petit
+    swapped_a = sum(deployment_co2(parameters["B"], deployment) for deployment in valid[:2])
+    assert by_model["A"].recommended_model_name == "B"
+    assert by_model["A"].co2_after_swap_kg == pytest.approx(swapped_a)
+    assert by_model["A"].co2_savings_kg == pytest.approx(co2[0] + co2[1] - swapped_a)
+    assert by_model["A"].training_co2_savings_kg == pytest.approx(80.0)
+    savings_c = co2[2] - deployment_co2(parameters["B"], valid[2])
+    assert by_model["C"].recommended_model_name == "B"
+    assert by_model["C"].co2_savings_kg == pytest.approx(savings_c)
+
+    # F remplacé par G : gain négatif, exclu du gain potentiel
+    assert by_model["F"].recommended_model_name == "G"
+    assert by_model["F"].co2_savings_kg < 0
+    assert by_model["D"].recommended_model_id is None and by_model["D"].co2_savings_kg is None
+    assert result.potential_savings_kg == pytest.approx(by_model["A"].co2_savings_kg + savings_c)
+
+
+def test_portfolio_without_valid_deployment(model_ids):
+    result = asyncio.run(SimulationService().simulate_portfolio([
+        SimulationParams(model_id="pas-un-id", region="france", frequency_per_day=10),
+    ]))
+    assert result.deployments_count == 0
+    assert result.by_model == [] and result.potential_savings_kg == 0.0
+    assert len(result.errors) == 1
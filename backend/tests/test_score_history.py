@@ -0,0 +1,122 @@
+# backend/tests/test_score_history.py
+
+"""Historique des scores (score_history_service) : numérotation des runs, buckets, trajectoire, churn."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.services import score_history_service
+from app.services.score_history_service import SCORE_HISTORY_COLLECTION, SCORE_RUNS_COLLECTION, ScoreHistoryService
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test_score_history"]
+    monkeypatch.setattr(score_history_service, "get_database", lambda: db)
+    # Buckets de 2 runs : une trajectoire de quelques runs couvre plusieurs documents
+    monkeypatch.setattr(score_history_service, "BUCKET_SIZE", 2)
+    return db
+
+
+def record_runs(service, runs_categories):
+    """Enregistre un run par dict {model_id: catégorie} ; retourne les runs créés."""
+    async def scenario():
+        runs = []
+        for categories in runs_categories:
+            run = await service.start_run("python")
+            model_ids = list(categories)
+            scores = [10.0 * (len(runs) + 1)] * len(model_ids)
+            await service.record_run(run, model_ids, scores, [categories[model_id] for model_id in model_ids])
+            runs.append(run)
+        return runs
+
+    return asyncio.run(scenario())
+
+
+class YieldingCollection:
+    """Collection dont find_one rend la main à la boucle (lectures entrelacées comme sur un vrai serveur)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one(self, *args, **kwargs):
+        doc = await self.collection.find_one(*args, **kwargs)
+        await asyncio.sleep(0)
+        return doc
+
+
+def test_concurrent_runs_get_distinct_numbers(db, monkeypatch):
+    service = ScoreHistoryService()
+    monkeypatch.setattr(service, "_get_runs_collection", lambda: YieldingCollection(db[SCORE_RUNS_COLLECTION]))
+
+    async def scenario():
+        await service.ensure_indexes()
+        return await asyncio.gather(*(service.start_run("python") for _ in range(10)))
+
+    runs = asyncio.run(scenario())
+    assert sorted(run["seq"] for run in runs) == list(range(10))
+
+
+def test_run_numbers_continue_after_existing_runs(db):
+    # Runs enregistrés avant l'introduction du compteur
+    asyncio.run(db[SCORE_RUNS_COLLECTION].insert_many([
+        {"_id": ObjectId(), "seq": seq, "timestamp": datetime(2024, 1, seq + 1)} for seq in (0, 1, 2)
+    ]))
+    service = ScoreHistoryService()
+
+    first = asyncio.run(service.start_run("python"))
+    second = asyncio.run(service.start_run("aggregation"))
+    assert (first["seq"], second["seq"]) == (3, 4)
+    assert [run.seq for run in asyncio.run(service.list_runs())] == [4, 3, 2, 1, 0]
+
+
+def test_runs_are_grouped_in_buckets_per_model(db):
+    service = ScoreHistoryService()
+    runs = record_runs(service, [{"m1": "A", "m2": "B"}] * 3 + [{"m1": "A"}])
+
+    buckets = asyncio.run(db[SCORE_HISTORY_COLLECTION].find({}).sort("_id", 1).to_list(None))
+    assert [(bucket["_id"], len(bucket["run_ids"])) for bucket in buckets] == [
+        ("m1:0", 2), ("m1:1", 2), ("m2:0", 2), ("m2:1", 1)
+    ]
+    assert buckets[1]["run_ids"] == [str(runs[2]["_id"]), str(runs[3]["_id"])]
+
+
+def test_trajectory_lists_every_run_in_order(db):
+    service = ScoreHistoryService()
+    runs = record_runs(service, [{"m1": "A"}, {"m1": "B"}, {"m1": "B"}, {"m2": "C"}, {"m1": "A"}])
+
+    trajectory = asyncio.run(service.get_trajectory("m1"))
+    assert [point.run_id for point in trajectory.points] == [str(runs[index]["_id"]) for index in (0, 1, 2, 4)]
+    assert [point.carbon_score for point in trajectory.points] == [10.0, 20.0, 30.0, 50.0]
+    assert [point.category for point in trajectory.points] == ["A", "B", "B", "A"]
+    assert asyncio.run(service.get_trajectory("inconnu")) is None
+
+
+def test_category_churn_between_two_runs(db):
+    service = ScoreHistoryService()
+    before, after = record_runs(service, [
+        {"m1": "A", "m2": "B", "m3": "B", "m4": "C"},
+        {"m1": "A", "m2": "A", "m3": "C", "m5": "B"},
+    ])
+
+    churn = asyncio.run(service.get_category_churn(str(before["_id"]), str(after["_id"])))
+    assert churn.compared_models == 3
+    assert churn.changed_models_count == 2
+    assert (churn.added_models_count, churn.removed_models_count) == (1, 1)
+    assert churn.transitions == {"A": {"A": 1}, "B": {"A": 1, "C": 1}}
+    assert sorted(change["model_id"] for change in churn.changed_models) == ["m2", "m3"]
+
+
+def test_category_churn_of_unknown_runs(db):
+    service = ScoreHistoryService()
+    record_runs(service, [{"m1": "A"}])
+
+    assert asyncio.run(service.get_category_churn("pas-un-id", str(ObjectId()))) is None
+    assert asyncio.run(service.get_category_churn(str(ObjectId()), str(ObjectId()))) is None
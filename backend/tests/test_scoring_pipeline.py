@@ -0,0 +1,153 @@
+# backend/tests/test_scoring_pipeline.py
+
+"""Le pipeline d'agrégation (moteur "aggregation") donne les scores des moteurs python et streaming.
+
+La structure du pipeline est vérifiée sans base. La parité des résultats est vérifiée en
+exécutant le pipeline ($setWindowFields, $rank, $merge) sur un vrai serveur MongoDB >= 5.0 :
+MONGODB_TEST_URL (par défaut mongodb://localhost:27017) ; le test est ignoré sans serveur.
+"""
+
+import os
+import uuid
+
+import numpy as np
+import pytest
+from mongomock.filtering import filter_applies
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.core.constants import CARBON_CATEGORIES, SCORE_WEIGHTS
+from app.utils.scoring import percentile_ranks, weighted_scores, categorize, category_switch_branches
+from scripts.calculate_scores import (
+    ELIGIBLE_FILTER, MODELS_COLLECTION, _percentile_rank_expr, build_scoring_pipeline, calculate_percentile_rank,
+)
+
+NAN = float("nan")
+METRICS = ["co2", "co2_per_param", "co2_per_score"]
+# Champs écrits par les moteurs python et streaming
+SCORE_FIELDS = {"carbon_score", "category", "rank_percentile", "efficiency_ratio", "co2_per_param",
+                "rank_co2", "rank_co2_per_param", "rank_co2_per_score"}
+
+# Égalités sur chaque métrique, et documents inéligibles (NaN, None, absent, nul)
+FIXTURE = [
+    {"_id": 1, "training_co2_kg": 10.0, "parameters_billions": 1.0, "overall_score": 50.0},
+    {"_id": 2, "training_co2_kg": 10.0, "parameters_billions": 2.0, "overall_score": 50.0},
+    {"_id": 3, "training_co2_kg": 20.0, "parameters_billions": 2.0, "overall_score": 40.0},
+    {"_id": 4, "training_co2_kg": 20.0, "parameters_billions": 4.0, "overall_score": 80.0},
+    {"_id": 5, "training_co2_kg": 20.0, "parameters_billions": 4.0, "overall_score": 80.0},
+    {"_id": 6, "training_co2_kg": 5.0, "parameters_billions": 0.5, "overall_score": 25.0},
+    {"_id": 7, "training_co2_kg": 80.0, "parameters_billions": 7.0, "overall_score": 60.0},
+    {"_id": 8, "training_co2_kg": NAN, "parameters_billions": 3.0, "overall_score": 30.0},
+    {"_id": 9, "training_co2_kg": 15.0, "parameters_billions": NAN, "overall_score": 30.0},
+    {"_id": 10, "training_co2_kg": 15.0, "parameters_billions": 3.0, "overall_score": NAN},
+    {"_id": 11, "training_co2_kg": None, "parameters_billions": 3.0, "overall_score": 30.0},
+    {"_id": 12, "parameters_billions": 3.0, "overall_score": 30.0},
+    {"_id": 13, "training_co2_kg": 0.0, "parameters_billions": 3.0, "overall_score": 30.0},
+]
+ELIGIBLE_IDS = [1, 2, 3, 4, 5, 6, 7]
+
+
+def _eligible_metrics():
+    eligible = [doc for doc in FIXTURE if filter_applies(ELIGIBLE_FILTER, doc)]
+    co2 = np.array([doc["training_co2_kg"] for doc in eligible])
+    params = np.array([doc["parameters_billions"] for doc in eligible])
+    score = np.array([doc["overall_score"] for doc in eligible])
+    return [doc["_id"] for doc in eligible], (co2, co2 / params, co2 / score)
+
+
+def _stages(name):
+    return [stage[name] for stage in build_scoring_pipeline() if name in stage]
+
+
+@pytest.fixture(scope="module")
+def mongo_db():
+    client = MongoClient(os.environ.get("MONGODB_TEST_URL", "mongodb://localhost:27017"),
+                         serverSelectionTimeoutMS=500)
+    try:
+        version = client.server_info()["versionArray"]
+    except PyMongoError:
+        pytest.skip("Pas de serveur MongoDB (MONGODB_TEST_URL)")
+    if version < [5, 0]:
+        pytest.skip("$setWindowFields nécessite MongoDB >= 5.0")
+    name = f"carbonscope_test_{uuid.uuid4().hex[:8]}"
+    yield client[name]
+    client.drop_database(name)
+    client.close()
+
+
+def test_eligible_filter_excludes_nan_and_missing_values():
+    ids, _ = _eligible_metrics()
+    assert ids == ELIGIBLE_IDS
+    assert build_scoring_pipeline()[0] == {"$match": ELIGIBLE_FILTER}
+
+
+def test_percentile_ranks_match_python_engine_with_ties():
+    _, metrics = _eligible_metrics()
+    for values in metrics:
+        sorted_values = sorted(values.tolist())
+        expected = [calculate_percentile_rank(value, sorted_values) for value in values]
+        np.testing.assert_allclose(percentile_ranks(values), expected)
+    # Égalités : même rang, demi-rang compté pour les valeurs égales
+    np.testing.assert_allclose(percentile_ranks(np.array([1.0, 1.0, 2.0, 3.0])), [75.0, 75.0, 37.5, 12.5])
+
+
+def test_pipeline_structure():
+    pipeline = build_scoring_pipeline()
+    assert [next(iter(stage)) for stage in pipeline] == (
+        ["$match", "$project"] + ["$setWindowFields"] * 7 + ["$set"] * 3 + ["$project", "$merge"]
+    )
+
+    # Un $rank croissant et un décroissant par métrique ; _n sur toute la partition
+    windows = _stages("$setWindowFields")
+    assert windows[0]["output"]["_n"]["window"] == {"documents": ["unbounded", "unbounded"]}
+    ranked = {(next(iter(window["sortBy"].items())), next(iter(window["output"]))) for window in windows[1:]}
+    assert ranked == {((metric, direction), f"_r{'a' if direction == 1 else 'd'}_{metric}")
+                      for metric in METRICS for direction in (1, -1)}
+    assert all(list(window["output"].values()) == [{"$rank": {}}] for window in windows[1:])
+
+    # Rang percentile de chaque métrique calculé depuis ses deux $rank
+    assert _stages("$set")[0] == {
+        f"_rank_{metric}": _percentile_rank_expr(f"_ra_{metric}", f"_rd_{metric}") for metric in METRICS
+    }
+
+    # Pondérations de SCORE_WEIGHTS, score borné entre 0 et 100
+    score = _stages("$set")[1]["carbon_score"]
+    terms = score["$max"][1]["$min"][1]["$add"]
+    assert {term["$multiply"][1]: term["$multiply"][0] for term in terms} == {
+        f"$_rank_{metric}": pytest.approx(SCORE_WEIGHTS[metric]) for metric in METRICS
+    }
+
+    # Catégories : meilleure d'abord, seuils de CARBON_CATEGORIES
+    switch = _stages("$set")[2]["category"]["$switch"]
+    assert switch["branches"] == category_switch_branches("$carbon_score")
+    thresholds = [branch["case"]["$gte"][1] for branch in switch["branches"]]
+    assert thresholds == sorted((data["min_score"] for data in CARBON_CATEGORIES.values()), reverse=True)
+
+    # Mêmes champs que les autres moteurs, fusionnés dans ai_models sans créer de document
+    assert set(_stages("$project")[1]) == SCORE_FIELDS
+    assert _stages("$merge")[0] == {"into": MODELS_COLLECTION, "on": "_id",
+                                    "whenMatched": "merge", "whenNotMatched": "discard"}
+
+
+def test_aggregation_pipeline_matches_vectorized_scores(mongo_db):
+    collection = mongo_db[MODELS_COLLECTION]
+    collection.insert_many([dict(doc) for doc in FIXTURE])
+    list(collection.aggregate(build_scoring_pipeline())) # Terminé par $merge : aucun document retourné
+
+    ids, (co2, co2_per_param, co2_per_score) = _eligible_metrics()
+    ranks = [percentile_ranks(values) for values in (co2, co2_per_param, co2_per_score)]
+    scores = weighted_scores(*ranks)
+    categories = categorize(scores)
+
+    results = {doc["_id"]: doc for doc in collection.find()}
+    for model_id in set(results) - set(ids):
+        assert not SCORE_FIELDS & set(results[model_id]) # Modèles inéligibles non scorés
+    for idx, model_id in enumerate(ids):
+        doc = results[model_id]
+        assert doc["rank_co2"] == pytest.approx(ranks[0][idx])
+        assert doc["rank_co2_per_param"] == pytest.approx(ranks[1][idx])
+        assert doc["rank_co2_per_score"] == pytest.approx(ranks[2][idx])
+        assert doc["carbon_score"] == pytest.approx(scores[idx])
+        assert doc["rank_percentile"] == pytest.approx(scores[idx])
+        assert doc["efficiency_ratio"] == pytest.approx(co2_per_score[idx])
+        assert doc["category"] == categories[idx]
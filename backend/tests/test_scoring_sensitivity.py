@@ -0,0 +1,135 @@
+# backend/tests/test_scoring_sensitivity.py
+
+"""Analyse de sensibilité aux pondérations (app.utils.scoring) : grille, rangs moyens, tau et rho.
+
+Les corrélations sont comparées à un calcul direct sur toutes les paires (tau-b de Kendall)
+et à pandas (Spearman = Pearson des rangs moyens), et à scipy.stats s'il est installé.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from app.models.models import WeightSensitivityRequest
+from app.utils.scoring import (
+    CATEGORY_ORDER, _average_ranks, category_indices, default_weights, weight_grid,
+    weight_sensitivity, weighted_scores,
+)
+
+
+def exact_kendall_tau_b(x, y):
+    """Tau-b de Kendall sur toutes les paires (égalités comprises)."""
+    score = x_untied = y_untied = 0
+    for i, j in itertools.combinations(range(len(x)), 2):
+        score += np.sign(x[i] - x[j]) * np.sign(y[i] - y[j])
+        x_untied += x[i] != x[j]
+        y_untied += y[i] != y[j]
+    return score / np.sqrt(x_untied * y_untied)
+
+
+def random_ranks(n_models, seed=1):
+    # Rangs percentiles arrondis : des égalités sur chaque métrique
+    rng = np.random.default_rng(seed)
+    return np.round(rng.uniform(0, 100, (n_models, 3)) / 5) * 5
+
+
+def test_weight_grid_enumerates_the_simplex():
+    grid = weight_grid(0.5)
+    expected = {(0, 0, 1), (0, 0.5, 0.5), (0, 1, 0), (0.5, 0, 0.5), (0.5, 0.5, 0), (1, 0, 0)}
+    assert {tuple(point) for point in grid.tolist()} == expected
+    assert len(weight_grid(0.05)) == 21 * 22 // 2 # (n + 1)(n + 2) / 2 points pour n = 20 divisions
+    np.testing.assert_allclose(weight_grid(0.1).sum(axis=1), 1.0)
+    assert len(weight_grid(1)) == 3
+
+
+@pytest.mark.parametrize("step", [0, -0.1, 1.5, 0.3, 0.07])
+def test_weight_grid_rejects_steps_that_do_not_divide_one(step):
+    with pytest.raises(ValueError):
+        weight_grid(step)
+
+
+@pytest.mark.parametrize("weights", [[[1, 2], [1, 2, 3]], [[1, 2, 3, 4]], [[]]])
+def test_request_rejects_weights_that_are_not_triplets(weights):
+    # Liste irrégulière : refusée à la validation (422) au lieu d'une ValueError de NumPy (500)
+    with pytest.raises(ValidationError):
+        WeightSensitivityRequest(weights=weights)
+
+
+def test_average_ranks_with_ties():
+    np.testing.assert_array_equal(_average_ranks(np.array([3.0, 1.0, 3.0, 2.0])), [2.5, 0.0, 2.5, 1.0])
+    np.testing.assert_array_equal(_average_ranks(np.array([5.0, 5.0, 5.0])), [1.0, 1.0, 1.0])
+    # 2D : chaque ligne est classée séparément
+    np.testing.assert_array_equal(
+        _average_ranks(np.array([[1.0, 1.0, 0.0], [0.0, 2.0, 2.0]])),
+        [[1.5, 1.5, 0.0], [0.0, 1.5, 1.5]],
+    )
+
+
+def test_average_ranks_match_pandas():
+    values = np.random.default_rng(3).integers(0, 6, (4, 50)).astype(np.float64)
+    expected = pd.DataFrame(values.T).rank(method="average").to_numpy().T - 1
+    np.testing.assert_array_equal(_average_ranks(values), expected)
+    np.testing.assert_array_equal(_average_ranks(values[0]), expected[0])
+
+
+def test_average_ranks_match_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    values = np.random.default_rng(4).integers(0, 10, 200).astype(np.float64)
+    np.testing.assert_array_equal(_average_ranks(values), stats.rankdata(values, method="average") - 1)
+
+
+def test_current_weights_leave_everything_unchanged():
+    ranks = random_ranks(40)
+    result = weight_sensitivity(ranks, default_weights()[None, :])
+    base_categories = category_indices(weighted_scores(ranks[:, 0], ranks[:, 1], ranks[:, 2]))
+
+    assert result["changed"].tolist() == [0]
+    assert result["kendall_tau"][0] == pytest.approx(1.0)
+    assert result["spearman_rho"][0] == pytest.approx(1.0)
+    transitions = result["transitions"][0]
+    assert np.count_nonzero(transitions - np.diag(np.diag(transitions))) == 0
+    # Diagonale dans l'ordre A+ ... F (CATEGORY_ORDER)
+    counts = np.bincount(base_categories, minlength=len(CATEGORY_ORDER))[::-1]
+    assert np.diag(transitions).tolist() == counts.tolist()
+
+
+def test_transitions_and_correlations_against_direct_computation():
+    ranks = random_ranks(30, seed=7)
+    grid = weight_grid(0.25)
+    result = weight_sensitivity(ranks, grid, pair_samples=400000, seed=11)
+    base_scores = weighted_scores(ranks[:, 0], ranks[:, 1], ranks[:, 2])
+    base_categories = category_indices(base_scores)
+
+    for idx, weights in enumerate(grid):
+        scores = np.clip(ranks @ weights, 0, 100)
+        categories = category_indices(scores)
+        assert result["changed"][idx] == np.count_nonzero(categories != base_categories)
+        assert result["transitions"][idx].sum() == len(ranks)
+
+        expected_rho = pd.Series(scores).rank().corr(pd.Series(base_scores).rank())
+        assert result["spearman_rho"][idx] == pytest.approx(expected_rho)
+        # Estimation par tirage de paires : proche du tau-b exact
+        assert result["kendall_tau"][idx] == pytest.approx(exact_kendall_tau_b(scores, base_scores), abs=0.02)
+
+
+def test_reversed_order_gives_negative_correlations():
+    # co2 classe les modèles dans l'ordre inverse des deux autres métriques
+    ranks = np.array([[0.0, 90.0, 90.0], [30.0, 60.0, 60.0], [60.0, 30.0, 30.0], [90.0, 0.0, 0.0]])
+    result = weight_sensitivity(ranks, np.array([[1.0, 0.0, 0.0]]), baseline=np.array([0.0, 0.5, 0.5]),
+                                pair_samples=1000)
+    assert result["spearman_rho"][0] == pytest.approx(-1.0)
+    assert result["kendall_tau"][0] == pytest.approx(-1.0)
+
+
+def test_correlations_match_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    ranks = random_ranks(25, seed=5)
+    weights = np.array([[0.6, 0.2, 0.2]])
+    result = weight_sensitivity(ranks, weights, pair_samples=400000)
+    scores = ranks @ weights[0]
+    base_scores = weighted_scores(ranks[:, 0], ranks[:, 1], ranks[:, 2])
+    assert result["spearman_rho"][0] == pytest.approx(stats.spearmanr(scores, base_scores).correlation)
+    assert result["kendall_tau"][0] == pytest.approx(stats.kendalltau(scores, base_scores).correlation, abs=0.02)
@@ -0,0 +1,138 @@
+# backend/tests/test_simulation_batch.py
+
+"""Simulation par lot (simulate_batch) : contrat de SimulationBatchResult, écriture de l'historique.
+
+Le routeur renvoie le dict du service dans une JSONResponse, sans revalidation Pydantic :
+ces tests garantissent que ce dict est exactement celui que produirait SimulationBatchResult.
+"""
+
+import asyncio
+import json
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app.models.models import SimulationBatchResult, SimulationParams
+from app.services import catalog_service, model_service, simulation_service, simulation_write_buffer
+from app.services.catalog_service import MODELS_COLLECTION
+from app.services.simulation_service import SimulationService
+from app.services.simulation_write_buffer import SIMULATIONS_COLLECTION
+
+
+class FakeCollection:
+    """Collection dont insert_many est remplacé (erreurs du serveur simulées)."""
+
+    def __init__(self, insert_many):
+        self.insert_many = insert_many
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test_simulation_batch"]
+    for module in (catalog_service, model_service, simulation_service, simulation_write_buffer):
+        monkeypatch.setattr(module, "get_database", lambda: db)
+    return db
+
+
+def insert_models(db):
+    async def insert():
+        known = await db[MODELS_COLLECTION].insert_one({
+            "model_name": "M1", "parameters_billions": 7.0, "architecture": "LlamaForCausalLM",
+            "model_type": "🟢 pretrained", "training_co2_kg": 10.0, "overall_score": 50.0,
+        })
+        # Taille inconnue : énergie et eau non calculables (None)
+        unknown_size = await db[MODELS_COLLECTION].insert_one({
+            "model_name": "M2", "architecture": "LlamaForCausalLM", "model_type": "🟢 pretrained",
+        })
+        return str(known.inserted_id), str(unknown_size.inserted_id)
+
+    return asyncio.run(insert())
+
+
+def scenarios(known, unknown_size):
+    return [
+        SimulationParams(model_id=known, frequency_per_day=1000, region="france", duration_days=30),
+        SimulationParams(model_id=str(ObjectId()), frequency_per_day=10, region="france"),
+        SimulationParams(model_id=unknown_size, frequency_per_day=10, region="france"),
+        SimulationParams(model_id=known, frequency_per_day=10, region="atlantide"),
+        SimulationParams(model_id="pas-un-id", frequency_per_day=10, region="france"),
+    ]
+
+
+def test_batch_payload_matches_the_response_model(db):
+    known, unknown_size = insert_models(db)
+    result = asyncio.run(SimulationService().simulate_batch(scenarios(known, unknown_size), "u1"))
+
+    validated = SimulationBatchResult.parse_obj(result)
+    # Même JSON que la revalidation (types compris : un entier Pydantic n'est pas un float)
+    assert json.dumps(result, sort_keys=True) == json.dumps(json.loads(validated.json()), sort_keys=True)
+    assert [item["model_id"] for item in result["results"]] == [known, unknown_size]
+    assert result["results"][1]["total_energy_kwh"] is None
+    assert [error["index"] for error in result["errors"]] == [1, 3, 4]
+
+
+def test_batch_results_are_written_to_the_history(db):
+    known, unknown_size = insert_models(db)
+    result = asyncio.run(SimulationService().simulate_batch(scenarios(known, unknown_size), "u1"))
+
+    docs = asyncio.run(db[SIMULATIONS_COLLECTION].find({"user_id": "u1"}).to_list(None))
+    assert {str(doc["_id"]) for doc in docs} == {item["id"] for item in result["results"]}
+
+
+def test_rejected_history_write_does_not_fail_the_batch(db, monkeypatch):
+    known, unknown_size = insert_models(db)
+    collection = db[SIMULATIONS_COLLECTION]
+
+    async def insert_many(docs, ordered=False):
+        # Validation de schéma côté serveur : le document du modèle M2 est refusé
+        accepted = [doc for doc in docs if doc["result"]["model_name"] != "M2"]
+        if accepted:
+            await collection.insert_many(accepted, ordered=False)
+        errors = [{"index": index, "code": 121, "errmsg": "Document failed validation"}
+                  for index, doc in enumerate(docs) if doc["result"]["model_name"] == "M2"]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(accepted)})
+
+    buffer = simulation_write_buffer.SimulationWriteBuffer(max_pending=100, batch_size=10, flush_interval=60)
+    monkeypatch.setattr(buffer, "_get_collection", lambda: FakeCollection(insert_many))
+    monkeypatch.setattr(simulation_service, "simulation_write_buffer", buffer)
+
+    result = asyncio.run(SimulationService().simulate_batch(scenarios(known, unknown_size), "u1"))
+
+    assert len(result["results"]) == 2
+    docs = asyncio.run(collection.find({}).to_list(None))
+    assert [doc["result"]["model_name"] for doc in docs] == ["M1"]
+    assert buffer.dead_lettered == 1
+
+
+def test_history_write_is_retried_when_the_database_is_unavailable(db, monkeypatch):
+    known, unknown_size = insert_models(db)
+    collection = db[SIMULATIONS_COLLECTION]
+    available = False
+
+    async def insert_many(docs, ordered=False):
+        if not available:
+            raise AutoReconnect("connexion perdue")
+        return await collection.insert_many(docs, ordered=ordered)
+
+    buffer = simulation_write_buffer.SimulationWriteBuffer(max_pending=100, batch_size=10, flush_interval=60)
+    monkeypatch.setattr(buffer, "_get_collection", lambda: FakeCollection(insert_many))
+    monkeypatch.setattr(simulation_service, "simulation_write_buffer", buffer)
+
+    async def scenario():
+        nonlocal available
+        await buffer.start()
+        result = await SimulationService().simulate_batch(scenarios(known, unknown_size), "u1")
+        pending = buffer.stats()["pending"]
+        available = True
+        await buffer.stop()
+        ids = {str(doc["_id"]) async for doc in collection.find({}, {"_id": 1})}
+        return result, pending, ids
+
+    result, pending, ids = asyncio.run(scenario())
+    # Résultats renvoyés malgré la panne ; l'historique est remis en file puis écrit
+    assert pending == 2
+    assert ids == {item["id"] for item in result["results"]}
+    assert buffer.dead_lettered == 0
@@ -0,0 +1,125 @@
+# backend/tests/test_simulation_cache.py
+
+"""Cache des résultats de simulate_impact (simulation_cache) : succès, invalidation, erreurs.
+
+La clé dépend du compteur d'écritures du catalogue (catalog_meta), lu sans charger le
+snapshot : une écriture signalée par CatalogService.record_write rend les anciennes entrées
+inatteignables.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models.models import SimulationParams
+from app.services import catalog_service, model_service, simulation_service, simulation_write_buffer
+from app.services.catalog_service import CatalogService, MODELS_COLLECTION
+from app.services.model_service import ModelService
+from app.services.simulation_service import SimulationService, simulation_cache
+from app.services.simulation_write_buffer import SIMULATIONS_COLLECTION
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test_simulation_cache"]
+    for module in (catalog_service, model_service, simulation_service, simulation_write_buffer):
+        monkeypatch.setattr(module, "get_database", lambda: db)
+    monkeypatch.setattr(catalog_service, "_write_version", None)
+    simulation_cache.clear()
+
+    async def fail_snapshot(self):
+        raise AssertionError("simulate_impact ne doit pas charger le snapshot du catalogue")
+
+    monkeypatch.setattr(CatalogService, "get_snapshot", fail_snapshot)
+    yield db
+    simulation_cache.clear()
+
+
+@pytest.fixture
+def model_reads(monkeypatch):
+    reads = []
+    get_model_by_id = ModelService.get_model_by_id
+
+    async def counting_get_model_by_id(self, model_id):
+        reads.append(model_id)
+        return await get_model_by_id(self, model_id)
+
+    monkeypatch.setattr(ModelService, "get_model_by_id", counting_get_model_by_id)
+    return reads
+
+
+async def insert_model(db, name="M1", parameters_billions=7.0):
+    result = await db[MODELS_COLLECTION].insert_one({
+        "model_name": name, "parameters_billions": parameters_billions, "architecture": "LlamaForCausalLM",
+        "model_type": "🟢 pretrained", "training_co2_kg": 10.0, "overall_score": 50.0,
+    })
+    return str(result.inserted_id)
+
+
+def params(model_id, region="france", frequency_per_day=1000):
+    return SimulationParams(model_id=model_id, region=region, frequency_per_day=frequency_per_day, duration_days=30)
+
+
+def test_second_simulation_is_served_from_cache(db, model_reads):
+    service = SimulationService()
+
+    async def scenario():
+        model_id = await insert_model(db)
+        first = await service.simulate_impact(params(model_id), "u1")
+        second = await service.simulate_impact(params(model_id), "u1")
+        other = await service.simulate_impact(params(model_id, frequency_per_day=10), "u1")
+        return model_id, first, second, other, await db[SIMULATIONS_COLLECTION].count_documents({})
+
+    model_id, first, second, other, recorded = asyncio.run(scenario())
+    assert model_reads == [model_id, model_id] # Deuxième appel : modèle non relu
+    assert second.total_co2_kg == first.total_co2_kg
+    assert other.total_co2_kg == pytest.approx(first.total_co2_kg / 100)
+    # Chaque appel est enregistré dans l'historique, sous son propre ID
+    assert recorded == 3
+    assert len({first.id, second.id, other.id}) == 3
+
+
+def test_catalog_write_invalidates_cached_results(db, model_reads):
+    service = SimulationService()
+
+    async def scenario():
+        model_id = await insert_model(db)
+        before = await service.simulate_impact(params(model_id), "u1")
+        # Modification du modèle signalée comme le font l'API et les scripts de chargement
+        await db[MODELS_COLLECTION].update_one({"model_name": "M1"}, {"$set": {"parameters_billions": 14.0}})
+        await CatalogService().record_write()
+        after = await service.simulate_impact(params(model_id), "u1")
+        return model_id, before, after
+
+    model_id, before, after = asyncio.run(scenario())
+    assert model_reads == [model_id, model_id]
+    assert after.total_co2_kg == pytest.approx(before.total_co2_kg * 2)
+
+
+def test_write_version_is_cached_until_invalidated(db):
+    service = CatalogService()
+
+    async def scenario():
+        assert await service.get_write_version() == 0
+        await catalog_service.bump_catalog_version(db) # Écriture d'un autre processus
+        unchanged = await service.get_write_version()
+        service.invalidate()
+        return unchanged, await service.get_write_version()
+
+    assert asyncio.run(scenario()) == (0, 1)
+
+
+def test_unknown_model_is_reported_before_unknown_region(db):
+    service = SimulationService()
+
+    async def scenario(model_id, region):
+        with pytest.raises(HTTPException) as error:
+            await service.simulate_impact(params(model_id, region=region), "u1")
+        return error.value.status_code
+
+    assert asyncio.run(scenario("64b000000000000000000000", "atlantide")) == 404
+    model_id = asyncio.run(insert_model(db))
+    assert asyncio.run(scenario(model_id, "atlantide")) == 400
+    assert asyncio.run(scenario("64b000000000000000000000", "france")) == 404
@@ -0,0 +1,98 @@
+# backend/tests/test_simulation_history.py
+
+"""Historique des simulations : horodatage UTC, pagination par curseur "<timestamp ISO>|<id>"."""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import settings
+from app.models.models import SimulationParams, SimulationResult
+from app.services import simulation_service, simulation_write_buffer
+from app.services.simulation_service import SimulationService
+from app.services.simulation_write_buffer import SIMULATIONS_COLLECTION
+
+START = datetime(2024, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test_simulation_history"]
+    monkeypatch.setattr(simulation_service, "get_database", lambda: db)
+    monkeypatch.setattr(simulation_write_buffer, "get_database", lambda: db)
+    return db
+
+
+def history_doc(timestamp, user_id="u1"):
+    return {"_id": ObjectId(), "user_id": user_id, "timestamp": timestamp, "saved": False,
+            "params": {"model_id": "m1", "frequency_per_day": 10, "region": "france", "duration_days": 30},
+            "result": {"model_id": "m1", "model_name": "M1", "total_co2_kg": 1.0, "equivalent_car_km": 0.0,
+                       "equivalent_trees_needed": 0, "equivalent_smartphone_charges": 0}}
+
+
+def read_all_pages(service, limit):
+    async def scenario():
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = await service.get_simulation_history("u1", limit=limit, cursor=cursor)
+            ids += [item.id for item in page.items]
+            pages += 1
+            if page.next_cursor is None:
+                return ids, pages
+            cursor = page.next_cursor
+
+    return asyncio.run(scenario())
+
+
+def test_pages_cover_the_history_once_including_timestamp_ties(db):
+    # Plusieurs simulations par horodatage (lot simulate_batch) : départage par _id via $or
+    docs = [history_doc(START + timedelta(seconds=second)) for second in (0, 0, 0, 1, 2, 2, 2, 2, 3)]
+    docs.append(history_doc(START, user_id="u2"))
+    asyncio.run(db[SIMULATIONS_COLLECTION].insert_many(docs))
+    expected = [str(doc["_id"]) for doc in sorted(
+        (doc for doc in docs if doc["user_id"] == "u1"), key=lambda doc: (doc["timestamp"], doc["_id"]), reverse=True
+    )]
+
+    for limit in (1, 2, 3, 4, 50):
+        ids, pages = read_all_pages(SimulationService(), limit)
+        assert ids == expected
+        assert pages == max(1, -(-len(expected) // limit))
+
+
+@pytest.mark.parametrize("cursor", ["pas-un-curseur", "2024-03-01T12:00:00|pas-un-id", f"hier|{ObjectId()}"])
+def test_invalid_cursor_is_rejected(db, cursor):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(SimulationService().get_simulation_history("u1", cursor=cursor))
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def distant_timezone():
+    # Fuseau local éloigné d'UTC (UTC+14) : datetime.now() et datetime.utcnow() diffèrent
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "Pacific/Kiritimati"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_simulations_are_timestamped_in_utc(db, distant_timezone):
+    params = SimulationParams(model_id="m1", region="france", frequency_per_day=10, duration_days=30)
+    result = SimulationResult(model_id="m1", model_name="M1", total_co2_kg=1.0, equivalent_car_km=0.0,
+                              equivalent_trees_needed=0, equivalent_smartphone_charges=0)
+    simulation_id = asyncio.run(SimulationService()._record_simulation(params, result, "u1"))
+
+    doc = asyncio.run(db[SIMULATIONS_COLLECTION].find_one({"_id": ObjectId(simulation_id)}))
+    assert abs(doc["timestamp"] - datetime.utcnow()) < timedelta(minutes=1)
+    retention = doc["expires_at"] - doc["timestamp"]
+    assert abs(retention - timedelta(days=settings.SIMULATION_HISTORY_RETENTION_DAYS)) < timedelta(minutes=1)
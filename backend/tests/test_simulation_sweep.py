@@ -0,0 +1,108 @@
+# backend/tests/test_simulation_sweep.py
+
+"""Grilles de simulation (simulate_sweep) : diffusion fréquence × région × durée, formats NDJSON et npy."""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models.models import SimulationSweepRequest, SweepAxis
+from app.services import catalog_service, model_service, simulation_service
+from app.services.catalog_service import MODELS_COLLECTION
+from app.services.emission_factors import emission_factor_registry
+from app.services.simulation_service import (
+    EQUIVALENTS, SimulationService, compute_impacts, iter_sweep_ndjson, iter_sweep_npy, read_sweep_npy,
+)
+
+REGIONS = ["france", "china", "sweden"]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test_simulation_sweep"]
+    for module in (catalog_service, model_service, simulation_service):
+        monkeypatch.setattr(module, "get_database", lambda: db)
+    return db
+
+
+def insert_model(db, parameters_billions=7.0):
+    doc = {"model_name": "M1", "architecture": "LlamaForCausalLM", "model_type": "🟢 pretrained"}
+    if parameters_billions is not None:
+        doc["parameters_billions"] = parameters_billions
+    return str(asyncio.run(db[MODELS_COLLECTION].insert_one(doc)).inserted_id)
+
+
+def sweep(model_id, **overrides):
+    request = dict(
+        model_id=model_id,
+        frequency_per_day=SweepAxis(values=[1, 10, 1000, 25000]),
+        duration_days=SweepAxis(start=1, stop=365, num=5, log=True),
+        regions=REGIONS,
+    )
+    request.update(overrides)
+    return asyncio.run(SimulationService().simulate_sweep(SimulationSweepRequest(**request)))
+
+
+def test_each_cell_matches_a_single_simulation(db):
+    grid = sweep(insert_model(db))
+    header, tensors = grid["header"], grid["tensors"]
+    axes = header["axes"]
+    assert header["shape"] == [4, 3, 5]
+    assert axes["region"] == REGIONS
+    np.testing.assert_allclose(axes["duration_days"], np.geomspace(1, 365, 5))
+
+    for i, frequency in enumerate(axes["frequency_per_day"]):
+        for j, region in enumerate(axes["region"]):
+            factors = emission_factor_registry.lookup(None, region)
+            for k, duration in enumerate(axes["duration_days"]):
+                cell = compute_impacts(7.0, frequency, duration, factors["co2_factor"], EQUIVALENTS, factors["pue"])
+                assert tensors["total_co2_kg"][i, j, k] == pytest.approx(float(cell["total_co2_kg"]))
+                assert tensors["total_energy_kwh"][i, j, k] == pytest.approx(float(cell["total_energy_kwh"]))
+
+
+def test_model_without_size_omits_the_energy(db):
+    grid = sweep(insert_model(db, parameters_billions=None))
+    assert grid["header"]["metrics"] == ["total_co2_kg"]
+    assert not grid["tensors"]["total_co2_kg"].any()
+
+
+@pytest.mark.parametrize("overrides", [
+    {"regions": ["france", "atlantide"]},
+    {"frequency_per_day": SweepAxis()},
+    {"frequency_per_day": SweepAxis(values=[10, -1])},
+    {"frequency_per_day": SweepAxis(start=1, stop=10 ** 6, num=10000),
+     "duration_days": SweepAxis(start=1, stop=365, num=10000)},
+])
+def test_invalid_grids_are_rejected(db, overrides):
+    with pytest.raises(HTTPException) as error:
+        sweep(insert_model(db), **overrides)
+    assert error.value.status_code == 400
+
+
+def test_npy_preamble_and_array_round_trip(db):
+    grid = sweep(insert_model(db))
+    # Petits morceaux : le tableau est découpé en plusieurs blocs
+    payload = b"".join(iter_sweep_npy(grid["header"], grid["tensors"], chunk_bytes=100))
+
+    header, array = read_sweep_npy(payload)
+    assert header == grid["header"]
+    assert array.dtype == np.float64
+    assert array.shape == (2, 4, 3, 5)
+    np.testing.assert_array_equal(array[0], grid["tensors"]["total_co2_kg"])
+    np.testing.assert_array_equal(array[1], grid["tensors"]["total_energy_kwh"])
+
+
+def test_ndjson_has_one_line_per_frequency_and_region(db):
+    grid = sweep(insert_model(db))
+    lines = [json.loads(line) for line in "".join(iter_sweep_ndjson(grid["header"], grid["tensors"], 5)).splitlines()]
+
+    assert lines[0] == grid["header"]
+    rows = lines[1:]
+    assert [(row["frequency_index"], row["region_index"]) for row in rows] == [
+        (i, j) for i in range(4) for j in range(3)
+    ]
+    assert rows[4]["total_co2_kg"] == grid["tensors"]["total_co2_kg"][1, 1].tolist()
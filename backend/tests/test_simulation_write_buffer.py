@@ -0,0 +1,145 @@
+# backend/tests/test_simulation_write_buffer.py
+
+"""File d'écriture différée des simulations : documents refusés écartés, écriture par utilisateur."""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app.services import simulation_write_buffer as write_buffer_module
+from app.services.simulation_write_buffer import SimulationWriteBuffer, SIMULATIONS_COLLECTION
+
+
+def simulation_doc(user_id="u1", **extra):
+    return {"_id": ObjectId(), "user_id": user_id, "params": {"region": "france"},
+            "result": {"model_id": "m1", "model_name": "M1", "total_co2_kg": 1.0}, **extra}
+
+
+class FakeCollection:
+    """Collection dont insert_many est remplacé (erreurs du serveur simulées)."""
+
+    def __init__(self, insert_many):
+        self.insert_many = insert_many
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test_simulation_write_buffer"]
+    monkeypatch.setattr(write_buffer_module, "get_database", lambda: db)
+    return db
+
+
+async def written_ids(db):
+    return {doc["_id"] async for doc in db[SIMULATIONS_COLLECTION].find({}, {"_id": 1})}
+
+
+def test_invalid_document_does_not_block_the_queue(db):
+    # File courte : sans mise à l'écart, les producteurs resteraient bloqués par la contre-pression
+    buffer = SimulationWriteBuffer(max_pending=4, batch_size=2, flush_interval=0.01, max_attempts=2)
+    invalid = simulation_doc(params={"region": object()}) # Non encodable en BSON
+    valid = [simulation_doc() for _ in range(10)]
+
+    async def scenario():
+        await buffer.start()
+        await asyncio.wait_for(buffer.enqueue(invalid), timeout=5)
+        for doc in valid:
+            await asyncio.wait_for(buffer.enqueue(doc), timeout=5)
+        await buffer.stop()
+        return await written_ids(db)
+
+    ids = asyncio.run(scenario())
+    assert ids == {doc["_id"] for doc in valid}
+    stats = buffer.stats()
+    assert stats["pending"] == 0
+    assert stats["dead_lettered"] == 1
+    assert stats["dead_letters"][0]["id"] == str(invalid["_id"])
+    assert "InvalidDocument" in stats["dead_letters"][0]["error"]
+
+
+def test_rejected_write_is_dead_lettered_after_max_attempts(db, monkeypatch):
+    buffer = SimulationWriteBuffer(max_pending=100, batch_size=10, flush_interval=60, max_attempts=3)
+    collection = db[SIMULATIONS_COLLECTION]
+
+    async def insert_many(docs, ordered=False):
+        # Validation de schéma côté serveur : code 121 pour le document "rejected"
+        accepted = [doc for doc in docs if not doc.get("rejected")]
+        if accepted:
+            await collection.insert_many(accepted, ordered=False)
+        errors = [{"index": index, "code": 121, "errmsg": "Document failed validation"}
+                  for index, doc in enumerate(docs) if doc.get("rejected")]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(accepted)})
+
+    monkeypatch.setattr(buffer, "_get_collection", lambda: FakeCollection(insert_many))
+    rejected = simulation_doc(rejected=True)
+    valid = [simulation_doc() for _ in range(4)]
+
+    async def scenario():
+        await buffer.start()
+        for doc in [rejected] + valid:
+            await buffer.enqueue(doc)
+        for _ in range(buffer.max_attempts):
+            await buffer.flush()
+            assert buffer.stats()["pending"] == 1 # Seul le document refusé reste en file
+        await buffer.flush()
+        await buffer.stop()
+        return await written_ids(db)
+
+    assert asyncio.run(scenario()) == {doc["_id"] for doc in valid}
+    assert buffer.stats()["pending"] == 0
+    assert buffer.dead_lettered == 1
+    assert buffer.dead_letters[0]["doc"] is rejected
+    assert buffer.written == len(valid)
+
+
+def test_database_errors_are_retried_without_dead_letters(db, monkeypatch):
+    buffer = SimulationWriteBuffer(max_pending=100, batch_size=10, flush_interval=60, max_attempts=2)
+    available = False
+    collection = db[SIMULATIONS_COLLECTION]
+
+    async def insert_many(docs, ordered=False):
+        if not available:
+            raise AutoReconnect("connexion perdue")
+        return await collection.insert_many(docs, ordered=ordered)
+
+    monkeypatch.setattr(buffer, "_get_collection", lambda: FakeCollection(insert_many))
+    docs = [simulation_doc() for _ in range(3)]
+
+    async def scenario():
+        nonlocal available
+        await buffer.start()
+        for doc in docs:
+            await buffer.enqueue(doc)
+        for _ in range(5):
+            await buffer.flush()
+        assert buffer.stats()["pending"] == len(docs)
+        assert buffer.dead_lettered == 0
+        available = True
+        await buffer.flush()
+        await buffer.stop()
+        return await written_ids(db)
+
+    assert asyncio.run(scenario()) == {doc["_id"] for doc in docs}
+
+
+def test_flush_user_writes_only_that_users_documents(db):
+    buffer = SimulationWriteBuffer(max_pending=100, batch_size=2, flush_interval=60)
+    mine = [simulation_doc("u1") for _ in range(3)]
+    others = [simulation_doc("u2") for _ in range(4)]
+
+    async def scenario():
+        await buffer.start()
+        for doc in others[:2] + mine + others[2:]:
+            await buffer.enqueue(doc)
+        await buffer.flush_user("u1")
+        ids = await written_ids(db)
+        pending = list(buffer._pending)
+        await buffer.stop()
+        return ids, pending
+
+    ids, pending = asyncio.run(scenario())
+    assert ids == {doc["_id"] for doc in mine}
+    assert pending == others # Ordre de la file conservé
@@ -0,0 +1,92 @@
+# backend/tests/test_user_cache.py
+
+"""Cache des utilisateurs authentifiés (user_cache) : invalidation par les modifications.
+
+Chaque modification (profil, favoris, désactivation) retire l'utilisateur du cache, y compris
+lorsqu'elle survient pendant qu'une requête lit l'utilisateur dans MongoDB : la valeur lue
+avant la modification n'est alors pas remise en cache.
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models.models import UserCreate
+from app.services import user_service
+from app.services.user_service import UserService, USERS_COLLECTION, user_cache
+
+EMAIL = "alice@example.com"
+
+# Modifications d'un utilisateur, et leur effet attendu sur la valeur relue
+WRITES = {
+    "update": (
+        lambda service, user_id: service.update_user(user_id, UserCreate(email=EMAIL, username="alice2", password="")),
+        lambda user: user.username == "alice2",
+    ),
+    "add_favorite": (
+        lambda service, user_id: service.add_favorite(user_id, "model-1"),
+        lambda user: "model-1" in user.favorites,
+    ),
+    "remove_favorite": (
+        lambda service, user_id: service.remove_favorite(user_id, "model-0"),
+        lambda user: user.favorites == [],
+    ),
+    "deactivate": (
+        lambda service, user_id: service.deactivate_user(user_id),
+        lambda user: not user.is_active,
+    ),
+}
+
+
+@pytest.fixture
+def user_id(monkeypatch):
+    db = AsyncMongoMockClient()["test_user_cache"]
+    monkeypatch.setattr(user_service, "get_database", lambda: db)
+    user_cache.clear()
+    now = datetime.utcnow()
+    result = asyncio.run(db[USERS_COLLECTION].insert_one({
+        "email": EMAIL, "username": "alice", "hashed_password": "x", "is_active": True, "is_admin": False,
+        "created_at": now, "updated_at": now, "favorites": ["model-0"], "search_history": [],
+    }))
+    yield str(result.inserted_id)
+    user_cache.clear()
+
+
+@pytest.mark.parametrize("write", WRITES)
+def test_write_invalidates_cached_user(user_id, write):
+    apply_write, is_updated = WRITES[write]
+    service = UserService()
+
+    async def scenario():
+        cached = await service.get_authenticated_user(EMAIL)
+        assert user_cache.get(EMAIL) is cached
+        await apply_write(service, user_id)
+        assert user_cache.get(EMAIL) is None
+        return await service.get_authenticated_user(EMAIL)
+
+    assert is_updated(asyncio.run(scenario()))
+
+
+@pytest.mark.parametrize("write", WRITES)
+def test_write_during_read_is_not_cached_stale(user_id, write, monkeypatch):
+    apply_write, is_updated = WRITES[write]
+    service = UserService()
+    read_user = UserService.get_user_by_email
+
+    async def slow_read(self, email):
+        # Lecture terminée avant la modification, résultat rendu après l'invalidation
+        user = await read_user(self, email)
+        await apply_write(service, user_id)
+        return user
+
+    async def scenario():
+        monkeypatch.setattr(UserService, "get_user_by_email", slow_read)
+        stale = await service.get_authenticated_user(EMAIL)
+        monkeypatch.setattr(UserService, "get_user_by_email", read_user)
+        assert not is_updated(stale)
+        assert user_cache.get(EMAIL) is None
+        return await service.get_authenticated_user(EMAIL)
+
+    assert is_updated(asyncio.run(scenario()))